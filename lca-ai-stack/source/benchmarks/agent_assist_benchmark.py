@@ -0,0 +1,207 @@
+#!/usr/bin/env python3.12
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Agent Assist Turn Benchmark
+
+Counts the agent assist orchestrator requests of simulated calls where the
+caller turns are split into one to three quick final segments, with and
+without the turn level dispatch (a quiet window of 0 sends each segment).
+
+The records are grouped in KDS batches by their arrival time (one batch per
+poll interval) and processed in order with execute_process_event_api_mutation.
+The pending turns are sent at the end of each batch as in the Lambda
+handler - turns are only merged within a batch. AppSync is replaced with a session stub and the orchestrator invoke
+with a function recording the requests. The assist delay is the stream time
+from the arrival of the last final segment of a request to the end of the
+poll interval of the batch that dispatched it.
+Run from the repo root:
+
+    python lca-ai-stack/source/benchmarks/agent_assist_benchmark.py --calls 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from typing import Any, Dict, List, Tuple
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(SOURCE_DIR, "lambda_layers", "transcript_enrichment_layer")
+FUNCTION_DIR = os.path.join(SOURCE_DIR, "lambda_functions", "call_event_processor")
+
+OFFLINE_ENVIRONMENT = dict(
+    AWS_DEFAULT_REGION="us-east-1",
+    AWS_ACCESS_KEY_ID="benchmark",
+    AWS_SECRET_ACCESS_KEY="benchmark",
+    APPSYNC_GRAPHQL_URL="https://benchmark.appsync-api.us-east-1.amazonaws.com/graphql",
+    STATE_DYNAMODB_TABLE_NAME="benchmark",
+    POWERTOOLS_SERVICE_NAME="benchmark",
+    LOG_LEVEL="WARNING",
+    IS_SENTIMENT_ANALYSIS_ENABLED="false",
+    ASYNC_AGENT_ASSIST_ORCHESTRATOR_ARN="benchmark-agent-assist-orchestrator",
+)
+for _name, _value in OFFLINE_ENVIRONMENT.items():
+    os.environ.setdefault(_name, _value)
+sys.path[:0] = [LAYER_DIR, FUNCTION_DIR]
+
+# pylint: disable=import-error,wrong-import-position
+from appsync_utils import load_schema_snapshot
+from event_processor import call_event_processor
+from lambda_utils import AgentAssistTurnDispatcher
+from sentiment import SentimentAggregationStore
+
+# pylint: enable=import-error,wrong-import-position
+
+WORDS = "I need to change the address on my account and check my last payment".split()
+
+RecordType = Tuple[float, Dict[str, Any]]
+
+
+class _Client:
+    # pylint: disable=too-few-public-methods
+    def __init__(self, schema) -> None:
+        self.schema = schema
+
+
+class EchoSession:
+    """AppSync session stub echoing the mutation input"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, schema) -> None:
+        self.client = _Client(schema)
+
+    async def execute(self, document, variable_values=None) -> Dict[str, Any]:
+        """Returns the input"""
+        field_name = document.definitions[0].selection_set.selections[0].name.value
+        if field_name == "getTranscriptSegmentsWithSentiment":
+            return {field_name: {"TranscriptSegmentsWithSentiment": []}}
+        return {field_name: dict((variable_values or {}).get("input") or {})}
+
+
+def get_records(calls: int, turns: int, seed: int) -> List[RecordType]:
+    """Partial and final segments of the calls with their arrival time"""
+    rng = random.Random(seed)
+    records: List[RecordType] = []
+    for call in range(calls):
+        call_id = f"call-{call}"
+        now = rng.uniform(0, 2)
+        for turn in range(turns):
+            channel = "CALLER" if turn % 2 == 0 else "AGENT"
+            segment_count = rng.randint(1, 3) if channel == "CALLER" else 1
+            for index in range(segment_count):
+                duration = rng.uniform(0.8, 2.5)
+                segment = dict(
+                    EventType="ADD_TRANSCRIPT_SEGMENT",
+                    CallId=call_id,
+                    Channel=channel,
+                    SegmentId=f"{call_id}-{turn}-{index}",
+                    StartTime=round(now, 3),
+                    EndTime=round(now + duration, 3),
+                    Transcript=" ".join(rng.sample(WORDS, rng.randint(3, 8))),
+                )
+                records.append((now + duration / 2, dict(segment, IsPartial=True)))
+                records.append((now + duration, dict(segment, IsPartial=False)))
+                # quick pause between the segments of a turn
+                now += duration + rng.uniform(0.1, 0.4)
+            now += rng.uniform(0.5, 1.5)
+    records.sort(key=lambda record: record[0])
+    return records
+
+
+def get_batches(
+    records: List[RecordType], poll_interval: float
+) -> List[Tuple[float, List[RecordType]]]:
+    """Groups the records by poll interval - with the end time of the interval"""
+    batches: Dict[int, List[RecordType]] = {}
+    for record in records:
+        batches.setdefault(int(record[0] // poll_interval), []).append(record)
+    return [((key + 1) * poll_interval, batches[key]) for key in sorted(batches)]
+
+
+async def run_mode(
+    args: argparse.Namespace,
+    quiet_window: float,
+    batches: List[Tuple[float, List[RecordType]]],
+) -> Dict[str, Any]:
+    """Processes the batches with a dispatcher"""
+    requests: List[Dict[str, Any]] = []
+    delays: List[float] = []
+    arrival_times: Dict[str, float] = {}
+    poll_time = 0.0
+
+    async def dispatch(payload: Dict[str, Any]) -> None:
+        delays.append(poll_time - arrival_times[payload["SegmentId"]])
+        requests.append(payload)
+
+    dispatcher = AgentAssistTurnDispatcher(
+        dispatch_fn=dispatch,
+        quiet_window=quiet_window,
+        max_delay=args.max_delay_ms / 1000,
+        max_length=args.max_length,
+    )
+    # the dispatcher is configured from the environment at import
+    call_event_processor.AGENT_ASSIST_DISPATCHER = dispatcher
+    session = EchoSession(load_schema_snapshot())
+    sentiment_analysis_args = dict(sentiment_aggregation_store=SentimentAggregationStore())
+    for poll_time, batch in batches:
+        for arrival_time, message in batch:
+            if not message["IsPartial"]:
+                arrival_times[message["SegmentId"]] = arrival_time
+            await call_event_processor.execute_process_event_api_mutation(
+                message=dict(message),
+                settings={},
+                appsync_session=session,  # type: ignore
+                sns_client=None,  # type: ignore
+                agent_assist_args=dict(
+                    is_lex_agent_assist_enabled=False, is_lambda_agent_assist_enabled=True
+                ),
+                sentiment_analysis_args=sentiment_analysis_args,
+            )
+        await call_event_processor.flush_agent_assist_turns()
+
+    stats = dispatcher.stats
+    delays.sort()
+    return dict(
+        caller_segments=stats["segments"],
+        requests=len(requests),
+        segments_per_request=round(stats["segments"] / max(len(requests), 1), 2),
+        flush_reasons={k[6:]: v for k, v in stats.items() if k.startswith("flush_")},
+        assist_delay_ms=dict(
+            p50=round(delays[len(delays) // 2] * 1000) if delays else 0,
+            p90=round(delays[len(delays) * 9 // 10] * 1000) if delays else 0,
+            max=round(delays[-1] * 1000) if delays else 0,
+        ),
+    )
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Runs the modes on the same batches"""
+    records = get_records(args.calls, args.turns, args.seed)
+    batches = get_batches(records, args.poll_interval_ms / 1000)
+    return dict(
+        calls=args.calls,
+        records=len(records),
+        batches=len(batches),
+        per_segment=await run_mode(args, 0.0, batches),
+        per_turn=await run_mode(args, args.quiet_window_ms / 1000, batches),
+    )
+
+
+def main() -> int:
+    """Runs the benchmark and returns the exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--calls", type=int, default=10, help="simulated calls")
+    parser.add_argument("--turns", type=int, default=20, help="turns per call")
+    parser.add_argument("--poll-interval-ms", type=float, default=1000, help="KDS batch interval")
+    parser.add_argument("--quiet-window-ms", type=float, default=500, help="turn quiet window")
+    parser.add_argument("--max-delay-ms", type=float, default=4000, help="turn max delay")
+    parser.add_argument("--max-length", type=int, default=1000, help="turn max length")
+    parser.add_argument("--seed", type=int, default=7, help="random seed")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3.12
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Call Category Ledger Benchmark
+
+Counts the addCallCategory mutations, CATEGORY_MATCH segments and SNS
+messages of simulated calls where Contact Lens repeats the matched categories
+of the call on the following segments and TCA sends repeated CategoryEvents,
+with and without the call category ledger.
+
+The ledger mode is run twice on the same state table stub: the second run
+has a new ledger (a new container) and processes the same records again as
+on a Kinesis retry. AppSync, SNS and DynamoDB are replaced with stubs.
+Run from the repo root:
+
+    python lca-ai-stack/source/benchmarks/call_category_benchmark.py --calls 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(SOURCE_DIR, "lambda_layers", "transcript_enrichment_layer")
+FUNCTION_DIR = os.path.join(SOURCE_DIR, "lambda_functions", "call_event_processor")
+
+OFFLINE_ENVIRONMENT = dict(
+    AWS_DEFAULT_REGION="us-east-1",
+    AWS_ACCESS_KEY_ID="benchmark",
+    AWS_SECRET_ACCESS_KEY="benchmark",
+    APPSYNC_GRAPHQL_URL="https://benchmark.appsync-api.us-east-1.amazonaws.com/graphql",
+    STATE_DYNAMODB_TABLE_NAME="benchmark",
+    POWERTOOLS_SERVICE_NAME="benchmark",
+    LOG_LEVEL="WARNING",
+    IS_SENTIMENT_ANALYSIS_ENABLED="false",
+    SNS_TOPIC_ARN="benchmark-topic",
+)
+for _name, _value in OFFLINE_ENVIRONMENT.items():
+    os.environ.setdefault(_name, _value)
+sys.path[:0] = [LAYER_DIR, FUNCTION_DIR]
+
+# pylint: disable=import-error,wrong-import-position
+import boto3
+from appsync_utils import load_schema_snapshot
+from event_processor import call_event_processor
+from eventprocessor_utils import CallCategoryLedger
+from sentiment import SentimentAggregationStore
+
+# pylint: enable=import-error,wrong-import-position
+
+CATEGORIES = ["Billing", "Cancellation", "Escalation", "Competitor"]
+
+
+class _Client:
+    # pylint: disable=too-few-public-methods
+    def __init__(self, schema) -> None:
+        self.schema = schema
+
+
+class CountingSession:
+    """AppSync session stub counting the category writes"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, schema) -> None:
+        self.client = _Client(schema)
+        self.call_category_count = 0
+        self.category_segment_count = 0
+
+    async def execute(self, document, variable_values=None) -> Dict[str, Any]:
+        """Counts and echoes the input"""
+        call_input = dict((variable_values or {}).get("input") or {})
+        field_name = document.definitions[0].selection_set.selections[0].name.value
+        if field_name == "addCallCategory":
+            self.call_category_count += len(call_input["CallCategories"])
+        elif call_input.get("Channel") == "CATEGORY_MATCH":
+            self.category_segment_count += 1
+        return {field_name: call_input}
+
+
+class CountingSnsClient:
+    """SNS client stub counting the messages"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self) -> None:
+        self.publish_count = 0
+        self._lock = threading.Lock()
+
+    def publish(self, **kwargs) -> Dict[str, Any]:
+        """Counts the message"""
+        # pylint: disable=unused-argument
+        with self._lock:
+            self.publish_count += 1
+        return dict(MessageId="benchmark")
+
+
+class StubStateTable:
+    """DynamoDB table stub with the conditional claims of the ledger"""
+
+    def __init__(self) -> None:
+        client = boto3.client("dynamodb", region_name="us-east-1")
+        self.meta = SimpleNamespace(client=client)
+        self.items: Dict[Any, Dict[str, Any]] = {}
+        self.calls: Dict[str, int] = dict(put_item=0, update_item=0, delete_item=0)
+        self._lock = threading.Lock()
+
+    def _condition_failed(self) -> Exception:
+        return self.meta.client.exceptions.ConditionalCheckFailedException(
+            {"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem"
+        )
+
+    def put_item(self, Item: Dict[str, Any], **kwargs) -> None:
+        """Puts an item unless it is recorded or its claim has not expired"""
+        # pylint: disable=invalid-name
+        with self._lock:
+            self.calls["put_item"] += 1
+            key = (Item["PK"], Item["SK"])
+            item = self.items.get(key)
+            now = kwargs["ExpressionAttributeValues"][":now"]
+            if item is not None and not item.get("ClaimExpiresAt", now) < now:
+                raise self._condition_failed()
+            self.items[key] = Item
+
+    def update_item(self, Key: Dict[str, Any], **kwargs) -> None:
+        """Marks an item as recorded"""
+        # pylint: disable=invalid-name
+        with self._lock:
+            self.calls["update_item"] += 1
+            item = self.items.setdefault((Key["PK"], Key["SK"]), dict(Key))
+            item["ExpiresAfter"] = kwargs["ExpressionAttributeValues"][":expires_after"]
+            item.pop("ClaimExpiresAt", None)
+
+    def delete_item(self, Key: Dict[str, Any], **kwargs) -> None:
+        """Deletes an item that is not recorded"""
+        # pylint: disable=invalid-name,unused-argument
+        with self._lock:
+            self.calls["delete_item"] += 1
+            key = (Key["PK"], Key["SK"])
+            if "ClaimExpiresAt" not in self.items.get(key, {}):
+                raise self._condition_failed()
+            del self.items[key]
+
+
+def get_batches(calls: int, messages: int) -> List[List[Dict[str, Any]]]:
+    """Contact Lens and TCA category events of the calls - one event per call per batch"""
+    batches: List[List[Dict[str, Any]]] = []
+    for index in range(messages):
+        batch = []
+        for call in range(calls):
+            # a new category matches every few messages and the matches are repeated
+            matched = CATEGORIES[: min(len(CATEGORIES), index // 3 + 1)]
+            points = {
+                category: dict(
+                    PointsOfInterest=[
+                        dict(
+                            BeginOffsetMillis=position * 9000,
+                            EndOffsetMillis=position * 9000 + 2500,
+                        )
+                    ]
+                )
+                for position, category in enumerate(matched)
+            }
+            if call % 2 == 0:
+                batch.append(
+                    dict(
+                        EventType="SEGMENTS",
+                        ContactId=f"contact-{call}",
+                        Segments=[
+                            dict(Categories=dict(MatchedCategories=matched, MatchedDetails=points))
+                        ],
+                    )
+                )
+            else:
+                batch.append(
+                    dict(
+                        EventType="ADD_CALL_CATEGORY",
+                        CallId=f"call-{call}",
+                        CreatedAt="2024-01-01T00:00:00.000Z",
+                        CategoryEvent=dict(
+                            MatchedCategories=matched,
+                            MatchedDetails={
+                                category: dict(
+                                    TimestampRanges=[
+                                        dict(point) for point in detail["PointsOfInterest"]
+                                    ]
+                                )
+                                for category, detail in points.items()
+                            },
+                        ),
+                    )
+                )
+        batches.append(batch)
+    return batches
+
+
+async def run_mode(
+    batches: List[List[Dict[str, Any]]], ledger: Optional[CallCategoryLedger]
+) -> Dict[str, Any]:
+    """Processes the batches with the ledger"""
+    session = CountingSession(load_schema_snapshot())
+    sns_client = CountingSnsClient()
+    sentiment_analysis_args = dict(sentiment_aggregation_store=SentimentAggregationStore())
+    errors = 0
+    for batch in batches:
+        results = await asyncio.gather(
+            *(
+                call_event_processor.execute_process_event_api_mutation(
+                    message=json.loads(json.dumps(message)),
+                    settings={},
+                    appsync_session=session,  # type: ignore
+                    sns_client=sns_client,  # type: ignore
+                    agent_assist_args=dict(
+                        is_lex_agent_assist_enabled=False, is_lambda_agent_assist_enabled=False
+                    ),
+                    sentiment_analysis_args=sentiment_analysis_args,
+                    call_category_ledger=ledger,
+                )
+                for message in batch
+            )
+        )
+        errors += sum(len(result["errors"]) for result in results)
+    return dict(
+        call_categories=session.call_category_count,
+        category_segments=session.category_segment_count,
+        sns_messages=sns_client.publish_count,
+        errors=errors,
+        ledger=ledger.stats if ledger else {},
+    )
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Runs the modes on the same batches"""
+    batches = get_batches(args.calls, args.messages)
+    state_table = StubStateTable()
+    return dict(
+        calls=args.calls,
+        messages_per_call=args.messages,
+        distinct_categories_per_call=min(len(CATEGORIES), (args.messages - 1) // 3 + 1),
+        no_ledger=await run_mode(batches, None),
+        ledger=await run_mode(batches, CallCategoryLedger(state_table=state_table)),  # type: ignore
+        ledger_retry_new_container=await run_mode(
+            batches, CallCategoryLedger(state_table=state_table)  # type: ignore
+        ),
+        state_table_requests=state_table.calls,
+    )
+
+
+def main() -> int:
+    """Runs the benchmark and returns the exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--calls", type=int, default=10, help="simulated calls")
+    parser.add_argument("--messages", type=int, default=20, help="category events per call")
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    return 0 if not any(report[m]["errors"] for m in ("no_ledger", "ledger")) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
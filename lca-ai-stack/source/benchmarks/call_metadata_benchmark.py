@@ -0,0 +1,190 @@
+#!/usr/bin/env python3.12
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Call Metadata Cache Benchmark
+
+Counts the getCall queries of the post call summary hook for simulated calls
+(START, UPDATE_AGENT, END and ADD_SUMMARY events) with the call metadata
+cache and without it (a cache of size 0 - each summary queries the call).
+
+The events of a batch are processed concurrently as the records of different
+calls are. The AppSync session stub stores the created calls and yields to
+the event loop on each request so that the events of the calls interleave.
+The start of call and post call summary hook payloads are checked against
+the phone numbers of their calls.
+Run from the repo root:
+
+    python lca-ai-stack/source/benchmarks/call_metadata_benchmark.py --calls 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(SOURCE_DIR, "lambda_layers", "transcript_enrichment_layer")
+FUNCTION_DIR = os.path.join(SOURCE_DIR, "lambda_functions", "call_event_processor")
+
+OFFLINE_ENVIRONMENT = dict(
+    AWS_DEFAULT_REGION="us-east-1",
+    AWS_ACCESS_KEY_ID="benchmark",
+    AWS_SECRET_ACCESS_KEY="benchmark",
+    APPSYNC_GRAPHQL_URL="https://benchmark.appsync-api.us-east-1.amazonaws.com/graphql",
+    STATE_DYNAMODB_TABLE_NAME="benchmark",
+    POWERTOOLS_SERVICE_NAME="benchmark",
+    LOG_LEVEL="WARNING",
+    START_OF_CALL_LAMBDA_HOOK_FUNCTION_ARN="benchmark-start-of-call",
+    POST_CALL_SUMMARY_LAMBDA_HOOK_FUNCTION_ARN="benchmark-post-call-summary",
+)
+for _name, _value in OFFLINE_ENVIRONMENT.items():
+    os.environ.setdefault(_name, _value)
+sys.path[:0] = [LAYER_DIR, FUNCTION_DIR]
+
+# pylint: disable=import-error,wrong-import-position
+from appsync_utils import load_schema_snapshot
+from event_processor import call_event_processor
+from eventprocessor_utils import CallMetadataCache
+from sentiment import SentimentAggregationStore
+
+# pylint: enable=import-error,wrong-import-position
+
+
+class _Client:
+    # pylint: disable=too-few-public-methods
+    def __init__(self, schema) -> None:
+        self.schema = schema
+
+
+class CallStoreSession:
+    """AppSync session stub storing the created calls"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, schema) -> None:
+        self.client = _Client(schema)
+        self.calls: Dict[str, Dict[str, Any]] = {}
+        self.get_call_count = 0
+
+    async def execute(self, document, variable_values=None) -> Dict[str, Any]:
+        """Stores createCall inputs and returns them from getCall"""
+        await asyncio.sleep(0)
+        variable_values = variable_values or {}
+        field_name = document.definitions[0].selection_set.selections[0].name.value
+        if field_name == "getCall":
+            self.get_call_count += 1
+            return {field_name: dict(self.calls[variable_values["CallId"]])}
+        call_input = dict(variable_values.get("input") or {})
+        if field_name == "createCall":
+            self.calls[call_input["CallId"]] = call_input
+        elif field_name == "addCallSummaryText":
+            self.calls[call_input["CallId"]]["CallSummaryText"] = call_input["CallSummaryText"]
+        return {field_name: call_input}
+
+
+class RecordingInvoker:
+    """Lambda hook invoker stub recording the payloads"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self) -> None:
+        self.payloads: List[Dict[str, Any]] = []
+
+    async def invoke(self, **kwargs) -> None:
+        """Records the payload"""
+        await asyncio.sleep(0)
+        self.payloads.append(dict(kwargs["payload"], HookType=kwargs["hook_type"]))
+
+
+def get_batches(calls: int) -> List[List[Dict[str, Any]]]:
+    """Batches of the events of the calls - one event type per batch"""
+    phone_numbers = {f"call-{call}": f"+1555{call:07d}" for call in range(calls)}
+    return [
+        [
+            dict(
+                EventType="START",
+                CallId=call_id,
+                CustomerPhoneNumber=phone_number,
+                SystemPhoneNumber="+18005551111",
+                CreatedAt="2024-01-01T00:00:00.000Z",
+            )
+            for call_id, phone_number in phone_numbers.items()
+        ],
+        [
+            dict(EventType="UPDATE_AGENT", CallId=call_id, AgentId="agent")
+            for call_id in phone_numbers
+        ],
+        [dict(EventType="END", CallId=call_id) for call_id in phone_numbers],
+        [
+            dict(EventType="ADD_SUMMARY", CallId=call_id, CallSummaryText=f"summary of {call_id}")
+            for call_id in phone_numbers
+        ],
+    ]
+
+
+async def run_mode(calls: int, max_size: int) -> Dict[str, Any]:
+    """Processes the events of the calls with a cache of max_size calls"""
+    # the cache and the invoker are configured from the environment at import
+    call_event_processor.CALL_METADATA_CACHE = CallMetadataCache(max_size=max_size)
+    invoker = call_event_processor.LAMBDA_HOOK_INVOKER = RecordingInvoker()  # type: ignore
+    session = CallStoreSession(load_schema_snapshot())
+    sentiment_analysis_args = dict(sentiment_aggregation_store=SentimentAggregationStore())
+    for batch in get_batches(calls):
+        await asyncio.gather(
+            *(
+                call_event_processor.execute_process_event_api_mutation(
+                    message=message,
+                    settings={},
+                    appsync_session=session,  # type: ignore
+                    sns_client=None,  # type: ignore
+                    agent_assist_args=dict(
+                        is_lex_agent_assist_enabled=False, is_lambda_agent_assist_enabled=False
+                    ),
+                    sentiment_analysis_args=sentiment_analysis_args,
+                )
+                for message in batch
+            )
+        )
+
+    wrong_payloads = [
+        p
+        for p in invoker.payloads
+        if p["CustomerPhoneNumber"] != session.calls[p["CallId"]]["CustomerPhoneNumber"]
+        or (
+            p["HookType"] == "post_call_summary"
+            and p["CallSummaryText"] != f"summary of {p['CallId']}"
+        )
+    ]
+    return dict(
+        get_call_queries=session.get_call_count,
+        hook_payloads=len(invoker.payloads),
+        wrong_hook_payloads=len(wrong_payloads),
+        cache=call_event_processor.get_call_metadata_stats(),
+    )
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Runs the modes"""
+    return dict(
+        calls=args.calls,
+        no_cache=await run_mode(args.calls, 0),
+        cache=await run_mode(args.calls, args.max_size),
+    )
+
+
+def main() -> int:
+    """Runs the benchmark and returns the exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--calls", type=int, default=100, help="simulated calls")
+    parser.add_argument(
+        "--max-size", type=int, default=CallMetadataCache.DEFAULT_MAX_SIZE, help="cached calls"
+    )
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    return (
+        0 if not any(report[mode]["wrong_hook_payloads"] for mode in ("no_cache", "cache")) else 1
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
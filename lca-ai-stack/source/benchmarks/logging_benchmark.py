@@ -0,0 +1,178 @@
+#!/usr/bin/env python3.12
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Logging Benchmark
+
+Measures the CPU time per Kinesis record of the logging on the record hot path
+(record decoding, record mapping and GraphQL query execution against a stub
+session) at the INFO level, at the DEBUG level and with per-invocation debug
+sampling. The eager formatting row is the cost of the query printing and JSON
+serialization that used to run for every record regardless of the level.
+Run from the repo root:
+
+    python lca-ai-stack/source/benchmarks/logging_benchmark.py --records 2000
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import sys
+from time import process_time
+from typing import Any, Callable, Dict, List
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(SOURCE_DIR, "lambda_layers", "transcript_enrichment_layer")
+
+os.environ.setdefault("POWERTOOLS_SERVICE_NAME", "benchmark")
+sys.path.insert(0, LAYER_DIR)
+
+# pylint: disable=import-error,wrong-import-position
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.data_classes.kinesis_stream_event import KinesisStreamRecord
+from gql import gql
+from graphql import print_ast
+
+from appsync_utils import execute_gql_query_with_retries
+from logging_utils import DebugLogSampler
+from transcript_batch_processor import TranscriptBatchProcessor
+
+# pylint: enable=import-error,wrong-import-position
+
+# records are written to an in-memory stream so that the I/O is not measured
+LOG_STREAM = io.StringIO()
+LOGGER = Logger(stream=LOG_STREAM)
+
+QUERY = gql(
+    """
+    mutation AddTranscriptSegment($input: AddTranscriptSegmentInput!) {
+      addTranscriptSegment(input: $input) {
+        PK SK CallId SegmentId StartTime EndTime Transcript IsPartial Channel
+      }
+    }
+    """
+)
+
+
+class StubSession:
+    """Client session returning an empty result"""
+
+    # pylint: disable=too-few-public-methods
+    async def execute(self, document, variable_values=None):  # pylint: disable=unused-argument
+        """Executes a query"""
+        return {"addTranscriptSegment": variable_values["input"] if variable_values else {}}
+
+
+def _get_records(count: int) -> List[Dict[str, Any]]:
+    records = []
+    for index in range(count):
+        message = dict(
+            EventType="ADD_TRANSCRIPT_SEGMENT",
+            CallId=f"call-{index % 10}",
+            Channel="CALLER" if index % 2 else "AGENT",
+            SegmentId=f"segment-{index // 2}",
+            StartTime=index * 1.5,
+            EndTime=index * 1.5 + 1.4,
+            Transcript="the quick brown fox jumps over the lazy dog " * 3,
+            IsPartial=bool(index % 2),
+        )
+        records.append(
+            {
+                "eventID": f"shardId-000000000000:{index}",
+                "eventSource": "aws:kinesis",
+                "kinesis": {
+                    "data": base64.b64encode(json.dumps(message).encode()).decode(),
+                    "partitionKey": message["CallId"],
+                    "sequenceNumber": str(index),
+                    "approximateArrivalTimestamp": 1700000000.0,
+                },
+            }
+        )
+    return records
+
+
+async def _run_hot_path(records: List[Dict[str, Any]]) -> None:
+    session = StubSession()
+    for record in records:
+        payload = TranscriptBatchProcessor._process_record(  # pylint: disable=protected-access
+            KinesisStreamRecord(record)
+        )
+        TranscriptBatchProcessor._map_kds_processed_message(  # pylint: disable=protected-access
+            ("success", payload, record)
+        )
+        await execute_gql_query_with_retries(
+            QUERY,
+            client_session=session,  # type: ignore
+            variable_values={"input": payload},
+            logger=LOGGER,
+        )
+
+
+def _run_eager_formatting(records: List[Dict[str, Any]]) -> None:
+    for record in records:
+        payload = KinesisStreamRecord(record).kinesis.data_as_json()
+        print_ast(QUERY)
+        json.dumps(payload)
+        json.dumps(record)
+
+
+def _measure(fn: Callable[[], None], samples: int, record_count: int) -> float:
+    durations = []
+    for _ in range(samples):
+        LOG_STREAM.seek(0)
+        LOG_STREAM.truncate()
+        start_time = process_time()
+        fn()
+        durations.append(process_time() - start_time)
+    return round(min(durations) / record_count * 1_000_000, 2)
+
+
+def main() -> int:
+    """Runs the benchmark and returns the exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--records", type=int, default=2000, help="records per sample")
+    parser.add_argument("--batch-size", type=int, default=100, help="records per invocation")
+    parser.add_argument("--samples", type=int, default=5, help="runs per measurement")
+    parser.add_argument("--sample-rate", type=float, default=0.05, help="debug sample rate")
+    args = parser.parse_args()
+
+    records = _get_records(args.records)
+    batches = [
+        records[index : index + args.batch_size]
+        for index in range(0, len(records), args.batch_size)
+    ]
+    event_loop = asyncio.new_event_loop()
+
+    def run_at_level(level: str) -> Callable[[], None]:
+        def run() -> None:
+            LOGGER.setLevel(level)
+            event_loop.run_until_complete(_run_hot_path(records))
+
+        return run
+
+    def run_sampled() -> None:
+        LOGGER.setLevel("INFO")
+        sampler = DebugLogSampler(LOGGER, sample_rate=args.sample_rate)
+        for batch in batches:
+            sampler.sample()
+            event_loop.run_until_complete(_run_hot_path(batch))
+        LOGGER.setLevel("INFO")
+
+    results = dict(
+        records=args.records,
+        cpu_us_per_record=dict(
+            info=_measure(run_at_level("INFO"), args.samples, args.records),
+            debug=_measure(run_at_level("DEBUG"), args.samples, args.records),
+            sampled_debug=_measure(run_sampled, args.samples, args.records),
+            eager_formatting=_measure(
+                lambda: _run_eager_formatting(records), args.samples, args.records
+            ),
+        ),
+    )
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
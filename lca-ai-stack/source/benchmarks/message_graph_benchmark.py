@@ -0,0 +1,187 @@
+#!/usr/bin/env python3.12
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Transcript Message Scheduling Benchmark
+
+Measures the latency of execute_process_event_api_mutation for transcript
+messages (final Call Analytics utterances with an issue detected) and
+checks the order of the AppSync operations of each message: the segment
+with sentiment should be written after the segment it replaces and the
+call aggregation should start after the segment writes of the message
+that triggered it.
+
+AppSync is replaced with a session stub that sleeps for the configured
+latency and records the start and end time of each operation. Comprehend
+is the layer stub with a latency. The call aggregation runs per message
+(no batch processor).
+Run from the repo root:
+
+    python lca-ai-stack/source/benchmarks/message_graph_benchmark.py --messages 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(SOURCE_DIR, "lambda_layers", "transcript_enrichment_layer")
+FUNCTION_DIR = os.path.join(SOURCE_DIR, "lambda_functions", "call_event_processor")
+
+OFFLINE_ENVIRONMENT = dict(
+    AWS_DEFAULT_REGION="us-east-1",
+    AWS_ACCESS_KEY_ID="benchmark",
+    AWS_SECRET_ACCESS_KEY="benchmark",
+    APPSYNC_GRAPHQL_URL="https://benchmark.appsync-api.us-east-1.amazonaws.com/graphql",
+    STATE_DYNAMODB_TABLE_NAME="benchmark",
+    POWERTOOLS_SERVICE_NAME="benchmark",
+    LOG_LEVEL="WARNING",
+    IS_SENTIMENT_ANALYSIS_ENABLED="true",
+)
+for _name, _value in OFFLINE_ENVIRONMENT.items():
+    os.environ.setdefault(_name, _value)
+sys.path[:0] = [LAYER_DIR, FUNCTION_DIR]
+
+# pylint: disable=import-error,wrong-import-position
+from appsync_utils import load_schema_snapshot
+from event_processor import execute_process_event_api_mutation
+from sentiment import SentimentAggregationStore
+from sentiment.comprehend_stub import StubComprehendClient
+
+# pylint: enable=import-error,wrong-import-position
+
+CALL_ID = "benchmark-call"
+TRANSCRIPT = "I have a problem with my bill and I want to cancel the service"
+
+OperationType = Tuple[str, Optional[str], float, float]
+
+
+class _Client:
+    # pylint: disable=too-few-public-methods
+    def __init__(self, schema) -> None:
+        self.schema = schema
+
+
+class RecordingSession:
+    """AppSync session stub recording the operation times"""
+
+    def __init__(self, schema, latency: float) -> None:
+        self.client = _Client(schema)
+        self._latency = latency
+        self.operations: List[OperationType] = []
+
+    async def execute(self, document, variable_values=None) -> Dict[str, Any]:
+        """Sleeps for the latency and echoes the input"""
+        field_name = document.definitions[0].selection_set.selections[0].name.value
+        value = dict((variable_values or {}).get("input") or {})
+        start_time = perf_counter()
+        await asyncio.sleep(self._latency)
+        kind = field_name
+        if field_name == "addTranscriptSegment" and value.get("Sentiment"):
+            kind = "addTranscriptSegment+sentiment"
+        self.operations.append((kind, value.get("SegmentId"), start_time, perf_counter()))
+        if field_name == "getTranscriptSegmentsWithSentiment":
+            return {field_name: {"TranscriptSegmentsWithSentiment": []}}
+        return {field_name: value}
+
+
+def get_message(index: int) -> Dict[str, Any]:
+    """Final Call Analytics utterance with an issue detected"""
+    return dict(
+        EventType="ADD_TRANSCRIPT_SEGMENT",
+        CallId=CALL_ID,
+        UtteranceEvent=dict(
+            UtteranceId=f"utterance-{index}",
+            ParticipantRole="CUSTOMER",
+            BeginOffsetMillis=index * 5000,
+            EndOffsetMillis=index * 5000 + 4000,
+            Transcript=TRANSCRIPT,
+            IsPartial=False,
+            IssuesDetected=[dict(CharacterOffsets=dict(Begin=9, End=30))],
+        ),
+    )
+
+
+def check_order(operations: List[OperationType]) -> Dict[str, int]:
+    """Counts the out of order operations of a message"""
+    segment_ends = [end for kind, _, _, end in operations if kind == "addTranscriptSegment"]
+    sentiment_starts = [
+        start for kind, _, start, _ in operations if kind == "addTranscriptSegment+sentiment"
+    ]
+    sentiment_ends = [
+        end for kind, _, _, end in operations if kind == "addTranscriptSegment+sentiment"
+    ]
+    aggregation_starts = [
+        start for kind, _, start, _ in operations if kind == "updateCallAggregation"
+    ]
+    return dict(
+        sentiment_write_before_segment_write=sum(
+            1 for start in sentiment_starts if any(end > start for end in segment_ends)
+        ),
+        aggregation_before_writes=sum(
+            1
+            for start in aggregation_starts
+            if any(end > start for end in segment_ends + sentiment_ends)
+        ),
+    )
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Processes the messages one at a time"""
+    schema = load_schema_snapshot()
+    comprehend_client = StubComprehendClient(latency=args.comprehend_latency_ms / 1000)
+    sentiment_analysis_args = dict(
+        comprehend_client=comprehend_client,
+        comprehend_language_code="en",
+        sentiment_aggregation_store=SentimentAggregationStore(),
+    )
+    latencies: List[float] = []
+    order_errors: Dict[str, int] = {}
+    for index in range(args.messages):
+        session = RecordingSession(schema, latency=args.appsync_latency_ms / 1000)
+        start_time = perf_counter()
+        result = await execute_process_event_api_mutation(
+            message=get_message(index),
+            settings={},
+            appsync_session=session,  # type: ignore
+            sns_client=None,  # type: ignore
+            agent_assist_args=dict(
+                is_lex_agent_assist_enabled=False, is_lambda_agent_assist_enabled=False
+            ),
+            sentiment_analysis_args=sentiment_analysis_args,
+        )
+        latencies.append(perf_counter() - start_time)
+        if result["errors"]:
+            raise RuntimeError(f"message errors: {result['errors']}")
+        for name, count in check_order(session.operations).items():
+            order_errors[name] = order_errors.get(name, 0) + count
+
+    latencies.sort()
+    return dict(
+        messages=args.messages,
+        latency_ms=dict(
+            mean=round(sum(latencies) / len(latencies) * 1000, 1),
+            p50=round(latencies[len(latencies) // 2] * 1000, 1),
+            max=round(latencies[-1] * 1000, 1),
+        ),
+        out_of_order=order_errors,
+    )
+
+
+def main() -> int:
+    """Runs the benchmark and returns the exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--messages", type=int, default=50, help="transcript messages")
+    parser.add_argument("--appsync-latency-ms", type=float, default=20, help="AppSync latency")
+    parser.add_argument(
+        "--comprehend-latency-ms", type=float, default=30, help="Comprehend latency"
+    )
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,710 @@
+#!/usr/bin/env python3.12
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Kinesis Replay Load Test
+
+Replays KDS batches through the call_event_processor Lambda handler to
+measure the records per second that a shard can sustain. The batches are
+synthetic calls (a mix of START/END lifecycle events, custom transcript
+segments, Transcribe TranscriptEvent, TCA UtteranceEvent, Contact Lens
+Segments and call categories) or a recording of decoded KDS messages (one
+JSON object per line).
+
+AppSync is replaced with an in-process GraphQL server executing the
+documents against the bundled schema snapshot, running in its own thread
+and event loop. Comprehend, SNS, Lambda, DynamoDB, SSM and Connect are
+stubbed in the layer client registry. Latencies and the AppSync error rate
+are configurable. Reports the throughput, the per batch latency
+percentiles, the mutations received by the server and the query retries.
+Run from the repo root:
+
+    python lca-ai-stack/source/benchmarks/replay_benchmark.py --calls 20 --batch-size 100
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from time import perf_counter, sleep, time
+from typing import Any, Dict, Iterator, List, Optional
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(SOURCE_DIR, "lambda_layers", "transcript_enrichment_layer")
+FUNCTION_DIR = os.path.join(SOURCE_DIR, "lambda_functions", "call_event_processor")
+
+SERVICE_NAME = "replay-benchmark"
+OFFLINE_ENVIRONMENT = dict(
+    AWS_DEFAULT_REGION="us-east-1",
+    AWS_ACCESS_KEY_ID="benchmark",
+    AWS_SECRET_ACCESS_KEY="benchmark",
+    STATE_DYNAMODB_TABLE_NAME="benchmark",
+    PARAMETER_STORE_NAME="benchmark",
+    SNS_TOPIC_ARN="arn:aws:sns:us-east-1:123456789012:benchmark",
+    POWERTOOLS_SERVICE_NAME=SERVICE_NAME,
+    LOG_LEVEL="INFO",
+    IS_LEX_AGENT_ASSIST_ENABLED="false",
+    IS_LAMBDA_AGENT_ASSIST_ENABLED="false",
+)
+TRANSCRIPT_LAMBDA_HOOK_ARN = "arn:aws:lambda:us-east-1:123456789012:function:benchmark-hook"
+# settings of the parameter store - every category raises an alert
+SETTINGS = dict(CategoryAlertRegex=".*")
+RETRY_LOG_MESSAGE = "error on query - retry: [%d] - sleeping for [%f]s - error: [%s]"
+TRANSCRIPT = "thanks for calling how can I help you with your account today"
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Nearest rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+##########################################################################
+# AppSync stand-in
+##########################################################################
+
+
+class FakeAppsyncServer:
+    """GraphQL server executing AppSync requests against the schema snapshot
+
+    Mutations echo their input and getCall returns the created call so that
+    the documents are validated and the selections are resolved like in
+    AppSync. Root fields fail with a throttling error at error_rate.
+    """
+
+    # placeholders of the non-null output fields that the input did not set
+    PLACEHOLDERS = dict(String="", ID="", Int=0, Float=0.0, Boolean=False)
+
+    def __init__(self, schema, latency: float, error_rate: float, seed: int) -> None:
+        # pylint: disable=import-outside-toplevel
+        from graphql import GraphQLNonNull, get_named_type
+
+        self._schema = schema
+        self._latency = latency
+        self._error_rate = error_rate
+        self._random = random.Random(seed)
+        self._documents: Dict[str, Any] = {}
+        self._calls: Dict[str, Dict[str, Any]] = {}
+        self._non_null = GraphQLNonNull
+        self._get_named_type = get_named_type
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+        self.operations: Counter = Counter()
+        self.url = ""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Any = None
+
+    def _get_document(self, query: str):
+        # pylint: disable=import-outside-toplevel
+        from graphql import parse, validate
+
+        document = self._documents.get(query)
+        if document is None:
+            document = parse(query)
+            errors = validate(self._schema, document)
+            if errors:
+                raise ValueError(f"invalid document: {errors}")
+            self._documents[query] = document
+        return document
+
+    def _resolve_field(self, source, info, **args):
+        """Resolves root fields from the arguments and other fields from the source"""
+        if info.parent_type in (self._schema.mutation_type, self._schema.query_type):
+            return self._resolve_root_field(info.field_name, args)
+        value = source.get(info.field_name) if isinstance(source, dict) else None
+        if value is None and isinstance(info.return_type, self._non_null):
+            named_type = self._get_named_type(info.return_type)
+            value = self.PLACEHOLDERS.get(
+                named_type.name, {} if hasattr(named_type, "fields") else ""
+            )
+        return value
+
+    def _resolve_root_field(self, field_name: str, args: Dict[str, Any]) -> Any:
+        with self._lock:
+            self.operations[field_name] += 1
+            if self._error_rate and self._random.random() < self._error_rate:
+                self.error_count += 1
+                raise RuntimeError("Rate exceeded")
+        if field_name == "getCall":
+            return self._calls.get(args["CallId"], {"CallId": args["CallId"]})
+        if field_name == "getTranscriptSegmentsWithSentiment":
+            return {"TranscriptSegmentsWithSentiment": []}
+        value = dict(args.get("input") or {})
+        call_id = value.get("CallId")
+        if call_id:
+            value.setdefault("PK", f"c#{call_id}")
+            value.setdefault("SK", f"c#{call_id}")
+            if field_name == "createCall":
+                self._calls[call_id] = value
+        return value
+
+    async def _handle(self, request):
+        # pylint: disable=import-outside-toplevel
+        from aiohttp import web
+        from graphql import execute
+
+        self.request_count += 1
+        body = await request.json()
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        try:
+            document = self._get_document(body["query"])
+        except Exception as error:  # pylint: disable=broad-except
+            return web.json_response({"errors": [{"message": str(error)}]})
+        result = execute(
+            self._schema,
+            document,
+            variable_values=body.get("variables"),
+            field_resolver=self._resolve_field,
+        )
+        response: Dict[str, Any] = {"data": result.data}
+        if result.errors:
+            response["errors"] = [error.formatted for error in result.errors]
+        return web.json_response(response)
+
+    def start(self) -> None:
+        """Starts the server in a background thread"""
+        started = threading.Event()
+
+        def run() -> None:
+            # pylint: disable=import-outside-toplevel
+            from aiohttp import web
+
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            app = web.Application(client_max_size=16 * 1024 * 1024)
+            app.router.add_post("/graphql", self._handle)
+            self._runner = web.AppRunner(app, access_log=None)
+            loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, "127.0.0.1", 0)
+            loop.run_until_complete(site.start())
+            port = site._server.sockets[0].getsockname()[1]  # pylint: disable=protected-access
+            self.url = f"http://127.0.0.1:{port}/graphql"
+            self._loop = loop
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="fake-appsync", daemon=True).start()
+        started.wait()
+
+    def stop(self) -> None:
+        """Stops the server"""
+        if self._loop:
+            loop = self._loop
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+
+
+##########################################################################
+# AWS service stubs
+##########################################################################
+
+
+class _StubBase:
+    """Stub of a boto3 client - the calls block for latency seconds like boto3"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, latency: float) -> None:
+        self._latency = latency
+        self.calls: Counter = Counter()
+
+    def _call(self, name: str) -> None:
+        self.calls[name] += 1
+        if self._latency:
+            sleep(self._latency)
+
+
+class ComprehendStub(_StubBase):
+    """Comprehend stub"""
+
+    SCORE = dict(Positive=0.7, Negative=0.1, Neutral=0.15, Mixed=0.05)
+
+    def detect_sentiment(self, Text, LanguageCode):  # pylint: disable=invalid-name,unused-argument
+        """DetectSentiment"""
+        self._call("detect_sentiment")
+        return dict(Sentiment="POSITIVE", SentimentScore=self.SCORE)
+
+    def batch_detect_sentiment(self, TextList, LanguageCode):
+        """BatchDetectSentiment"""
+        # pylint: disable=invalid-name,unused-argument
+        self._call("batch_detect_sentiment")
+        return dict(
+            ResultList=[
+                dict(Index=index, Sentiment="POSITIVE", SentimentScore=self.SCORE)
+                for index in range(len(TextList))
+            ],
+            ErrorList=[],
+        )
+
+
+class SnsStub(_StubBase):
+    """SNS stub"""
+
+    class exceptions:  # pylint: disable=invalid-name,too-few-public-methods
+        """Modeled exceptions"""
+
+        class ThrottledException(Exception):
+            """Throttling"""
+
+    def publish(self, **kwargs):  # pylint: disable=unused-argument
+        """Publish"""
+        self._call("publish")
+        return dict(MessageId="benchmark")
+
+
+class LambdaStub(_StubBase):
+    """Lambda stub - request response invocations echo the payload"""
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        """Invoke"""
+        # pylint: disable=invalid-name,unused-argument
+        self._call("invoke")
+        if InvocationType == "Event":
+            return dict(StatusCode=202)
+        return dict(StatusCode=200, Payload=io.BytesIO(Payload.encode()))
+
+
+class DynamoDbTableStub(_StubBase):
+    """State table stub - the items are not persisted"""
+
+    def get_item(self, **kwargs):  # pylint: disable=unused-argument
+        """GetItem"""
+        self._call("get_item")
+        return {}
+
+    def put_item(self, **kwargs):  # pylint: disable=unused-argument
+        """PutItem"""
+        self._call("put_item")
+        return {}
+
+    def update_item(self, **kwargs):  # pylint: disable=unused-argument
+        """UpdateItem"""
+        self._call("update_item")
+        return {}
+
+
+class DynamoDbResourceStub:
+    """DynamoDB resource stub"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, table: DynamoDbTableStub) -> None:
+        self._table = table
+
+    def Table(self, name):  # pylint: disable=invalid-name,unused-argument
+        """Table"""
+        return self._table
+
+
+class SsmStub(_StubBase):
+    """Parameter store stub"""
+
+    def get_parameter(self, Name):  # pylint: disable=invalid-name,unused-argument
+        """GetParameter"""
+        self._call("get_parameter")
+        return dict(Parameter=dict(Value=json.dumps(SETTINGS)))
+
+
+class ConnectStub(_StubBase):
+    """Connect stub"""
+
+    def get_contact_attributes(self, **kwargs):  # pylint: disable=unused-argument
+        """GetContactAttributes"""
+        self._call("get_contact_attributes")
+        return dict(Attributes={})
+
+
+class RetryCounter(logging.Handler):
+    """Counts the query retries and failures logged by execute_gql_query_with_retries
+
+    Also sums the retry coordinator counters of the invocation metrics logs.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(level=logging.INFO)
+        self.retry_count = 0
+        self.failure_count = 0
+        self.coordinator_stats: Counter = Counter()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.msg == RETRY_LOG_MESSAGE:
+            self.retry_count += 1
+        elif str(record.msg).startswith("max retries on query"):
+            self.failure_count += 1
+        for name, value in (getattr(record, "appsync_retries", None) or {}).items():
+            if isinstance(value, int):
+                self.coordinator_stats[name] += value
+
+
+class LambdaContext:
+    """Lambda context of the replayed invocations"""
+
+    # pylint: disable=too-few-public-methods
+    function_name = "benchmark-call-event-processor"
+    function_version = "$LATEST"
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:benchmark"
+    memory_limit_in_mb = 1024
+    log_group_name = "/aws/lambda/benchmark"
+    log_stream_name = "benchmark"
+
+    def __init__(self, request_id: int) -> None:
+        self.aws_request_id = f"benchmark-{request_id}"
+
+    @staticmethod
+    def get_remaining_time_in_millis() -> int:
+        """Remaining time of the invocation"""
+        return 900_000
+
+
+##########################################################################
+# Batches
+##########################################################################
+
+
+def _get_call_messages(call_index: int, segment_count: int) -> List[Dict[str, Any]]:
+    """Messages of a synthetic call - the source format depends on the call"""
+    call_id = f"call-{call_index}-{os.getpid()}"
+    source = ("custom", "transcribe", "tca", "contact_lens")[call_index % 4]
+    messages: List[Dict[str, Any]] = [
+        dict(
+            EventType="START",
+            CallId=call_id,
+            CustomerPhoneNumber="+18005550100",
+            SystemPhoneNumber="+18005550199",
+            AgentId="agent",
+        )
+    ]
+    for index in range(segment_count):
+        channel = "AGENT" if index % 2 else "CALLER"
+        start_time = index * 4.0
+        # two partial results followed by the final result of the segment
+        for result_index in range(3):
+            is_partial = result_index < 2
+            # final transcripts are unique so that they miss the sentiment cache
+            transcript = (
+                TRANSCRIPT[: 20 * (result_index + 1)]
+                if is_partial
+                else f"{TRANSCRIPT} reference {call_index} {index}"
+            )
+            segment_id = f"{call_id}-{index}"
+            if source == "custom":
+                message = dict(
+                    EventType="ADD_TRANSCRIPT_SEGMENT",
+                    CallId=call_id,
+                    Channel=channel,
+                    SegmentId=segment_id,
+                    StartTime=start_time,
+                    EndTime=start_time + 3.5,
+                    Transcript=transcript,
+                    IsPartial=is_partial,
+                )
+            elif source == "transcribe":
+                message = dict(
+                    EventType="ADD_TRANSCRIPT_SEGMENT",
+                    CallId=call_id,
+                    TranscriptEvent=dict(
+                        Channel=channel,
+                        ResultId=segment_id,
+                        StartTime=start_time,
+                        EndTime=start_time + 3.5,
+                        Transcript=transcript,
+                        IsPartial=is_partial,
+                    ),
+                )
+            elif source == "tca":
+                message = dict(
+                    EventType="ADD_TRANSCRIPT_SEGMENT",
+                    CallId=call_id,
+                    UtteranceEvent=dict(
+                        ParticipantRole="CUSTOMER" if channel == "CALLER" else channel,
+                        UtteranceId=segment_id,
+                        BeginOffsetMillis=int(start_time * 1000),
+                        EndOffsetMillis=int((start_time + 3.5) * 1000),
+                        Transcript=transcript,
+                        IsPartial=is_partial,
+                        Sentiment=None if is_partial else "NEUTRAL",
+                    ),
+                )
+            else:
+                participant_role = "CUSTOMER" if channel == "CALLER" else channel
+                offsets = dict(
+                    BeginOffsetMillis=int(start_time * 1000),
+                    EndOffsetMillis=int((start_time + 3.5) * 1000),
+                    ParticipantRole=participant_role,
+                )
+                item = (
+                    dict(
+                        Utterance=dict(
+                            TranscriptId=segment_id, PartialContent=transcript, **offsets
+                        )
+                    )
+                    if is_partial
+                    else dict(
+                        Transcript=dict(
+                            Id=segment_id, Content=transcript, Sentiment="NEUTRAL", **offsets
+                        )
+                    )
+                )
+                message = dict(EventType="SEGMENTS", ContactId=call_id, Segments=[item])
+            messages.append(message)
+        if index and index % 10 == 0:
+            category = f"category-{index}"
+            timestamps = dict(
+                BeginOffsetMillis=int(start_time * 1000),
+                EndOffsetMillis=int(start_time * 1000) + 500,
+            )
+            if source == "contact_lens":
+                messages.append(
+                    dict(
+                        EventType="SEGMENTS",
+                        ContactId=call_id,
+                        Segments=[
+                            dict(
+                                Categories=dict(
+                                    MatchedCategories=[category],
+                                    MatchedDetails={category: dict(PointsOfInterest=[timestamps])},
+                                )
+                            )
+                        ],
+                    )
+                )
+            else:
+                messages.append(
+                    dict(
+                        EventType="ADD_CALL_CATEGORY",
+                        CallId=call_id,
+                        CreatedAt=datetime.utcnow().astimezone().isoformat(),
+                        CategoryEvent=dict(
+                            MatchedCategories=[category],
+                            MatchedDetails={category: dict(TimestampRanges=[timestamps])},
+                        ),
+                    )
+                )
+    messages.append(dict(EventType="END", CallId=call_id))
+    return messages
+
+
+def get_synthetic_messages(call_count: int, segment_count: int, seed: int) -> List[Dict[str, Any]]:
+    """Interleaves the messages of concurrent calls keeping the order of each call"""
+    calls = [_get_call_messages(index, segment_count) for index in range(call_count)]
+    positions = [0] * call_count
+    random_generator = random.Random(seed)
+    messages = []
+    active = list(range(call_count))
+    while active:
+        call_index = random_generator.choice(active)
+        messages.append(calls[call_index][positions[call_index]])
+        positions[call_index] += 1
+        if positions[call_index] >= len(calls[call_index]):
+            active.remove(call_index)
+    return messages
+
+
+def get_recorded_messages(path: str) -> List[Dict[str, Any]]:
+    """Loads decoded KDS messages - one JSON object per line"""
+    with open(path, encoding="utf-8") as recording:
+        return [json.loads(line) for line in recording if line.strip()]
+
+
+def get_kds_batches(
+    messages: List[Dict[str, Any]], batch_size: int, lag: float
+) -> Iterator[Dict[str, Any]]:
+    """Kinesis events of batch_size records - arrival times are set when a batch is replayed"""
+    for batch_index, start in enumerate(range(0, len(messages), batch_size)):
+        arrival_timestamp = time() - lag
+        records = []
+        for index, message in enumerate(messages[start : start + batch_size], start=start):
+            records.append(
+                {
+                    "eventID": f"shardId-000000000000:{index}",
+                    "eventSource": "aws:kinesis",
+                    "eventName": "aws:kinesis:record",
+                    "kinesis": {
+                        "kinesisSchemaVersion": "1.0",
+                        "partitionKey": message.get("CallId") or message.get("ContactId", ""),
+                        "sequenceNumber": f"{batch_index:08d}{index:012d}",
+                        "data": base64.b64encode(json.dumps(message).encode()).decode(),
+                        "approximateArrivalTimestamp": arrival_timestamp,
+                    },
+                }
+            )
+        yield {"Records": records}
+
+
+##########################################################################
+# Replay
+##########################################################################
+
+
+def main() -> int:
+    """Runs the load test and returns the exit code"""
+    # pylint: disable=too-many-locals,import-outside-toplevel,import-error
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--calls", type=int, default=20, help="synthetic calls")
+    parser.add_argument("--segments", type=int, default=40, help="final segments per call")
+    parser.add_argument("--recording", help="JSON lines file of decoded KDS messages")
+    parser.add_argument("--batch-size", type=int, default=100, help="records per invocation")
+    parser.add_argument("--appsync-latency-ms", type=float, default=20, help="AppSync latency")
+    parser.add_argument("--appsync-error-rate", type=float, default=0.0, help="failed root fields")
+    parser.add_argument(
+        "--comprehend-latency-ms", type=float, default=30, help="Comprehend latency"
+    )
+    parser.add_argument("--sns-latency-ms", type=float, default=20, help="SNS latency")
+    parser.add_argument("--lambda-latency-ms", type=float, default=50, help="Lambda latency")
+    parser.add_argument("--dynamodb-latency-ms", type=float, default=5, help="DynamoDB latency")
+    parser.add_argument(
+        "--no-transcript-lambda-hook", action="store_true", help="disable the transcript hook"
+    )
+    parser.add_argument(
+        "--no-retry-coordinator", action="store_true", help="disable the AppSync retry coordinator"
+    )
+    parser.add_argument(
+        "--maximum-retry-attempts",
+        type=int,
+        default=2,
+        help="replays of the failed records of a batch (event source mapping)",
+    )
+    parser.add_argument("--lag-seconds", type=float, default=0, help="backlog lag of the batches")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--verbose", action="store_true", help="print the function logs")
+    args = parser.parse_args()
+
+    from appsync_utils import load_schema_snapshot
+
+    schema = load_schema_snapshot()
+    if schema is None:
+        print("unable to load the AppSync schema snapshot", file=sys.stderr)
+        return 1
+    server = FakeAppsyncServer(
+        schema=schema,
+        latency=args.appsync_latency_ms / 1000,
+        error_rate=args.appsync_error_rate,
+        seed=args.seed,
+    )
+    server.start()
+
+    # the function reads its configuration at import
+    os.environ["APPSYNC_GRAPHQL_URL"] = server.url
+    if not args.no_transcript_lambda_hook:
+        os.environ["TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN"] = TRANSCRIPT_LAMBDA_HOOK_ARN
+    if args.no_retry_coordinator:
+        os.environ["IS_APPSYNC_RETRY_COORDINATOR_ENABLED"] = "false"
+    stubs: Dict[str, _StubBase] = dict(
+        comprehend=ComprehendStub(args.comprehend_latency_ms / 1000),
+        sns=SnsStub(args.sns_latency_ms / 1000),
+        lambda_=LambdaStub(args.lambda_latency_ms / 1000),
+        dynamodb=DynamoDbTableStub(args.dynamodb_latency_ms / 1000),
+        ssm=SsmStub(0),
+        connect=ConnectStub(args.dynamodb_latency_ms / 1000),
+    )
+    clients = {name.rstrip("_"): stub for name, stub in stubs.items() if name != "dynamodb"}
+    resources = dict(dynamodb=DynamoDbResourceStub(stubs["dynamodb"]))
+    from boto3_utils.client_registry import CLIENT_REGISTRY
+
+    # the function and the layer get their clients from the shared registry
+    CLIENT_REGISTRY.get_client = clients.__getitem__  # type: ignore
+    CLIENT_REGISTRY.get_resource = resources.__getitem__  # type: ignore
+
+    log_stream = sys.stdout if args.verbose else io.StringIO()
+    import lambda_function
+
+    service_logger = logging.getLogger(SERVICE_NAME)
+    for handler in service_logger.handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(log_stream)  # type: ignore
+    retry_counter = RetryCounter()
+    service_logger.addHandler(retry_counter)
+
+    messages = (
+        get_recorded_messages(args.recording)
+        if args.recording
+        else get_synthetic_messages(args.calls, args.segments, args.seed)
+    )
+    durations: List[float] = []
+    error_count = 0
+    replayed_record_count = 0
+    discarded_record_count = 0
+    start_time = perf_counter()
+    for event in get_kds_batches(messages, args.batch_size, args.lag_seconds):
+        # like the event source mapping, the records from the first reported
+        # failure are replayed up to the maximum retry attempts
+        for attempt in range(args.maximum_retry_attempts + 1):
+            batch_start_time = perf_counter()
+            response: Dict[str, Any] = {}
+            try:
+                response = lambda_function.handler(event, LambdaContext(len(durations))) or {}
+            except Exception as error:  # pylint: disable=broad-except
+                error_count += 1
+                print(f"invocation error: {error}", file=sys.stderr)
+            durations.append(perf_counter() - batch_start_time)
+            failures = response.get("batchItemFailures") or []
+            if not failures:
+                break
+            checkpoint = min(int(failure["itemIdentifier"]) for failure in failures)
+            event = {
+                "Records": [
+                    record
+                    for record in event["Records"]
+                    if int(record["kinesis"]["sequenceNumber"]) >= checkpoint
+                ]
+            }
+            if attempt == args.maximum_retry_attempts:
+                discarded_record_count += len(event["Records"])
+            else:
+                replayed_record_count += len(event["Records"])
+    duration = perf_counter() - start_time
+    if lambda_function.APPSYNC_SESSION_MANAGER:
+        lambda_function.EVENT_LOOP.run_until_complete(
+            lambda_function.APPSYNC_SESSION_MANAGER.close()
+        )
+    server.stop()
+
+    results = dict(
+        records=len(messages),
+        batches=len(durations),
+        replayed_records=replayed_record_count,
+        discarded_records=discarded_record_count,
+        batch_size=args.batch_size,
+        invocation_errors=error_count,
+        duration_s=round(duration, 3),
+        records_per_second=round(len(messages) / duration, 1),
+        batch_latency_ms={
+            f"p{percent}": round(_percentile(durations, percent) * 1000, 1)
+            for percent in (50, 95, 99)
+        }
+        | dict(max=round(max(durations, default=0) * 1000, 1)),
+        appsync=dict(
+            requests=server.request_count,
+            mutations=sum(
+                count
+                for name, count in server.operations.items()
+                if schema.mutation_type and name in schema.mutation_type.fields
+            ),
+            operations=dict(sorted(server.operations.items())),
+            injected_errors=server.error_count,
+            retries=retry_counter.retry_count,
+            failed_queries=retry_counter.failure_count,
+            retry_coordinator=dict(sorted(retry_counter.coordinator_stats.items())),
+        ),
+        service_calls={
+            service_name.rstrip("_"): dict(stub.calls) for service_name, stub in stubs.items()
+        },
+    )
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    for _name, _value in OFFLINE_ENVIRONMENT.items():
+        os.environ.setdefault(_name, _value)
+    sys.path[:0] = [LAYER_DIR, FUNCTION_DIR]
+    sys.exit(main())
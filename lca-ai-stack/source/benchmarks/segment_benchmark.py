@@ -0,0 +1,374 @@
+#!/usr/bin/env python3.12
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Segment Normalization Benchmark
+
+Measures the CPU time per KDS message and the memory retained per normalized
+segment of the path from the decoded KDS payload to the AppSync mutation
+variables (key casing, normalization, sentiment merge and variable
+serialization). The slotted TranscriptSegment path is compared with the
+previous dict path (kept here as a reference) which copied the message and
+its segments at each step and serialized the variables by walking the input
+type fields.
+Run from the repo root:
+
+    python lca-ai-stack/source/benchmarks/segment_benchmark.py --messages 3000
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime
+from time import process_time
+from typing import Any, Callable, Dict, List
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(SOURCE_DIR, "lambda_layers", "transcript_enrichment_layer")
+FUNCTION_DIR = os.path.join(SOURCE_DIR, "lambda_functions", "call_event_processor")
+
+OFFLINE_ENVIRONMENT = dict(
+    AWS_DEFAULT_REGION="us-east-1",
+    AWS_ACCESS_KEY_ID="benchmark",
+    AWS_SECRET_ACCESS_KEY="benchmark",
+    APPSYNC_GRAPHQL_URL="https://benchmark.appsync-api.us-east-1.amazonaws.com/graphql",
+    STATE_DYNAMODB_TABLE_NAME="benchmark",
+    POWERTOOLS_SERVICE_NAME="benchmark",
+    LOG_LEVEL="WARNING",
+)
+for _name, _value in OFFLINE_ENVIRONMENT.items():
+    os.environ.setdefault(_name, _value)
+sys.path[:0] = [LAYER_DIR, FUNCTION_DIR]
+
+# pylint: disable=import-error,wrong-import-position
+from graphql import GraphQLInputObjectType, GraphQLInputType, GraphQLList, GraphQLNonNull
+
+from appsync_utils import get_compiled_operation, load_schema_snapshot
+from eventprocessor_utils import get_ttl, normalize_transcript_segments
+from eventprocessor_utils.eventprocessor import SENTIMENT_SCORE, SENTIMENT_WEIGHT
+from event_processor.call_event_processor import (
+    GRAPHQL_OPERATIONS,
+    convert_keys_to_uppercamelcase,
+)
+
+# pylint: enable=import-error,wrong-import-position
+
+SENTIMENT = dict(
+    Sentiment="POSITIVE",
+    SentimentScore=dict(Positive=0.9, Negative=0.01, Neutral=0.05, Mixed=0.04),
+    SentimentWeighted=4.5,
+)
+
+
+def _get_messages(count: int) -> List[Dict[str, Any]]:
+    """Decoded KDS payloads of the custom, TCA and Contact Lens formats"""
+    messages: List[Dict[str, Any]] = []
+    for index in range(count):
+        call_id = f"call-{index % 10}"
+        is_partial = bool(index % 2)
+        kind = index % 3
+        if kind == 0:
+            message: Dict[str, Any] = dict(
+                EventType="ADD_TRANSCRIPT_SEGMENT",
+                CallId=call_id,
+                Channel="CALLER",
+                SegmentId=f"segment-{index // 2}",
+                StartTime=index * 1.5,
+                EndTime=index * 1.5 + 1.4,
+                Transcript="the quick brown fox jumps over the lazy dog",
+                IsPartial=is_partial,
+            )
+        elif kind == 1:
+            message = dict(
+                eventType="ADD_TRANSCRIPT_SEGMENT",
+                callId=call_id,
+                utteranceEvent=dict(
+                    utteranceId=f"utterance-{index // 2}",
+                    participantRole="CUSTOMER",
+                    beginOffsetMillis=index * 1500,
+                    endOffsetMillis=index * 1500 + 1400,
+                    transcript="the quick brown fox jumps over the lazy dog",
+                    isPartial=is_partial,
+                    sentiment="NEUTRAL",
+                ),
+            )
+        else:
+            message = dict(
+                EventType="SEGMENTS",
+                ContactId=call_id,
+                Segments=[
+                    {
+                        "Transcript": {
+                            "Id": f"transcript-{index}",
+                            "Content": "the quick brown fox jumps over the lazy dog",
+                            "ParticipantRole": "AGENT",
+                            "BeginOffsetMillis": index * 1500,
+                            "EndOffsetMillis": index * 1500 + 1400,
+                            "Sentiment": "NEUTRAL",
+                        }
+                    }
+                ],
+            )
+        messages.append(message)
+    return messages
+
+
+def _legacy_convert_keys_to_uppercamelcase(value: Dict[str, Any]) -> Dict[str, Any]:
+    new_dict = {}
+    for key, nested_value in value.items():
+        if isinstance(nested_value, dict):
+            new_dict[key[0].upper() + key[1:]] = _legacy_convert_keys_to_uppercamelcase(
+                nested_value
+            )
+        else:
+            new_dict[key[0].upper() + key[1:]] = nested_value
+    return new_dict
+
+
+def _legacy_transform_contact_lens_segment(segment: Dict[str, Any]) -> Dict[str, Any]:
+    call_id = segment["CallId"]
+    utterance = segment.get("Utterance", None)
+    categories = segment.get("Categories", None)
+    contact_lens_transcript = segment.get("Transcript", None)
+    sentiment_args = {}
+    segment_item = segment["Transcript"]
+    segment_id = segment_item["Id"]
+    transcript = segment_item["Content"]
+    if "Sentiment" in segment_item:
+        sentiment = segment_item.get("Sentiment", "NEUTRAL")
+        sentiment_args = dict(
+            Sentiment=sentiment,
+            SentimentScore=SENTIMENT_SCORE,
+            SentimentWeighted=SENTIMENT_WEIGHT.get(sentiment, 0),
+        )
+    channel = segment_item.get("ParticipantRole", "AGENT")
+    if channel == "CUSTOMER":
+        channel = "CALLER"
+    transcript_segment = dict(
+        CallId=call_id,
+        ContactId=call_id,
+        Channel=channel,
+        CreatedAt=datetime.utcnow().astimezone().isoformat(),
+        ExpiresAfter=get_ttl(),
+        EndTime=segment_item["EndOffsetMillis"] / 1000,
+        IsPartial=False,
+        SegmentId=segment_id,
+        StartTime=segment_item["BeginOffsetMillis"] / 1000,
+        Status="TRANSCRIBING",
+        Transcript=transcript,
+        OriginalTranscript=transcript,
+        **sentiment_args,
+    )
+    if utterance:
+        transcript_segment["Utterance"] = utterance
+    if categories:
+        transcript_segment["Categories"] = categories
+    if contact_lens_transcript:
+        transcript_segment["ContactLensTranscript"] = contact_lens_transcript
+    return transcript_segment
+
+
+def _legacy_normalize_transcript_segments(message: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Previous dict normalization of the message formats of the benchmark"""
+    # pylint: disable=too-many-locals,too-many-branches
+    sentiment = None
+    sentiment_weighted = None
+    sentiment_score = None
+    issues_detected = None
+    status = "TRANSCRIBING"
+    expires_after = get_ttl()
+    created_at = datetime.utcnow().astimezone().isoformat()
+    segments = []
+    utterance_event = message.get("UtteranceEvent", None)
+    contact_lens_event = message.get("ContactId", None)
+    if utterance_event:
+        call_id = message["CallId"]
+        channel = utterance_event["ParticipantRole"]
+        if channel == "CUSTOMER":
+            channel = "CALLER"
+        transcript = utterance_event["Transcript"]
+        is_partial = utterance_event["IsPartial"]
+        if not is_partial and utterance_event.get("Sentiment", None):
+            sentiment = utterance_event.get("Sentiment", None)
+        if not is_partial and utterance_event.get("SentimentWeighted", None):
+            sentiment_weighted = utterance_event.get("SentimentWeighted", None)
+        if not is_partial and utterance_event.get("SentimentScore", None):
+            sentiment_score = utterance_event.get("SentimentScore", None)
+        if not is_partial and utterance_event.get("IssuesDetected", []):
+            issues_detected = utterance_event.get("IssuesDetected")
+        segments.append(
+            dict(
+                CallId=call_id,
+                Channel=channel,
+                SegmentId=utterance_event["UtteranceId"],
+                StartTime=utterance_event["BeginOffsetMillis"] / 1000,
+                EndTime=utterance_event["EndOffsetMillis"] / 1000,
+                Transcript=transcript,
+                OriginalTranscript=transcript,
+                IsPartial=is_partial,
+                Sentiment=sentiment,
+                SentimentWeighted=sentiment_weighted,
+                SentimentScore=sentiment_score,
+                IssuesDetected=issues_detected,
+                Status=status,
+                ExpiresAfter=expires_after,
+                CreatedAt=created_at,
+            )
+        )
+    elif contact_lens_event:
+        call_id = message["ContactId"]
+        for segment in message.get("Segments", []):
+            if "Utterance" not in segment and "Transcript" not in segment:
+                continue
+            segments.append(
+                {**_legacy_transform_contact_lens_segment({**segment, "CallId": call_id})}
+            )
+    else:
+        call_id = message["CallId"]
+        channel = "CALLER"
+        if message.get("Channel", None):
+            channel = message["Channel"]
+        elif not message.get("IsCaller", True):
+            channel = "AGENT"
+        segment_id = message["SegmentId"] if message.get("SegmentId", None) else str(uuid.uuid4())
+        start_time = end_time = None
+        if message.get("BeginOffsetMillis", None):
+            start_time = message["BeginOffsetMillis"]
+        if message.get("StartTime", None):
+            start_time = message["StartTime"]
+        if message.get("EndOffsetMillis", None):
+            end_time = message["EndOffsetMillis"]
+        if message.get("EndTime", None):
+            end_time = message["EndTime"]
+        transcript = message["Transcript"]
+        if message.get("Sentiment", None):
+            sentiment = message["Sentiment"]
+        segments.append(
+            dict(
+                CallId=call_id,
+                Channel=channel,
+                SegmentId=segment_id,
+                StartTime=start_time,
+                EndTime=end_time,
+                Transcript=transcript,
+                OriginalTranscript=transcript,
+                IsPartial=message["IsPartial"],
+                Sentiment=sentiment,
+                IssuesDetected=issues_detected,
+                Status=status,
+                ExpiresAfter=expires_after,
+                CreatedAt=created_at,
+            )
+        )
+    return segments
+
+
+def _legacy_serialize_input_value(value: Any, input_type: GraphQLInputType) -> Any:
+    if isinstance(input_type, GraphQLNonNull):
+        return _legacy_serialize_input_value(value, input_type.of_type)
+    if value is None:
+        return None
+    if isinstance(input_type, GraphQLList):
+        if isinstance(value, (list, tuple)):
+            return [_legacy_serialize_input_value(v, input_type.of_type) for v in value]
+        return [_legacy_serialize_input_value(value, input_type.of_type)]
+    if isinstance(input_type, GraphQLInputObjectType):
+        return {
+            name: _legacy_serialize_input_value(value[name], field.type)
+            for name, field in input_type.fields.items()
+            if name in value
+        }
+    return value
+
+
+def _run_segment_path(messages: List[Dict[str, Any]], variables_fn: Callable) -> None:
+    for payload in messages:
+        message = convert_keys_to_uppercamelcase(payload)
+        for segment in normalize_transcript_segments(message):
+            variables_fn(input=segment)
+            if not segment["IsPartial"]:
+                segment_with_sentiment = segment.to_dict()
+                segment_with_sentiment.update(SENTIMENT)
+                variables_fn(input=segment_with_sentiment)
+
+
+def _run_dict_path(messages: List[Dict[str, Any]], input_type: GraphQLInputType) -> None:
+    def variables_fn(**values: Any) -> Dict[str, Any]:
+        return {"input": _legacy_serialize_input_value(values["input"], input_type)}
+
+    for payload in messages:
+        message = _legacy_convert_keys_to_uppercamelcase(payload)
+        for segment in _legacy_normalize_transcript_segments({**message}):
+            variables_fn(input=segment)
+            if not segment["IsPartial"]:
+                variables_fn(input={**segment, **SENTIMENT})
+
+
+def _measure_cpu(
+    fns: Dict[str, Callable[[], None]], samples: int, message_count: int
+) -> Dict[str, float]:
+    """Minimum CPU time per message - the paths are interleaved between samples"""
+    durations: Dict[str, List[float]] = {name: [] for name in fns}
+    for _ in range(samples):
+        for name, fn in fns.items():
+            start_time = process_time()
+            fn()
+            durations[name].append(process_time() - start_time)
+    return {
+        name: round(min(values) / message_count * 1_000_000, 2)
+        for name, values in durations.items()
+    }
+
+
+def _measure_retained_bytes(normalize_fn: Callable[[Dict[str, Any]], List[Any]], messages) -> float:
+    """Memory held by the normalized segments of the messages"""
+    tracemalloc.start()
+    segments = [segment for message in messages for segment in normalize_fn(message)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(current / len(segments), 1)
+
+
+def main() -> int:
+    """Runs the benchmark and returns the exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--messages", type=int, default=3000, help="messages per sample")
+    parser.add_argument("--samples", type=int, default=10, help="runs per measurement")
+    args = parser.parse_args()
+
+    schema = load_schema_snapshot()
+    if schema is None:
+        print("unable to load the AppSync schema snapshot", file=sys.stderr)
+        return 1
+    compiled_operation = get_compiled_operation(
+        name="AddTranscriptSegmentWithSentiment",
+        schema=schema,
+        build_fn=GRAPHQL_OPERATIONS["AddTranscriptSegmentWithSentiment"],
+    )
+    variables_fn = compiled_operation.variables
+    input_type = compiled_operation.variable_types["input"]
+    messages = _get_messages(args.messages)
+    upper_messages = [convert_keys_to_uppercamelcase(m) for m in messages]
+
+    results = dict(
+        messages=args.messages,
+        cpu_us_per_message=_measure_cpu(
+            dict(
+                segment=lambda: _run_segment_path(messages, variables_fn),
+                dict=lambda: _run_dict_path(messages, input_type),
+            ),
+            args.samples,
+            args.messages,
+        ),
+        retained_bytes_per_segment=dict(
+            segment=_measure_retained_bytes(normalize_transcript_segments, upper_messages),
+            dict=_measure_retained_bytes(_legacy_normalize_transcript_segments, upper_messages),
+        ),
+    )
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
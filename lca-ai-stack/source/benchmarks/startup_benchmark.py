@@ -0,0 +1,118 @@
+#!/usr/bin/env python3.12
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Startup Benchmark
+
+Measures the cold start import time of the transcript enrichment layer
+packages and the init duration of the Lambda function entry points using the
+layer. Each sample runs in a fresh interpreter with offline AWS settings so
+that no network call is made. Run from the repo root:
+
+    python lca-ai-stack/source/benchmarks/startup_benchmark.py --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(SOURCE_DIR, "lambda_layers", "transcript_enrichment_layer")
+FUNCTIONS_DIR = os.path.join(SOURCE_DIR, "lambda_functions")
+
+LAYER_PACKAGES = (
+    "appsync_utils",
+    "boto3_utils",
+    "eventprocessor_utils",
+    "graphql_helpers",
+    "lambda_utils",
+    "lex_utils",
+    "logging_utils",
+    "sentiment",
+    "sns_utils",
+    "transcript_batch_processor",
+)
+
+ENTRY_POINTS = (
+    "call_event_processor",
+    "async_agent_assist_orchestrator",
+    "async_transcript_summary_orchestrator",
+)
+
+OFFLINE_ENVIRONMENT = dict(
+    AWS_DEFAULT_REGION="us-east-1",
+    AWS_ACCESS_KEY_ID="benchmark",
+    AWS_SECRET_ACCESS_KEY="benchmark",
+    APPSYNC_GRAPHQL_URL="https://benchmark.appsync-api.us-east-1.amazonaws.com/graphql",
+    STATE_DYNAMODB_TABLE_NAME="benchmark",
+    POWERTOOLS_SERVICE_NAME="benchmark",
+)
+
+SAMPLE_CODE = """
+import sys
+from time import perf_counter
+start_time = perf_counter()
+import {module}
+print((perf_counter() - start_time) * 1000)
+"""
+
+
+def _run_sample(module: str, path: List[str]) -> float:
+    environment = {**os.environ, **OFFLINE_ENVIRONMENT, "PYTHONPATH": os.pathsep.join(path)}
+    output = subprocess.run(
+        [sys.executable, "-c", SAMPLE_CODE.format(module=module)],
+        env=environment,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def _measure(module: str, path: List[str], samples: int) -> Dict[str, float]:
+    durations = [_run_sample(module, path) for _ in range(samples)]
+    return dict(
+        median_ms=round(statistics.median(durations), 1),
+        min_ms=round(min(durations), 1),
+        max_ms=round(max(durations), 1),
+    )
+
+
+def main() -> int:
+    """Runs the benchmark and returns the exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--samples", type=int, default=5, help="interpreters per measurement")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=0.0,
+        help="fails when the median init of an entry point is over this value",
+    )
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = dict(layer_packages={}, entry_points={})
+    for package in LAYER_PACKAGES:
+        results["layer_packages"][package] = _measure(package, [LAYER_DIR], args.samples)
+    for entry_point in ENTRY_POINTS:
+        results["entry_points"][entry_point] = _measure(
+            "lambda_function",
+            [os.path.join(FUNCTIONS_DIR, entry_point), LAYER_DIR],
+            args.samples,
+        )
+    print(json.dumps(results, indent=2))
+
+    over_budget = [
+        name
+        for name, result in results["entry_points"].items()
+        if args.budget_ms and result["median_ms"] > args.budget_ms
+    ]
+    if over_budget:
+        print(f"over the {args.budget_ms} ms startup budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
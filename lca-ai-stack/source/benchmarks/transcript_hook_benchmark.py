@@ -0,0 +1,212 @@
+#!/usr/bin/env python3.12
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Transcript Hook Benchmark
+
+Measures the overhead per hooked segment of the transcript hook modes for a
+KDS batch of transcript messages:
+
+- segment: a RequestResponse Lambda invoke per segment, run in the call
+  lanes of the batch processor (the messages of a call are in order)
+- batch: a single Lambda invoke with the segments of the batch
+- plugin: an in-process function called with the segments of the batch
+
+The Lambda client is a stub that sleeps for the configured invoke latency
+in the invoker thread pool and upper cases the transcripts. The plugin does
+the same without the latency. The hooked transcripts of the modes are
+compared.
+Run from the repo root:
+
+    python lca-ai-stack/source/benchmarks/transcript_hook_benchmark.py --calls 10
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+import time
+from time import perf_counter
+from typing import Any, Dict, List
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(SOURCE_DIR, "lambda_layers", "transcript_enrichment_layer")
+FUNCTION_DIR = os.path.join(SOURCE_DIR, "lambda_functions", "call_event_processor")
+
+OFFLINE_ENVIRONMENT = dict(
+    AWS_DEFAULT_REGION="us-east-1",
+    AWS_ACCESS_KEY_ID="benchmark",
+    AWS_SECRET_ACCESS_KEY="benchmark",
+    APPSYNC_GRAPHQL_URL="https://benchmark.appsync-api.us-east-1.amazonaws.com/graphql",
+    STATE_DYNAMODB_TABLE_NAME="benchmark",
+    POWERTOOLS_SERVICE_NAME="benchmark",
+    LOG_LEVEL="WARNING",
+    TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN="benchmark-transcript-hook",
+)
+for _name, _value in OFFLINE_ENVIRONMENT.items():
+    os.environ.setdefault(_name, _value)
+sys.path[:0] = [LAYER_DIR, FUNCTION_DIR]
+
+# pylint: disable=import-error,wrong-import-position
+from eventprocessor_utils import normalize_transcript_segments
+from event_processor import call_event_processor
+from lambda_utils import AsyncLambdaInvoker
+from transcript_batch_processor import CallLaneScheduler
+from transcript_hooks import (
+    LambdaBatchTranscriptHook,
+    PluginTranscriptHook,
+    load_transcript_hook_plugin,
+)
+
+# pylint: enable=import-error,wrong-import-position
+
+TRANSCRIPT = "my account number is one two three four and I need help with my bill"
+
+
+def redact_segments(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Transcript hook plugin - keeps the original transcript"""
+    for segment in segments:
+        segment["OriginalTranscript"] = segment["Transcript"]
+        segment["Transcript"] = segment["Transcript"].upper()
+    return segments
+
+
+class StubLambdaClient:
+    """Lambda client stub running the hook after the invoke latency"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, latency: float) -> None:
+        self._latency = latency
+        self._lock = threading.Lock()
+        self.invoke_count = 0
+
+    def invoke(self, FunctionName: str, InvocationType: str, Payload: str) -> Dict[str, Any]:
+        """Sleeps for the latency and returns the hooked payload"""
+        # pylint: disable=invalid-name,unused-argument
+        time.sleep(self._latency)
+        with self._lock:
+            self.invoke_count += 1
+        payload = json.loads(Payload)
+        if "Segments" in payload:
+            payload["Segments"] = redact_segments(payload["Segments"])
+        else:
+            payload = redact_segments([payload])[0]
+        return dict(Payload=io.BytesIO(json.dumps(payload).encode("utf-8")))
+
+
+def get_messages(calls: int, messages_per_call: int) -> List[Dict[str, Any]]:
+    """Partial and final custom transcript messages of the calls (in stream order)"""
+    messages: List[Dict[str, Any]] = []
+    for index in range(messages_per_call):
+        for call in range(calls):
+            messages.append(
+                dict(
+                    EventType="ADD_TRANSCRIPT_SEGMENT",
+                    CallId=f"call-{call}",
+                    Channel="CALLER" if index % 4 < 2 else "AGENT",
+                    SegmentId=f"segment-{index // 2}",
+                    StartTime=index * 1.5,
+                    EndTime=index * 1.5 + 1.4,
+                    Transcript=TRANSCRIPT,
+                    IsPartial=index % 2 == 0,
+                )
+            )
+    return messages
+
+
+async def run_segment_mode(messages: List[Dict[str, Any]]) -> List[List[Any]]:
+    """Invokes the hook per segment in the call lanes"""
+
+    async def hook_message(message: Dict[str, Any]) -> List[Any]:
+        segments = normalize_transcript_segments(
+            call_event_processor.prepare_event_message(message)
+        )
+        return list(
+            await asyncio.gather(
+                *(call_event_processor.invoke_transcript_lambda_hook(s) for s in segments)
+            )
+        )
+
+    return await CallLaneScheduler().run(
+        [(message["CallId"], hook_message(message)) for message in messages]
+    )
+
+
+async def run_batch_mode(messages: List[Dict[str, Any]]) -> List[List[Any]]:
+    """Applies the hook once to the segments of the batch"""
+    results = await call_event_processor.execute_transcript_batch_hook(messages)
+    return [result[call_event_processor.NORMALIZED_SEGMENTS_KEY] for result in results]
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Runs the batches of each mode"""
+    lambda_client = StubLambdaClient(latency=args.invoke_latency_ms / 1000)
+    # the invoker and hooks are configured from the environment at import
+    call_event_processor.LAMBDA_HOOK_INVOKER = AsyncLambdaInvoker(
+        lambda_client=lambda_client,  # type: ignore
+        max_concurrency=args.max_concurrency,
+    )
+    hooks = dict(
+        segment=None,
+        batch=LambdaBatchTranscriptHook(
+            invoker=call_event_processor.LAMBDA_HOOK_INVOKER,
+            function_name=os.environ["TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN"],
+        ),
+        plugin=PluginTranscriptHook(load_transcript_hook_plugin(f"{__name__}:redact_segments")),
+    )
+    report: Dict[str, Any] = dict(
+        batches=args.batches,
+        messages_per_batch=args.calls * args.messages_per_call,
+        invoke_latency_ms=args.invoke_latency_ms,
+        modes={},
+    )
+    transcripts: Dict[str, List[str]] = {}
+    for mode, hook in hooks.items():
+        call_event_processor.TRANSCRIPT_HOOK = hook
+        lambda_client.invoke_count = 0
+        durations: List[float] = []
+        hooked_segment_count = 0
+        for _ in range(args.batches):
+            messages = get_messages(args.calls, args.messages_per_call)
+            start_time = perf_counter()
+            if hook is None:
+                segment_lists = await run_segment_mode(messages)
+            else:
+                segment_lists = await run_batch_mode(messages)
+            durations.append(perf_counter() - start_time)
+            segments = [segment for segment_list in segment_lists for segment in segment_list]
+            hooked_segment_count += len([s for s in segments if s["Transcript"] != TRANSCRIPT])
+            transcripts[mode] = [s["Transcript"] for s in segments]
+        duration = sum(durations) / len(durations)
+        report["modes"][mode] = dict(
+            batch_ms=round(duration * 1000, 1),
+            invokes_per_batch=lambda_client.invoke_count / args.batches,
+            hooked_segments_per_batch=hooked_segment_count / args.batches,
+            overhead_per_segment_ms=round(sum(durations) / max(hooked_segment_count, 1) * 1000, 3),
+        )
+    report["same_transcripts"] = all(t == transcripts["segment"] for t in transcripts.values())
+    return report
+
+
+def main() -> int:
+    """Runs the benchmark and returns the exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--calls", type=int, default=10, help="calls per batch")
+    parser.add_argument("--messages-per-call", type=int, default=10, help="messages per call")
+    parser.add_argument("--batches", type=int, default=5, help="batches per mode")
+    parser.add_argument("--invoke-latency-ms", type=float, default=25, help="Lambda invoke latency")
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=call_event_processor.LAMBDA_HOOK_MAX_CONCURRENCY,
+        help="concurrent Lambda invokes",
+    )
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    return 0 if report["same_transcripts"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,6 +13,7 @@ from eventprocessor_utils import (
     get_ttl
 )
 from lex_utils import recognize_text_lex
+from logging_utils import DebugLogSampler, LazyJson
 
 # third-party imports from Lambda layer
 from aws_lambda_powertools import Logger
@@ -23,6 +24,8 @@ from botocore.config import Config as BotoCoreConfig
 
 # pylint: enable=import-error
 LOGGER = Logger(location="%(filename)s:%(lineno)d - %(funcName)s()")
+# fraction of the invocations logged at the debug level
+DEBUG_LOG_SAMPLER = DebugLogSampler(LOGGER, sample_rate=float(getenv("DEBUG_LOG_SAMPLE_RATE", "0")))
 
 if TYPE_CHECKING:
     from mypy_boto3_lambda.client import LambdaClient
@@ -80,13 +83,14 @@ def write_agent_assist_to_kds(
 
     if callId:
         try:
+            data = json.dumps(message)
             KINESIS_CLIENT.put_record(
                 StreamName=CALL_DATA_STREAM_NAME,
                 PartitionKey=callId,
-                Data=json.dumps(message)
+                Data=data
             )
-            LOGGER.info("Write AGENT_ASSIST event to KDS: %s",
-                        json.dumps(message))
+            LOGGER.info("Write AGENT_ASSIST event to KDS. callId: %s", callId)
+            LOGGER.debug("AGENT_ASSIST event: %s", data)
         except Exception as error:
             LOGGER.error(
                 "Error writing AGENT_ASSIST event to KDS ",
@@ -363,7 +367,7 @@ def publish_contact_lens_lex_agent_assist_transcript_segment(
     end_time: float
 
     send_lex_agent_assist_args = []
-    LOGGER.info("LEX CONTACT LENS SEGMENT %s", json.dumps(segment))
+    LOGGER.debug("LEX CONTACT LENS SEGMENT %s", LazyJson(segment))
 
     # only send relevant segments to agent assist
     # BobS: Modified to process Utterance rather than Transcript events
@@ -611,7 +615,8 @@ def publish_contact_lens_lambda_agent_assist_transcript_segment(
 def handler(event, context: LambdaContext):
     # pylint: disable=unused-argument
     """Lambda handler"""
-    LOGGER.info("Agent assist lambda event", extra={"event": event})
+    DEBUG_LOG_SAMPLER.sample()
+    LOGGER.debug("Agent assist lambda event", extra={"event": event})
 
     data = json.loads(json.dumps(event))
 
@@ -1,6 +1,26 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 """API Mutation Event Processors"""
-from .call_event_processor import execute_process_event_api_mutation
+from .call_event_processor import (
+    execute_pending_call_aggregation_mutation,
+    execute_process_event_api_mutation,
+    execute_transcript_batch_hook,
+    flush_agent_assist_turns,
+    get_agent_assist_turn_stats,
+    get_call_metadata_stats,
+    get_lambda_hook_stats,
+    get_partial_utterance_stats,
+    get_transcript_hook_stats,
+)
 
-__all__ = ["execute_process_event_api_mutation"]
\ No newline at end of file
+__all__ = [
+    "execute_pending_call_aggregation_mutation",
+    "execute_process_event_api_mutation",
+    "execute_transcript_batch_hook",
+    "flush_agent_assist_turns",
+    "get_agent_assist_turn_stats",
+    "get_call_metadata_stats",
+    "get_lambda_hook_stats",
+    "get_partial_utterance_stats",
+    "get_transcript_hook_stats",
+]
\ No newline at end of file
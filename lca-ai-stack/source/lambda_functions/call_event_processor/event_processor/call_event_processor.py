@@ -3,50 +3,83 @@
 """ Transcribe API Mutation Processor
 """
 import asyncio
+from collections import Counter
 from datetime import datetime
-from statistics import fmean
 from os import getenv
-from typing import TYPE_CHECKING, Any, Coroutine, Dict, List, Literal, Optional, TypedDict
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Dict,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+)
 import uuid
 import json
 import re
 
 # third-party imports from Lambda layer
-import boto3
-from botocore.config import Config as BotoCoreConfig
 from aws_lambda_powertools import Logger
 from gql.client import AsyncClientSession as AppsyncAsyncClientSession
-from gql.dsl import DSLMutation, DSLSchema, DSLQuery, dsl_gql
-from graphql.language.printer import print_ast
+from gql.dsl import DSLMutation, DSLSchema, DSLQuery, DSLVariableDefinitions
 
 # custom utils/helpers imports from Lambda layer
 # pylint: disable=import-error
-from appsync_utils import execute_gql_query_with_retries
+from appsync_utils import (
+    CONDITION_FAILURE_MESSAGE,
+    ITEM_EXISTS_MESSAGE,
+    CompiledOperation,
+    execute_gql_query_with_retries,
+    get_compiled_operation,
+    get_error_messages,
+)
+from boto3_utils import ContactAttributesCache, get_client, lazy_client
 from graphql_helpers import (
     call_fields,
     transcript_segment_fields,
     transcript_segment_sentiment_fields,
 )
 from sns_utils import publish_sns
-from lambda_utils import invoke_lambda
+from lambda_utils import AgentAssistTurnDispatcher, AsyncLambdaInvoker, invoke_lambda
+from logging_utils import LazyJson
 from eventprocessor_utils import (
+    PARTIAL_UTTERANCE_BUFFER,
+    CallCategoryLedger,
+    CallMetadataCache,
+    get_call_category_key,
+    get_category_alert_key,
+    get_category_segment_key,
     normalize_transcript_segments,
     get_ttl,
     transform_segment_to_add_sentiment,
     transform_segment_to_issues_agent_assist,
     transform_segment_to_categories_agent_assist,
 )
+from sentiment import CallSentimentAggregate, SentimentAggregationStore
+from transcript_batch_processor import CallAggregationBatch, PendingCallAggregation, TaskGraph
+from transcript_hooks import (
+    LambdaBatchTranscriptHook,
+    PluginTranscriptHook,
+    TranscriptHook,
+    load_transcript_hook_plugin,
+)
 # pylint: enable=import-error
 if TYPE_CHECKING:
     from mypy_boto3_lambda.client import LambdaClient
     from mypy_boto3_lambda.type_defs import InvocationResponseTypeDef
     from mypy_boto3_sns.client import SNSClient
     from mypy_boto3_ssm.client import SSMClient
-    from boto3 import Session as Boto3Session
 else:
     LambdaClient = object
     InvocationResponseTypeDef = object
-    Boto3Session = object
     SNSClient = object
     SSMClient = object
 
@@ -54,10 +87,6 @@ SNS_TOPIC_ARN = getenv("SNS_TOPIC_ARN", "")
 
 IS_SENTIMENT_ANALYSIS_ENABLED = getenv("IS_SENTIMENT_ANALYSIS_ENABLED", "true").lower() == "true"
 
-BOTO3_SESSION: Boto3Session = boto3.Session()
-CLIENT_CONFIG = BotoCoreConfig(
-    retries={"mode": "adaptive", "max_attempts": 3},
-)
 TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN = getenv("TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN", "")
 
 START_OF_CALL_LAMBDA_HOOK_FUNCTION_ARN = getenv("START_OF_CALL_LAMBDA_HOOK_FUNCTION_ARN", "")
@@ -67,15 +96,60 @@ ASYNC_TRANSCRIPT_SUMMARY_ORCHESTRATOR_ARN = getenv("ASYNC_TRANSCRIPT_SUMMARY_ORC
 IS_TRANSCRIPT_SUMMARY_ENABLED = getenv("IS_TRANSCRIPT_SUMMARY_ENABLED", "false").lower() == "true"
 
 ASYNC_AGENT_ASSIST_ORCHESTRATOR_ARN = getenv("ASYNC_AGENT_ASSIST_ORCHESTRATOR_ARN", "")
+# consecutive final CALLER segments of a call in an invocation are sent to the
+# agent assist orchestrator as a single turn. The turn ends when no segment was
+# added for the quiet window - each segment is sent when the window is 0
+AGENT_ASSIST_TURN_QUIET_WINDOW = int(getenv("AGENT_ASSIST_TURN_QUIET_WINDOW_MS", "500")) / 1000
+# turns are sent at the latest after the max delay or at the end of the invocation
+AGENT_ASSIST_TURN_MAX_DELAY = int(getenv("AGENT_ASSIST_TURN_MAX_DELAY_MS", "4000")) / 1000
+AGENT_ASSIST_TURN_MAX_LENGTH = int(getenv("AGENT_ASSIST_TURN_MAX_LENGTH", "1000"))
+
+LAMBDA_HOOK_MAX_CONCURRENCY = int(getenv("LAMBDA_HOOK_MAX_CONCURRENCY", "10"))
 
 TRANSCRIPT_LAMBDA_HOOK_FUNCTION_NONPARTIAL_ONLY = getenv(
     "TRANSCRIPT_LAMBDA_HOOK_FUNCTION_NONPARTIAL_ONLY", "true").lower() == "true"
+# segment: a hook invocation per segment - batch: a hook invocation per KDS batch
+TRANSCRIPT_LAMBDA_HOOK_MODE = getenv("TRANSCRIPT_LAMBDA_HOOK_MODE", "segment").lower()
+# module:function called in process with the segments of a batch instead of
+# the transcript Lambda hook
+TRANSCRIPT_HOOK_PLUGIN = getenv("TRANSCRIPT_HOOK_PLUGIN", "")
 if (TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN
         or ASYNC_TRANSCRIPT_SUMMARY_ORCHESTRATOR_ARN
         or ASYNC_AGENT_ASSIST_ORCHESTRATOR_ARN
         or START_OF_CALL_LAMBDA_HOOK_FUNCTION_ARN
         or POST_CALL_SUMMARY_LAMBDA_HOOK_FUNCTION_ARN):
-    LAMBDA_HOOK_CLIENT: LambdaClient = BOTO3_SESSION.client("lambda", config=CLIENT_CONFIG)
+    LAMBDA_HOOK_CLIENT: LambdaClient = lazy_client("lambda")
+    # runs the hook invocations in a thread pool instead of the event loop
+    LAMBDA_HOOK_INVOKER = AsyncLambdaInvoker(
+        lambda_client=LAMBDA_HOOK_CLIENT,
+        max_concurrency=LAMBDA_HOOK_MAX_CONCURRENCY,
+    )
+
+if ASYNC_AGENT_ASSIST_ORCHESTRATOR_ARN:
+    AGENT_ASSIST_DISPATCHER = AgentAssistTurnDispatcher(
+        dispatch_fn=lambda payload: LAMBDA_HOOK_INVOKER.invoke(
+            function_name=ASYNC_AGENT_ASSIST_ORCHESTRATOR_ARN,
+            payload=payload,
+            invocation_type="Event",
+            hook_type="agent_assist",
+        ),
+        quiet_window=AGENT_ASSIST_TURN_QUIET_WINDOW,
+        max_delay=AGENT_ASSIST_TURN_MAX_DELAY,
+        max_length=AGENT_ASSIST_TURN_MAX_LENGTH,
+    )
+
+# transcript hook applied once to the segments of a batch
+TRANSCRIPT_HOOK: Optional[TranscriptHook] = None
+if TRANSCRIPT_HOOK_PLUGIN:
+    TRANSCRIPT_HOOK = PluginTranscriptHook(load_transcript_hook_plugin(TRANSCRIPT_HOOK_PLUGIN))
+elif TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN and TRANSCRIPT_LAMBDA_HOOK_MODE == "batch":
+    TRANSCRIPT_HOOK = LambdaBatchTranscriptHook(
+        invoker=LAMBDA_HOOK_INVOKER,
+        function_name=TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN,
+    )
+
+# key of the segments normalized by the transcript batch hook in a message
+NORMALIZED_SEGMENTS_KEY = "NormalizedTranscriptSegments"
 
 IS_LEX_AGENT_ASSIST_ENABLED = False
 
@@ -101,8 +175,17 @@ CONNECT_CONTACT_ATTR_CUSTOMER_PHONE_NUMBER = getenv(
 CONNECT_CONTACT_ATTR_SYSTEM_PHONE_NUMBER = getenv(
     "CONNECT_CONTACT_ATTR_SYSTEM_PHONE_NUMBER", "LCA System Phone Number")
 
-CUSTOMER_PHONE_NUMBER = ""
-CALL_ID = ""
+# contact attributes looked up on Contact Lens START - reused across warm invocations
+CONTACT_ATTRIBUTES_CACHE = ContactAttributesCache(
+    max_size=int(getenv("CONTACT_ATTRIBUTES_CACHE_MAX_SIZE", "1000")),
+    ttl=float(getenv("CONTACT_ATTRIBUTES_CACHE_TTL_SECONDS", "300")),
+)
+
+# phone numbers, agent and status of the calls - reused across warm invocations
+CALL_METADATA_CACHE = CallMetadataCache(
+    max_size=int(getenv("CALL_METADATA_CACHE_MAX_SIZE", "1000")),
+    ttl=float(getenv("CALL_METADATA_CACHE_TTL_SECONDS", "7200")),
+)
 
 CALL_DATA_STREAM_NAME = getenv("CALL_DATA_STREAM_NAME", "")
 
@@ -149,6 +232,101 @@ class Sentiment(TypedDict):
     OverallSentiment: Dict[ChannelType, float]
     SentimentByPeriod: Dict[SentimentPeriodType, Dict[ChannelType, List[SentimentByPeriodEntry]]]
 
+##########################################################################
+# GraphQL Operations
+# Documents use variables and are compiled once per schema
+##########################################################################
+
+def _add_transcript_segment_operation(
+    schema: DSLSchema, variables: DSLVariableDefinitions
+) -> DSLMutation:
+    return DSLMutation(
+        schema.Mutation.addTranscriptSegment.args(input=variables.input).select(
+            *transcript_segment_fields(schema),
+        )
+    )
+
+def _add_transcript_segment_with_sentiment_operation(
+    schema: DSLSchema, variables: DSLVariableDefinitions
+) -> DSLMutation:
+    return DSLMutation(
+        schema.Mutation.addTranscriptSegment.args(input=variables.input).select(
+            *transcript_segment_fields(schema),
+            *transcript_segment_sentiment_fields(schema),
+        )
+    )
+
+def _create_call_operation(schema: DSLSchema, variables: DSLVariableDefinitions) -> DSLMutation:
+    return DSLMutation(
+        schema.Mutation.createCall.args(input=variables.input).select(
+            schema.CreateCallOutput.CallId
+        )
+    )
+
+def _call_mutation_operation_fn(field_name: str):
+    def build_operation(schema: DSLSchema, variables: DSLVariableDefinitions) -> DSLMutation:
+        return DSLMutation(
+            getattr(schema.Mutation, field_name).args(input=variables.input).select(
+                *call_fields(schema)
+            )
+        )
+    return build_operation
+
+def _get_transcript_segments_with_sentiment_operation(
+    schema: DSLSchema, variables: DSLVariableDefinitions
+) -> DSLQuery:
+    return DSLQuery(
+        schema.Query.getTranscriptSegmentsWithSentiment.args(callId=variables.callId).select(
+            schema.TranscriptSegmentsWithSentimentList.TranscriptSegmentsWithSentiment.select(
+                schema.TranscriptSegmentWithSentiment.PK,
+                schema.TranscriptSegmentWithSentiment.SK,
+                schema.TranscriptSegmentWithSentiment.CallId,
+                schema.TranscriptSegmentWithSentiment.Channel,
+                schema.TranscriptSegmentWithSentiment.SegmentId,
+                schema.TranscriptSegmentWithSentiment.StartTime,
+                schema.TranscriptSegmentWithSentiment.EndTime,
+                schema.TranscriptSegmentWithSentiment.Sentiment,
+                schema.TranscriptSegmentWithSentiment.SentimentWeighted,
+            )
+        )
+    )
+
+def _get_call_operation(schema: DSLSchema, variables: DSLVariableDefinitions) -> DSLQuery:
+    return DSLQuery(
+        schema.Query.getCall.args(CallId=variables.CallId).select(
+            *call_fields(schema),
+        )
+    )
+
+GRAPHQL_OPERATIONS = dict(
+    AddTranscriptSegment=_add_transcript_segment_operation,
+    AddTranscriptSegmentWithSentiment=_add_transcript_segment_with_sentiment_operation,
+    CreateCall=_create_call_operation,
+    UpdateCallStatus=_call_mutation_operation_fn("updateCallStatus"),
+    UpdateCallAggregation=_call_mutation_operation_fn("updateCallAggregation"),
+    UpdateRecordingUrl=_call_mutation_operation_fn("updateRecordingUrl"),
+    UpdatePcaUrl=_call_mutation_operation_fn("updatePcaUrl"),
+    AddCallCategory=_call_mutation_operation_fn("addCallCategory"),
+    AddIssuesDetected=_call_mutation_operation_fn("addIssuesDetected"),
+    AddCallSummaryText=_call_mutation_operation_fn("addCallSummaryText"),
+    UpdateAgent=_call_mutation_operation_fn("updateAgent"),
+    GetTranscriptSegmentsWithSentiment=_get_transcript_segments_with_sentiment_operation,
+    GetCall=_get_call_operation,
+)
+
+def get_operation(
+    name: str,
+    appsync_session: AppsyncAsyncClientSession,
+) -> CompiledOperation:
+    """Gets a compiled GraphQL operation for the session schema"""
+    if not appsync_session.client.schema:
+        raise ValueError("invalid AppSync schema")
+    return get_compiled_operation(
+        name=name,
+        schema=appsync_session.client.schema,
+        build_fn=GRAPHQL_OPERATIONS[name],
+    )
+
 ##########################################################################
 # Transcripts
 ##########################################################################
@@ -158,9 +336,7 @@ def add_transcript_segments(
     appsync_session: AppsyncAsyncClientSession,
 ) -> List[Coroutine]:
     """Add Transcript Segment GraphQL Mutation"""
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
+    operation = get_operation("AddTranscriptSegment", appsync_session)
 
     tasks = []
     if message:
@@ -176,19 +352,12 @@ def add_transcript_segments(
             transcript = f"{transcript[:start]}<span class='issue-span'>{transcript[start:end]}</span>{transcript[end:]}<br/><span class='issue-pill'>Issue Detected</span>"
             message["Transcript"] = transcript
 
-        query = dsl_gql(
-            DSLMutation(
-                schema.Mutation.addTranscriptSegment.args(input=message).select(
-                    *transcript_segment_fields(schema),
-                )
-            )
-        )
-        def ignore_exception_fn(e): return True if (
-            e["message"] == 'item put condition failure') else False
+        def ignore_exception_fn(e): return CONDITION_FAILURE_MESSAGE in get_error_messages(e)
         tasks.append(
             execute_gql_query_with_retries(
-                query,
+                operation,
                 client_session=appsync_session,
+                variable_values=operation.variables(input=message),
                 logger=LOGGER,
                 should_ignore_exception_fn=ignore_exception_fn,
             ),
@@ -200,26 +369,20 @@ async def add_sentiment_to_transcript(
     message: Dict[str, Any],
     sentiment_analysis_args: Dict[str, Any],
     appsync_session: AppsyncAsyncClientSession,
+    before_write_fn: Optional[Callable[[], Awaitable[Any]]] = None,
 ):
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
+    operation = get_operation("AddTranscriptSegmentWithSentiment", appsync_session)
 
     transcript_segment_with_sentiment = await transform_segment_to_add_sentiment(message, sentiment_analysis_args)
+    if before_write_fn:
+        # e.g. the segment write that the segment with sentiment replaces
+        await before_write_fn()
 
     result = {}
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.addTranscriptSegment.args(input=transcript_segment_with_sentiment).select(
-                *transcript_segment_fields(schema),
-                *transcript_segment_sentiment_fields(schema),
-            )
-        )
-    )
-
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(input=transcript_segment_with_sentiment),
         logger=LOGGER,
     )
 
@@ -229,12 +392,15 @@ def add_transcript_sentiment_analysis(
     message: Dict[str, Any],
     sentiment_analysis_args: Dict[str, Any],
     appsync_session: AppsyncAsyncClientSession,
+    before_write_fn: Optional[Callable[[], Awaitable[Any]]] = None,
 ) -> List[Coroutine]:
     """Add Transcript Sentiment GraphQL Mutation"""
 
     tasks = []
 
-    task = add_sentiment_to_transcript(message, sentiment_analysis_args, appsync_session)
+    task = add_sentiment_to_transcript(
+        message, sentiment_analysis_args, appsync_session, before_write_fn=before_write_fn
+    )
     tasks.append(task)
 
     return tasks
@@ -244,43 +410,31 @@ async def execute_create_call_mutation(
     appsync_session: AppsyncAsyncClientSession,
 ) -> Dict:
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
-
-    global CUSTOMER_PHONE_NUMBER
-    global CALL_ID
-    CUSTOMER_PHONE_NUMBER = message.get("CustomerPhoneNumber", "")
-    CALL_ID = message.get("CallId", "")
+    operation = get_operation("CreateCall", appsync_session)
 
     # Contact Lens STARTED event type doesn't provide customer and system phone numbers, nor does it
     # have CreatedAt, so we will create a new message structure that conforms to other KDS channels.
 
     if('ContactId' in message.keys()):
-        CALL_ID = message.get("ContactId")
+        call_id = message.get("ContactId")
         created_at = datetime.utcnow().astimezone().isoformat()
-        (CUSTOMER_PHONE_NUMBER, system_phone_number) = get_caller_and_system_phone_numbers_from_connect(message)
-        message.update({"CallId": CALL_ID, "CreatedAt": created_at, "CustomerPhoneNumber": CUSTOMER_PHONE_NUMBER, "SystemPhoneNumber": system_phone_number})
+        (customer_phone_number, system_phone_number) = get_caller_and_system_phone_numbers_from_connect(message)
+        message.update({"CallId": call_id, "CreatedAt": created_at, "CustomerPhoneNumber": customer_phone_number, "SystemPhoneNumber": system_phone_number})
 
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.createCall.args(input=message).select(
-                schema.CreateCallOutput.CallId
-            )
-        )
+    def ignore_exception_fn(e): return bool(
+        {CONDITION_FAILURE_MESSAGE, ITEM_EXISTS_MESSAGE}.intersection(get_error_messages(e))
     )
-
-    def ignore_exception_fn(e): return True if (
-        e["message"] == 'item put condition failure') else False
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(input=message),
         logger=LOGGER,
         should_ignore_exception_fn=ignore_exception_fn,
     )
 
-    query_string = print_ast(query)
-    LOGGER.debug("query result", extra=dict(query=query_string, result=result))
+    LOGGER.debug("query result", extra=dict(query=operation.query_string, result=result))
+
+    CALL_METADATA_CACHE.update(message.get("CallId", ""), {**message, "Status": "STARTED"})
 
     return result
 
@@ -298,9 +452,7 @@ async def execute_update_call_status_mutation(
         # STARTED status is set by createCall - skip update mutation
         return {"ok": True}
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
+    operation = get_operation("UpdateCallStatus", appsync_session)
 
     # Contact Lens event requires CallId mapped to ContactId
 
@@ -310,21 +462,16 @@ async def execute_update_call_status_mutation(
         message['CallId'] = call_id
         message['UpdatedAt'] = updated_at
 
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.updateCallStatus.args(input={**message, "Status": status}).select(
-                *call_fields(schema)
-            )
-        )
-    )
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(input={**message, "Status": status}),
         logger=LOGGER,
     )
 
-    query_string = print_ast(query)
-    LOGGER.debug("query result", extra=dict(query=query_string, result=result))
+    LOGGER.debug("query result", extra=dict(query=operation.query_string, result=result))
+
+    CALL_METADATA_CACHE.update(message.get("CallId", ""), dict(Status=status))
 
     return result
 
@@ -338,170 +485,66 @@ async def execute_get_transcript_segments_query(
         error_message = "callid does not exist"
         raise TypeError(error_message)
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
-
-    # get_transcript_segments_input = {
-    #     "CallId": call_id
-    # }
-    query = dsl_gql(
-        DSLQuery(
-            schema.Query.getTranscriptSegmentsWithSentiment.args(callId=call_id).select(
-                schema.TranscriptSegmentsWithSentimentList.TranscriptSegmentsWithSentiment.select(
-                    schema.TranscriptSegmentWithSentiment.PK,
-                    schema.TranscriptSegmentWithSentiment.SK,
-                    schema.TranscriptSegmentWithSentiment.CallId,
-                    schema.TranscriptSegmentWithSentiment.Channel,
-                    schema.TranscriptSegmentWithSentiment.SegmentId,
-                    schema.TranscriptSegmentWithSentiment.StartTime,
-                    schema.TranscriptSegmentWithSentiment.EndTime,
-                    schema.TranscriptSegmentWithSentiment.Sentiment,
-                    schema.TranscriptSegmentWithSentiment.SentimentWeighted,
-                )
-            )
-        )
-    )
+    operation = get_operation("GetTranscriptSegmentsWithSentiment", appsync_session)
+
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(callId=call_id),
         logger=LOGGER,
     )
 
-    query_string = print_ast(query)
-    LOGGER.debug("get transcript segments result", extra=dict(query=query_string, result=result))
+    LOGGER.debug("get transcript segments result", extra=dict(query=operation.query_string, result=result))
 
     return result
 
-def _get_sentiment_per_quarter(
-    sentiment_list: List[SentimentEntry],
-) -> List[SentimentByPeriodEntry]:
-    sorted_sentiment = sorted(sentiment_list, key=lambda i: i["BeginOffsetMillis"])
-    min_begin_time: float = (
-        min(
-            sorted_sentiment,
-            key=lambda i: i["BeginOffsetMillis"],
-        ).get("BeginOffsetMillis", 0.0)
-        if sorted_sentiment
-        else 0.0
-    )
-    max_end_time: float = (
-        max(sorted_sentiment, key=lambda i: i["EndOffsetMillis"]).get("EndOffsetMillis", 0.0)
-        if sorted_sentiment
-        else 0.0
-    )
-    time_range: float = max_end_time - min_begin_time
-    time_ranges = (
-        (
-            max((min_begin_time + time_range * i / 4), min_begin_time),
-            min((min_begin_time + time_range * (i + 1) / 4), max_end_time),
-        )
-        for i in range(4)
-    )
-    quarters = (
-        [
-            s
-            for s in sorted_sentiment
-            if s["EndOffsetMillis"] > time_range[0] and s["EndOffsetMillis"] <= time_range[1]
-        ]
-        for time_range in time_ranges
-    )
-    sentiment_per_quarter = [
-        SentimentByPeriodEntry(
-            {
-                "Score": fmean((i["Score"] for i in quarter)) if quarter else 0,
-                "BeginOffsetMillis": (
-                    min((i["BeginOffsetMillis"] for i in quarter)) if quarter else 0
-                ),
-                "EndOffsetMillis": (
-                    max((i["EndOffsetMillis"] for i in quarter)) if quarter else 0
-                ),
-            }
-        )
-        for quarter in quarters
-    ]
-
-    return sentiment_per_quarter
-
 async def get_aggregated_sentiment(
     message: Dict[str, Any],
     appsync_session: AppsyncAsyncClientSession,
+    sentiment_aggregation_store: SentimentAggregationStore,
+    sentiment_segments: Optional[List[Dict[str, Any]]] = None,
 ) -> Dict:
+    """Incrementally aggregates the call sentiment
+
+    Adds the sentiment bearing segments to the running aggregate of the call.
+    The full list of call segments is only read from AppSync to seed the
+    aggregate when it is neither cached nor found in the state table.
+    """
 
     call_id = message.get("CallId")
     if not call_id:
         error_message = "callid does not exist"
         raise TypeError(error_message)
-    
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
- 
-    result = await execute_get_transcript_segments_query(
-        message=message,
-        appsync_session=appsync_session
-    )
- 
-    sentiment_entry_list_by_channel: Dict[ChannelType, SentimentPerChannel] = {}
-
-    for segment in result.get("getTranscriptSegmentsWithSentiment").get("TranscriptSegmentsWithSentiment"):
-        channel = segment.get("Channel", None)
-        if channel and channel in ["AGENT", "CALLER"] :
-            if segment.get("SentimentWeighted", None):
-                LOGGER.debug("Aggregating sentiment entry", extra=segment)
-                sentiment_entry : SentimentEntry = {
-                    "Id" : segment["SegmentId"],
-                    "BeginOffsetMillis": segment["StartTime"] * 1000,
-                    "EndOffsetMillis": segment["EndTime"] * 1000,
-                    "Sentiment": segment["Sentiment"],
-                    "Score": segment["SentimentWeighted"]
-                }
-                if channel in sentiment_entry_list_by_channel:
-                    tmp = sentiment_entry_list_by_channel[channel].get("SentimentList", [])
-                    tmp.append(sentiment_entry)
-                    sentiment_list_obj = {
-                        "SentimentList": tmp
-                    }
-                else:
-                    sentiment_list_obj = {
-                        "SentimentList": [sentiment_entry]
-                    }
-
-                sentiment_entry_list_by_channel[channel] = sentiment_list_obj
-                
-    aggregated_sentiment:Sentiment = {}
-    overall_sentiment:Dict[ChannelType, float] = {}
-    sentiment_by_period_by_channel:Dict[ChannelType, List[SentimentByPeriodEntry]] = {}
-    
-    for channel in sentiment_entry_list_by_channel.keys():
-        sentiment_list = sentiment_entry_list_by_channel[channel].get("SentimentList", [])
-        sentiment_scores = [i["Score"] for i in sentiment_list]
-        sentiment_average = fmean(sentiment_scores) if sentiment_scores else 0
 
-        sentiment_per_quarter = (
-            _get_sentiment_per_quarter(sentiment_list) if sentiment_list else []
+    async def seed_aggregate(aggregate: CallSentimentAggregate) -> None:
+        result = await execute_get_transcript_segments_query(
+            message=message,
+            appsync_session=appsync_session
         )
+        for segment in result.get("getTranscriptSegmentsWithSentiment").get("TranscriptSegmentsWithSentiment"):
+            aggregate.add_segment(segment)
 
-        overall_sentiment[channel] = sentiment_average
-        sentiment_by_period_by_channel[channel] = sentiment_per_quarter
-    
-    LOGGER.debug("Overall Sentiment: ", extra=dict(DebugOverallSentiment=overall_sentiment))
-    LOGGER.debug("Sentiment by Period: ", extra=dict(DebugSentimentByPeriod=sentiment_by_period_by_channel))
-        
-    aggregated_sentiment = {
-        "OverallSentiment": overall_sentiment,
-        "SentimentByPeriod": {
-                "QUARTER": sentiment_by_period_by_channel
-            },
-        }
+    async with sentiment_aggregation_store.lock(call_id):
+        aggregate = await sentiment_aggregation_store.get(call_id, seed_fn=seed_aggregate)
+        for segment in sentiment_segments or []:
+            if segment.get("CallId", call_id) == call_id and aggregate.add_segment(segment):
+                LOGGER.debug("Aggregating sentiment entry", extra=dict(SegmentId=segment.get("SegmentId")))
+        # the saved aggregate includes the segments added by other containers
+        aggregate = await sentiment_aggregation_store.save(aggregate, expires_after=get_ttl())
+        aggregated_sentiment: Sentiment = aggregate.get_sentiment()
+
+    LOGGER.debug("Overall Sentiment: ", extra=dict(DebugOverallSentiment=aggregated_sentiment["OverallSentiment"]))
+    LOGGER.debug("Sentiment by Period: ", extra=dict(DebugSentimentByPeriod=aggregated_sentiment["SentimentByPeriod"]))
 
     return aggregated_sentiment
 
 async def get_aggregate_call_data(
     message: Dict[str, object],
     appsync_session: AppsyncAsyncClientSession,
+    sentiment_aggregation_store: SentimentAggregationStore,
+    sentiment_segments: Optional[List[Dict[str, Any]]] = None,
 ) -> Dict:
-    
+
     call_id = message.get("CallId")
     if not call_id:
         error_message = "callid does not exist"
@@ -511,8 +554,10 @@ async def get_aggregate_call_data(
 
     sentiment = await get_aggregated_sentiment(
         message=message,
-        appsync_session=appsync_session
-    ) 
+        appsync_session=appsync_session,
+        sentiment_aggregation_store=sentiment_aggregation_store,
+        sentiment_segments=sentiment_segments,
+    )
     
     updated_at = message.get("UpdatedAt", datetime.utcnow().astimezone().isoformat())
     event_type = message.get("EventType", "")
@@ -534,32 +579,26 @@ async def get_aggregate_call_data(
 async def get_call_aggregation_tasks(
     message: Dict[str, object],
     appsync_session: AppsyncAsyncClientSession,
+    sentiment_aggregation_store: SentimentAggregationStore,
+    sentiment_segments: Optional[List[Dict[str, Any]]] = None,
 ) -> List[Coroutine]:
 
     call_aggregation = await get_aggregate_call_data(
         message=message,
-        appsync_session=appsync_session
-    )
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
-
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.updateCallAggregation.args(
-                input=call_aggregation
-            ).select(*call_fields(schema))
-        )
+        appsync_session=appsync_session,
+        sentiment_aggregation_store=sentiment_aggregation_store,
+        sentiment_segments=sentiment_segments,
     )
+    operation = get_operation("UpdateCallAggregation", appsync_session)
 
     tasks = []
 
-    def ignore_exception_fn(e): return True if (
-        e["message"] == 'item put condition failure') else False
+    def ignore_exception_fn(e): return CONDITION_FAILURE_MESSAGE in get_error_messages(e)
     tasks.append(
         execute_gql_query_with_retries(
-            query,
+            operation,
             client_session=appsync_session,
+            variable_values=operation.variables(input=call_aggregation),
             logger=LOGGER,
             should_ignore_exception_fn=ignore_exception_fn,
         ),
@@ -571,42 +610,55 @@ async def get_call_aggregation_tasks(
 async def execute_update_call_aggregation_mutation(
     message: Dict[str, object],
     appsync_session: AppsyncAsyncClientSession,
+    sentiment_aggregation_store: SentimentAggregationStore,
+    sentiment_segments: Optional[List[Dict[str, Any]]] = None,
 ) -> Dict:
 
     call_aggregation = await get_aggregate_call_data(
         message=message,
-        appsync_session=appsync_session
+        appsync_session=appsync_session,
+        sentiment_aggregation_store=sentiment_aggregation_store,
+        sentiment_segments=sentiment_segments,
     )
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
-
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.updateCallAggregation.args(
-                input=call_aggregation
-            ).select(*call_fields(schema))
-        )
-    )
+    operation = get_operation("UpdateCallAggregation", appsync_session)
 
-    def ignore_exception_fn(e): return True if (
-        e["message"] == 'item put condition failure') else False
+    def ignore_exception_fn(e): return CONDITION_FAILURE_MESSAGE in get_error_messages(e)
     
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(input=call_aggregation),
         logger=LOGGER,
         should_ignore_exception_fn=ignore_exception_fn,
 
     )
 
-    query_string = print_ast(query)
     LOGGER.debug(
-        "transcript aggregation mutation", extra=dict(query=query_string, result=result)
+        "transcript aggregation mutation", extra=dict(query=operation.query_string, result=result)
     )
     return result
 
+async def execute_pending_call_aggregation_mutation(
+    pending_call_aggregation: PendingCallAggregation,
+    appsync_session: AppsyncAsyncClientSession,
+    sentiment_analysis_args: Dict[str, Any],
+) -> Dict:
+    """Executes the coalesced call aggregation of a batch"""
+    LOGGER.debug(
+        "coalesced call aggregation",
+        extra=dict(
+            call_id=pending_call_aggregation.call_id,
+            request_count=pending_call_aggregation.request_count,
+        ),
+    )
+    return await execute_update_call_aggregation_mutation(
+        message=pending_call_aggregation.message,
+        appsync_session=appsync_session,
+        sentiment_aggregation_store=sentiment_analysis_args["sentiment_aggregation_store"],
+        sentiment_segments=pending_call_aggregation.sentiment_segments,
+    )
+
 async def execute_add_s3_recording_mutation(
     message: Dict[str, Any],
     appsync_session: AppsyncAsyncClientSession,
@@ -617,26 +669,16 @@ async def execute_add_s3_recording_mutation(
         error_message = "recording url doesn't exist in add s3 recording url event"
         raise TypeError(error_message)
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
-
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.updateRecordingUrl.args(
-                input={**message, "RecordingUrl": recording_url}
-            ).select(*call_fields(schema))
-        )
-    )
+    operation = get_operation("UpdateRecordingUrl", appsync_session)
 
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(input={**message, "RecordingUrl": recording_url}),
         logger=LOGGER,
     )
 
-    query_string = print_ast(query)
-    LOGGER.debug("query result", extra=dict(query=query_string, result=result))
+    LOGGER.debug("query result", extra=dict(query=operation.query_string, result=result))
 
     return result
 
@@ -650,59 +692,55 @@ async def execute_add_pca_url_mutation(
         error_message = "pca url doesn't exist in add pca url event"
         raise TypeError(error_message)
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
-
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.updatePcaUrl.args(
-                input={**message, "PcaUrl": pca_url}
-            ).select(*call_fields(schema))
-        )
-    )
+    operation = get_operation("UpdatePcaUrl", appsync_session)
 
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(input={**message, "PcaUrl": pca_url}),
         logger=LOGGER,
     )
 
-    query_string = print_ast(query)
-    LOGGER.debug("query result", extra=dict(query=query_string, result=result))
+    LOGGER.debug("query result", extra=dict(query=operation.query_string, result=result))
 
     return result
 
 async def execute_add_call_category_mutation(
     message: Dict[str, Any],
     appsync_session: AppsyncAsyncClientSession,
+    call_category_ledger: Optional[CallCategoryLedger] = None,
 ) -> Dict:
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
+    operation = get_operation("AddCallCategory", appsync_session)
 
     categories = message["CategoryEvent"]["MatchedCategories"]
     if (len(categories) == 0):
         error_message = "No MatchedCategories in ADD_CALL_CATEGORY event"
         raise TypeError(error_message)
 
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.addCallCategory.args(
-                input={**message, "CallCategories": categories}
-            ).select(*call_fields(schema))
-        )
+    # categories already added to the call are skipped
+    keys = await claim_call_categories(
+        call_category_ledger,
+        message["CallId"],
+        [get_call_category_key(category) for category in categories],
     )
+    categories = [c for c in categories if _take_category_key(keys, get_call_category_key(c))]
+    if not categories:
+        return {"ok": True}
 
-    result = await execute_gql_query_with_retries(
-        query,
-        client_session=appsync_session,
-        logger=LOGGER,
+    result = await record_call_categories(
+        execute_gql_query_with_retries(
+            operation,
+            client_session=appsync_session,
+            variable_values=operation.variables(input={**message, "CallCategories": categories}),
+            logger=LOGGER,
+        ),
+        call_category_ledger,
+        message["CallId"],
+        [get_call_category_key(category) for category in categories],
     )
 
-    query_string = print_ast(query)
-    LOGGER.debug("query result", extra=dict(query=query_string, result=result))
+    LOGGER.debug("query result", extra=dict(query=operation.query_string, result=result))
 
     return result
 
@@ -722,26 +760,16 @@ async def execute_add_issues_detected_mutation(
             transcript = message["Transcript"]
             issueText = transcript[start:end]
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
-
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.addIssuesDetected.args(
-                input={**message, "IssuesDetected": issueText}
-            ).select(*call_fields(schema))
-        )
-    )
+    operation = get_operation("AddIssuesDetected", appsync_session)
 
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(input={**message, "IssuesDetected": issueText}),
         logger=LOGGER,
     )
 
-    query_string = print_ast(query)
-    LOGGER.debug("query result", extra=dict(query=query_string, result=result))
+    LOGGER.debug("query result", extra=dict(query=operation.query_string, result=result))
 
     return result
 
@@ -755,27 +783,17 @@ async def execute_add_call_summary_text_mutation(
     if calltext and len(calltext) > 0:
         call_summary_text = calltext
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
+    operation = get_operation("AddCallSummaryText", appsync_session)
 
     
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.addCallSummaryText.args(
-                input={**message, "CallSummaryText": call_summary_text}
-            ).select(*call_fields(schema))
-        )
-    )
-
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(input={**message, "CallSummaryText": call_summary_text}),
         logger=LOGGER,
     )
 
-    query_string = print_ast(query)
-    LOGGER.debug("query result", extra=dict(query=query_string, result=result))
+    LOGGER.debug("query result", extra=dict(query=operation.query_string, result=result))
 
     return result
 
@@ -784,30 +802,20 @@ async def execute_add_agent_assist_mutation(
     appsync_session: AppsyncAsyncClientSession,
 ) -> Dict:
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
-
-    LOGGER.debug("Add Agent Assist Mutation message: %s", json.dumps(message))
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.addTranscriptSegment.args(input=message).select(
-                *transcript_segment_fields(schema),
-            )
-        )
-    )
+    operation = get_operation("AddTranscriptSegment", appsync_session)
 
-    LOGGER.debug("Executing QUERY: %s", query)
+    LOGGER.debug("Add Agent Assist Mutation message: %s", LazyJson(message))
+    LOGGER.debug("Executing QUERY: %s", operation.query_string)
 
 
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(input=message),
         logger=LOGGER,
     )
 
-    query_string = print_ast(query)
-    LOGGER.debug("query result", extra=dict(query=query_string, result=result))
+    LOGGER.debug("query result", extra=dict(query=operation.query_string, result=result))
 
     return result
 
@@ -821,26 +829,18 @@ async def execute_update_agent_mutation(
         error_message = "AgentId doesn't exist in UPDATE_AGENT event"
         raise TypeError(error_message)
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
-
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.updateAgent.args(
-                input={**message, "AgentId": agentId}
-            ).select(*call_fields(schema))
-        )
-    )
+    operation = get_operation("UpdateAgent", appsync_session)
 
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(input={**message, "AgentId": agentId}),
         logger=LOGGER,
     )
 
-    query_string = print_ast(query)
-    LOGGER.debug("query result", extra=dict(query=query_string, result=result))
+    LOGGER.debug("query result", extra=dict(query=operation.query_string, result=result))
+
+    CALL_METADATA_CACHE.update(message.get("CallId", ""), dict(AgentId=agentId))
 
     return result
 
@@ -854,23 +854,14 @@ async def send_call_category(
     appsync_session: AppsyncAsyncClientSession
 ):
     """Send Call Category Transcript Segment"""
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
+    operation = get_operation("AddTranscriptSegment", appsync_session)
 
     transcript_segment = {**transcript_segment_args, "Transcript": category}
 
-    query = dsl_gql(
-        DSLMutation(
-            schema.Mutation.addTranscriptSegment.args(input=transcript_segment).select(
-                *transcript_segment_fields(schema),
-            )
-        )
-    )
-
     result = await execute_gql_query_with_retries(
-        query,
+        operation,
         client_session=appsync_session,
+        variable_values=operation.variables(input=transcript_segment),
         logger=LOGGER,
     )
 
@@ -897,31 +888,115 @@ async def publish_sns_category(
                         
     return result
 
-def add_call_category(
+async def claim_call_categories(
+    call_category_ledger: Optional[CallCategoryLedger],
+    call_id: str,
+    keys: Sequence[str],
+) -> "Counter[str]":
+    """Claims the category keys of a call in the ledger
+
+    Returns the count of each key to send - each key once when claimed with
+    the ledger or each occurrence without a ledger
+    """
+    if call_category_ledger is None:
+        return Counter(keys)
+    return Counter(await call_category_ledger.claim(call_id, keys))
+
+def _take_category_key(keys: "Counter[str]", key: str) -> bool:
+    if keys[key] <= 0:
+        return False
+    keys[key] -= 1
+    return True
+
+async def record_call_categories(
+    task: Awaitable[Any],
+    call_category_ledger: Optional[CallCategoryLedger],
+    call_id: str,
+    keys: Sequence[str],
+) -> Any:
+    """Awaits a category task - its keys are recorded once it succeeds
+
+    The keys are released if it fails so that a retry sends them
+    """
+    try:
+        result = await task
+    except Exception:
+        if call_category_ledger is not None:
+            await call_category_ledger.release(call_id, keys)
+        raise
+    if call_category_ledger is not None:
+        await call_category_ledger.record(call_id, keys, expires_after=get_ttl())
+    return result
+
+async def add_call_category(
     message: Dict[str, Any],
     appsync_session: AppsyncAsyncClientSession,
-    sns_client: SNSClient
+    sns_client: SNSClient,
+    call_category_ledger: Optional[CallCategoryLedger] = None,
 ) -> List[Coroutine]:
-    """Add Categories GraphQL Mutations"""
+    """Add Categories GraphQL Mutations
+
+    With a call category ledger, the category matches already sent for the
+    call are skipped
+    """
     # pylint: disable=too-many-locals
     LOGGER.debug("Detected Call Category")
 
-    tasks = []
+    call_id = message["CallId"]
+    category_ranges: List[Tuple[str, List[Tuple[str, str, Dict[str, Any]]]]] = []
     for category in message["CategoryEvent"]["MatchedCategories"]:
-        # Publish SNS message for the category
-        sns_task = publish_sns_category(
-            sns_client=sns_client,
-            category_name=category,
-            call_id=message["CallId"]
-        )
-        tasks.append(sns_task)
-        # Insert Category marker into transcript, if timestamps are provided in the event.
         try:
             timestampRanges = message["CategoryEvent"]["MatchedDetails"][category]["TimestampRanges"]
         except KeyError:
             LOGGER.debug("Category: %s has no TimestampRanges. Skip transcript insertion.", category)
-            continue
+            timestampRanges = []
+        ranges = []
         for timestampRange in timestampRanges:
+            match_times = (
+                timestampRange.get("BeginOffsetMillis", timestampRange["EndOffsetMillis"]) / 1000,
+                timestampRange["EndOffsetMillis"] / 1000,
+            )
+            ranges.append((
+                get_category_segment_key(category, *match_times),
+                get_category_alert_key(category, *match_times),
+                timestampRange,
+            ))
+        category_ranges.append((category, ranges))
+    keys = await claim_call_categories(
+        call_category_ledger,
+        call_id,
+        [
+            key
+            for category, ranges in category_ranges
+            for key in (
+                *(segment_key for segment_key, _, _ in ranges),
+                *([alert_key for _, alert_key, _ in ranges] or [get_category_alert_key(category)]),
+            )
+        ],
+    )
+
+    tasks = []
+    for category, ranges in category_ranges:
+        # the SNS message is the only match of a category without timestamps
+        alert_keys = [
+            alert_key
+            for alert_key in ([a for _, a, _ in ranges] or [get_category_alert_key(category)])
+            if _take_category_key(keys, alert_key)
+        ]
+        if alert_keys:
+            # Publish SNS message for the category
+            sns_task = publish_sns_category(
+                sns_client=sns_client,
+                category_name=category,
+                call_id=call_id
+            )
+            tasks.append(
+                record_call_categories(sns_task, call_category_ledger, call_id, alert_keys)
+            )
+        # Insert Category marker into transcript, if timestamps are provided in the event.
+        for key, _, timestampRange in ranges:
+            if not _take_category_key(keys, key):
+                continue
             start_time = timestampRange["EndOffsetMillis"]/1000
             end_time = start_time + 0.1
             send_call_category_args = []
@@ -946,26 +1021,31 @@ def add_call_category(
                     appsync_session=appsync_session,
                     **call_category_args,
                 )
-                tasks.append(task)
+                tasks.append(record_call_categories(task, call_category_ledger, call_id, [key]))
 
     return tasks
 
-def add_contact_lens_call_category(
+async def add_contact_lens_call_category(
     message: Dict[str, Any],
     appsync_session: AppsyncAsyncClientSession,
-    sns_client: SNSClient
+    sns_client: SNSClient,
+    call_category_ledger: Optional[CallCategoryLedger] = None,
 ) -> List[Coroutine]:
-    """Add Categories GraphQL Mutations"""
+    """Add Categories GraphQL Mutations
+
+    Contact Lens repeats the matched categories on many segments. With a
+    call category ledger, the categories and category matches already sent
+    for the call are skipped
+    """
     # pylint: disable=too-many-locals
     LOGGER.debug("Detected Call Category")
     send_call_category_args = []
     tasks = []
     call_id = message["ContactId"]
 
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
+    operation = get_operation("AddCallCategory", appsync_session)
 
+    segment_categories = []
     for segment in message.get("Segments", []):
         # only handle categories and transcripts with issues
         if (
@@ -974,35 +1054,73 @@ def add_contact_lens_call_category(
             continue
 
         categories = segment.get("Categories", {})
-        matched_categories = categories.get("MatchedCategories", [])
+        category_segments = [
+            transform_segment_to_categories_agent_assist(
+                category=category,
+                category_details=categories["MatchedDetails"][category],
+                call_id=call_id,
+            )
+            for category in categories.get("MatchedCategories", [])
+        ]
+        segment_categories.append((categories.get("MatchedCategories", []), category_segments))
 
-        if (len(matched_categories) > 0):
-            query = dsl_gql(
-                DSLMutation(
-                    schema.Mutation.addCallCategory.args(
-                        input={"CallId": message["ContactId"], "CallCategories": matched_categories}
-                    ).select(*call_fields(schema))
-                )
+    keys = await claim_call_categories(
+        call_category_ledger,
+        call_id,
+        [
+            key
+            for matched_categories, category_segments in segment_categories
+            for key in (
+                *(get_call_category_key(category) for category in matched_categories),
+                *(
+                    get_key(s["Transcript"], s["StartTime"], s["EndTime"])
+                    for s in category_segments
+                    for get_key in (get_category_segment_key, get_category_alert_key)
+                ),
             )
+        ],
+    )
+
+    for matched_categories, category_segments in segment_categories:
+        matched_categories = [
+            category for category in matched_categories
+            if _take_category_key(keys, get_call_category_key(category))
+        ]
 
+        if (len(matched_categories) > 0):
             tasks.append(
-                execute_gql_query_with_retries(
-                    query,
-                    client_session=appsync_session,
-                    logger=LOGGER,
+                record_call_categories(
+                    execute_gql_query_with_retries(
+                        operation,
+                        client_session=appsync_session,
+                        variable_values=operation.variables(
+                            input={"CallId": message["ContactId"], "CallCategories": matched_categories}
+                        ),
+                        logger=LOGGER,
+                    ),
+                    call_category_ledger,
+                    call_id,
+                    [get_call_category_key(category) for category in matched_categories],
                 ),
             )
 
-        for category in categories.get("MatchedCategories", []):
-            category_details = categories["MatchedDetails"][category]
-            category_segment = transform_segment_to_categories_agent_assist(
-                category=category,
-                category_details=category_details,
-                call_id=call_id,
+        for category_segment in category_segments:
+            match = (
+                category_segment["Transcript"],
+                category_segment["StartTime"],
+                category_segment["EndTime"],
             )
+            segment_key = get_category_segment_key(*match)
+            alert_key = get_category_alert_key(*match)
+            is_segment_sent = _take_category_key(keys, segment_key)
+            is_alert_sent = _take_category_key(keys, alert_key)
+            if not is_segment_sent and not is_alert_sent:
+                continue
 
             send_call_category_args.append(
                 dict(
+                    segment_key=segment_key if is_segment_sent else None,
+                    alert_key=alert_key if is_alert_sent else None,
                     category=category_segment['Transcript'],
                     transcript_segment_args=dict(
                         CallId=message["ContactId"],
@@ -1019,17 +1137,23 @@ def add_contact_lens_call_category(
             )
 
     for call_category_args in send_call_category_args:
-        task = send_call_category(
-            appsync_session=appsync_session,
-            **call_category_args,
-        )
-        tasks.append(task)
-        sns_task = publish_sns_category(
-            sns_client=sns_client,
-            category_name=category,
-            call_id=message["ContactId"]
-        )
-        tasks.append(sns_task)
+        segment_key = call_category_args.pop("segment_key")
+        alert_key = call_category_args.pop("alert_key")
+        if segment_key:
+            task = send_call_category(
+                appsync_session=appsync_session,
+                **call_category_args,
+            )
+            tasks.append(record_call_categories(task, call_category_ledger, call_id, [segment_key]))
+        if alert_key:
+            sns_task = publish_sns_category(
+                sns_client=sns_client,
+                category_name=call_category_args["category"],
+                call_id=message["ContactId"]
+            )
+            tasks.append(
+                record_call_categories(sns_task, call_category_ledger, call_id, [alert_key])
+            )
 
 
     return tasks
@@ -1046,16 +1170,18 @@ def add_contact_lens_call_category(
 # field is used for Agent Assist input.
 ##########################################################################
 
-def invoke_transcript_lambda_hook(
+async def invoke_transcript_lambda_hook(
     message: Dict[str, Any]
 ):
     if (message.get("IsPartial") == False or TRANSCRIPT_LAMBDA_HOOK_FUNCTION_NONPARTIAL_ONLY == False):
         LOGGER.debug("Transcript Lambda Hook Arn: %s", TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN)
         LOGGER.debug("Transcript Lambda Hook Request: %s", message)
-        lambda_response = LAMBDA_HOOK_CLIENT.invoke(
-            FunctionName=TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(message)
+        lambda_response = await LAMBDA_HOOK_INVOKER.invoke(
+            function_name=TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN,
+            # segments are converted to a JSON serializable dict at the edge
+            payload=dict(message),
+            invocation_type="RequestResponse",
+            hook_type="transcript",
         )
         LOGGER.debug("Transcript Lambda Hook Response: ", extra=lambda_response)
         try:
@@ -1067,44 +1193,147 @@ def invoke_transcript_lambda_hook(
             )
     return message
 
+
+def _is_transcript_hook_segment(segment: Mapping[str, Any]) -> bool:
+    return (
+        segment.get("IsPartial") == False
+        or TRANSCRIPT_LAMBDA_HOOK_FUNCTION_NONPARTIAL_ONLY == False
+    )
+
+async def apply_transcript_hook(
+    segment_lists: List[List[Mapping[str, Any]]],
+) -> List[List[Mapping[str, Any]]]:
+    """Applies the transcript hook to the segments of messages in a single call"""
+    hook_segments = [
+        segment
+        for segments in segment_lists
+        for segment in segments
+        if _is_transcript_hook_segment(segment)
+    ]
+    if TRANSCRIPT_HOOK is None or not hook_segments:
+        return segment_lists
+    LOGGER.debug("Transcript Hook Request", extra=dict(segments=len(hook_segments)))
+    hooked_segments = iter(await TRANSCRIPT_HOOK.apply(hook_segments))
+    return [
+        [
+            next(hooked_segments) if _is_transcript_hook_segment(segment) else segment
+            for segment in segments
+        ]
+        for segments in segment_lists
+    ]
+
+async def execute_transcript_batch_hook(messages: List[Any]) -> List[Any]:
+    """Applies the transcript hook to the transcript segments of a KDS batch
+
+    Transcript messages are returned prepared with their normalized segments
+    so that execute_process_event_api_mutation does not normalize them again.
+    Other messages are returned unchanged.
+    """
+    if TRANSCRIPT_HOOK is None:
+        return messages
+    results: List[Any] = list(messages)
+    transcript_messages: List[Tuple[int, Dict[str, Any]]] = []
+    for index, message in enumerate(messages):
+        if not isinstance(message, dict):
+            continue
+        prepared_message = prepare_event_message(message)
+        if prepared_message["EventType"] != "ADD_TRANSCRIPT_SEGMENT":
+            continue
+        utterance_event = prepared_message.get("UtteranceEvent", None)
+        if utterance_event and not utterance_event.get("ParticipantRole", None):
+            continue
+        transcript_messages.append((index, prepared_message))
+
+    segment_lists = await apply_transcript_hook(
+        [normalize_transcript_segments(message) for _, message in transcript_messages]
+    )
+    for (index, message), segments in zip(transcript_messages, segment_lists):
+        message[NORMALIZED_SEGMENTS_KEY] = segments
+        results[index] = message
+    return results
+
+def get_transcript_hook_stats(reset: bool = True) -> Dict[str, int]:
+    """Gets the batched transcript hook call count and timing"""
+    if TRANSCRIPT_HOOK is None:
+        return {}
+    stats = TRANSCRIPT_HOOK.stats
+    if reset:
+        TRANSCRIPT_HOOK.reset_stats()
+    return stats
+
+def get_lambda_hook_stats(reset: bool = True) -> Dict[str, Dict[str, int]]:
+    """Gets the Lambda hook invocation timing by hook type"""
+    invoker: Optional[AsyncLambdaInvoker] = globals().get("LAMBDA_HOOK_INVOKER")
+    if invoker is None:
+        return {}
+    stats = invoker.stats
+    if reset:
+        invoker.reset_stats()
+    return stats
+
+async def flush_agent_assist_turns() -> None:
+    """Sends the pending agent assist turns - called at the end of each invocation"""
+    dispatcher: Optional[AgentAssistTurnDispatcher] = globals().get("AGENT_ASSIST_DISPATCHER")
+    if dispatcher is not None:
+        await dispatcher.flush()
+
+def get_agent_assist_turn_stats(reset: bool = True) -> Dict[str, int]:
+    """Gets the agent assist turn counters"""
+    dispatcher: Optional[AgentAssistTurnDispatcher] = globals().get("AGENT_ASSIST_DISPATCHER")
+    if dispatcher is None:
+        return {}
+    stats = dispatcher.stats
+    if reset:
+        dispatcher.reset_stats()
+    return stats
+
+def get_partial_utterance_stats(reset: bool = True) -> Dict[str, int]:
+    """Gets the Contact Lens partial utterance buffer occupancy and counters"""
+    stats = PARTIAL_UTTERANCE_BUFFER.stats
+    if reset:
+        PARTIAL_UTTERANCE_BUFFER.reset_stats()
+    return stats
+
+def get_call_metadata_stats(reset: bool = True) -> Dict[str, Any]:
+    """Gets the call metadata cache hit rate and counters"""
+    stats = CALL_METADATA_CACHE.stats
+    if reset:
+        CALL_METADATA_CACHE.reset_stats()
+    return stats
+
 async def get_call_details(
     message: Dict[str, Any],
     appsync_session: AppsyncAsyncClientSession,
 ) -> Dict:
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-
-    global CUSTOMER_PHONE_NUMBER
-    global CALL_ID
+    """Gets the call details of the post call summary hook
 
-    schema = DSLSchema(appsync_session.client.schema)
+    The call is only queried when its phone number is not in the call
+    metadata cache. The summary is the one of the ADD_SUMMARY message.
+    """
+    metadata = CALL_METADATA_CACHE.get(message["CallId"])
+    call_summary = message.get("CallSummaryText", None)
+    if not metadata or not metadata.get("CustomerPhoneNumber"):
+        operation = get_operation("GetCall", appsync_session)
 
-    query = dsl_gql(
-        DSLQuery(
-            schema.Query.getCall.args(CallId=message["CallId"]).select(
-                *call_fields(schema),
-            )
+        result = await execute_gql_query_with_retries(
+            operation,
+            client_session=appsync_session,
+            variable_values=operation.variables(CallId=message["CallId"]),
+            logger=LOGGER,
         )
-    )
 
-    result = await execute_gql_query_with_retries(
-        query,
-        client_session=appsync_session,
-        logger=LOGGER,
-    )
+        result = result['getCall']
+        LOGGER.debug("Get Call result %s", LazyJson(result))
 
-    result = result['getCall']
-    LOGGER.debug("Get Call result %s", json.dumps(result))
-
-    CUSTOMER_PHONE_NUMBER = result['CustomerPhoneNumber']
-    CALL_ID = result['CallId']
-    call_summary = result.get("CallSummaryText", "")
+        metadata = CALL_METADATA_CACHE.update(result['CallId'], result)
+        if call_summary is None:
+            call_summary = result.get("CallSummaryText", "")
 
     return dict(
-        CustomerPhoneNumber=CUSTOMER_PHONE_NUMBER,
-        CallId=CALL_ID,
+        CustomerPhoneNumber=metadata['CustomerPhoneNumber'],
+        CallId=metadata['CallId'],
         CallDataStream=CALL_DATA_STREAM_NAME,
-        CallSummaryText=call_summary
+        CallSummaryText=call_summary or ""
     )
 
 
@@ -1114,19 +1343,18 @@ def get_caller_and_system_phone_numbers_from_connect(
     instanceId = message.get("InstanceId")
     contactId = message.get("ContactId")
 
-    client = boto3.client('connect')
-    response = client.get_contact_attributes(
-        InstanceId=instanceId,
-        InitialContactId=contactId
+    attributes = CONTACT_ATTRIBUTES_CACHE.get_contact_attributes(
+        instance_id=instanceId,
+        contact_id=contactId,
     )
     # Try to retrieve customer phone number from contact attribute
-    customer_phone_number = response["Attributes"].get(CONNECT_CONTACT_ATTR_CUSTOMER_PHONE_NUMBER)
+    customer_phone_number = attributes.get(CONNECT_CONTACT_ATTR_CUSTOMER_PHONE_NUMBER)
     if not customer_phone_number:
         LOGGER.warning(
             f"Unable to retrieve contact attribute: '{CONNECT_CONTACT_ATTR_CUSTOMER_PHONE_NUMBER}'. Reverting to default.")
         customer_phone_number = DEFAULT_CUSTOMER_PHONE_NUMBER
     # Try to retrieve system phone number from contact attribute: "LCA System Phone Number"
-    system_phone_number = response["Attributes"].get(CONNECT_CONTACT_ATTR_SYSTEM_PHONE_NUMBER)
+    system_phone_number = attributes.get(CONNECT_CONTACT_ATTR_SYSTEM_PHONE_NUMBER)
     if not system_phone_number:
         LOGGER.warning(
             "Unable to retrieve contact attribute: '{CONNECT_CONTACT_ATTR_SYSTEM_PHONE_NUMBER}'. Reverting to default.")
@@ -1141,9 +1369,7 @@ def add_contact_lens_agent_assistances(
 ) -> List[Coroutine]:
     """Add Contact Lens Agent Assist GraphQL Mutations"""
     # pylint: disable=too-many-locals
-    if not appsync_session.client.schema:
-        raise ValueError("invalid AppSync schema")
-    schema = DSLSchema(appsync_session.client.schema)
+    operation = get_operation("AddTranscriptSegment", appsync_session)
 
     call_id = message["ContactId"]
 
@@ -1181,17 +1407,11 @@ def add_contact_lens_agent_assistances(
         """
 
         for transcript_segment in transcript_segments:
-            query = dsl_gql(
-                DSLMutation(
-                    schema.Mutation.addTranscriptSegment.args(input=transcript_segment).select(
-                        *transcript_segment_fields(schema),
-                    )
-                )
-            )
             tasks.append(
                 execute_gql_query_with_retries(
-                    query,
+                    operation,
                     client_session=appsync_session,
+                    variable_values=operation.variables(input=transcript_segment),
                     logger=LOGGER,
                 ),
             )
@@ -1203,14 +1423,25 @@ def add_contact_lens_agent_assistances(
 ##########################################################################
 
 def convert_keys_to_uppercamelcase(d):
+    # returns a new top level dict - nested dicts are only copied when a key changes
     new_dict = {}
     for k, v in d.items():
         if isinstance(v, dict):
-            new_dict[k[0].upper() + k[1:]] = convert_keys_to_uppercamelcase(v)
-        else:
-            new_dict[k[0].upper() + k[1:]] = v
+            v = _convert_nested_keys_to_uppercamelcase(v)
+        new_dict[k[0].upper() + k[1:]] = v
     return new_dict
 
+def _has_uppercamelcase_keys(d):
+    for k, v in d.items():
+        if k[0].upper() != k[0] or (isinstance(v, dict) and not _has_uppercamelcase_keys(v)):
+            return False
+    return True
+
+def _convert_nested_keys_to_uppercamelcase(d):
+    if _has_uppercamelcase_keys(d):
+        return d
+    return convert_keys_to_uppercamelcase(d)
+
 ##########################################################################
 # merge dicts
 ##########################################################################
@@ -1226,7 +1457,7 @@ def merge_dicts(d1, d2):
 ##########################################################################
 
 def send_call_session_mapping_event(call_id, session_id):
-    client = boto3.client('events')
+    client = get_client("events")
 
     LOGGER.debug("Sending CALL_SESSION_MAPPING event. callId: %s, SessionId: %s", call_id, session_id)
     event_response = client.put_events(
@@ -1248,31 +1479,11 @@ def send_call_session_mapping_event(call_id, session_id):
 # Main event processing
 ##########################################################################
 
-async def execute_process_event_api_mutation(
-    message: Dict[str, Any],
-    settings: Dict[str, Any],
-    appsync_session: AppsyncAsyncClientSession,
-    sns_client: SNSClient,
-    agent_assist_args: Dict[str, Any],
-    sentiment_analysis_args: Dict[str, Any]
-) -> Dict[Literal["successes", "errors"], List]:
-
-    """Executes AppSync API Mutation"""
-    # pylint: disable=global-statement
-    global IS_LEX_AGENT_ASSIST_ENABLED
-    global IS_LAMBDA_AGENT_ASSIST_ENABLED
-    global SETTINGS
-    # pylint: enable=global-statement
-
-    IS_LEX_AGENT_ASSIST_ENABLED = agent_assist_args.get("is_lex_agent_assist_enabled")
-    IS_LAMBDA_AGENT_ASSIST_ENABLED = agent_assist_args.get("is_lambda_agent_assist_enabled")
-    SETTINGS = settings
-
-    return_value: Dict[Literal["successes", "errors"], List] = {
-        "successes": [],
-        "errors": [],
-    }
+def prepare_event_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalizes the key casing, metadata and event type of a KDS message
 
+    Returns a new message with the mapped EventType ("" when unknown)
+    """
     metadata = None
     
     # normalize the casing
@@ -1320,6 +1531,47 @@ async def execute_process_event_api_mutation(
     message["EventType"] = event_type
     message["ExpiresAfter"] = get_ttl()
 
+    return message
+
+
+async def execute_process_event_api_mutation(
+    message: Dict[str, Any],
+    settings: Dict[str, Any],
+    appsync_session: AppsyncAsyncClientSession,
+    sns_client: SNSClient,
+    agent_assist_args: Dict[str, Any],
+    sentiment_analysis_args: Dict[str, Any],
+    call_aggregation_batch: Optional[CallAggregationBatch] = None,
+    deferred_tasks: Optional[List[Tuple[str, Coroutine]]] = None,
+    call_category_ledger: Optional[CallCategoryLedger] = None,
+) -> Dict[Literal["successes", "errors"], List]:
+
+    """Executes AppSync API Mutation
+
+    When deferred_tasks is provided (batch processor priority mode), the
+    sentiment and call aggregation work of transcript segments is appended to
+    it keyed by call instead of being awaited with the transcript writes.
+    When call_category_ledger is provided, the categories, category segments
+    and SNS messages already sent for the call are skipped.
+    """
+    # pylint: disable=global-statement
+    global IS_LEX_AGENT_ASSIST_ENABLED
+    global IS_LAMBDA_AGENT_ASSIST_ENABLED
+    global SETTINGS
+    # pylint: enable=global-statement
+
+    IS_LEX_AGENT_ASSIST_ENABLED = agent_assist_args.get("is_lex_agent_assist_enabled")
+    IS_LAMBDA_AGENT_ASSIST_ENABLED = agent_assist_args.get("is_lambda_agent_assist_enabled")
+    SETTINGS = settings
+
+    return_value: Dict[Literal["successes", "errors"], List] = {
+        "successes": [],
+        "errors": [],
+    }
+
+    message = prepare_event_message(message)
+    event_type = message["EventType"]
+
     LOGGER.debug("Process event. eventType: %s, callId: %s", event_type, message.get("CallId", ""))
 
     if event_type == "START":
@@ -1337,20 +1589,25 @@ async def execute_process_event_api_mutation(
 
         if (START_OF_CALL_LAMBDA_HOOK_FUNCTION_ARN):
             payload = dict(
-                CustomerPhoneNumber=CUSTOMER_PHONE_NUMBER,
-                CallId=CALL_ID,
+                CustomerPhoneNumber=message.get("CustomerPhoneNumber", ""),
+                CallId=message.get("CallId", ""),
                 CallDataStream=CALL_DATA_STREAM_NAME,
             )
-            LAMBDA_HOOK_CLIENT.invoke(
-                FunctionName=START_OF_CALL_LAMBDA_HOOK_FUNCTION_ARN,
-                InvocationType='Event',
-                Payload=json.dumps(payload)
+            await LAMBDA_HOOK_INVOKER.invoke(
+                function_name=START_OF_CALL_LAMBDA_HOOK_FUNCTION_ARN,
+                payload=payload,
+                invocation_type="Event",
+                hook_type="start_of_call",
             )
 
     elif event_type in [
         "END",
     ]:
         LOGGER.debug("END Event: update status")
+        # partial utterances left without a final transcript
+        PARTIAL_UTTERANCE_BUFFER.clear_call(message.get("ContactId") or message.get("CallId", ""))
+        if "AGENT_ASSIST_DISPATCHER" in globals():
+            AGENT_ASSIST_DISPATCHER.end_turn(str(message.get("CallId", "")), reason="call_end")
         response = await execute_update_call_status_mutation(
             message=message,
             appsync_session=appsync_session
@@ -1361,10 +1618,11 @@ async def execute_process_event_api_mutation(
             return_value["successes"].append(response)
         
         if (IS_TRANSCRIPT_SUMMARY_ENABLED):
-            LAMBDA_HOOK_CLIENT.invoke(
-                FunctionName=ASYNC_TRANSCRIPT_SUMMARY_ORCHESTRATOR_ARN,
-                InvocationType='Event',
-                Payload=json.dumps(message)
+            await LAMBDA_HOOK_INVOKER.invoke(
+                function_name=ASYNC_TRANSCRIPT_SUMMARY_ORCHESTRATOR_ARN,
+                payload=message,
+                invocation_type="Event",
+                hook_type="transcript_summary",
             )
             LOGGER.debug("END Event: Invoked Async Transcript Summary Lambda")
       
@@ -1391,15 +1649,16 @@ async def execute_process_event_api_mutation(
                 message=message,
                 appsync_session=appsync_session)
 
-            LAMBDA_HOOK_CLIENT.invoke(
-                FunctionName=POST_CALL_SUMMARY_LAMBDA_HOOK_FUNCTION_ARN,
-                InvocationType='Event',
-                Payload=json.dumps(payload)
+            await LAMBDA_HOOK_INVOKER.invoke(
+                function_name=POST_CALL_SUMMARY_LAMBDA_HOOK_FUNCTION_ARN,
+                payload=payload,
+                invocation_type="Event",
+                hook_type="post_call_summary",
             )
 
     elif event_type == "ADD_AGENT_ASSIST":
         LOGGER.debug("ADD_AGENT_ASSIST MUTATION ")
-        normalized_message = normalize_transcript_segments({**message})
+        normalized_message = normalize_transcript_segments(message)
 
         response = await execute_add_agent_assist_mutation(
             message=normalized_message[0],
@@ -1428,75 +1687,186 @@ async def execute_process_event_api_mutation(
                 return return_value
         # Invoke custom lambda hook (if any) and use returned version of message.
 
-        normalized_messages = normalize_transcript_segments({**message})
+        # normalized and hooked by the batch processor with the batch hook
+        normalized_messages = message.pop(NORMALIZED_SEGMENTS_KEY, None)
+        if normalized_messages is None:
+            normalized_messages = normalize_transcript_segments(message)
+            if TRANSCRIPT_HOOK:
+                normalized_messages = (await apply_transcript_hook([normalized_messages]))[0]
+            elif (TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN):
+                # the hooks of the segments of a message are invoked concurrently
+                normalized_messages = list(await asyncio.gather(
+                    *(invoke_transcript_lambda_hook(m) for m in normalized_messages)
+                ))
+
+        final_messages = [m for m in normalized_messages if not m["IsPartial"]]
+        # in priority mode the sentiment and call aggregation work is deferred
+        # until the transcript writes of the batch are done
+        is_sentiment_deferred = bool(
+            deferred_tasks is not None
+            and final_messages
+            and (IS_SENTIMENT_ANALYSIS_ENABLED or call_aggregation_batch is None)
+        )
 
-        add_transcript_tasks = []
+        # the sentiment write of a segment runs after its segment write and the
+        # call aggregation after all the writes of the message. The issues,
+        # categories and agent assist tasks are independent
+        task_graph = TaskGraph()
+        segment_nodes: List[int] = []
+        sentiment_nodes: List[int] = []
         add_transcript_sentiment_tasks = []
 
         for normalized_message in normalized_messages:
-            if (TRANSCRIPT_LAMBDA_HOOK_FUNCTION_ARN):
-                normalized_message = invoke_transcript_lambda_hook(normalized_message)
-
             issues_detected = normalized_message.get("IssuesDetected", None)
             if issues_detected and len(issues_detected) > 0:
                 LOGGER.debug("Add Issues Detected to Call Summary")
-                response = await execute_add_issues_detected_mutation(
-                    message=normalized_message,
-                    appsync_session=appsync_session
+                # copied before the issue markup is added to the transcript
+                task_graph.add(
+                    execute_add_issues_detected_mutation(
+                        message=normalized_message.copy(),
+                        appsync_session=appsync_session
+                    )
                 )
-                if isinstance(response, Exception):
-                    return_value["errors"].append(response)
-                else:
-                    return_value["successes"].append(response)
 
             LOGGER.debug("Add Transcript Segment")
-            add_transcript_tasks.extend(
-                add_transcript_segments(
+            message_segment_nodes = [
+                task_graph.add(task)
+                for task in add_transcript_segments(
                     message=normalized_message,
                     appsync_session=appsync_session,
                 )
-            )
+            ]
+            segment_nodes.extend(message_segment_nodes)
             if IS_SENTIMENT_ANALYSIS_ENABLED and not normalized_message["IsPartial"]:
                 LOGGER.debug("Add Sentiment Analysis")
-                add_transcript_sentiment_tasks.extend(
-                    add_transcript_sentiment_analysis(
-                        message=normalized_message,
-                        sentiment_analysis_args=sentiment_analysis_args,
-                        appsync_session=appsync_session,
+                if is_sentiment_deferred:
+                    add_transcript_sentiment_tasks.extend(
+                        add_transcript_sentiment_analysis(
+                            message=normalized_message,
+                            sentiment_analysis_args=sentiment_analysis_args,
+                            appsync_session=appsync_session,
+                        )
+                    )
+                else:
+                    # the sentiment is detected during the segment write and both
+                    # writes put the segment item - the one with sentiment goes last
+                    sentiment_nodes.extend(
+                        task_graph.add(task)
+                        for task in add_transcript_sentiment_analysis(
+                            message=normalized_message,
+                            sentiment_analysis_args=sentiment_analysis_args,
+                            appsync_session=appsync_session,
+                            before_write_fn=partial(task_graph.wait, message_segment_nodes),
+                        )
+                    )
+            is_agent_assist_enabled = IS_LEX_AGENT_ASSIST_ENABLED or IS_LAMBDA_AGENT_ASSIST_ENABLED
+            agent_assist_dispatcher: Optional[AgentAssistTurnDispatcher] = globals().get(
+                "AGENT_ASSIST_DISPATCHER"
+            )
+            if (
+                is_agent_assist_enabled
+                and agent_assist_dispatcher is not None
+                and "ContactId" not in normalized_message.keys()
+            ):
+                # consecutive final segments of the caller are sent as a single
+                # turn - the turn ends when the agent speaks
+                channel = normalized_message["Channel"]
+                if channel == "CALLER" and not normalized_message["IsPartial"]:
+                    agent_assist_dispatcher.add(dict(normalized_message))
+                elif channel == "AGENT":
+                    agent_assist_dispatcher.end_turn(str(normalized_message["CallId"]))
+            elif (
+                is_agent_assist_enabled
+                and ASYNC_AGENT_ASSIST_ORCHESTRATOR_ARN
+                and normalized_message["Channel"] == "CALLER"
+            ):
+                task_graph.add(
+                    LAMBDA_HOOK_INVOKER.invoke(
+                        function_name=ASYNC_AGENT_ASSIST_ORCHESTRATOR_ARN,
+                        payload=dict(normalized_message),
+                        invocation_type="Event",
+                        hook_type="agent_assist",
                     )
                 )
-            if (IS_LEX_AGENT_ASSIST_ENABLED or IS_LAMBDA_AGENT_ASSIST_ENABLED) and (normalized_message["Channel"] == "CALLER" and (not normalized_message["IsPartial"] or 'ContactId' in normalized_message.keys())):
-                LAMBDA_HOOK_CLIENT.invoke(
-                    FunctionName=ASYNC_AGENT_ASSIST_ORCHESTRATOR_ARN,
-                    InvocationType='Event',
-                    Payload=json.dumps(normalized_message)
-                )
-
-        add_call_category_tasks = []
 
         if 'ContactId' in message.keys():
-            add_call_category_tasks = add_contact_lens_call_category(
+            for task in await add_contact_lens_call_category(
                 message=message,
                 appsync_session=appsync_session,
                 sns_client=sns_client,
-            )
-
-        update_call_aggregation_tasks = []
-        for normalized_message in normalized_messages:
-            if not normalized_message["IsPartial"]:
+                call_category_ledger=call_category_ledger,
+            ):
+                task_graph.add(task)
+
+        async def execute_call_aggregation(sentiment_responses: List[Any]) -> List[Any]:
+            # the incremental sentiment aggregate includes the segments of this message
+            if IS_SENTIMENT_ANALYSIS_ENABLED:
+                sentiment_segments = [
+                    response["addTranscriptSegment"]
+                    for response in sentiment_responses
+                    if isinstance(response, dict) and response.get("addTranscriptSegment")
+                ]
+            else:
+                sentiment_segments = final_messages
+
+            update_call_aggregation_tasks = []
+            if final_messages and call_aggregation_batch is not None:
+                # deferred to a single aggregation per call after the batch writes
+                call_aggregation_batch.add(
+                    message=final_messages[-1],
+                    sentiment_segments=sentiment_segments,
+                )
+            elif final_messages:
                 update_call_aggregation_tasks = await get_call_aggregation_tasks(
-                    message=normalized_message,
+                    message=final_messages[-1],
                     appsync_session=appsync_session,
+                    sentiment_aggregation_store=sentiment_analysis_args["sentiment_aggregation_store"],
+                    sentiment_segments=sentiment_segments,
                 )
 
-        task_responses = await asyncio.gather(
-            *add_transcript_tasks,
-            *add_transcript_sentiment_tasks,
-            *add_call_category_tasks,
-            *update_call_aggregation_tasks,
-            # *add_tca_agent_assist_tasks,
-            return_exceptions=True,
-        )
+            return list(await asyncio.gather(
+                *update_call_aggregation_tasks,
+                return_exceptions=True,
+            ))
+
+        async def execute_deferred_sentiment_and_call_aggregation() -> Dict[str, List]:
+            deferred_return_value: Dict[str, List] = {"successes": [], "errors": []}
+            sentiment_responses = await asyncio.gather(
+                *add_transcript_sentiment_tasks,
+                return_exceptions=True,
+            )
+            for response in [
+                *sentiment_responses,
+                *await execute_call_aggregation(sentiment_responses),
+            ]:
+                if isinstance(response, Exception):
+                    deferred_return_value["errors"].append(response)
+                else:
+                    deferred_return_value["successes"].append(response)
+            return deferred_return_value
+
+        call_aggregation_node: Optional[int] = None
+        if is_sentiment_deferred and deferred_tasks is not None:
+            deferred_tasks.append(
+                (
+                    str(final_messages[-1].get("CallId", "")),
+                    execute_deferred_sentiment_and_call_aggregation(),
+                )
+            )
+        elif final_messages:
+            call_aggregation_node = task_graph.add(
+                lambda: execute_call_aggregation(
+                    [task_graph.result(node) for node in sentiment_nodes]
+                ),
+                after=[*segment_nodes, *sentiment_nodes],
+            )
+
+        task_responses: List[Any] = []
+        for node, response in enumerate(await task_graph.run()):
+            if node == call_aggregation_node and isinstance(response, list):
+                task_responses.extend(response)
+            else:
+                task_responses.append(response)
 
         for response in task_responses:
             if isinstance(response, Exception):
@@ -1508,7 +1878,8 @@ async def execute_process_event_api_mutation(
         LOGGER.debug("Add Call Category to Call details")
         response = await execute_add_call_category_mutation(
             message=message,
-            appsync_session=appsync_session
+            appsync_session=appsync_session,
+            call_category_ledger=call_category_ledger,
         )
         if isinstance(response, Exception):
             return_value["errors"].append(response)
@@ -1517,10 +1888,11 @@ async def execute_process_event_api_mutation(
 
         LOGGER.debug("Add Call Category to Transcript segments")
         add_call_category_tasks = []
-        add_call_category_tasks = add_call_category(
+        add_call_category_tasks = await add_call_category(
             message=message,
             appsync_session=appsync_session,
-            sns_client=sns_client
+            sns_client=sns_client,
+            call_category_ledger=call_category_ledger,
         )
         task_responses = await asyncio.gather(
             *add_call_category_tasks,
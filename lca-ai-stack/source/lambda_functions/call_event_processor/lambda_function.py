@@ -5,37 +5,47 @@
 """
 import asyncio
 from os import environ, getenv
-from typing import TYPE_CHECKING, Dict, List
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Any, Dict, List
 import json
 import re
 
 # third-party imports from Lambda layer
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.utilities.typing import LambdaContext
-import boto3
-from botocore.config import Config as BotoCoreConfig
 
 # imports from Lambda layer
 # pylint: disable=import-error
-from appsync_utils import AppsyncAioGqlClient
+from appsync_utils import AppsyncAioGqlClient, AppsyncSessionManager, RetryCoordinator
+from boto3_utils import LazyClient, get_resource, lazy_client
+from eventprocessor_utils import PARTIAL_UTTERANCE_BUFFER, CallCategoryLedger
+from logging_utils import DebugLogSampler
+from sentiment import SentimentAggregationStore, SentimentBatcher, SentimentCache
 from transcript_batch_processor import TranscriptBatchProcessor
 
 # local imports
-from event_processor import execute_process_event_api_mutation
+from event_processor import (
+    execute_pending_call_aggregation_mutation,
+    execute_process_event_api_mutation,
+    execute_transcript_batch_hook,
+    flush_agent_assist_turns,
+    get_agent_assist_turn_stats,
+    get_call_metadata_stats,
+    get_lambda_hook_stats,
+    get_partial_utterance_stats,
+    get_transcript_hook_stats,
+)
 
 # pylint: enable=import-error
 
 if TYPE_CHECKING:
-    from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table as DynamoDbTable
+    from mypy_boto3_dynamodb.service_resource import Table as DynamoDbTable
     from mypy_boto3_lexv2_runtime.client import LexRuntimeV2Client
     from mypy_boto3_lambda.client import LambdaClient
     from mypy_boto3_comprehend.client import ComprehendClient
     from mypy_boto3_sns.client import SNSClient
     from mypy_boto3_ssm.client import SSMClient
-    from boto3 import Session as Boto3Session
 else:
-    Boto3Session = object
-    DynamoDBServiceResource = object
     DynamoDbTable = object
     LexRuntimeV2Client = object
     LambdaClient = object
@@ -44,21 +54,57 @@ else:
     SSMClient = object
 
 APPSYNC_GRAPHQL_URL = environ["APPSYNC_GRAPHQL_URL"]
+# the schema is loaded from the layer snapshot and only introspected when
+# the snapshot does not match APPSYNC_SCHEMA_VERSION (if set)
 APPSYNC_CLIENT = AppsyncAioGqlClient(
-    url=APPSYNC_GRAPHQL_URL, fetch_schema_from_transport=True)
-
-BOTO3_SESSION: Boto3Session = boto3.Session()
-CLIENT_CONFIG = BotoCoreConfig(
-    retries={"mode": "adaptive", "max_attempts": 3},
+    url=APPSYNC_GRAPHQL_URL,
+    fetch_schema_from_transport=True,
+    use_schema_snapshot=getenv("IS_APPSYNC_SCHEMA_SNAPSHOT_ENABLED", "true").lower() == "true",
+    schema_version=getenv("APPSYNC_SCHEMA_VERSION") or None,
+)
+# keeps the AppSync connection pool open across warm invocations
+APPSYNC_SESSION_MANAGER = (
+    AppsyncSessionManager(
+        client=APPSYNC_CLIENT,
+        pool_size=int(getenv("APPSYNC_POOL_SIZE", "50")),
+        keepalive_timeout=float(getenv("APPSYNC_KEEPALIVE_TIMEOUT_SECONDS", "60")),
+        max_idle_time=float(getenv("APPSYNC_MAX_IDLE_TIME_SECONDS", "60")),
+    )
+    if getenv("IS_APPSYNC_PERSISTENT_SESSION_ENABLED", "true").lower() == "true"
+    else None
+)
+# retry budget and circuit breaker shared by the AppSync queries across warm invocations
+RETRY_COORDINATOR = (
+    RetryCoordinator(
+        budget_capacity=float(getenv("APPSYNC_RETRY_BUDGET_CAPACITY", "100")),
+        budget_refill_rate=float(getenv("APPSYNC_RETRY_BUDGET_REFILL_PER_SECOND", "10")),
+        failure_threshold=int(getenv("APPSYNC_CIRCUIT_BREAKER_FAILURE_THRESHOLD", "20")),
+        reset_timeout=float(getenv("APPSYNC_CIRCUIT_BREAKER_RESET_TIMEOUT_SECONDS", "10")),
+        deadline_margin=float(getenv("APPSYNC_RETRY_DEADLINE_MARGIN_SECONDS", "3")),
+    )
+    if getenv("IS_APPSYNC_RETRY_COORDINATOR_ENABLED", "true").lower() == "true"
+    else None
 )
 
 STATE_DYNAMODB_TABLE_NAME = environ["STATE_DYNAMODB_TABLE_NAME"]
-STATE_DYNAMODB_RESOURCE: DynamoDBServiceResource = BOTO3_SESSION.resource(
-    "dynamodb",
-    config=CLIENT_CONFIG,
+# clients are created on first use instead of at import
+STATE_DYNAMODB_TABLE: DynamoDbTable = LazyClient(
+    lambda: get_resource("dynamodb").Table(STATE_DYNAMODB_TABLE_NAME))
+# running sentiment aggregates of calls - reused across warm invocations
+SENTIMENT_AGGREGATION_STORE = SentimentAggregationStore(
+    state_table=STATE_DYNAMODB_TABLE,
+    max_cached_calls=int(getenv("SENTIMENT_AGGREGATION_MAX_CACHED_CALLS", "1000")),
+)
+# categories and category matches sent per call - reused across warm invocations
+CALL_CATEGORY_LEDGER = (
+    CallCategoryLedger(
+        state_table=STATE_DYNAMODB_TABLE,
+        max_cached_calls=int(getenv("CALL_CATEGORY_LEDGER_MAX_CACHED_CALLS", "1000")),
+        claim_timeout=float(getenv("CALL_CATEGORY_LEDGER_CLAIM_TIMEOUT_SECONDS", "30")),
+    )
+    if getenv("IS_CALL_CATEGORY_DEDUPLICATION_ENABLED", "true").lower() == "true"
+    else None
 )
-STATE_DYNAMODB_TABLE: DynamoDbTable = STATE_DYNAMODB_RESOURCE.Table(
-    STATE_DYNAMODB_TABLE_NAME)
 
 IS_LEX_AGENT_ASSIST_ENABLED = getenv(
     "IS_LEX_AGENT_ASSIST_ENABLED", "true").lower() == "true"
@@ -69,24 +115,69 @@ IS_LAMBDA_AGENT_ASSIST_ENABLED = getenv(
 IS_SENTIMENT_ANALYSIS_ENABLED = getenv(
     "IS_SENTIMENT_ANALYSIS_ENABLED", "true").lower() == "true"
 if IS_SENTIMENT_ANALYSIS_ENABLED:
-    COMPREHEND_CLIENT: ComprehendClient = BOTO3_SESSION.client(
-        "comprehend", config=CLIENT_CONFIG)
+    COMPREHEND_CLIENT: ComprehendClient = lazy_client("comprehend")
 else:
     COMPREHEND_CLIENT = None
 COMPREHEND_LANGUAGE_CODE = getenv("COMPREHEND_LANGUAGE_CODE", "en")
+# groups sentiment requests of the batch in BatchDetectSentiment - disabled when <= 1
+COMPREHEND_BATCH_SIZE = int(getenv("COMPREHEND_BATCH_SIZE", "25"))
+SENTIMENT_BATCHER = (
+    SentimentBatcher(
+        comprehend_client=COMPREHEND_CLIENT,
+        max_batch_size=COMPREHEND_BATCH_SIZE,
+        batch_window=int(getenv("COMPREHEND_BATCH_WINDOW_MS", "20")) / 1000,
+    )
+    if COMPREHEND_CLIENT and COMPREHEND_BATCH_SIZE > 1
+    else None
+)
+# sentiment of short repeated utterances - optionally shared in the state table
+IS_SENTIMENT_CACHE_ENABLED = getenv("IS_SENTIMENT_CACHE_ENABLED", "true").lower() == "true"
+IS_SENTIMENT_CACHE_TABLE_ENABLED = getenv(
+    "IS_SENTIMENT_CACHE_TABLE_ENABLED", "false").lower() == "true"
+SENTIMENT_CACHE = (
+    SentimentCache(
+        max_size=int(getenv("SENTIMENT_CACHE_MAX_SIZE", "10000")),
+        min_text_length=int(getenv("SENTIMENT_CACHE_MIN_TEXT_LENGTH", "2")),
+        max_text_length=int(getenv("SENTIMENT_CACHE_MAX_TEXT_LENGTH", "100")),
+        state_table=STATE_DYNAMODB_TABLE if IS_SENTIMENT_CACHE_TABLE_ENABLED else None,
+    )
+    if COMPREHEND_CLIENT and IS_SENTIMENT_CACHE_ENABLED
+    else None
+)
+
+IS_PARTIAL_TRANSCRIPT_COALESCING_ENABLED = getenv(
+    "IS_PARTIAL_TRANSCRIPT_COALESCING_ENABLED", "true").lower() == "true"
+
+# number of mutations packed in a single AppSync request - disabled when <= 1
+APPSYNC_MUTATION_BATCH_SIZE = int(getenv("APPSYNC_MUTATION_BATCH_SIZE", "10"))
+APPSYNC_MUTATION_BATCH_WINDOW = int(getenv("APPSYNC_MUTATION_BATCH_WINDOW_MS", "10")) / 1000
+# records running at the same time across calls - unbounded when <= 0
+EVENT_PROCESSOR_MAX_CONCURRENCY = int(getenv("EVENT_PROCESSOR_MAX_CONCURRENCY", "20"))
+
+# backlog lag of a batch in seconds past which the load shedding starts (0 disables)
+PRIORITY_MODE_LAG_THRESHOLD = float(getenv("PRIORITY_MODE_LAG_THRESHOLD_SECONDS", "30"))
+PARTIAL_DROP_LAG_THRESHOLD = float(getenv("PARTIAL_DROP_LAG_THRESHOLD_SECONDS", "120"))
 
-SNS_CLIENT: SNSClient = BOTO3_SESSION.client("sns", config=CLIENT_CONFIG)
-SSM_CLIENT: SSMClient = BOTO3_SESSION.client("ssm", config=CLIENT_CONFIG)
+SNS_CLIENT: SNSClient = lazy_client("sns")
+SSM_CLIENT: SSMClient = lazy_client("ssm")
 
 LOGGER = Logger(location="%(filename)s:%(lineno)d - %(funcName)s()")
+# fraction of the invocations logged at the debug level
+DEBUG_LOG_SAMPLER = DebugLogSampler(LOGGER, sample_rate=float(getenv("DEBUG_LOG_SAMPLE_RATE", "0")))
 
 EVENT_LOOP = asyncio.get_event_loop()
 
-setting_response = SSM_CLIENT.get_parameter(
-    Name=getenv("PARAMETER_STORE_NAME"))
-SETTINGS = json.loads(setting_response["Parameter"]["Value"])
-if "CategoryAlertRegex" in SETTINGS:
-    SETTINGS['AlertRegEx'] = re.compile(SETTINGS["CategoryAlertRegex"])
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Dict[str, Any]:
+    """Loads the settings from the parameter store on the first invocation"""
+    setting_response = SSM_CLIENT.get_parameter(
+        Name=getenv("PARAMETER_STORE_NAME"))
+    settings = json.loads(setting_response["Parameter"]["Value"])
+    if "CategoryAlertRegex" in settings:
+        settings['AlertRegEx'] = re.compile(settings["CategoryAlertRegex"])
+    return settings
 
 
 async def process_event(event) -> Dict[str, List]:
@@ -99,28 +190,92 @@ async def process_event(event) -> Dict[str, List]:
         ),
         sentiment_analysis_args=dict(
             comprehend_client=COMPREHEND_CLIENT,
-            comprehend_language_code=COMPREHEND_LANGUAGE_CODE
+            comprehend_language_code=COMPREHEND_LANGUAGE_CODE,
+            sentiment_batcher=SENTIMENT_BATCHER,
+            sentiment_cache=SENTIMENT_CACHE,
+            sentiment_aggregation_store=SENTIMENT_AGGREGATION_STORE,
         ),
         # called for each record right before the context manager exits
-        api_mutation_fn=execute_process_event_api_mutation,
+        api_mutation_fn=partial(
+            execute_process_event_api_mutation, call_category_ledger=CALL_CATEGORY_LEDGER),
+        # called once per CallId after the record mutations of the batch
+        call_aggregation_fn=execute_pending_call_aggregation_mutation,
+        # called once with the records of the batch (batch and plugin transcript hooks)
+        transcript_hook_fn=execute_transcript_batch_hook,
+        coalesce_partial_transcripts_enabled=IS_PARTIAL_TRANSCRIPT_COALESCING_ENABLED,
+        mutation_batch_size=APPSYNC_MUTATION_BATCH_SIZE,
+        mutation_batch_window=APPSYNC_MUTATION_BATCH_WINDOW,
+        max_concurrency=EVENT_PROCESSOR_MAX_CONCURRENCY,
+        appsync_session_manager=APPSYNC_SESSION_MANAGER,
+        priority_mode_lag_threshold=PRIORITY_MODE_LAG_THRESHOLD,
+        partial_drop_lag_threshold=PARTIAL_DROP_LAG_THRESHOLD,
+        partial_utterance_buffer=PARTIAL_UTTERANCE_BUFFER,
+        retry_coordinator=RETRY_COORDINATOR,
         sns_client=SNS_CLIENT,
-        settings=SETTINGS
+        settings=get_settings()
     ) as processor:
         await processor.handle_event(event=event)
 
+    # turns are not held across invocations - the records are checkpointed
+    await flush_agent_assist_turns()
+
     return processor.results
 
 
+def get_retry_stats() -> Dict[str, object]:
+    """Gets and resets the AppSync retry counters"""
+    if not RETRY_COORDINATOR:
+        return {}
+    stats = RETRY_COORDINATOR.stats
+    RETRY_COORDINATOR.reset_stats()
+    return stats
+
+
+def get_call_category_stats() -> Dict[str, int]:
+    """Gets and resets the call category ledger counters"""
+    if not CALL_CATEGORY_LEDGER:
+        return {}
+    stats = CALL_CATEGORY_LEDGER.stats
+    CALL_CATEGORY_LEDGER.reset_stats()
+    return stats
+
+
+def get_sentiment_stats() -> Dict[str, Dict[str, int]]:
+    """Gets and resets the sentiment detection counters"""
+    stats: Dict[str, Dict[str, int]] = {}
+    if SENTIMENT_BATCHER:
+        stats["batcher"] = SENTIMENT_BATCHER.stats
+        SENTIMENT_BATCHER.reset_stats()
+    if SENTIMENT_CACHE:
+        stats["cache"] = SENTIMENT_CACHE.stats
+        SENTIMENT_CACHE.reset_stats()
+    return stats
+
+
 @LOGGER.inject_lambda_context
-def handler(event, context: LambdaContext):
-    # pylint: disable=unused-argument
+def handler(event, context: LambdaContext) -> Dict[str, List[Dict[str, str]]]:
     """Lambda handler"""
+    DEBUG_LOG_SAMPLER.sample()
     LOGGER.debug("lambda event", extra={"event": event})
+    if RETRY_COORDINATOR:
+        # retries are not started past the invocation deadline
+        RETRY_COORDINATOR.start_invocation(context.get_remaining_time_in_millis() / 1000)
 
     event_processor_results = EVENT_LOOP.run_until_complete(
         process_event(event=event))
     LOGGER.debug("event processor results", extra=dict(
         event_results=event_processor_results))
+    LOGGER.info("event processor metrics", extra=dict(
+        metrics=event_processor_results.get("metrics", {}),
+        lambda_hooks=get_lambda_hook_stats(),
+        agent_assist_turns=get_agent_assist_turn_stats(),
+        call_metadata=get_call_metadata_stats(),
+        call_categories=get_call_category_stats(),
+        transcript_hook=get_transcript_hook_stats(),
+        sentiment=get_sentiment_stats(),
+        partial_utterances=get_partial_utterance_stats(),
+        appsync_retries=get_retry_stats(),
+        appsync_session=APPSYNC_SESSION_MANAGER.stats if APPSYNC_SESSION_MANAGER else {}))
 
     for error in event_processor_results.get("errors", []):
         LOGGER.error("event processor error: %s", error)
@@ -130,4 +285,11 @@ def handler(event, context: LambdaContext):
             except Exception:  # pylint: disable=broad-except
                 LOGGER.exception("event processor exception")
 
-    return
+    # the stream is checkpointed before the first failed record of each shard
+    batch_item_failures = event_processor_results.get("batch_item_failures", [])
+    if batch_item_failures:
+        LOGGER.warning(
+            "replaying failed records", extra=dict(batch_item_failures=batch_item_failures)
+        )
+
+    return dict(batchItemFailures=batch_item_failures)
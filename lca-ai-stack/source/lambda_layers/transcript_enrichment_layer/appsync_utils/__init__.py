@@ -1,12 +1,79 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
-"""AppSync GraphQL Utilities"""
-from .aio_gql_client import AppsyncAioGqlClient
-from .requests_gql_client import AppsyncRequestsGqlClient
-from .execute_query import execute_gql_query_with_retries
+"""AppSync GraphQL Utilities
+
+Submodules are imported on first attribute access so that importing the
+package does not load the gql transports.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .aio_gql_client import AppsyncAioGqlClient
+    from .batching_session import BatchingClientSession
+    from .compiled_operation import CompiledOperation, get_compiled_operation
+    from .execute_query import execute_gql_query_with_retries
+    from .requests_gql_client import AppsyncRequestsGqlClient
+    from .retry_coordinator import (
+        CONDITION_FAILURE_MESSAGE,
+        ITEM_EXISTS_MESSAGE,
+        CircuitOpenError,
+        RetryCoordinator,
+        classify_error,
+        get_current_retry_coordinator,
+        get_error_messages,
+        reset_current_retry_coordinator,
+        set_current_retry_coordinator,
+    )
+    from .schema_snapshot import load_schema_snapshot
+    from .session_manager import AppsyncSessionManager
+
+_ATTRIBUTE_MODULES = {
+    "CONDITION_FAILURE_MESSAGE": ".retry_coordinator",
+    "ITEM_EXISTS_MESSAGE": ".retry_coordinator",
+    "AppsyncAioGqlClient": ".aio_gql_client",
+    "AppsyncRequestsGqlClient": ".requests_gql_client",
+    "AppsyncSessionManager": ".session_manager",
+    "BatchingClientSession": ".batching_session",
+    "CircuitOpenError": ".retry_coordinator",
+    "CompiledOperation": ".compiled_operation",
+    "RetryCoordinator": ".retry_coordinator",
+    "classify_error": ".retry_coordinator",
+    "execute_gql_query_with_retries": ".execute_query",
+    "get_compiled_operation": ".compiled_operation",
+    "get_current_retry_coordinator": ".retry_coordinator",
+    "get_error_messages": ".retry_coordinator",
+    "load_schema_snapshot": ".schema_snapshot",
+    "reset_current_retry_coordinator": ".retry_coordinator",
+    "set_current_retry_coordinator": ".retry_coordinator",
+}
 
 __all__ = [
+    "CONDITION_FAILURE_MESSAGE",
+    "ITEM_EXISTS_MESSAGE",
     "AppsyncAioGqlClient",
     "AppsyncRequestsGqlClient",
+    "AppsyncSessionManager",
+    "BatchingClientSession",
+    "CircuitOpenError",
+    "CompiledOperation",
+    "RetryCoordinator",
+    "classify_error",
     "execute_gql_query_with_retries",
+    "get_compiled_operation",
+    "get_current_retry_coordinator",
+    "get_error_messages",
+    "load_schema_snapshot",
+    "reset_current_retry_coordinator",
+    "set_current_retry_coordinator",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """Imports the submodule of an attribute on first access"""
+    module_name = _ATTRIBUTE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
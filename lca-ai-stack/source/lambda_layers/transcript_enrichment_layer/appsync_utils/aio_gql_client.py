@@ -1,19 +1,35 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 """AppSync Async IO Gql Client"""
+from time import perf_counter
+from typing import Dict, Optional
 from urllib.parse import urlparse
 
+# third-party imports from Lambda layer
+from aws_lambda_powertools import Logger
 from gql.client import Client
 from gql.transport.aiohttp import AIOHTTPTransport
 from gql.transport.appsync_auth import AppSyncIAMAuthentication
 
+from .schema_snapshot import SCHEMA_SNAPSHOT_PATH, load_schema_snapshot
+
+LOGGER = Logger(child=True, location="%(filename)s:%(lineno)d - %(funcName)s()")
+
 
 class AppsyncAioGqlClient(Client):
-    """AppSync Async IO Gql Client"""
+    """AppSync Async IO Gql Client
+
+    When use_schema_snapshot is set, the schema is loaded from the snapshot
+    bundled with the layer on the first connection. Introspection is only
+    used when the snapshot is missing or does not match schema_version.
+    """
 
     def __init__(
         self,
         url: str,
+        use_schema_snapshot: bool = False,
+        schema_snapshot_path: str = SCHEMA_SNAPSHOT_PATH,
+        schema_version: Optional[str] = None,
         **kwargs,
     ):
         host = str(urlparse(url).netloc)
@@ -21,3 +37,37 @@ class AppsyncAioGqlClient(Client):
         transport = AIOHTTPTransport(url=url, auth=auth)
 
         super().__init__(transport=transport, **kwargs)
+
+        self._use_schema_snapshot = use_schema_snapshot
+        self._schema_snapshot_path = schema_snapshot_path
+        self._schema_version = schema_version
+        # cold start timing breakdown - logged on the first connection
+        self.startup_timings: Optional[Dict[str, int]] = None
+
+    async def connect_async(self, reconnecting=False, **kwargs):
+        if self.startup_timings is not None:
+            return await super().connect_async(reconnecting=reconnecting, **kwargs)
+
+        timings: Dict[str, int] = {}
+        start_time = perf_counter()
+        schema_source = "provided" if self.schema else "introspection"
+        if not self.schema and self._use_schema_snapshot:
+            self.schema = load_schema_snapshot(
+                snapshot_path=self._schema_snapshot_path,
+                expected_version=self._schema_version,
+            )
+            timings["schema_snapshot_ms"] = round((perf_counter() - start_time) * 1000)
+            if self.schema:
+                schema_source = "snapshot"
+        connect_start_time = perf_counter()
+        session = await super().connect_async(reconnecting=reconnecting, **kwargs)
+        # includes the introspection query when the schema was not loaded
+        timings["connect_ms"] = round((perf_counter() - connect_start_time) * 1000)
+        timings["total_ms"] = round((perf_counter() - start_time) * 1000)
+        self.startup_timings = timings
+        LOGGER.info(
+            "appsync client cold start",
+            extra=dict(schema_source=schema_source, timings=timings),
+        )
+
+        return session
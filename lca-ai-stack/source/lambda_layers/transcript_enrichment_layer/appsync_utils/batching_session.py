@@ -0,0 +1,257 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Batching Async Client Session"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from gql.client import AsyncClientSession
+from gql.transport.exceptions import TransportQueryError
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    NameNode,
+    OperationDefinitionNode,
+    OperationType,
+    SelectionSetNode,
+    VariableDefinitionNode,
+    VariableNode,
+    Visitor,
+    visit,
+)
+
+from .compiled_operation import CompiledOperation, get_compiled_operation_from_document
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _VariableRenamer(Visitor):
+    """Prefixes the variable names of a document node"""
+
+    def __init__(self, prefix: str) -> None:
+        super().__init__()
+        self.prefix = prefix
+
+    def enter_variable(self, node: VariableNode, *_args) -> VariableNode:
+        """Renames the variable"""
+        return VariableNode(name=NameNode(value=f"{self.prefix}{node.name.value}"))
+
+
+class _PendingMutation:
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("operation", "variable_values", "future")
+
+    def __init__(
+        self,
+        operation: CompiledOperation,
+        variable_values: Optional[Dict[str, Any]],
+        future: "asyncio.Future[Dict[str, Any]]",
+    ) -> None:
+        self.operation = operation
+        self.variable_values = variable_values or {}
+        self.future = future
+
+
+class BatchingClientSession:
+    """Async client session that batches mutations into aliased requests
+
+    Wraps a gql AsyncClientSession. Independent mutations of compiled
+    operations executed within batch_window seconds of each other are packed
+    into a single GraphQL document of up to max_batch_size aliased fields.
+    The response is split back per operation. An operation whose alias has
+    errors raises a TransportQueryError so that only the failed operations
+    are retried by execute_gql_query_with_retries. Errors without a path
+    can't be matched to an operation so the operations without a result are
+    then run one at a time. Queries and documents that are not compiled
+    operations are executed as is.
+    """
+
+    DEFAULT_MAX_BATCH_SIZE = 10
+    DEFAULT_BATCH_WINDOW = 0.010
+    MAX_CACHED_DOCUMENTS = 256
+    ALIAS_PREFIX = "b"
+
+    def __init__(
+        self,
+        session: AsyncClientSession,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+        logger: logging.Logger = LOGGER,
+    ) -> None:
+        self._session = session
+        self._max_batch_size = max_batch_size
+        self._batch_window = batch_window
+        self._logger = logger
+        self._pending: List[_PendingMutation] = []
+        self._flush_task: Optional["asyncio.Future[None]"] = None
+        self._tasks: Set["asyncio.Future[None]"] = set()
+        self._documents: "OrderedDict[Tuple[int, ...], DocumentNode]" = OrderedDict()
+        self.request_count = 0
+        self.batched_operation_count = 0
+
+    @property
+    def client(self):
+        """gql client of the wrapped session"""
+        return self._session.client
+
+    async def execute(
+        self,
+        document: DocumentNode,
+        variable_values: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """Executes a document - batching compiled mutations"""
+        operation = get_compiled_operation_from_document(document)
+        if (
+            operation is None
+            or kwargs
+            or self._max_batch_size <= 1
+            or self._get_operation_definition(document).operation != OperationType.MUTATION
+        ):
+            self.request_count += 1
+            return await self._session.execute(document, variable_values=variable_values, **kwargs)
+
+        future: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        self._pending.append(
+            _PendingMutation(operation=operation, variable_values=variable_values, future=future)
+        )
+        if len(self._pending) >= self._max_batch_size:
+            self._start_flush(delay=0)
+        elif self._flush_task is None:
+            self._start_flush(delay=self._batch_window)
+
+        return await future
+
+    def _start_flush(self, delay: float) -> None:
+        if delay <= 0:
+            task = asyncio.ensure_future(self._execute_pending(self._take_batch()))
+        else:
+            task = self._flush_task = asyncio.ensure_future(self._delayed_flush(delay))
+        # keeps a reference to the task until it is done
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _delayed_flush(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._flush_task = None
+        while self._pending:
+            await self._execute_pending(self._take_batch())
+
+    def _take_batch(self) -> List[_PendingMutation]:
+        batch = self._pending[: self._max_batch_size]
+        self._pending = self._pending[self._max_batch_size :]
+        return batch
+
+    @staticmethod
+    def _get_operation_definition(document: DocumentNode) -> OperationDefinitionNode:
+        return next(d for d in document.definitions if isinstance(d, OperationDefinitionNode))
+
+    def _get_batch_document(self, operations: List[CompiledOperation]) -> DocumentNode:
+        """Builds the aliased document of a batch - cached by operation documents"""
+        key = tuple(id(o.document) for o in operations)
+        document = self._documents.get(key)
+        if document is not None:
+            self._documents.move_to_end(key)
+            return document
+
+        variable_definitions: List[VariableDefinitionNode] = []
+        selections: List[FieldNode] = []
+        for index, operation in enumerate(operations):
+            alias = f"{self.ALIAS_PREFIX}{index}"
+            definition = visit(
+                self._get_operation_definition(operation.document),
+                _VariableRenamer(prefix=f"{alias}_"),
+            )
+            variable_definitions.extend(definition.variable_definitions or ())
+            for field in definition.selection_set.selections:
+                selections.append(
+                    FieldNode(
+                        alias=NameNode(value=alias),
+                        name=field.name,
+                        arguments=field.arguments,
+                        directives=field.directives,
+                        selection_set=field.selection_set,
+                    )
+                )
+        document = DocumentNode(
+            definitions=(
+                OperationDefinitionNode(
+                    operation=OperationType.MUTATION,
+                    name=NameNode(value="BatchMutation"),
+                    variable_definitions=tuple(variable_definitions),
+                    directives=(),
+                    selection_set=SelectionSetNode(selections=tuple(selections)),
+                ),
+            )
+        )
+        self._documents[key] = document
+        while len(self._documents) > self.MAX_CACHED_DOCUMENTS:
+            self._documents.popitem(last=False)
+
+        return document
+
+    async def _execute_pending(self, batch: List[_PendingMutation]) -> None:
+        if not batch:
+            return
+        if len(batch) == 1:
+            pending = batch[0]
+            self.request_count += 1
+            try:
+                result = await self._session.execute(
+                    pending.operation.document, variable_values=pending.variable_values
+                )
+                pending.future.set_result(result)
+            except Exception as error:  # pylint: disable=broad-except
+                pending.future.set_exception(error)
+            return
+
+        document = self._get_batch_document([p.operation for p in batch])
+        variable_values = {
+            f"{self.ALIAS_PREFIX}{index}_{name}": value
+            for index, pending in enumerate(batch)
+            for name, value in pending.variable_values.items()
+        }
+        self.request_count += 1
+        self.batched_operation_count += len(batch)
+        errors_by_alias: Dict[str, List[Dict[str, Any]]] = {}
+        try:
+            data: Optional[Dict[str, Any]] = await self._session.execute(
+                document, variable_values=variable_values
+            )
+        except TransportQueryError as error:
+            data = error.data
+            for query_error in error.errors or []:
+                path = query_error.get("path") if isinstance(query_error, dict) else None
+                alias = str(path[0]) if path else ""
+                errors_by_alias.setdefault(alias, []).append(query_error)
+        except Exception as error:  # pylint: disable=broad-except
+            for pending in batch:
+                pending.future.set_exception(error)
+            return
+
+        self._logger.debug(
+            "batched mutation - operations: [%d] - failed aliases: [%s]",
+            len(batch),
+            ",".join(errors_by_alias),
+        )
+        rerun_batch: List[_PendingMutation] = []
+        for index, pending in enumerate(batch):
+            alias = f"{self.ALIAS_PREFIX}{index}"
+            errors = errors_by_alias.get(alias)
+            if not errors and "" in errors_by_alias and (data or {}).get(alias) is None:
+                rerun_batch.append(pending)
+                continue
+            definition = self._get_operation_definition(pending.operation.document)
+            field_name = definition.selection_set.selections[0].name.value  # type: ignore
+            if errors:
+                pending.future.set_exception(
+                    TransportQueryError(str(errors[0]), errors=errors, data=None)
+                )
+            else:
+                pending.future.set_result({field_name: (data or {}).get(alias)})
+        if rerun_batch:
+            self._logger.debug(
+                "batched mutation error without path - rerun operations: [%d]", len(rerun_batch)
+            )
+            await asyncio.gather(*(self._execute_pending([p]) for p in rerun_batch))
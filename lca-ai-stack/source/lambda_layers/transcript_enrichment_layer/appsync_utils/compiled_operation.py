@@ -0,0 +1,149 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Compiled GraphQL Operations"""
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from gql.dsl import DSLMutation, DSLQuery, DSLSchema, DSLVariableDefinitions, dsl_gql
+from graphql import (
+    GraphQLInputObjectType,
+    GraphQLInputType,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLSchema,
+    OperationDefinitionNode,
+    print_ast,
+    type_from_ast,
+)
+from graphql.language.ast import DocumentNode
+
+OperationBuildFnType = Callable[[DSLSchema, DSLVariableDefinitions], Union[DSLMutation, DSLQuery]]
+
+
+InputFieldsType = Dict[str, Optional[GraphQLInputType]]
+# input object fields by type - nested types are None for the leaf fields
+_INPUT_FIELDS: Dict[int, Tuple[GraphQLInputObjectType, InputFieldsType]] = {}
+
+
+def _get_input_fields(input_type: GraphQLInputObjectType) -> InputFieldsType:
+    cached = _INPUT_FIELDS.get(id(input_type))
+    if cached is not None and cached[0] is input_type:
+        return cached[1]
+    fields: InputFieldsType = {}
+    for name, field in input_type.fields.items():
+        field_type = field.type
+        while isinstance(field_type, GraphQLNonNull):
+            field_type = field_type.of_type
+        is_leaf = not isinstance(field_type, (GraphQLList, GraphQLInputObjectType))
+        fields[name] = None if is_leaf else field_type
+    _INPUT_FIELDS[id(input_type)] = (input_type, fields)
+    return fields
+
+
+def _serialize_input_value(value: Any, input_type: GraphQLInputType) -> Any:
+    """Keeps the fields of a variable value that are defined in its input type
+
+    Mirrors the literal serialization of the gql DSL which ignores the keys
+    not defined in the input object type. Mappings other than dict (e.g.
+    transcript segments) are read in a single pass over their items.
+    """
+    if isinstance(input_type, GraphQLNonNull):
+        return _serialize_input_value(value, input_type.of_type)
+    if value is None:
+        return None
+    if isinstance(input_type, GraphQLList):
+        if isinstance(value, (list, tuple)):
+            return [_serialize_input_value(v, input_type.of_type) for v in value]
+        return [_serialize_input_value(value, input_type.of_type)]
+    if isinstance(input_type, GraphQLInputObjectType):
+        fields = _get_input_fields(input_type)
+        if not isinstance(value, dict):
+            return {
+                name: item if fields[name] is None else _serialize_input_value(item, fields[name])
+                for name, item in value.items()
+                if name in fields
+            }
+        return {
+            name: value[name]
+            if field_type is None
+            else _serialize_input_value(value[name], field_type)
+            for name, field_type in fields.items()
+            if name in value
+        }
+    return value
+
+
+class CompiledOperation:
+    """GraphQL operation parsed and printed once
+
+    Holds a GraphQL document that uses variables instead of inline input
+    literals so that it can be reused across records and invocations.
+    """
+
+    __slots__ = ("name", "schema", "document", "query_string", "variable_types")
+
+    def __init__(self, name: str, schema: GraphQLSchema, document: DocumentNode) -> None:
+        self.name = name
+        self.schema = schema
+        self.document = document
+        self.query_string = print_ast(document)
+        self.variable_types: Dict[str, GraphQLInputType] = {}
+        for definition in document.definitions:
+            if isinstance(definition, OperationDefinitionNode):
+                for variable_definition in definition.variable_definitions or ():
+                    self.variable_types[variable_definition.variable.name.value] = type_from_ast(
+                        schema, variable_definition.type  # type: ignore
+                    )
+
+    def variables(self, **values: Any) -> Dict[str, Any]:
+        """Builds the variable values of the operation"""
+        return {
+            name: _serialize_input_value(value, self.variable_types[name])
+            for name, value in values.items()
+            if name in self.variable_types
+        }
+
+
+_COMPILED_OPERATIONS: Dict[str, Tuple[GraphQLSchema, CompiledOperation]] = {}
+# compiled documents by object id - documents are kept alive by the cache
+_COMPILED_DOCUMENTS: Dict[int, CompiledOperation] = {}
+
+
+def get_compiled_operation_from_document(document: DocumentNode) -> Optional[CompiledOperation]:
+    """Gets the compiled operation of a document built by get_compiled_operation"""
+    compiled_operation = _COMPILED_DOCUMENTS.get(id(document))
+    if compiled_operation is not None and compiled_operation.document is document:
+        return compiled_operation
+    return None
+
+
+def get_compiled_operation(
+    name: str,
+    schema: GraphQLSchema,
+    build_fn: OperationBuildFnType,
+) -> CompiledOperation:
+    """Gets a compiled operation from the module level cache
+
+    The operation is built with build_fn the first time it is requested for
+    a schema and reused afterwards.
+
+    :param name: operation name - unique per build_fn
+    :param schema: GraphQL schema of the client
+    :param build_fn: function returning the DSL operation from the DSL schema
+        and the variable definitions to be used as arguments
+    """
+    cached = _COMPILED_OPERATIONS.get(name)
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+
+    variable_definitions = DSLVariableDefinitions()
+    operation = build_fn(DSLSchema(schema), variable_definitions)
+    operation.variable_definitions = variable_definitions
+    compiled_operation = CompiledOperation(
+        name=name,
+        schema=schema,
+        document=dsl_gql(**{name: operation}),
+    )
+    _COMPILED_OPERATIONS[name] = (schema, compiled_operation)
+    _COMPILED_DOCUMENTS[id(compiled_operation.document)] = compiled_operation
+
+    return compiled_operation
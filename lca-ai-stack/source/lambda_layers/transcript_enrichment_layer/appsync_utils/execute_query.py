@@ -4,32 +4,45 @@
 import asyncio
 import logging
 from random import randint
-from typing import Callable, Dict, Optional, Union
+from typing import Any, Callable, Dict, Optional, Union
 
 
 from graphql import print_ast
 from graphql.language.ast import DocumentNode
 from gql.client import AsyncClientSession, ExecutionResult
 
+from logging_utils import LazyStr  # pylint: disable=import-error
+
+from .compiled_operation import CompiledOperation
+from .retry_coordinator import (
+    CircuitOpenError,
+    RetryCoordinator,
+    classify_error,
+    get_current_retry_coordinator,
+)
+
 LOGGER = logging.getLogger(__name__)
 DEFAULT_IGNORED_EXCEPTION_RESPONSE: Dict[str, object] = {"ok": True}
 
 
 async def execute_gql_query_with_retries(
-    query: DocumentNode,
+    query: Union[DocumentNode, CompiledOperation],
     client_session: AsyncClientSession,
+    variable_values: Optional[Dict[str, Any]] = None,
     max_retries: int = 3,
     min_sleep_time: float = 0.750,
     logger: logging.Logger = LOGGER,
     should_ignore_exception_fn: Callable[[Exception], bool] = lambda _: False,
     ignored_exception_response: Optional[Dict[str, object]] = None,
+    retry_coordinator: Optional[RetryCoordinator] = None,
 ) -> Union[Dict[str, object], ExecutionResult]:
     """Executes a query asynchronously with retries
 
     Implements retries using exponential backoff with jitter
 
-    :param query: GraphQL query as AST Node object
+    :param query: GraphQL query as AST Node object or compiled operation
     :param client_session: Asynchonous GraphQL client session
+    :param variable_values: Values of the variables used by the query
 
     :param max_retries: Number of times to retry appsync GraphQL queries
         after the initial query fails. This helps with async issues where
@@ -42,32 +55,76 @@ async def execute_gql_query_with_retries(
         exception to verify it it should be ignored
     :param ignored_exception_response: Response to send when an exception has
         been ignored
+    :param retry_coordinator: Shared retry budget, error classification,
+        circuit breaker and deadline of the retries. Defaults to the
+        coordinator of the current context. Without a coordinator, every
+        error is retried up to max_retries
     """
-    # pylint: disable=too-many-arguments
-    query_string = print_ast(query)
+    # pylint: disable=too-many-arguments,too-many-locals
+    query_string: Union[str, LazyStr]
+    if isinstance(query, CompiledOperation):
+        document = query.document
+        query_string = query.query_string
+    else:
+        document = query
+        # only printed when a record is emitted
+        query_string = LazyStr(print_ast, query)
     _ignored_exception_response = (
         DEFAULT_IGNORED_EXCEPTION_RESPONSE
         if ignored_exception_response is None
         else ignored_exception_response
     )
+    _retry_coordinator = retry_coordinator or get_current_retry_coordinator()
     result: Union[Dict[str, object], ExecutionResult] = {}
     retries = 0
     while True:
         try:
+            if _retry_coordinator:
+                _retry_coordinator.before_attempt()
             logger.debug(
                 "executing query document - retry: [%d]",
                 retries,
                 extra=dict(query=query_string),
             )
-            result = await client_session.execute(query)
+            result = await client_session.execute(document, variable_values=variable_values)
             logger.debug(
                 "query document retry: [%d] result - ",
                 retries,
                 extra=dict(result=result),
             )
+            if _retry_coordinator:
+                _retry_coordinator.record_success()
             break
         except Exception as error:  # pylint: disable=broad-except
-            if retries >= max_retries:
+            # ignorable exceptions are expected responses and are not retried
+            if should_ignore_exception_fn(error):
+                logger.info("ignorable exception - not retrying - error: [%s]", error)
+                if _retry_coordinator:
+                    _retry_coordinator.record_success()
+                result = _ignored_exception_response
+                break
+
+            if isinstance(error, CircuitOpenError):
+                logger.warning("query not sent - error: [%s]", error)
+                raise
+
+            sleep_time: Optional[float] = None
+            if retries < max_retries:
+                if _retry_coordinator:
+                    error_class = classify_error(error)
+                    _retry_coordinator.record_failure(error_class)
+                    sleep_time = _retry_coordinator.get_retry_delay(
+                        error_class=error_class,
+                        retries=retries + 1,
+                        min_sleep_time=min_sleep_time,
+                    )
+                else:
+                    # exponential backoff with jitter using base 2
+                    sleep_time = min_sleep_time * randint(1, 2 ** (retries + 1))  # nosec
+            elif _retry_coordinator:
+                _retry_coordinator.record_failure(classify_error(error))
+
+            if sleep_time is None:
                 logger.error(
                     "max retries on query - retries: [%d] - error: [%s]",
                     retries,
@@ -77,14 +134,7 @@ async def execute_gql_query_with_retries(
                 logger.exception("gql query exception")
                 raise
 
-            if should_ignore_exception_fn(error):
-                logger.info("ignorable exception - not retrying - error: [%s]", error)
-                result = _ignored_exception_response
-                break
-
             retries = retries + 1
-            # exponential backoff with jitter using base 2
-            sleep_time = min_sleep_time * randint(1, 2**retries)  # nosec
             logger.warning(
                 "error on query - retry: [%d] - sleeping for [%f]s - error: [%s]",
                 retries,
@@ -0,0 +1,316 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""AppSync Retry Coordinator"""
+import asyncio
+from contextvars import ContextVar, Token
+from random import randint
+from time import monotonic
+from typing import Dict, List, Literal, Optional
+
+# third-party imports from Lambda layer
+import aiohttp
+from gql.transport.exceptions import (
+    TransportClosed,
+    TransportQueryError,
+    TransportServerError,
+)
+from graphql import GraphQLError
+
+ErrorClassType = Literal[
+    "throttle", "conflict", "auth", "validation", "connection", "server", "unknown"
+]
+CircuitStateType = Literal["closed", "open", "half_open"]
+
+# messages of the AppSync resolver errors (see the appsync directory)
+CONDITION_FAILURE_MESSAGE = "item put condition failure"
+ITEM_EXISTS_MESSAGE = "Item already exists"
+
+_THROTTLE_MARKERS = (
+    "throttl",
+    "rate exceeded",
+    "too many requests",
+    "provisionedthroughputexceeded",
+    "requestlimitexceeded",
+)
+_AUTH_MARKERS = (
+    "unauthorized",
+    "forbidden",
+    "accessdenied",
+    "expiredtoken",
+    "security token",
+    "signature expired",
+)
+_VALIDATION_MARKERS = (
+    "validation error",
+    "invalid value",
+    "badrequest",
+    "mappingtemplate",
+)
+# HTTP status codes of the requests denied with the credentials of the function
+_AUTH_STATUS_CODES = (401, 403)
+# error classes that count as AppSync being degraded
+_DEGRADED_ERROR_CLASSES = ("throttle", "connection", "server")
+
+
+def get_error_messages(error: BaseException) -> List[str]:
+    """Messages of the GraphQL errors of an exception"""
+    if isinstance(error, TransportQueryError) and error.errors:
+        return [str(e.get("message", "")) if isinstance(e, dict) else str(e) for e in error.errors]
+    return [str(error)]
+
+
+def _get_error_text(error: BaseException) -> str:
+    if isinstance(error, TransportQueryError) and error.errors:
+        parts = []
+        for graphql_error in error.errors:
+            if isinstance(graphql_error, dict):
+                parts.append(str(graphql_error.get("errorType", "")))
+                parts.append(str(graphql_error.get("message", "")))
+            else:
+                parts.append(str(graphql_error))
+        return " ".join(parts).lower()
+    return str(error).lower()
+
+
+def classify_error(error: BaseException) -> ErrorClassType:
+    """Classifies an exception raised by an AppSync query
+
+    throttle: AppSync or data source throttling - retried and counted as degraded
+    conflict: condition failures of out of order events (e.g. a call not created yet)
+    auth: request denied (e.g. expired credentials) - retried with signatures
+        of refreshed credentials and the record is replayed
+    validation: invalid request (HTTP 4xx, GraphQL validation errors of the
+        document or the resolvers) - never succeeds on retry
+    connection and server: transport errors - retried and counted as degraded
+    unknown: any other exception (e.g. a bug or a malformed response) -
+        retried and the record is replayed
+    """
+    # pylint: disable=too-many-return-statements
+    if isinstance(error, TransportServerError):
+        if error.code == 429:
+            return "throttle"
+        if error.code in _AUTH_STATUS_CODES:
+            return "auth"
+        if error.code is not None and 400 <= error.code < 500:
+            return "validation"
+        return "server"
+    if isinstance(error, aiohttp.ClientResponseError):
+        if error.status == 429:
+            return "throttle"
+        if error.status in _AUTH_STATUS_CODES:
+            return "auth"
+        return "validation" if 400 <= error.status < 500 else "server"
+    if isinstance(
+        error,
+        (
+            aiohttp.ClientConnectionError,
+            aiohttp.ClientPayloadError,
+            asyncio.TimeoutError,
+            TransportClosed,
+        ),
+    ):
+        return "connection"
+    if isinstance(error, GraphQLError):
+        # the document does not validate against the schema
+        return "validation"
+    text = _get_error_text(error)
+    if any(marker in text for marker in _THROTTLE_MARKERS):
+        return "throttle"
+    if CONDITION_FAILURE_MESSAGE in text or "conditionalcheckfailed" in text:
+        return "conflict"
+    if any(marker in text for marker in _AUTH_MARKERS):
+        return "auth"
+    if isinstance(error, TransportQueryError) and any(
+        marker in text for marker in _VALIDATION_MARKERS
+    ):
+        return "validation"
+    return "unknown"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a query while the circuit breaker is open"""
+
+
+class RetryCoordinator:
+    """Coordinates the retries of the AppSync queries of the invocations
+
+    Shared by the queries of an invocation (and across warm invocations) so
+    that they back off together instead of amplifying an overload:
+
+    - retries take tokens from a bucket of budget_capacity tokens refilled at
+      budget_refill_rate tokens per second. Retries of degraded errors cost
+      more than ordering conflicts. A retry is denied when the bucket is empty
+    - validation errors are not retried
+    - the circuit breaker opens after failure_threshold consecutive degraded
+      errors. Queries then fail fast with CircuitOpenError for reset_timeout
+      seconds, after which a single probe query is let through
+    - retries whose backoff would end within deadline_margin seconds of the
+      invocation deadline are denied
+    """
+
+    DEFAULT_BUDGET_CAPACITY = 100.0
+    DEFAULT_BUDGET_REFILL_RATE = 10.0
+    DEFAULT_FAILURE_THRESHOLD = 20
+    DEFAULT_RESET_TIMEOUT = 10.0
+    DEFAULT_DEADLINE_MARGIN = 3.0
+    RETRY_COSTS: Dict[ErrorClassType, float] = dict(
+        throttle=5.0,
+        conflict=1.0,
+        auth=5.0,
+        connection=5.0,
+        server=5.0,
+        unknown=5.0,
+    )
+
+    def __init__(
+        self,
+        budget_capacity: float = DEFAULT_BUDGET_CAPACITY,
+        budget_refill_rate: float = DEFAULT_BUDGET_REFILL_RATE,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        deadline_margin: float = DEFAULT_DEADLINE_MARGIN,
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        self._budget_capacity = budget_capacity
+        self._budget_refill_rate = budget_refill_rate
+        self._tokens = budget_capacity
+        self._refilled_at = monotonic()
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._deadline_margin = deadline_margin
+        self._deadline: Optional[float] = None
+        self._state: CircuitStateType = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._is_probe_in_flight = False
+        self._stats: Dict[str, int] = {}
+        self.reset_stats()
+
+    def start_invocation(self, remaining_time: Optional[float] = None) -> None:
+        """Sets the deadline of the invocation from its remaining time in seconds"""
+        self._deadline = None if remaining_time is None else monotonic() + remaining_time
+
+    @property
+    def state(self) -> CircuitStateType:
+        """Circuit breaker state"""
+        if self._state == "open" and monotonic() - self._opened_at >= self._reset_timeout:
+            self._state = "half_open"
+            self._is_probe_in_flight = False
+        return self._state
+
+    def before_attempt(self) -> None:
+        """Raises CircuitOpenError when the query should not be sent"""
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._is_probe_in_flight:
+            self._is_probe_in_flight = True
+            return
+        self._stats["rejected"] += 1
+        raise CircuitOpenError(f"AppSync circuit breaker is {state}")
+
+    def record_success(self) -> None:
+        """Closes the circuit breaker"""
+        self._consecutive_failures = 0
+        if self._state != "closed":
+            self._state = "closed"
+            self._is_probe_in_flight = False
+
+    def record_failure(self, error_class: ErrorClassType) -> None:
+        """Counts an error - degraded errors may open the circuit breaker"""
+        self._stats[error_class] += 1
+        if self._state == "half_open":
+            self._is_probe_in_flight = False
+        if error_class not in _DEGRADED_ERROR_CLASSES:
+            return
+        self._consecutive_failures += 1
+        if self._state == "half_open" or (
+            self._state == "closed" and self._consecutive_failures >= self._failure_threshold
+        ):
+            self._state = "open"
+            self._opened_at = monotonic()
+            self._stats["opened"] += 1
+
+    def _take_tokens(self, cost: float) -> bool:
+        now = monotonic()
+        self._tokens = min(
+            self._budget_capacity,
+            self._tokens + (now - self._refilled_at) * self._budget_refill_rate,
+        )
+        self._refilled_at = now
+        if self._tokens < cost:
+            return False
+        self._tokens -= cost
+        return True
+
+    def get_retry_delay(
+        self, error_class: ErrorClassType, retries: int, min_sleep_time: float
+    ) -> Optional[float]:
+        """Backoff of a retry - None when the retry is denied
+
+        :param error_class: class of the error of the failed attempt
+        :param retries: number of the retry (starting at 1)
+        :param min_sleep_time: minimum backoff - exponential with base 2 and jitter
+        """
+        if error_class == "validation":
+            return None
+        if self.state == "open":
+            self._stats["denied_circuit_open"] += 1
+            return None
+        # exponential backoff with jitter using base 2
+        delay = min_sleep_time * randint(1, 2**retries)  # nosec
+        deadline = self._deadline
+        if deadline is not None and monotonic() + delay > deadline - self._deadline_margin:
+            self._stats["denied_deadline"] += 1
+            return None
+        if not self._take_tokens(self.RETRY_COSTS.get(error_class, 5.0)):
+            self._stats["denied_budget"] += 1
+            return None
+        self._stats["retries"] += 1
+        return delay
+
+    @property
+    def stats(self) -> Dict[str, object]:
+        """Retry and error counters and the circuit breaker state"""
+        return dict(self._stats, circuit=self.state, budget_tokens=round(self._tokens, 1))
+
+    def reset_stats(self) -> None:
+        """Clears the counters"""
+        self._stats = dict(
+            retries=0,
+            denied_budget=0,
+            denied_deadline=0,
+            denied_circuit_open=0,
+            rejected=0,
+            opened=0,
+            throttle=0,
+            conflict=0,
+            auth=0,
+            validation=0,
+            connection=0,
+            server=0,
+            unknown=0,
+        )
+
+
+# coordinator of the queries run in the current context (set by the batch processor)
+_CURRENT_RETRY_COORDINATOR: ContextVar[Optional[RetryCoordinator]] = ContextVar(
+    "retry_coordinator", default=None
+)
+
+
+def get_current_retry_coordinator() -> Optional[RetryCoordinator]:
+    """Gets the retry coordinator of the current context"""
+    return _CURRENT_RETRY_COORDINATOR.get()
+
+
+def set_current_retry_coordinator(
+    retry_coordinator: Optional[RetryCoordinator],
+) -> "Token[Optional[RetryCoordinator]]":
+    """Sets the retry coordinator of the current context and the tasks it creates"""
+    return _CURRENT_RETRY_COORDINATOR.set(retry_coordinator)
+
+
+def reset_current_retry_coordinator(token: "Token[Optional[RetryCoordinator]]") -> None:
+    """Restores the retry coordinator of the current context"""
+    _CURRENT_RETRY_COORDINATOR.reset(token)
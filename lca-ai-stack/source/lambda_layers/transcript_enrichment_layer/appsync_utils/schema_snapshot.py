@@ -0,0 +1,110 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""AppSync GraphQL Schema Snapshot
+
+The snapshot is the introspection result of the AppSync schema bundled with
+the layer so that clients do not need an introspection query on cold start.
+Rebuild it when the AppSync schema changes:
+
+    python -m appsync_utils.schema_snapshot ../../appsync/schema.graphql
+"""
+import hashlib
+import json
+import sys
+from functools import lru_cache
+from os import path
+from time import perf_counter
+from typing import Optional
+
+# third-party imports from Lambda layer
+from aws_lambda_powertools import Logger
+from graphql import GraphQLSchema, build_client_schema, build_schema, introspection_from_schema
+
+LOGGER = Logger(child=True, location="%(filename)s:%(lineno)d - %(funcName)s()")
+
+SCHEMA_SNAPSHOT_PATH = path.join(path.dirname(__file__), "appsync_schema.json")
+
+# AppSync scalars and directives that are implicit in the AppSync schema
+APPSYNC_DEFINITIONS = """
+scalar AWSDate
+scalar AWSTime
+scalar AWSDateTime
+scalar AWSTimestamp
+scalar AWSEmail
+scalar AWSJSON
+scalar AWSURL
+scalar AWSPhone
+scalar AWSIPAddress
+directive @aws_iam on OBJECT | FIELD_DEFINITION
+directive @aws_api_key on OBJECT | FIELD_DEFINITION
+directive @aws_oidc on OBJECT | FIELD_DEFINITION
+directive @aws_lambda on OBJECT | FIELD_DEFINITION
+directive @aws_cognito_user_pools(cognito_groups: [String]) on OBJECT | FIELD_DEFINITION
+directive @aws_auth(cognito_groups: [String]) on FIELD_DEFINITION
+directive @aws_subscribe(mutations: [String]) on FIELD_DEFINITION
+"""
+
+
+def get_schema_version(schema_definition: str) -> str:
+    """Gets the version of an AppSync schema definition (SDL)"""
+    return hashlib.sha256(schema_definition.encode("utf-8")).hexdigest()[:16]
+
+
+def build_schema_snapshot(
+    schema_definition_path: str,
+    snapshot_path: str = SCHEMA_SNAPSHOT_PATH,
+) -> str:
+    """Builds the snapshot file from an AppSync schema definition file
+
+    :returns: version of the schema
+    """
+    with open(schema_definition_path, encoding="utf-8") as schema_file:
+        schema_definition = schema_file.read()
+    schema = build_schema(APPSYNC_DEFINITIONS + schema_definition)
+    version = get_schema_version(schema_definition)
+    with open(snapshot_path, "w", encoding="utf-8") as snapshot_file:
+        json.dump(
+            dict(version=version, introspection=introspection_from_schema(schema)),
+            snapshot_file,
+            separators=(",", ":"),
+        )
+    return version
+
+
+@lru_cache(maxsize=None)
+def load_schema_snapshot(
+    snapshot_path: str = SCHEMA_SNAPSHOT_PATH,
+    expected_version: Optional[str] = None,
+) -> Optional[GraphQLSchema]:
+    """Loads the GraphQL schema from the snapshot file
+
+    :param expected_version: version of the deployed schema. The snapshot is
+        discarded when it does not match
+    :returns: the schema or None when the snapshot is missing, invalid or
+        stale so that the client falls back to introspection
+    """
+    start_time = perf_counter()
+    try:
+        with open(snapshot_path, encoding="utf-8") as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        version = snapshot.get("version")
+        if expected_version and version != expected_version:
+            LOGGER.warning(
+                "stale schema snapshot",
+                extra=dict(version=version, expected_version=expected_version),
+            )
+            return None
+        schema = build_client_schema(snapshot["introspection"])
+    except Exception as error:  # pylint: disable=broad-except
+        LOGGER.warning("unable to load schema snapshot", extra=dict(error=str(error)))
+        return None
+    LOGGER.debug(
+        "loaded schema snapshot",
+        extra=dict(version=version, duration_ms=round((perf_counter() - start_time) * 1000)),
+    )
+
+    return schema
+
+
+if __name__ == "__main__":
+    print(build_schema_snapshot(*sys.argv[1:3]))
@@ -0,0 +1,158 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""AppSync Session Manager"""
+import asyncio
+from contextlib import asynccontextmanager
+from time import time
+from typing import AsyncIterator, Dict, Iterable, Optional
+
+# third-party imports from Lambda layer
+import aiohttp
+from aws_lambda_powertools import Logger
+from gql.client import AsyncClientSession
+from gql.transport.exceptions import TransportClosed
+
+from .aio_gql_client import AppsyncAioGqlClient
+
+LOGGER = Logger(child=True, location="%(filename)s:%(lineno)d - %(funcName)s()")
+
+CONNECTION_ERROR_TYPES = (
+    aiohttp.ClientConnectionError,
+    aiohttp.ClientPayloadError,
+    asyncio.TimeoutError,
+    TransportClosed,
+)
+
+
+class AppsyncSessionManager:
+    """Keeps an AppSync client session connected across Lambda invocations
+
+    The gql session and its aiohttp connection pool are created on first use
+    and reused by the following invocations running on the same event loop.
+    The session is reconnected when it was idle for longer than
+    max_idle_time (the pooled connections are likely closed by the server
+    while the Lambda container is frozen), when it is older than
+    max_session_age or after a connection error.
+    """
+
+    DEFAULT_POOL_SIZE = 50
+    DEFAULT_KEEPALIVE_TIMEOUT = 60.0
+    DEFAULT_MAX_IDLE_TIME = 60.0
+    DEFAULT_MAX_SESSION_AGE = 3600.0
+
+    def __init__(
+        self,
+        client: AppsyncAioGqlClient,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+        max_idle_time: float = DEFAULT_MAX_IDLE_TIME,
+        max_session_age: float = DEFAULT_MAX_SESSION_AGE,
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        self._client = client
+        self._pool_size = pool_size
+        self._keepalive_timeout = keepalive_timeout
+        self._max_idle_time = max_idle_time
+        self._max_session_age = max_session_age
+        self._session: Optional[AsyncClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connected_at = 0.0
+        self._last_used_at = 0.0
+        self._is_healthy = True
+        self._lock: Optional[asyncio.Lock] = None
+        self._stats: Dict[str, int] = dict(connects=0, reuses=0, reconnects=0)
+
+    def _get_reconnect_reason(self, loop: asyncio.AbstractEventLoop) -> Optional[str]:
+        """Health check of the current session"""
+        if self._session is None:
+            return "new"
+        now = time()
+        transport_session = getattr(self._client.transport, "session", None)
+        if self._loop is not loop:
+            return "event_loop_changed"
+        if transport_session is None or transport_session.closed:
+            return "closed"
+        if not self._is_healthy:
+            return "connection_error"
+        if now - self._last_used_at > self._max_idle_time:
+            return "idle"
+        if now - self._connected_at > self._max_session_age:
+            return "age"
+        return None
+
+    async def _connect(self) -> AsyncClientSession:
+        # the connector is bound to the running loop so it is created here
+        self._client.transport.client_session_args = dict(
+            connector=aiohttp.TCPConnector(
+                limit=self._pool_size,
+                keepalive_timeout=self._keepalive_timeout,
+            ),
+        )
+        session = await self._client.connect_async()
+        self._session = session
+        self._loop = asyncio.get_running_loop()
+        self._connected_at = time()
+        self._is_healthy = True
+        return session
+
+    async def _disconnect(self) -> None:
+        session, self._session = self._session, None
+        if session is None:
+            return
+        try:
+            if self._loop is asyncio.get_running_loop():
+                await self._client.close_async()
+            else:
+                # resources of another loop can not be awaited
+                self._client.transport.session = None
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.warning("appsync session close exception", extra=dict(error=str(error)))
+            self._client.transport.session = None
+
+    async def acquire(self) -> AsyncClientSession:
+        """Gets the connected session - reconnecting when it is not healthy"""
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop not in (None, loop):
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            reason = self._get_reconnect_reason(loop)
+            if reason is None:
+                self._stats["reuses"] += 1
+            else:
+                if reason != "new":
+                    self._stats["reconnects"] += 1
+                    LOGGER.info("reconnecting appsync session", extra=dict(reason=reason))
+                await self._disconnect()
+                await self._connect()
+                self._stats["connects"] += 1
+            self._last_used_at = time()
+            return self._session  # type: ignore
+
+    def report_errors(self, errors: Iterable[object]) -> None:
+        """Marks the session for reconnection if an error is connection related"""
+        if any(isinstance(error, CONNECTION_ERROR_TYPES) for error in errors):
+            self._is_healthy = False
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncClientSession]:
+        """Context manager providing the connected session
+
+        Unlike the client context manager, the session is kept open on exit.
+        """
+        session = await self.acquire()
+        try:
+            yield session
+        except Exception as error:
+            self.report_errors([error])
+            raise
+        finally:
+            self._last_used_at = time()
+
+    async def close(self) -> None:
+        """Closes the session and its connection pool"""
+        await self._disconnect()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Connection counters"""
+        return dict(self._stats)
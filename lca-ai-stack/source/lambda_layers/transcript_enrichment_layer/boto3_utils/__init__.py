@@ -0,0 +1,50 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Shared boto3 Client Utilities
+
+Submodules are imported on first attribute access so that importing the
+package does not load boto3.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .client_registry import (
+        CLIENT_CONFIG,
+        ClientRegistry,
+        get_client,
+        get_resource,
+        lazy_client,
+        LazyClient,
+    )
+    from .contact_attributes_cache import ContactAttributesCache
+
+_ATTRIBUTE_MODULES = {
+    "CLIENT_CONFIG": ".client_registry",
+    "ClientRegistry": ".client_registry",
+    "ContactAttributesCache": ".contact_attributes_cache",
+    "LazyClient": ".client_registry",
+    "get_client": ".client_registry",
+    "get_resource": ".client_registry",
+    "lazy_client": ".client_registry",
+}
+
+__all__ = [
+    "CLIENT_CONFIG",
+    "ClientRegistry",
+    "ContactAttributesCache",
+    "LazyClient",
+    "get_client",
+    "get_resource",
+    "lazy_client",
+]
+
+
+def __getattr__(name: str) -> Any:
+    """Imports the submodule of an attribute on first access"""
+    module_name = _ATTRIBUTE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
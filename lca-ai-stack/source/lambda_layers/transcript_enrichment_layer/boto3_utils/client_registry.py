@@ -0,0 +1,98 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+""" Shared boto3 Client Registry
+"""
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+# third-party imports from Lambda layer
+import boto3
+from botocore.config import Config as BotoCoreConfig
+
+# tuned for many concurrent requests from the async event loop executors
+CLIENT_CONFIG = BotoCoreConfig(
+    retries={"mode": "adaptive", "max_attempts": 3},
+    max_pool_connections=50,
+    connect_timeout=5,
+)
+
+
+class ClientRegistry:
+    """Lazily creates boto3 clients and resources and reuses them
+
+    Clients are created on first use from a single boto3 session and shared
+    across warm Lambda invocations so that their connection pools are kept.
+    Creation is guarded by a lock since clients may be requested from
+    executor threads.
+    """
+
+    def __init__(self, config: BotoCoreConfig = CLIENT_CONFIG) -> None:
+        self._config = config
+        self._session: Optional[boto3.Session] = None
+        self._clients: Dict[str, Any] = {}
+        self._resources: Dict[str, Any] = {}
+        self._lock = Lock()
+
+    def _get_session(self) -> boto3.Session:
+        if self._session is None:
+            self._session = boto3.Session()
+        return self._session
+
+    def get_client(self, service_name: str) -> Any:
+        """Gets the shared client of a service"""
+        client = self._clients.get(service_name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(service_name)
+                if client is None:
+                    client = self._get_session().client(service_name, config=self._config)
+                    self._clients[service_name] = client
+        return client
+
+    def get_resource(self, service_name: str) -> Any:
+        """Gets the shared resource of a service"""
+        resource = self._resources.get(service_name)
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(service_name)
+                if resource is None:
+                    resource = self._get_session().resource(service_name, config=self._config)
+                    self._resources[service_name] = resource
+        return resource
+
+
+CLIENT_REGISTRY = ClientRegistry()
+
+
+def get_client(service_name: str) -> Any:
+    """Gets a client from the layer client registry"""
+    return CLIENT_REGISTRY.get_client(service_name)
+
+
+def get_resource(service_name: str) -> Any:
+    """Gets a resource from the layer client registry"""
+    return CLIENT_REGISTRY.get_resource(service_name)
+
+
+class LazyClient:
+    """Proxy that creates a client on first attribute access
+
+    Used for module level clients so that they are only created when a
+    code path needs them instead of at import.
+    """
+
+    __slots__ = ("_factory", "_client")
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        self._factory = factory
+        self._client: Any = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._client is None:
+            self._client = self._factory()
+        return getattr(self._client, name)
+
+
+def lazy_client(service_name: str) -> Any:
+    """Gets a proxy of a registry client created on first use"""
+    return LazyClient(lambda: get_client(service_name))
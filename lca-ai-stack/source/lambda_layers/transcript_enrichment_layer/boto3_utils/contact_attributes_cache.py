@@ -0,0 +1,64 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+""" Amazon Connect Contact Attributes Cache
+"""
+from collections import OrderedDict
+from time import monotonic
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from .client_registry import get_client
+
+if TYPE_CHECKING:
+    from mypy_boto3_connect.client import ConnectClient
+else:
+    ConnectClient = object
+
+ContactKeyType = Tuple[str, str]
+
+
+class ContactAttributesCache:
+    """Bounded TTL cache of Amazon Connect contact attributes
+
+    Keyed by (InstanceId, ContactId) so that repeated lookups for the same
+    contact do not call GetContactAttributes.
+    """
+
+    DEFAULT_MAX_SIZE = 1000
+    DEFAULT_TTL = 300.0
+
+    def __init__(
+        self,
+        connect_client: Optional[ConnectClient] = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+        ttl: float = DEFAULT_TTL,
+    ) -> None:
+        self._connect_client = connect_client
+        self._max_size = max_size
+        self._ttl = ttl
+        self._cache: "OrderedDict[ContactKeyType, Tuple[float, Dict[str, str]]]" = OrderedDict()
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def get_contact_attributes(self, instance_id: str, contact_id: str) -> Dict[str, str]:
+        """Gets the attributes of a contact"""
+        key = (instance_id, contact_id)
+        now = monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > now:
+            self._cache.move_to_end(key)
+            self.hit_count += 1
+            return cached[1]
+
+        self.miss_count += 1
+        connect_client: ConnectClient = self._connect_client or get_client("connect")
+        response = connect_client.get_contact_attributes(
+            InstanceId=instance_id,
+            InitialContactId=contact_id,
+        )
+        attributes = response.get("Attributes", {})
+        self._cache[key] = (now + self._ttl, attributes)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+
+        return attributes
@@ -2,15 +2,34 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from .eventprocessor import (
+    PARTIAL_UTTERANCE_BUFFER,
     normalize_transcript_segments,
     get_ttl,
     transform_segment_to_add_sentiment,
     transform_segment_to_categories_agent_assist,
     transform_segment_to_issues_agent_assist
 )
+from .call_category_ledger import (
+    CallCategoryLedger,
+    get_call_category_key,
+    get_category_alert_key,
+    get_category_segment_key,
+)
+from .call_metadata_cache import CALL_METADATA_FIELDS, CallMetadataCache
+from .partial_utterance_buffer import PartialUtteranceBuffer
+from .transcript_segment import TranscriptSegment
 
-__all__ = ["normalize_transcript_segments",
+__all__ = ["CALL_METADATA_FIELDS",
+            "CallCategoryLedger",
+            "CallMetadataCache",
+            "PARTIAL_UTTERANCE_BUFFER",
+            "PartialUtteranceBuffer",
+            "normalize_transcript_segments",
+            "get_call_category_key",
+            "get_category_alert_key",
+            "get_category_segment_key",
             "get_ttl", 
             "transform_segment_to_add_sentiment",
             "transform_segment_to_categories_agent_assist",
-            "transform_segment_to_issues_agent_assist"]
\ No newline at end of file
+            "transform_segment_to_issues_agent_assist",
+            "TranscriptSegment"]
\ No newline at end of file
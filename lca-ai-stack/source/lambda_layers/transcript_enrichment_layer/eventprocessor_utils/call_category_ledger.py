@@ -0,0 +1,234 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Per Call Category Ledger"""
+import asyncio
+import math
+from collections import OrderedDict
+from time import monotonic, time
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+# third-party imports from Lambda layer
+from aws_lambda_powertools import Logger
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table as DynamoDbTable
+else:
+    DynamoDbTable = object
+
+LOGGER = Logger(child=True, location="%(filename)s:%(lineno)d - %(funcName)s()")
+
+
+def get_call_category_key(category: str) -> str:
+    """Ledger key of a category added to the call"""
+    return f"category#{category}"
+
+
+def _get_match_suffix(
+    category: str, start_time: Optional[float] = None, end_time: Optional[float] = None
+) -> str:
+    if start_time is None:
+        return category
+    return f"{category}#{float(start_time):.3f}#{float(end_time or start_time):.3f}"
+
+
+def get_category_segment_key(category: str, start_time: float, end_time: float) -> str:
+    """Ledger key of the CATEGORY_MATCH transcript segment of a category match"""
+    return f"segment#{_get_match_suffix(category, start_time, end_time)}"
+
+
+def get_category_alert_key(
+    category: str, start_time: Optional[float] = None, end_time: Optional[float] = None
+) -> str:
+    """Ledger key of the SNS message of a category match"""
+    return f"alert#{_get_match_suffix(category, start_time, end_time)}"
+
+
+class CallCategoryLedger:
+    """Records the categories and category matches sent for each call
+
+    Each side effect (addCallCategory, CATEGORY_MATCH segment and SNS
+    message) has its own key. A key is claimed before its side effect is
+    sent and recorded once the side effect succeeded:
+
+    - claimed keys are pending in memory for claim_timeout seconds so that
+      the repeated matches of a batch are sent once. Keys that are not in
+      memory are claimed with a conditional put of their item in the state
+      DynamoDB table that fails when the key was recorded or is claimed by
+      another container. Claims expire after claim_timeout seconds so that
+      the side effects of a container that never completed them (e.g. a
+      timeout) are sent again by a retried record
+    - recorded keys are marked in the table by removing their claim
+      expiration. The keys of a failed side effect are released and their
+      table item is deleted
+
+    The keys of each call are kept in an in memory LRU cache that is reused
+    across warm invocations. State table errors are logged and the key is
+    sent (a duplicate is preferred to a missed alert).
+    """
+
+    DEFAULT_MAX_CACHED_CALLS = 1000
+    DEFAULT_CLAIM_TIMEOUT = 30.0
+    PK_PREFIX = "cat#"
+
+    def __init__(
+        self,
+        state_table: Optional[DynamoDbTable] = None,
+        max_cached_calls: int = DEFAULT_MAX_CACHED_CALLS,
+        claim_timeout: float = DEFAULT_CLAIM_TIMEOUT,
+    ) -> None:
+        self._state_table = state_table
+        self._max_cached_calls = max_cached_calls
+        self._claim_timeout = claim_timeout
+        # expiration (monotonic) of the pending keys of each call - None once recorded
+        self._calls: "OrderedDict[str, Dict[str, Optional[float]]]" = OrderedDict()
+        self._stats: Dict[str, int] = {}
+        self.reset_stats()
+
+    def _get_call_keys(self, call_id: str) -> Dict[str, Optional[float]]:
+        keys = self._calls.get(call_id)
+        if keys is None:
+            keys = self._calls[call_id] = {}
+            while len(self._calls) > self._max_cached_calls:
+                self._calls.popitem(last=False)
+        else:
+            self._calls.move_to_end(call_id)
+        return keys
+
+    def _get_table_key(self, call_id: str, key: str) -> Dict[str, str]:
+        return {"PK": f"{self.PK_PREFIX}{call_id}", "SK": key}
+
+    async def _put_claim(self, call_id: str, key: str) -> bool:
+        """Claims a key in the state table - False when it is recorded or claimed"""
+        state_table = self._state_table
+        if not state_table:
+            return True
+        now = int(time())
+        claim_expires_at = now + math.ceil(self._claim_timeout)
+        event_loop = asyncio.get_running_loop()
+        try:
+            await event_loop.run_in_executor(
+                None,
+                lambda: state_table.put_item(
+                    Item={
+                        **self._get_table_key(call_id, key),
+                        "CallId": call_id,
+                        "ClaimExpiresAt": claim_expires_at,
+                        "ExpiresAfter": claim_expires_at,
+                    },
+                    ConditionExpression="attribute_not_exists(PK) OR ClaimExpiresAt < :now",
+                    ExpressionAttributeValues={":now": now},
+                ),
+            )
+        except state_table.meta.client.exceptions.ConditionalCheckFailedException:
+            return False
+        except Exception as error:  # pylint: disable=broad-except
+            self._stats["errors"] += 1
+            LOGGER.warning(
+                "unable to claim call category: %s", error, extra=dict(call_id=call_id, key=key)
+            )
+        return True
+
+    async def _set_recorded(self, call_id: str, key: str, expires_after: int) -> None:
+        state_table = self._state_table
+        if not state_table:
+            return
+        event_loop = asyncio.get_running_loop()
+        try:
+            await event_loop.run_in_executor(
+                None,
+                lambda: state_table.update_item(
+                    Key=self._get_table_key(call_id, key),
+                    UpdateExpression="SET ExpiresAfter = :expires_after REMOVE ClaimExpiresAt",
+                    ExpressionAttributeValues={":expires_after": expires_after},
+                ),
+            )
+        except Exception as error:  # pylint: disable=broad-except
+            self._stats["errors"] += 1
+            LOGGER.warning(
+                "unable to record call category: %s", error, extra=dict(call_id=call_id, key=key)
+            )
+
+    async def _delete_claim(self, call_id: str, key: str) -> None:
+        state_table = self._state_table
+        if not state_table:
+            return
+        event_loop = asyncio.get_running_loop()
+        try:
+            await event_loop.run_in_executor(
+                None,
+                lambda: state_table.delete_item(
+                    Key=self._get_table_key(call_id, key),
+                    # recorded keys are kept
+                    ConditionExpression="attribute_exists(ClaimExpiresAt)",
+                ),
+            )
+        except state_table.meta.client.exceptions.ConditionalCheckFailedException:
+            pass
+        except Exception as error:  # pylint: disable=broad-except
+            self._stats["errors"] += 1
+            LOGGER.warning(
+                "unable to release call category: %s", error, extra=dict(call_id=call_id, key=key)
+            )
+
+    async def claim(self, call_id: str, keys: Iterable[str]) -> List[str]:
+        """Claims the keys of a call - returns the keys to send"""
+        call_keys = self._get_call_keys(call_id)
+        now = monotonic()
+        new_keys: List[str] = []
+        for key in keys:
+            if key in call_keys:
+                expires_at = call_keys[key]
+                if expires_at is None or expires_at > now:
+                    self._stats["duplicates"] += 1
+                    continue
+                self._stats["expired"] += 1
+            # pending before the table claim so that concurrent claims are duplicates
+            call_keys[key] = now + self._claim_timeout
+            new_keys.append(key)
+        if not new_keys:
+            return []
+
+        results = await asyncio.gather(*(self._put_claim(call_id, key) for key in new_keys))
+        # keys recorded or claimed by another container stay pending so that
+        # the claim of a container that never completed it is retried
+        claimed_keys = [key for key, is_claimed in zip(new_keys, results) if is_claimed]
+        self._stats["claimed"] += len(claimed_keys)
+        self._stats["table_duplicates"] += len(new_keys) - len(claimed_keys)
+        return claimed_keys
+
+    async def record(self, call_id: str, keys: Iterable[str], expires_after: int) -> None:
+        """Records the claimed keys of the side effects that succeeded"""
+        keys = list(keys)
+        call_keys = self._get_call_keys(call_id)
+        for key in keys:
+            call_keys[key] = None
+        self._stats["recorded"] += len(keys)
+        await asyncio.gather(*(self._set_recorded(call_id, key, expires_after) for key in keys))
+
+    async def release(self, call_id: str, keys: Iterable[str]) -> None:
+        """Releases claimed keys (e.g. their side effect failed) to be sent again"""
+        keys = list(keys)
+        call_keys = self._calls.get(call_id)
+        if call_keys is not None:
+            keys = [key for key in keys if call_keys.get(key, 0.0) is not None]
+            for key in keys:
+                call_keys.pop(key, None)
+        self._stats["released"] += len(keys)
+        await asyncio.gather(*(self._delete_claim(call_id, key) for key in keys))
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Claim and duplicate counters"""
+        return dict(self._stats, calls=len(self._calls))
+
+    def reset_stats(self) -> None:
+        """Clears the counters - the keys are kept"""
+        self._stats = dict(
+            claimed=0,
+            duplicates=0,
+            table_duplicates=0,
+            expired=0,
+            recorded=0,
+            released=0,
+            errors=0,
+        )
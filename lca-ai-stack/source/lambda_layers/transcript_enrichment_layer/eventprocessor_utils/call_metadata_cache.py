@@ -0,0 +1,81 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Per Call Metadata Cache"""
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+CALL_METADATA_FIELDS = (
+    "CallId",
+    "CustomerPhoneNumber",
+    "SystemPhoneNumber",
+    "AgentId",
+    "Status",
+    "CreatedAt",
+)
+
+
+class CallMetadataCache:
+    """Bounded TTL cache of the metadata of each call keyed by CallId
+
+    The metadata (see CALL_METADATA_FIELDS) is filled from the call events
+    (e.g. START and UPDATE_AGENT) and from getCall results so that it is
+    available to the later events of the call on the warm function without
+    querying the call. The least recently updated calls are evicted past
+    max_size and entries expire ttl seconds after their last update.
+    """
+
+    DEFAULT_MAX_SIZE = 1000
+    DEFAULT_TTL = 7200.0
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_TTL) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._stats: Dict[str, int] = {}
+        self.reset_stats()
+
+    def get(self, call_id: str) -> Optional[Dict[str, Any]]:
+        """Gets a copy of the metadata of a call - None on a miss"""
+        cached = self._cache.get(call_id)
+        if cached is not None and cached[0] <= monotonic():
+            del self._cache[call_id]
+            self._stats["expired"] += 1
+            cached = None
+        if cached is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return dict(cached[1])
+
+    def update(self, call_id: str, values: Mapping[str, Any]) -> Dict[str, Any]:
+        """Merges the metadata fields of values into the entry of a call"""
+        if not call_id:
+            return {}
+        cached = self._cache.pop(call_id, None)
+        metadata = cached[1] if cached is not None else dict(CallId=call_id)
+        metadata.update(
+            (field, values[field])
+            for field in CALL_METADATA_FIELDS
+            if values.get(field) not in (None, "") and field != "CallId"
+        )
+        self._cache[call_id] = (monotonic() + self._ttl, metadata)
+        self._stats["updates"] += 1
+        while len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+            self._stats["evicted"] += 1
+        return dict(metadata)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and eviction counters"""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return dict(
+            self._stats,
+            hit_rate=round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            calls=len(self._cache),
+        )
+
+    def reset_stats(self) -> None:
+        """Clears the counters - the entries are kept"""
+        self._stats = dict(hits=0, misses=0, updates=0, evicted=0, expired=0)
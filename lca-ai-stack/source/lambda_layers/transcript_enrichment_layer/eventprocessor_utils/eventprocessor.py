@@ -8,12 +8,18 @@ import uuid
 import asyncio
 from sentiment import ComprehendWeightedSentiment
 
+from .partial_utterance_buffer import PartialUtteranceBuffer
+from .transcript_segment import TranscriptSegment
+
 if TYPE_CHECKING:
+    from sentiment import SentimentBatcher, SentimentCache
     from mypy_boto3_comprehend.type_defs import DetectSentimentResponseTypeDef
     from mypy_boto3_comprehend.client import ComprehendClient
 else:
     ComprehendClient = object
     DetectSentimentResponseTypeDef = object
+    SentimentBatcher = object
+    SentimentCache = object
 
 DYNAMODB_EXPIRATION_IN_DAYS = getenv("DYNAMODB_EXPIRATION_IN_DAYS", "90")
  
@@ -26,10 +32,13 @@ SENTIMENT_SCORE = dict(
     Mixed=0,
 )
 
-# XXX workaround - this should be moved to the Tumbling Window state
 # Contact Lens sends individual Utterances (partials)
-# This map is used to concatenate the invididual Utterances
-UTTERANCES_MAP: Dict[str, str] = {}
+# This buffer is used to concatenate the invididual Utterances of each call
+PARTIAL_UTTERANCE_BUFFER = PartialUtteranceBuffer(
+    max_utterances=int(getenv("PARTIAL_UTTERANCE_BUFFER_MAX_UTTERANCES", "10000")),
+    max_length=int(getenv("PARTIAL_UTTERANCE_BUFFER_MAX_LENGTH", "2000000")),
+    max_age=float(getenv("PARTIAL_UTTERANCE_BUFFER_MAX_AGE_SECONDS", "600")),
+)
 
 # Get value for DynamboDB TTL field
 def get_ttl():
@@ -117,10 +126,20 @@ def transform_segment_to_issues_agent_assist(
     )
 
 
-def transform_contact_lens_segment(segment: Dict) -> Dict[str, object]:
-    """Transforms Kinesis Stream Transcript Payload to addTranscript API"""
-    call_id: str = segment["CallId"]
-    contact_id: str = segment["CallId"]
+def transform_contact_lens_segment(
+    segment: Dict,
+    call_id: Optional[str] = None,
+    created_at: Optional[str] = None,
+    expires_after: Optional[int] = None,
+) -> TranscriptSegment:
+    """Transforms Kinesis Stream Transcript Payload to addTranscript API
+
+    call_id, created_at and expires_after are shared by the segments of a
+    message - they default to the segment CallId and the current time
+    """
+    if call_id is None:
+        call_id = segment["CallId"]
+    contact_id: str = call_id
     is_partial: bool
     segment_item: Dict[str, Any]
     segment_id: str
@@ -136,17 +155,15 @@ def transform_contact_lens_segment(segment: Dict) -> Dict[str, object]:
         segment_item = segment["Utterance"]
         segment_id = segment_item["TranscriptId"]
         content = segment_item["PartialContent"]
-        UTTERANCES_MAP[segment_id] = UTTERANCES_MAP.get(segment_id, "") + " " + content
-        transcript = UTTERANCES_MAP[segment_id]
+        transcript = PARTIAL_UTTERANCE_BUFFER.append(call_id, segment_id, content)
     # final transcript
     elif "Transcript" in segment:
         is_partial = False
         segment_item = segment["Transcript"]
         segment_id = segment_item["Id"]
         transcript = segment_item["Content"]
-        # delete utterance concatenatin from global map
-        if segment_id in UTTERANCES_MAP:
-            del UTTERANCES_MAP[segment_id]
+        # delete utterance concatenation from the buffer
+        PARTIAL_UTTERANCE_BUFFER.pop(call_id, segment_id)
         if "Sentiment" in segment_item:
             sentiment = segment_item.get("Sentiment", "NEUTRAL")
             sentiment_args = dict(
@@ -161,19 +178,22 @@ def transform_contact_lens_segment(segment: Dict) -> Dict[str, object]:
     # contact lens uses "CUSTOMER" and LCA expects "CALLER"
     if channel == "CUSTOMER":
         channel = "CALLER"
-    created_at = datetime.utcnow().astimezone().isoformat()
+    if created_at is None:
+        created_at = datetime.utcnow().astimezone().isoformat()
+    if expires_after is None:
+        expires_after = get_ttl()
     # Contact Lens times are in Milliseconds
     # Changing to seconds to normalize units used by the transcript state manager which uses
     # seconds per the Transcribe streaming API
     start_time: float = segment_item["BeginOffsetMillis"] / 1000
     end_time: float = segment_item["EndOffsetMillis"] / 1000
 
-    transcript_segment = dict (
+    transcript_segment = TranscriptSegment(
         CallId=call_id,
         ContactId=contact_id,
         Channel=channel,
         CreatedAt=created_at,
-        ExpiresAfter=get_ttl(),
+        ExpiresAfter=expires_after,
         EndTime=end_time,
         IsPartial=is_partial,
         SegmentId=segment_id,
@@ -197,8 +217,11 @@ def transform_contact_lens_segment(segment: Dict) -> Dict[str, object]:
 
 
 # Transform Transcript segment fields
-def normalize_transcript_segments(message: Dict) -> List[Dict]:
-    """Transforms Kinesis Stream Transcript Payload to addTranscript API"""
+def normalize_transcript_segments(message: Dict) -> List[TranscriptSegment]:
+    """Transforms Kinesis Stream Transcript Payload to addTranscript API
+
+    The message is not modified
+    """
     
     call_id: str = None
     channel: str = None
@@ -241,7 +264,7 @@ def normalize_transcript_segments(message: Dict) -> List[Dict]:
         if not is_partial and utteranceEvent.get("IssuesDetected", []):
             issuesdetected = utteranceEvent.get("IssuesDetected")
         segments.append(
-            dict(
+            TranscriptSegment(
                     CallId=call_id,
                     Channel=channel,
                     SegmentId=segment_id,
@@ -272,7 +295,7 @@ def normalize_transcript_segments(message: Dict) -> List[Dict]:
         sentiment = None
         issuesdetected = None
         segments.append(
-            dict(
+            TranscriptSegment(
                     CallId=call_id,
                     Channel=channel,
                     SegmentId=segment_id,
@@ -294,10 +317,14 @@ def normalize_transcript_segments(message: Dict) -> List[Dict]:
             # only handle utterances and transcripts - delegate categories to agent assist
             if "Utterance" not in segment and "Transcript" not in segment:
                 continue
-            transcript_segment = {
-                **transform_contact_lens_segment({**segment, "CallId": call_id}),
-            }
-            segments.append(transcript_segment)
+            segments.append(
+                transform_contact_lens_segment(
+                    segment,
+                    call_id=call_id,
+                    created_at=created_at,
+                    expires_after=expires_afer,
+                )
+            )
 
     else:    # custom event message in KDS
         call_id = message["CallId"]
@@ -316,14 +343,15 @@ def normalize_transcript_segments(message: Dict) -> List[Dict]:
         else:
             segment_id = str(uuid.uuid4())
         
-        if message.get("BeginOffsetMillis", None):
+        # offsets of 0 are valid (first segment of the call)
+        if message.get("BeginOffsetMillis", None) is not None:
             start_time = message["BeginOffsetMillis"]
-        if message.get("StartTime", None):
+        if message.get("StartTime", None) is not None:
             start_time = message["StartTime"]
         
-        if message.get("EndOffsetMillis", None):
+        if message.get("EndOffsetMillis", None) is not None:
             end_time = message["EndOffsetMillis"]
-        if message.get("EndTime", None):
+        if message.get("EndTime", None) is not None:
             end_time = message["EndTime"]
         
         transcript = message["Transcript"]
@@ -332,7 +360,7 @@ def normalize_transcript_segments(message: Dict) -> List[Dict]:
         if message.get("Sentiment", None):
             sentiment = message["Sentiment"]
         segments.append(
-            dict(
+            TranscriptSegment(
                     CallId=call_id,
                     Channel=channel,
                     SegmentId=segment_id,
@@ -397,8 +425,25 @@ async def transform_segment_to_add_sentiment(message: Dict, sentiment_analysis_a
         text = message.get("OriginalTranscript", message.get("Transcript", ""))
         comprehend_client: ComprehendClient = sentiment_analysis_args.get("comprehend_client")
         comprehend_language_code = sentiment_analysis_args.get("comprehend_language_code", "en")
-
-        sentiment_response:DetectSentimentResponseTypeDef = await detect_sentiment(text, comprehend_client, comprehend_language_code)
+        sentiment_batcher: Optional[SentimentBatcher] = sentiment_analysis_args.get(
+            "sentiment_batcher"
+        )
+        sentiment_cache: Optional[SentimentCache] = sentiment_analysis_args.get("sentiment_cache")
+
+        async def detect_sentiment_fn() -> DetectSentimentResponseTypeDef:
+            if sentiment_batcher:
+                # grouped with the segments of other records in BatchDetectSentiment requests
+                return await sentiment_batcher.detect_sentiment(text, comprehend_language_code)
+            return await detect_sentiment(text, comprehend_client, comprehend_language_code)
+
+        sentiment_response:DetectSentimentResponseTypeDef
+        if sentiment_cache:
+            # the weighted sentiment is derived below from the cached raw scores
+            sentiment_response = await sentiment_cache.get_sentiment(  # type: ignore
+                text, comprehend_language_code, detect_sentiment_fn
+            )
+        else:
+            sentiment_response = await detect_sentiment_fn()
         comprehend_weighted_sentiment = ComprehendWeightedSentiment()
 
         sentiment = {
@@ -410,8 +455,9 @@ async def transform_segment_to_add_sentiment(message: Dict, sentiment_analysis_a
                 sentiment["SentimentWeighted"] = comprehend_weighted_sentiment.get_weighted_sentiment_score(
                         sentiment_response=sentiment_response
                     )
-    transcript_segment_with_sentiment = {
-        **message,
-        **sentiment
-    }
+    # the segment is converted to the mutation input dict here
+    transcript_segment_with_sentiment = (
+        message.to_dict() if isinstance(message, TranscriptSegment) else {**message}
+    )
+    transcript_segment_with_sentiment.update(sentiment)
     return transcript_segment_with_sentiment
@@ -0,0 +1,127 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Contact Lens Partial Utterance Buffer"""
+from collections import OrderedDict
+from time import monotonic
+from typing import Dict, List, Optional, Set, Tuple
+
+UtteranceKeyType = Tuple[str, str]
+
+
+class _PartialUtterance:
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("parts", "length", "updated_at")
+
+    def __init__(self) -> None:
+        self.parts: List[str] = []
+        self.length = 0
+        self.updated_at = 0.0
+
+
+class PartialUtteranceBuffer:
+    """Concatenates the Contact Lens partial utterances of each call
+
+    Contact Lens sends the individual partial contents of an utterance.
+    Contents are appended to a list per utterance and joined when the
+    partial transcript is read. An utterance is removed when its final
+    transcript arrives, when its call ends or when it is evicted: the least
+    recently updated utterances are evicted past max_utterances or
+    max_length buffered characters, and when they were not updated for
+    max_age seconds (e.g. the final transcript was dropped).
+    """
+
+    DEFAULT_MAX_UTTERANCES = 10000
+    DEFAULT_MAX_LENGTH = 2_000_000
+    DEFAULT_MAX_AGE = 600.0
+
+    def __init__(
+        self,
+        max_utterances: int = DEFAULT_MAX_UTTERANCES,
+        max_length: int = DEFAULT_MAX_LENGTH,
+        max_age: float = DEFAULT_MAX_AGE,
+    ) -> None:
+        self._max_utterances = max_utterances
+        self._max_length = max_length
+        self._max_age = max_age
+        # ordered by last update
+        self._utterances: "OrderedDict[UtteranceKeyType, _PartialUtterance]" = OrderedDict()
+        self._call_utterance_ids: Dict[str, Set[str]] = {}
+        self._length = 0
+        self._stats: Dict[str, int] = {}
+        self.reset_stats()
+
+    def append(self, call_id: str, utterance_id: str, content: str) -> str:
+        """Appends a partial content and returns the partial transcript"""
+        key = (call_id, utterance_id)
+        utterance = self._utterances.get(key)
+        if utterance is None:
+            utterance = self._utterances[key] = _PartialUtterance()
+            self._call_utterance_ids.setdefault(call_id, set()).add(utterance_id)
+        else:
+            self._utterances.move_to_end(key)
+        utterance.parts.append(content)
+        utterance.length += len(content)
+        self._length += len(content)
+        now = monotonic()
+        utterance.updated_at = now
+        # keeps the leading space of the concatenation used by the previous map
+        transcript = " " + " ".join(utterance.parts)
+        self._evict(now)
+        return transcript
+
+    def pop(self, call_id: str, utterance_id: str) -> bool:
+        """Removes an utterance - returns True if it was buffered"""
+        if self._remove((call_id, utterance_id)) is None:
+            return False
+        self._stats["completed"] += 1
+        return True
+
+    def clear_call(self, call_id: str) -> int:
+        """Removes the utterances of a call - returns the number removed"""
+        utterance_ids = self._call_utterance_ids.get(call_id)
+        if not utterance_ids:
+            return 0
+        count = 0
+        for utterance_id in list(utterance_ids):
+            if self._remove((call_id, utterance_id)) is not None:
+                count += 1
+        self._stats["cleared"] += count
+        return count
+
+    def _remove(self, key: UtteranceKeyType) -> Optional[_PartialUtterance]:
+        utterance = self._utterances.pop(key, None)
+        if utterance is None:
+            return None
+        self._length -= utterance.length
+        call_id, utterance_id = key
+        utterance_ids = self._call_utterance_ids.get(call_id)
+        if utterance_ids is not None:
+            utterance_ids.discard(utterance_id)
+            if not utterance_ids:
+                del self._call_utterance_ids[call_id]
+        return utterance
+
+    def _evict(self, now: float) -> None:
+        while self._utterances:
+            key, utterance = next(iter(self._utterances.items()))
+            if now - utterance.updated_at > self._max_age:
+                self._stats["expired"] += 1
+            elif len(self._utterances) > self._max_utterances or self._length > self._max_length:
+                self._stats["evicted"] += 1
+            else:
+                break
+            self._remove(key)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Occupancy and eviction counters"""
+        return dict(
+            self._stats,
+            calls=len(self._call_utterance_ids),
+            utterances=len(self._utterances),
+            length=self._length,
+        )
+
+    def reset_stats(self) -> None:
+        """Clears the counters - the occupancy is kept"""
+        self._stats = dict(completed=0, cleared=0, evicted=0, expired=0)
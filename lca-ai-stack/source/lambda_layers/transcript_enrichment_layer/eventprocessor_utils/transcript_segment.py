@@ -0,0 +1,182 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Transcript Segment Model"""
+from collections.abc import MutableMapping
+from operator import attrgetter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# field names are the AppSync input names so that segments map directly to
+# the mutation variables
+TRANSCRIPT_SEGMENT_FIELDS = (
+    "CallId",
+    "ContactId",
+    "Channel",
+    "SegmentId",
+    "StartTime",
+    "EndTime",
+    "Transcript",
+    "OriginalTranscript",
+    "IsPartial",
+    "Sentiment",
+    "SentimentWeighted",
+    "SentimentScore",
+    "IssuesDetected",
+    "Status",
+    "ExpiresAfter",
+    "CreatedAt",
+    "Utterance",
+    "Categories",
+    "ContactLensTranscript",
+)
+_FIELD_SET = frozenset(TRANSCRIPT_SEGMENT_FIELDS)
+_get_field_values = attrgetter(*TRANSCRIPT_SEGMENT_FIELDS)
+
+
+class _Unset:
+    # pylint: disable=too-few-public-methods
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "UNSET"
+
+
+UNSET: Any = _Unset()
+
+
+class TranscriptSegment(MutableMapping):
+    """Normalized transcript segment
+
+    Slotted record built in a single pass from the KDS message and converted
+    to a dict only at the edge (AppSync variables and Lambda payloads). It
+    implements the mapping interface of the dict segments it replaces. Fields
+    that are UNSET are not part of the mapping. Keys outside of the known
+    fields (e.g. added by a caller) are kept in a separate dict.
+    """
+
+    # pylint: disable=invalid-name,too-many-instance-attributes,too-many-locals
+    __slots__ = TRANSCRIPT_SEGMENT_FIELDS + ("_extra",)
+
+    def __init__(
+        self,
+        *,
+        CallId: Any = UNSET,
+        ContactId: Any = UNSET,
+        Channel: Any = UNSET,
+        SegmentId: Any = UNSET,
+        StartTime: Any = UNSET,
+        EndTime: Any = UNSET,
+        Transcript: Any = UNSET,
+        OriginalTranscript: Any = UNSET,
+        IsPartial: Any = UNSET,
+        Sentiment: Any = UNSET,
+        SentimentWeighted: Any = UNSET,
+        SentimentScore: Any = UNSET,
+        IssuesDetected: Any = UNSET,
+        Status: Any = UNSET,
+        ExpiresAfter: Any = UNSET,
+        CreatedAt: Any = UNSET,
+        Utterance: Any = UNSET,
+        Categories: Any = UNSET,
+        ContactLensTranscript: Any = UNSET,
+        **extra: Any,
+    ) -> None:
+        # pylint: disable=super-init-not-called,too-many-arguments
+        self.CallId = CallId
+        self.ContactId = ContactId
+        self.Channel = Channel
+        self.SegmentId = SegmentId
+        self.StartTime = StartTime
+        self.EndTime = EndTime
+        self.Transcript = Transcript
+        self.OriginalTranscript = OriginalTranscript
+        self.IsPartial = IsPartial
+        self.Sentiment = Sentiment
+        self.SentimentWeighted = SentimentWeighted
+        self.SentimentScore = SentimentScore
+        self.IssuesDetected = IssuesDetected
+        self.Status = Status
+        self.ExpiresAfter = ExpiresAfter
+        self.CreatedAt = CreatedAt
+        self.Utterance = Utterance
+        self.Categories = Categories
+        self.ContactLensTranscript = ContactLensTranscript
+        self._extra: Optional[Dict[str, Any]] = extra or None
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is not UNSET:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in _FIELD_SET and getattr(self, key) is not UNSET:
+            setattr(self, key, UNSET)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in _FIELD_SET:
+            return getattr(self, key) is not UNSET  # type: ignore
+        return self._extra is not None and key in self._extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            return default if value is UNSET else value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def keys(self) -> List[str]:  # type: ignore
+        return list(self.to_dict())
+
+    def items(self) -> List[Tuple[str, Any]]:  # type: ignore
+        items = [
+            (name, value)
+            for name, value in zip(TRANSCRIPT_SEGMENT_FIELDS, _get_field_values(self))
+            if value is not UNSET
+        ]
+        if self._extra:
+            items.extend(self._extra.items())
+        return items
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def copy(self) -> "TranscriptSegment":
+        """Shallow copy of the segment"""
+        segment = TranscriptSegment.__new__(TranscriptSegment)
+        for name, value in zip(TRANSCRIPT_SEGMENT_FIELDS, _get_field_values(self)):
+            setattr(segment, name, value)
+        segment._extra = dict(self._extra) if self._extra else None
+        return segment
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converts the segment to a dict of the fields that are set"""
+        values = {
+            name: value
+            for name, value in zip(TRANSCRIPT_SEGMENT_FIELDS, _get_field_values(self))
+            if value is not UNSET
+        }
+        if self._extra:
+            values.update(self._extra)
+        return values
+
+    def __repr__(self) -> str:
+        return f"TranscriptSegment({self.to_dict()!r})"
@@ -1,6 +1,36 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
-"""Async Lambda Client Utilities"""
-from .lambda_request import invoke_lambda
+"""Async Lambda Client Utilities
 
-__all__ = ["invoke_lambda"]
+Submodules are imported on first attribute access so that importing the
+package does not load powertools.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .agent_assist_dispatcher import AgentAssistTurnDispatcher
+    from .lambda_invoker import AsyncLambdaInvoker
+    from .lambda_request import invoke_lambda
+
+_ATTRIBUTE_MODULES = {
+    "AgentAssistTurnDispatcher": ".agent_assist_dispatcher",
+    "AsyncLambdaInvoker": ".lambda_invoker",
+    "invoke_lambda": ".lambda_request",
+}
+
+__all__ = [
+    "AgentAssistTurnDispatcher",
+    "AsyncLambdaInvoker",
+    "invoke_lambda",
+]
+
+
+def __getattr__(name: str) -> Any:
+    """Imports the submodule of an attribute on first access"""
+    module_name = _ATTRIBUTE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,145 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+""" Turn Level Agent Assist Dispatcher
+"""
+import asyncio
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Set
+
+# third-party imports from Lambda layer
+from aws_lambda_powertools import Logger
+
+
+LOGGER = Logger(child=True, location="%(filename)s:%(lineno)d - %(funcName)s()")
+
+DispatchFnType = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class _PendingTurn:
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("segments", "length", "started_at", "added_at")
+
+    def __init__(self, started_at: float) -> None:
+        self.segments: List[Mapping[str, Any]] = []
+        self.length = 0
+        self.started_at = started_at
+        self.added_at = started_at
+
+
+def merge_turn_segments(segments: List[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Merges the segments of a turn into a single agent assist request
+
+    The request is the last segment with the start time of the first one and
+    the joined transcripts
+    """
+    merged = dict(segments[-1])
+    if len(segments) > 1:
+        merged["StartTime"] = segments[0]["StartTime"]
+        merged["Transcript"] = " ".join(str(s["Transcript"]).strip() for s in segments)
+        if any("OriginalTranscript" in s for s in segments):
+            merged["OriginalTranscript"] = " ".join(
+                str(s.get("OriginalTranscript", s["Transcript"])).strip() for s in segments
+            )
+    return merged
+
+
+class AgentAssistTurnDispatcher:
+    """Merges the consecutive final CALLER segments of a call into agent assist requests
+
+    The final segments of the caller are buffered as a turn of the call which
+    is dispatched when:
+
+    - the turn ends (e.g. a segment of the agent or the end of the call)
+    - a segment is added more than quiet_window seconds after the previous
+      segment of the turn or more than max_delay seconds after the first one -
+      the turn is dispatched before the segment is added
+    - its transcript reaches max_length characters
+    - flush() is called at the end of the invocation. Turns are not held
+      across invocations: the Kinesis records of their segments are already
+      checkpointed and the function may not be invoked again
+
+    A quiet_window of 0 dispatches each segment. Dispatches run in the
+    background until flush() awaits them.
+    """
+
+    DEFAULT_QUIET_WINDOW = 0.5
+    DEFAULT_MAX_DELAY = 4.0
+    DEFAULT_MAX_LENGTH = 1000
+
+    def __init__(
+        self,
+        dispatch_fn: DispatchFnType,
+        quiet_window: float = DEFAULT_QUIET_WINDOW,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        max_length: int = DEFAULT_MAX_LENGTH,
+    ) -> None:
+        self._dispatch_fn = dispatch_fn
+        self._quiet_window = quiet_window
+        self._max_delay = max_delay
+        self._max_length = max_length
+        self._turns: Dict[str, _PendingTurn] = {}
+        self._tasks: Set["asyncio.Future[Any]"] = set()
+        self._stats: Dict[str, int] = {}
+        self.reset_stats()
+
+    def add(self, segment: Mapping[str, Any]) -> None:
+        """Adds a final CALLER segment to the turn of its call"""
+        call_id = str(segment.get("CallId", ""))
+        self._stats["segments"] += 1
+        now = monotonic()
+        turn = self._turns.get(call_id)
+        if turn is not None:
+            if now - turn.added_at > self._quiet_window:
+                self._dispatch(call_id, "quiet_window")
+                turn = None
+            elif now - turn.started_at >= self._max_delay:
+                self._dispatch(call_id, "max_delay")
+                turn = None
+        if turn is None:
+            turn = self._turns[call_id] = _PendingTurn(started_at=now)
+        turn.segments.append(segment)
+        turn.length += len(str(segment.get("Transcript", "")))
+        turn.added_at = now
+
+        if self._quiet_window <= 0:
+            self._dispatch(call_id, "segment")
+        elif turn.length >= self._max_length:
+            self._dispatch(call_id, "max_length")
+
+    def end_turn(self, call_id: str, reason: str = "channel") -> None:
+        """Dispatches the pending turn of a call"""
+        if call_id in self._turns:
+            self._dispatch(call_id, reason)
+
+    def _dispatch(self, call_id: str, reason: str) -> None:
+        turn = self._turns.pop(call_id, None)
+        if turn is None:
+            return
+        self._stats["requests"] += 1
+        self._stats[f"flush_{reason}"] = self._stats.get(f"flush_{reason}", 0) + 1
+        task = asyncio.ensure_future(self._dispatch_fn(merge_turn_segments(turn.segments)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        """Dispatches the pending turns and waits for the dispatches"""
+        for call_id in list(self._turns):
+            self._dispatch(call_id, "flush")
+        if not self._tasks:
+            return
+        results = await asyncio.gather(*self._tasks, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            self._stats["errors"] += len(errors)
+            LOGGER.warning(
+                "agent assist dispatch errors", extra=dict(errors=[str(e) for e in errors])
+            )
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Segment, request and flush reason counters"""
+        return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        """Clears the counters"""
+        self._stats = dict(segments=0, requests=0, errors=0)
@@ -0,0 +1,156 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+""" Async Lambda Invoker
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, Literal, Optional
+
+# third-party imports from Lambda layer
+from aws_lambda_powertools import Logger
+from botocore.exceptions import ClientError
+
+
+LOGGER = Logger(child=True, location="%(filename)s:%(lineno)d - %(funcName)s()")
+
+
+if TYPE_CHECKING:
+    from mypy_boto3_lambda.type_defs import InvocationResponseTypeDef
+    from mypy_boto3_lambda.client import LambdaClient
+else:
+    LambdaClient = object
+    InvocationResponseTypeDef = object
+
+InvocationType = Literal["RequestResponse", "Event"]
+
+RETRIABLE_ERROR_CODES = (
+    "ResourceConflictException",
+    "TooManyRequestsException",
+    "ServiceException",
+)
+
+
+class InvocationStats:
+    """Invocation timing of a hook type"""
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("count", "error_count", "retry_count", "duration_total", "duration_max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.error_count = 0
+        self.retry_count = 0
+        self.duration_total = 0.0
+        self.duration_max = 0.0
+
+    def to_dict(self) -> Dict[str, int]:
+        """Stats for logging and metrics"""
+        return dict(
+            count=self.count,
+            errors=self.error_count,
+            retries=self.retry_count,
+            duration_max_ms=round(self.duration_max * 1000),
+            duration_avg_ms=round(self.duration_total / self.count * 1000) if self.count else 0,
+        )
+
+
+class AsyncLambdaInvoker:
+    """Invokes Lambda functions without blocking the event loop
+
+    The synchronous boto3 invoke calls run in a dedicated thread pool of
+    max_concurrency workers which bounds the number of concurrent
+    invocations. Throttling and conflict errors are retried with a linear
+    backoff. Invocation timing is tracked per hook type.
+    """
+
+    DEFAULT_MAX_CONCURRENCY = 10
+
+    def __init__(
+        self,
+        lambda_client: LambdaClient,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = 3,
+        min_sleep_time: float = 0.25,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        self._lambda_client = lambda_client
+        self._max_retries = max_retries
+        self._min_sleep_time = min_sleep_time
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="lambda-invoker",
+        )
+        self._stats: Dict[str, InvocationStats] = {}
+
+    async def invoke(
+        self,
+        function_name: str,
+        payload: Any,
+        invocation_type: InvocationType = "RequestResponse",
+        hook_type: str = "default",
+    ) -> InvocationResponseTypeDef:
+        """Invokes a Lambda function in the thread pool
+
+        :param function_name: name or ARN of the function
+        :param payload: JSON serializable payload
+        :param invocation_type: RequestResponse or Event (asynchronous)
+        :param hook_type: name used to report the invocation timing
+        """
+        stats = self._stats.get(hook_type)
+        if stats is None:
+            stats = self._stats[hook_type] = InvocationStats()
+        serialized_payload = json.dumps(payload)
+        event_loop = asyncio.get_running_loop()
+        start_time = perf_counter()
+        retry_count = 0
+        try:
+            while True:
+                try:
+                    return await event_loop.run_in_executor(
+                        self._executor,
+                        lambda: self._lambda_client.invoke(
+                            FunctionName=function_name,
+                            InvocationType=invocation_type,
+                            Payload=serialized_payload,
+                        ),
+                    )
+                except ClientError as error:
+                    error_code = error.response.get("Error", {}).get("Code", "")
+                    if error_code not in RETRIABLE_ERROR_CODES or retry_count >= self._max_retries:
+                        raise
+                    retry_count += 1
+                    stats.retry_count += 1
+                    LOGGER.warning(
+                        "lambda invoke retriable exception",
+                        extra=dict(error=str(error), hook_type=hook_type, retry_count=retry_count),
+                    )
+                    await asyncio.sleep(self._min_sleep_time * retry_count)
+        except Exception:
+            stats.error_count += 1
+            LOGGER.exception("lambda invoke exception", extra=dict(hook_type=hook_type))
+            raise
+        finally:
+            duration = perf_counter() - start_time
+            stats.count += 1
+            stats.duration_total += duration
+            stats.duration_max = max(stats.duration_max, duration)
+            LOGGER.debug(
+                "lambda invoke",
+                extra=dict(
+                    hook_type=hook_type,
+                    invocation_type=invocation_type,
+                    duration_ms=round(duration * 1000),
+                ),
+            )
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Invocation stats by hook type"""
+        return {hook_type: stats.to_dict() for hook_type, stats in self._stats.items()}
+
+    def reset_stats(self) -> None:
+        """Clears the invocation stats"""
+        self._stats = {}
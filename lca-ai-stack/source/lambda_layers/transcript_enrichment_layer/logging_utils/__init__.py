@@ -0,0 +1,11 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Logging Utilities"""
+from .lazy_logging import DebugLogSampler, LazyJson, LazyStr, is_debug_enabled
+
+__all__ = [
+    "DebugLogSampler",
+    "LazyJson",
+    "LazyStr",
+    "is_debug_enabled",
+]
@@ -0,0 +1,78 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Lazy and Sampled Logging
+
+Log arguments that are expensive to format are wrapped so that they are only
+serialized when a handler emits the record. The debug level can be sampled
+per Lambda invocation so that a fraction of the batches are logged in full.
+"""
+import json
+import logging
+from random import random
+from typing import Any, Callable, Dict
+
+
+class LazyJson:
+    """Serializes a value to JSON when the log record is formatted"""
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("_value",)
+
+    def __init__(self, value: Any) -> None:
+        self._value = value
+
+    def __str__(self) -> str:
+        return json.dumps(self._value, default=str)
+
+
+class LazyStr:
+    """Calls a formatting function when the log record is formatted"""
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("_fn", "_args")
+
+    def __init__(self, fn: Callable[..., str], *args: Any) -> None:
+        self._fn = fn
+        self._args = args
+
+    def __str__(self) -> str:
+        return self._fn(*self._args)
+
+
+def is_debug_enabled(logger: Any) -> bool:
+    """Checks if a stdlib or powertools logger emits debug records"""
+    return logger.isEnabledFor(logging.DEBUG)
+
+
+class DebugLogSampler:
+    """Enables the debug level of a logger for a sample of the invocations
+
+    Unlike the powertools sampling rate that is drawn once per container,
+    sample() is called at the start of each invocation. Child loggers follow
+    the level of the logger.
+    """
+
+    def __init__(self, logger: Any, sample_rate: float = 0.0) -> None:
+        self._logger = logger
+        self._sample_rate = sample_rate
+        self._level = logger.level
+        self._stats: Dict[str, int] = dict(invocations=0, sampled=0)
+
+    def sample(self) -> bool:
+        """Sets the level of the logger for the invocation
+
+        :returns: True when the invocation is logged at the debug level
+        """
+        self._stats["invocations"] += 1
+        is_sampled = self._sample_rate > 0 and random() < self._sample_rate  # nosec
+        if is_sampled:
+            self._stats["sampled"] += 1
+            self._logger.setLevel(logging.DEBUG)
+        else:
+            self._logger.setLevel(self._level)
+        return is_sampled
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Number of invocations and sampled invocations"""
+        return dict(self._stats)
@@ -1,6 +1,44 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
-"""Sentiment Analysis"""
-from .weighted_sentiment import ComprehendWeightedSentiment
+"""Sentiment Analysis
 
-__all__ = ["ComprehendWeightedSentiment"]
+Submodules are imported on first attribute access so that importing the
+package does not load the sentiment helpers that are not used.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .comprehend_stub import StubComprehendClient
+    from .sentiment_aggregation import CallSentimentAggregate, SentimentAggregationStore
+    from .sentiment_batcher import SentimentBatcher
+    from .sentiment_cache import SentimentCache
+    from .weighted_sentiment import ComprehendWeightedSentiment
+
+_ATTRIBUTE_MODULES = {
+    "CallSentimentAggregate": ".sentiment_aggregation",
+    "ComprehendWeightedSentiment": ".weighted_sentiment",
+    "SentimentAggregationStore": ".sentiment_aggregation",
+    "SentimentBatcher": ".sentiment_batcher",
+    "SentimentCache": ".sentiment_cache",
+    "StubComprehendClient": ".comprehend_stub",
+}
+
+__all__ = [
+    "CallSentimentAggregate",
+    "ComprehendWeightedSentiment",
+    "SentimentAggregationStore",
+    "SentimentBatcher",
+    "SentimentCache",
+    "StubComprehendClient",
+]
+
+
+def __getattr__(name: str) -> Any:
+    """Imports the submodule of an attribute on first access"""
+    module_name = _ATTRIBUTE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
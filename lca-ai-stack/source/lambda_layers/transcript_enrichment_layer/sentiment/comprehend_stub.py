@@ -0,0 +1,61 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Comprehend Client Stub"""
+from time import sleep
+from typing import Any, Dict, List
+
+
+class StubComprehendClient:
+    """Offline Comprehend client stub
+
+    Implements detect_sentiment and batch_detect_sentiment with a keyword
+    lookup. Used to test sentiment detection without AWS credentials.
+    """
+
+    POSITIVE_WORDS = frozenset(("good", "great", "thank", "thanks", "happy", "excellent", "love"))
+    NEGATIVE_WORDS = frozenset(("bad", "terrible", "angry", "cancel", "problem", "awful", "hate"))
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls: Dict[str, int] = dict(detect_sentiment=0, batch_detect_sentiment=0)
+
+    def _get_sentiment(self, text: str) -> Dict[str, Any]:
+        words = {w.strip(".,!?").lower() for w in text.split()}
+        positive = len(words & self.POSITIVE_WORDS)
+        negative = len(words & self.NEGATIVE_WORDS)
+        total = positive + negative
+        if not total:
+            sentiment = "NEUTRAL"
+            score = dict(Positive=0.0, Negative=0.0, Neutral=1.0, Mixed=0.0)
+        else:
+            sentiment = "POSITIVE" if positive > negative else "NEGATIVE"
+            if positive == negative:
+                sentiment = "MIXED"
+            score = dict(
+                Positive=positive / total, Negative=negative / total, Neutral=0.0, Mixed=0.0
+            )
+        return dict(Sentiment=sentiment, SentimentScore=score)
+
+    def _sleep(self) -> None:
+        if self.latency:
+            sleep(self.latency)
+
+    def detect_sentiment(self, Text: str, LanguageCode: str) -> Dict[str, Any]:
+        """Stub of Comprehend DetectSentiment"""
+        # pylint: disable=invalid-name,unused-argument
+        self.calls["detect_sentiment"] += 1
+        self._sleep()
+        return self._get_sentiment(Text)
+
+    def batch_detect_sentiment(self, TextList: List[str], LanguageCode: str) -> Dict[str, Any]:
+        """Stub of Comprehend BatchDetectSentiment"""
+        # pylint: disable=invalid-name,unused-argument
+        self.calls["batch_detect_sentiment"] += 1
+        self._sleep()
+        return dict(
+            ResultList=[
+                dict(Index=index, **self._get_sentiment(text))
+                for index, text in enumerate(TextList)
+            ],
+            ErrorList=[],
+        )
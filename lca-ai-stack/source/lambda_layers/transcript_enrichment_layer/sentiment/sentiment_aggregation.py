@@ -0,0 +1,506 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Incremental Call Sentiment Aggregation"""
+import asyncio
+from collections import OrderedDict
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Set
+
+# third-party imports from Lambda layer
+from aws_lambda_powertools import Logger
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table as DynamoDbTable
+else:
+    DynamoDbTable = object
+
+LOGGER = Logger(child=True, location="%(filename)s:%(lineno)d - %(funcName)s()")
+
+CHANNELS = ("AGENT", "CALLER")
+
+
+def _to_decimal(value: float) -> Decimal:
+    # the DynamoDB resource does not accept floats
+    return Decimal(str(value))
+
+
+class ChannelSentimentAggregate:
+    """Running sentiment aggregate of a single channel
+
+    Keeps the sum and count used for the overall average and time buckets
+    of partial aggregates keyed by the segment end offset. Buckets double in
+    width when their number goes over max_buckets so that the state size is
+    bounded regardless of the call duration.
+    """
+
+    DEFAULT_BUCKET_WIDTH_MILLIS = 1000.0
+    DEFAULT_MAX_BUCKETS = 256
+
+    def __init__(
+        self,
+        bucket_width: float = DEFAULT_BUCKET_WIDTH_MILLIS,
+        max_buckets: int = DEFAULT_MAX_BUCKETS,
+    ) -> None:
+        self.score_sum: float = 0.0
+        self.count: int = 0
+        self.min_begin: Optional[float] = None
+        self.max_end: Optional[float] = None
+        self.bucket_width = bucket_width
+        self.max_buckets = max_buckets
+        # bucket index -> [score sum, count, min begin offset, max end offset]
+        self.buckets: Dict[int, List[float]] = {}
+
+    def add(self, begin_offset: float, end_offset: float, score: float) -> None:
+        """Adds a sentiment score to the running aggregate"""
+        self.score_sum += score
+        self.count += 1
+        self.min_begin = (
+            begin_offset if self.min_begin is None else min(self.min_begin, begin_offset)
+        )
+        self.max_end = end_offset if self.max_end is None else max(self.max_end, end_offset)
+
+        index = int(end_offset // self.bucket_width)
+        bucket = self.buckets.get(index)
+        if bucket is None:
+            self.buckets[index] = [score, 1, begin_offset, end_offset]
+        else:
+            bucket[0] += score
+            bucket[1] += 1
+            bucket[2] = min(bucket[2], begin_offset)
+            bucket[3] = max(bucket[3], end_offset)
+
+        if len(self.buckets) > self.max_buckets:
+            self._widen_buckets()
+
+    def _widen_buckets(self) -> None:
+        self.bucket_width = self.bucket_width * 2
+        buckets: Dict[int, List[float]] = {}
+        for bucket in self.buckets.values():
+            index = int(bucket[3] // self.bucket_width)
+            merged = buckets.get(index)
+            if merged is None:
+                buckets[index] = list(bucket)
+            else:
+                merged[0] += bucket[0]
+                merged[1] += bucket[1]
+                merged[2] = min(merged[2], bucket[2])
+                merged[3] = max(merged[3], bucket[3])
+        self.buckets = buckets
+
+    @property
+    def average(self) -> float:
+        """Overall sentiment average of the channel"""
+        return self.score_sum / self.count if self.count else 0
+
+    def get_sentiment_per_quarter(self) -> List[Dict[str, float]]:
+        """Sentiment averages by quarter of the channel time range
+
+        A bucket is assigned to the quarter containing its maximum end offset
+        """
+        if not self.count or self.min_begin is None or self.max_end is None:
+            return []
+        min_begin_time = self.min_begin
+        max_end_time = self.max_end
+        time_range = max_end_time - min_begin_time
+        time_ranges = [
+            (
+                max((min_begin_time + time_range * i / 4), min_begin_time),
+                min((min_begin_time + time_range * (i + 1) / 4), max_end_time),
+            )
+            for i in range(4)
+        ]
+        quarters: List[List[List[float]]] = [[] for _ in time_ranges]
+        for bucket in self.buckets.values():
+            for quarter, (range_begin, range_end) in zip(quarters, time_ranges):
+                if range_begin < bucket[3] <= range_end:
+                    quarter.append(bucket)
+                    break
+
+        sentiment_per_quarter = []
+        for quarter in quarters:
+            count = sum(b[1] for b in quarter)
+            sentiment_per_quarter.append(
+                {
+                    "Score": sum(b[0] for b in quarter) / count if count else 0,
+                    "BeginOffsetMillis": min(b[2] for b in quarter) if quarter else 0,
+                    "EndOffsetMillis": max(b[3] for b in quarter) if quarter else 0,
+                }
+            )
+
+        return sentiment_per_quarter
+
+    def get_bucket_attribute(self, index: int) -> List[Decimal]:
+        """State table value of a bucket"""
+        return [_to_decimal(v) for v in self.buckets[index]]
+
+    def to_attributes(self, channel: str) -> Dict[str, Any]:
+        """State table attributes of the channel aggregate"""
+        return {
+            f"ScoreSum_{channel}": _to_decimal(self.score_sum),
+            f"Count_{channel}": self.count,
+            f"MinBegin_{channel}": _to_decimal(self.min_begin or 0.0),
+            f"MaxEnd_{channel}": _to_decimal(self.max_end or 0.0),
+            f"BucketWidth_{channel}": _to_decimal(self.bucket_width),
+            f"Buckets_{channel}": {
+                str(index): self.get_bucket_attribute(index) for index in self.buckets
+            },
+        }
+
+    @classmethod
+    def from_attributes(
+        cls, item: Dict[str, Any], channel: str
+    ) -> Optional["ChannelSentimentAggregate"]:
+        """Builds the channel aggregate from the attributes of a state table item"""
+        if f"Count_{channel}" not in item:
+            return None
+        aggregate = cls(bucket_width=float(item[f"BucketWidth_{channel}"]))
+        aggregate.score_sum = float(item[f"ScoreSum_{channel}"])
+        aggregate.count = int(item[f"Count_{channel}"])
+        aggregate.min_begin = float(item[f"MinBegin_{channel}"])
+        aggregate.max_end = float(item[f"MaxEnd_{channel}"])
+        aggregate.buckets = {
+            int(index): [float(v) for v in bucket]
+            for index, bucket in item[f"Buckets_{channel}"].items()
+        }
+        return aggregate
+
+
+class CallSentimentAggregate:
+    """Running sentiment aggregate of a call
+
+    A window of the most recent segment Ids is kept so that retried or
+    replayed segments are not counted twice. The segments added since the
+    aggregate was loaded or saved are kept until it is saved so that they can
+    be applied again to a newer stored aggregate and so that only the changed
+    attributes are written.
+    """
+
+    MAX_SEGMENT_IDS = 500
+    # pending segments above which the whole item is put instead of updated
+    MAX_UPDATE_SEGMENTS = 20
+
+    def __init__(self, call_id: str) -> None:
+        self.call_id = call_id
+        # revision of the stored aggregate this state is based on (0 if not stored)
+        self.revision: int = 0
+        self.pending_segments: List[Dict[str, Any]] = []
+        self.channels: Dict[str, ChannelSentimentAggregate] = {}
+        # segment id -> sequence number
+        self._segment_ids: "OrderedDict[str, int]" = OrderedDict()
+        self._segment_sequence = 0
+        # state of the stored revision used to get the changed attributes
+        self._stored_segment_ids: Set[str] = set()
+        self._stored_bucket_widths: Dict[str, float] = {}
+
+    def add_segment(self, segment: Dict[str, Any]) -> bool:
+        """Adds a transcript segment with weighted sentiment to the aggregate
+
+        Uses the StartTime/EndTime (seconds), Channel, SegmentId and
+        SentimentWeighted fields of the transcript segment. Returns False if
+        the segment does not contribute to the aggregate.
+        """
+        channel = segment.get("Channel")
+        score = segment.get("SentimentWeighted")
+        segment_id = segment.get("SegmentId")
+        if channel not in CHANNELS or not score or not segment_id:
+            return False
+        if segment_id in self._segment_ids:
+            return False
+
+        self._segment_sequence += 1
+        self._segment_ids[segment_id] = self._segment_sequence
+        if len(self._segment_ids) > self.MAX_SEGMENT_IDS:
+            self._segment_ids.popitem(last=False)
+
+        if channel not in self.channels:
+            self.channels[channel] = ChannelSentimentAggregate()
+        self.channels[channel].add(
+            begin_offset=float(segment["StartTime"]) * 1000,
+            end_offset=float(segment["EndTime"]) * 1000,
+            score=float(score),
+        )
+        self.pending_segments.append(segment)
+        return True
+
+    def get_sentiment(self) -> Dict[str, Any]:
+        """Sentiment in the shape of the updateCallAggregation input"""
+        overall_sentiment = {}
+        sentiment_by_period_by_channel = {}
+        for channel, aggregate in self.channels.items():
+            overall_sentiment[channel] = aggregate.average
+            sentiment_by_period_by_channel[channel] = aggregate.get_sentiment_per_quarter()
+
+        return {
+            "OverallSentiment": overall_sentiment,
+            "SentimentByPeriod": {
+                "QUARTER": sentiment_by_period_by_channel,
+            },
+        }
+
+    def to_item(self) -> Dict[str, Any]:
+        """State table attributes of the aggregate (without the keys)"""
+        item: Dict[str, Any] = dict(SegmentIds=dict(self._segment_ids))
+        for channel, aggregate in self.channels.items():
+            item.update(aggregate.to_attributes(channel))
+        return item
+
+    def get_update(self, expires_after: int) -> Optional[Dict[str, Any]]:
+        """State table update of the pending segments
+
+        Returns the update_item arguments (without the key) that apply the
+        pending segments to the stored revision: the counters are added, the
+        changed buckets and segment ids are set and the segment ids out of the
+        window are removed. Returns None when the aggregate is not stored yet
+        or has too many pending segments to update.
+        """
+        if not self.revision or len(self.pending_segments) > self.MAX_UPDATE_SEGMENTS:
+            return None
+        names: Dict[str, str] = {}
+        values: Dict[str, Any] = {}
+
+        def get_path(*path: str) -> str:
+            placeholders = []
+            for name in path:
+                placeholder = f"#n{len(names)}"
+                names[placeholder] = name
+                placeholders.append(placeholder)
+            return ".".join(placeholders)
+
+        def get_value(value: Any) -> str:
+            placeholder = f":v{len(values)}"
+            values[placeholder] = value
+            return placeholder
+
+        set_actions = [
+            f"{get_path('Version')} = {get_value(self.revision + 1)}",
+            f"{get_path('ExpiresAfter')} = {get_value(expires_after)}",
+        ]
+        add_actions: List[str] = []
+        remove_actions: List[str] = []
+        for channel, aggregate in self.channels.items():
+            segments = [s for s in self.pending_segments if s["Channel"] == channel]
+            if not segments:
+                continue
+            add_actions.append(
+                f"{get_path(f'ScoreSum_{channel}')} "
+                f"{get_value(_to_decimal(sum(float(s['SentimentWeighted']) for s in segments)))}"
+            )
+            add_actions.append(f"{get_path(f'Count_{channel}')} {get_value(len(segments))}")
+            attributes = aggregate.to_attributes(channel)
+            names_to_set = [f"MinBegin_{channel}", f"MaxEnd_{channel}"]
+            if self._stored_bucket_widths.get(channel) != aggregate.bucket_width:
+                # new channel or widened buckets
+                names_to_set.extend([f"BucketWidth_{channel}", f"Buckets_{channel}"])
+            else:
+                indexes = {
+                    int(float(s["EndTime"]) * 1000 // aggregate.bucket_width) for s in segments
+                }
+                set_actions.extend(
+                    f"{get_path(f'Buckets_{channel}', str(index))} = "
+                    f"{get_value(aggregate.get_bucket_attribute(index))}"
+                    for index in sorted(indexes)
+                )
+            set_actions.extend(
+                f"{get_path(name)} = {get_value(attributes[name])}" for name in names_to_set
+            )
+
+        for segment_id, sequence in self._segment_ids.items():
+            if segment_id not in self._stored_segment_ids:
+                set_actions.append(f"{get_path('SegmentIds', segment_id)} = {get_value(sequence)}")
+        remove_actions.extend(
+            get_path("SegmentIds", segment_id)
+            for segment_id in sorted(self._stored_segment_ids.difference(self._segment_ids))
+        )
+
+        expression = f"SET {', '.join(set_actions)} ADD {', '.join(add_actions)}"
+        if remove_actions:
+            expression = f"{expression} REMOVE {', '.join(remove_actions)}"
+        return dict(
+            UpdateExpression=expression,
+            ConditionExpression=f"{get_path('Version')} = {get_value(self.revision)}",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+
+    def set_stored(self, revision: int) -> None:
+        """Notes that the aggregate is the stored revision"""
+        self.revision = revision
+        self.pending_segments.clear()
+        self._stored_segment_ids = set(self._segment_ids)
+        self._stored_bucket_widths = {k: v.bucket_width for k, v in self.channels.items()}
+
+    @classmethod
+    def from_item(cls, call_id: str, item: Dict[str, Any]) -> "CallSentimentAggregate":
+        """Builds the aggregate from its state table item"""
+        aggregate = cls(call_id=call_id)
+        for channel in CHANNELS:
+            channel_aggregate = ChannelSentimentAggregate.from_attributes(item, channel)
+            if channel_aggregate is not None:
+                aggregate.channels[channel] = channel_aggregate
+        segment_ids = sorted(item.get("SegmentIds", {}).items(), key=lambda i: int(i[1]))
+        aggregate._segment_ids = OrderedDict((k, int(v)) for k, v in segment_ids)
+        aggregate._segment_sequence = max(aggregate._segment_ids.values(), default=0)
+        aggregate.set_stored(revision=int(item.get("Version", 0)))
+        return aggregate
+
+
+class SentimentAggregationStore:
+    """Call Sentiment Aggregation Store
+
+    Keeps the running sentiment aggregate of calls in an in memory LRU cache
+    that is reused across warm invocations. The aggregates are persisted in
+    the state DynamoDB table with a revision so that the records of a call
+    processed by another container are not overwritten.
+    """
+
+    DEFAULT_MAX_CACHED_CALLS = 1000
+    DEFAULT_MAX_SAVE_ATTEMPTS = 3
+    PK_PREFIX = "agg#"
+    SK = "sentiment"
+
+    def __init__(
+        self,
+        state_table: Optional[DynamoDbTable] = None,
+        max_cached_calls: int = DEFAULT_MAX_CACHED_CALLS,
+        max_save_attempts: int = DEFAULT_MAX_SAVE_ATTEMPTS,
+    ) -> None:
+        self._state_table = state_table
+        self._max_cached_calls = max_cached_calls
+        self._max_save_attempts = max_save_attempts
+        self._cache: "OrderedDict[str, CallSentimentAggregate]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def lock(self, call_id: str) -> asyncio.Lock:
+        """Lock used to serialize load/update/save of a call aggregate"""
+        if call_id not in self._locks:
+            self._locks[call_id] = asyncio.Lock()
+        return self._locks[call_id]
+
+    def _cache_put(self, aggregate: CallSentimentAggregate) -> None:
+        self._cache[aggregate.call_id] = aggregate
+        self._cache.move_to_end(aggregate.call_id)
+        while len(self._cache) > self._max_cached_calls:
+            call_id, _ = self._cache.popitem(last=False)
+            lock = self._locks.get(call_id)
+            if lock and not lock.locked():
+                del self._locks[call_id]
+
+    def discard(self, call_id: str) -> None:
+        """Removes a call aggregate from the in memory cache"""
+        self._cache.pop(call_id, None)
+
+    async def _load(self, call_id: str) -> Optional[CallSentimentAggregate]:
+        if not self._state_table:
+            return None
+        state_table = self._state_table
+        event_loop = asyncio.get_running_loop()
+        response = await event_loop.run_in_executor(
+            None,
+            lambda: state_table.get_item(
+                Key={"PK": f"{self.PK_PREFIX}{call_id}", "SK": self.SK},
+                ConsistentRead=True,
+            ),
+        )
+        item = response.get("Item")
+        if not item:
+            return None
+        return CallSentimentAggregate.from_item(call_id=call_id, item=item)
+
+    async def get(
+        self,
+        call_id: str,
+        seed_fn: Callable[[CallSentimentAggregate], Awaitable[None]],
+    ) -> CallSentimentAggregate:
+        """Gets a call aggregate
+
+        Looks up the in memory cache and then the state table. If the
+        aggregate is not found, an empty one is created and passed to
+        seed_fn to fill it with the segments already stored for the call.
+        """
+        aggregate = self._cache.get(call_id)
+        if aggregate is not None:
+            self._cache.move_to_end(call_id)
+            return aggregate
+
+        try:
+            aggregate = await self._load(call_id)
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.warning("unable to load sentiment aggregate: %s", error)
+        if aggregate is None:
+            LOGGER.debug("seeding sentiment aggregate", extra=dict(call_id=call_id))
+            aggregate = CallSentimentAggregate(call_id=call_id)
+            await seed_fn(aggregate)
+
+        self._cache_put(aggregate)
+        return aggregate
+
+    async def _write(self, aggregate: CallSentimentAggregate, expires_after: int) -> None:
+        state_table = self._state_table
+        if not state_table:
+            return
+        key = {"PK": f"{self.PK_PREFIX}{aggregate.call_id}", "SK": self.SK}
+        revision = aggregate.revision
+        update = aggregate.get_update(expires_after)
+        if update is not None:
+            request: Dict[str, Any] = dict(Key=key, **update)
+            write_fn: Callable[..., Any] = state_table.update_item
+        else:
+            item = {
+                **key,
+                **aggregate.to_item(),
+                "CallId": aggregate.call_id,
+                "Version": revision + 1,
+                "ExpiresAfter": expires_after,
+            }
+            if revision:
+                request = dict(
+                    Item=item,
+                    ConditionExpression="Version = :revision",
+                    ExpressionAttributeValues={":revision": revision},
+                )
+            else:
+                request = dict(Item=item, ConditionExpression="attribute_not_exists(PK)")
+            write_fn = state_table.put_item
+        event_loop = asyncio.get_running_loop()
+        await event_loop.run_in_executor(None, lambda: write_fn(**request))
+
+    async def save(
+        self, aggregate: CallSentimentAggregate, expires_after: int
+    ) -> CallSentimentAggregate:
+        """Persists the pending segments of a call aggregate
+
+        The pending segments are written as an update of the stored revision
+        (the changed attributes only) conditioned on the stored revision
+        being the one the aggregate is based on. On a conflict (the call was
+        updated by another container), the stored aggregate is reloaded, the
+        pending segments are applied to it and the write is retried. An
+        aggregate without pending segments is not written or read. Returns
+        the saved aggregate - its sentiment is the one to send.
+        """
+        if not self._state_table:
+            aggregate.pending_segments.clear()
+            return aggregate
+        call_id = aggregate.call_id
+        for _ in range(self._max_save_attempts):
+            if not aggregate.pending_segments:
+                return aggregate
+            try:
+                await self._write(aggregate, expires_after)
+                aggregate.set_stored(revision=aggregate.revision + 1)
+                return aggregate
+            except self._state_table.meta.client.exceptions.ConditionalCheckFailedException:
+                LOGGER.info(
+                    "sentiment aggregate revision conflict - reloading",
+                    extra=dict(call_id=call_id, revision=aggregate.revision),
+                )
+            stored = await self._load(call_id) or CallSentimentAggregate(call_id=call_id)
+            for segment in aggregate.pending_segments:
+                stored.add_segment(segment)
+            self._cache_put(stored)
+            aggregate = stored
+
+        self.discard(call_id)
+        raise RuntimeError(
+            f"sentiment aggregate of call {call_id} not saved after "
+            f"{self._max_save_attempts} attempts"
+        )
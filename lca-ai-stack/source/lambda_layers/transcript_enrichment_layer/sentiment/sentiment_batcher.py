@@ -0,0 +1,173 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Batched Comprehend Sentiment Detection"""
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, List, Set
+
+# third-party imports from Lambda layer
+from aws_lambda_powertools import Logger
+
+if TYPE_CHECKING:
+    from mypy_boto3_comprehend.client import ComprehendClient
+    from mypy_boto3_comprehend.type_defs import DetectSentimentResponseTypeDef
+else:
+    ComprehendClient = object
+    DetectSentimentResponseTypeDef = object
+
+
+LOGGER = Logger(child=True, location="%(filename)s:%(lineno)d - %(funcName)s()")
+
+
+def _get_error_code(error: Exception) -> str:
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code", "")
+
+
+class _PendingText:
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("text", "future")
+
+    def __init__(self, text: str, future: "asyncio.Future[Dict[str, Any]]") -> None:
+        self.text = text
+        self.future = future
+
+
+class SentimentBatcher:
+    """Micro-batches Comprehend sentiment detection
+
+    Texts requested within batch_window seconds of each other are grouped by
+    language and sent with BatchDetectSentiment in groups of up to
+    max_batch_size (the Comprehend limit is 25). Texts that fail in a batch
+    or whose batch request fails are retried with DetectSentiment so that
+    errors surface per text. Batching is turned off when the role is not
+    allowed to call BatchDetectSentiment.
+    """
+
+    MAX_BATCH_SIZE = 25
+    DEFAULT_BATCH_WINDOW = 0.020
+
+    def __init__(
+        self,
+        comprehend_client: ComprehendClient,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+    ) -> None:
+        self._comprehend_client = comprehend_client
+        self._max_batch_size = min(max_batch_size, self.MAX_BATCH_SIZE)
+        self._batch_window = batch_window
+        self._pending: Dict[str, List[_PendingText]] = {}
+        self._flush_tasks: Dict[str, "asyncio.Future[None]"] = {}
+        self._tasks: Set["asyncio.Future[None]"] = set()
+        self.request_count = 0
+        self.text_count = 0
+
+    async def detect_sentiment(
+        self,
+        text: str,
+        language_code: str,
+    ) -> DetectSentimentResponseTypeDef:
+        """Detects the sentiment of a text as part of a batch
+
+        :returns: dict with the Sentiment and SentimentScore of the text
+        """
+        self.text_count += 1
+        if not text.strip() or self._max_batch_size <= 1:
+            return await self._detect_sentiment(text=text, language_code=language_code)
+
+        future: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(language_code, [])
+        pending.append(_PendingText(text=text, future=future))
+        if len(pending) >= self._max_batch_size:
+            self._start_task(self._execute_batch(language_code, self._take_batch(language_code)))
+        elif language_code not in self._flush_tasks:
+            self._flush_tasks[language_code] = self._start_task(self._delayed_flush(language_code))
+
+        return await future  # type: ignore
+
+    def _start_task(self, coroutine) -> "asyncio.Future[None]":
+        task = asyncio.ensure_future(coroutine)
+        # keeps a reference to the task until it is done
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _delayed_flush(self, language_code: str) -> None:
+        await asyncio.sleep(self._batch_window)
+        self._flush_tasks.pop(language_code, None)
+        while self._pending.get(language_code):
+            await self._execute_batch(language_code, self._take_batch(language_code))
+
+    def _take_batch(self, language_code: str) -> List[_PendingText]:
+        pending = self._pending.get(language_code, [])
+        self._pending[language_code] = pending[self._max_batch_size :]
+        return pending[: self._max_batch_size]
+
+    async def _detect_sentiment(self, text: str, language_code: str) -> Dict[str, Any]:
+        self.request_count += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: self._comprehend_client.detect_sentiment(
+                Text=text,
+                LanguageCode=language_code,  # type: ignore
+            ),
+        )
+
+    async def _execute_batch(self, language_code: str, batch: List[_PendingText]) -> None:
+        if not batch:
+            return
+        if len(batch) == 1:
+            await self._execute_single(language_code, batch[0])
+            return
+
+        self.request_count += 1
+        loop = asyncio.get_running_loop()
+        try:
+            response = await loop.run_in_executor(
+                None,
+                lambda: self._comprehend_client.batch_detect_sentiment(
+                    TextList=[p.text for p in batch],
+                    LanguageCode=language_code,  # type: ignore
+                ),
+            )
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.warning("batch detect sentiment error: %s", error)
+            if _get_error_code(error) == "AccessDeniedException":
+                # not allowed by the role - texts are sent one at a time from now on
+                self._max_batch_size = 1
+            await asyncio.gather(*(self._execute_single(language_code, p) for p in batch))
+            return
+
+        results: Dict[int, Dict[str, Any]] = {r["Index"]: r for r in response.get("ResultList", [])}
+        failed: List[_PendingText] = []
+        for index, pending in enumerate(batch):
+            result = results.get(index)
+            if result is None:
+                failed.append(pending)
+            else:
+                pending.future.set_result(
+                    dict(Sentiment=result["Sentiment"], SentimentScore=result["SentimentScore"])
+                )
+        if failed:
+            LOGGER.warning(
+                "batch detect sentiment errors",
+                extra=dict(errors=response.get("ErrorList", [])),
+            )
+            await asyncio.gather(*(self._execute_single(language_code, p) for p in failed))
+
+    async def _execute_single(self, language_code: str, pending: _PendingText) -> None:
+        try:
+            result = await self._detect_sentiment(text=pending.text, language_code=language_code)
+            pending.future.set_result(result)
+        except Exception as error:  # pylint: disable=broad-except
+            pending.future.set_exception(error)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Number of texts and Comprehend requests"""
+        return dict(texts=self.text_count, comprehend_requests=self.request_count)
+
+    def reset_stats(self) -> None:
+        """Clears the counters"""
+        self.request_count = 0
+        self.text_count = 0
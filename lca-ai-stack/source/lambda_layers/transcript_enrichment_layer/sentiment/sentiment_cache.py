@@ -0,0 +1,195 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Sentiment Cache"""
+import asyncio
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# third-party imports from Lambda layer
+from aws_lambda_powertools import Logger
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table as DynamoDbTable
+else:
+    DynamoDbTable = object
+
+LOGGER = Logger(child=True, location="%(filename)s:%(lineno)d - %(funcName)s()")
+
+CacheKeyType = Tuple[str, str]
+DetectSentimentFnType = Callable[[], Awaitable[Dict[str, Any]]]
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " .,!?;:\"'"
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes a text for sentiment lookups
+
+    Lower cases the text, collapses whitespace and strips the punctuation
+    around it.
+    """
+    return _WHITESPACE_PATTERN.sub(" ", text.lower()).strip(_EDGE_PUNCTUATION)
+
+
+class SentimentCache:
+    """Memoizes the Comprehend sentiment of short utterances
+
+    Bounded LRU keyed by language code and normalized text holding the raw
+    Sentiment and SentimentScore so that the weighted sentiment is derived
+    locally. Only texts with a normalized length between min_text_length and
+    max_text_length are cached as longer utterances rarely repeat. Misses can
+    optionally be looked up in a DynamoDB table shared by the Lambda
+    containers where the entries expire through the table TTL.
+    Concurrent lookups of the same text share a single detection.
+    """
+
+    DEFAULT_MAX_SIZE = 10000
+    DEFAULT_MIN_TEXT_LENGTH = 2
+    DEFAULT_MAX_TEXT_LENGTH = 100
+    DEFAULT_TTL_DAYS = 7
+    PK_PREFIX = "snt#"
+    SK = "sentiment"
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+        min_text_length: int = DEFAULT_MIN_TEXT_LENGTH,
+        max_text_length: int = DEFAULT_MAX_TEXT_LENGTH,
+        state_table: Optional[DynamoDbTable] = None,
+        ttl_days: int = DEFAULT_TTL_DAYS,
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        self._max_size = max_size
+        self._min_text_length = min_text_length
+        self._max_text_length = max_text_length
+        self._state_table = state_table
+        self._ttl_days = ttl_days
+        self._cache: "OrderedDict[CacheKeyType, Dict[str, Any]]" = OrderedDict()
+        self._in_flight: Dict[CacheKeyType, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._stats: Dict[str, int] = {}
+        self.reset_stats()
+
+    def _get_key(self, text: str, language_code: str) -> Optional[CacheKeyType]:
+        normalized_text = normalize_text(text)
+        if not self._min_text_length <= len(normalized_text) <= self._max_text_length:
+            return None
+        return (language_code, normalized_text)
+
+    async def get_sentiment(
+        self,
+        text: str,
+        language_code: str,
+        detect_sentiment_fn: DetectSentimentFnType,
+    ) -> Dict[str, Any]:
+        """Gets the sentiment of a text from the cache or detect_sentiment_fn
+
+        :param text: utterance text
+        :param language_code: Comprehend language code
+        :param detect_sentiment_fn: called on a miss - returns a Comprehend
+            DetectSentiment response
+        :returns: dict with the Sentiment and SentimentScore of the text
+        """
+        key = self._get_key(text=text, language_code=language_code)
+        if key is None:
+            self._stats["skipped"] += 1
+            return await detect_sentiment_fn()
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self._stats["hits"] += 1
+            return cached
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self._stats["hits"] += 1
+            return await asyncio.shield(in_flight)
+
+        future: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            sentiment = await self._load(key)
+            if sentiment is not None:
+                self._stats["table_hits"] += 1
+            else:
+                self._stats["misses"] += 1
+                response = await detect_sentiment_fn()
+                sentiment = dict(
+                    Sentiment=response["Sentiment"],
+                    SentimentScore=response["SentimentScore"],
+                )
+                await self._save(key, sentiment)
+            self._put(key, sentiment)
+            future.set_result(sentiment)
+            return sentiment
+        except Exception as error:
+            future.set_exception(error)
+            # retrieves the exception so that it is not reported as unhandled
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def _put(self, key: CacheKeyType, sentiment: Dict[str, Any]) -> None:
+        self._cache[key] = sentiment
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+
+    def _get_pk(self, key: CacheKeyType) -> str:
+        language_code, normalized_text = key
+        digest = hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+        return f"{self.PK_PREFIX}{language_code}#{digest}"
+
+    async def _load(self, key: CacheKeyType) -> Optional[Dict[str, Any]]:
+        if not self._state_table:
+            return None
+        state_table = self._state_table
+        event_loop = asyncio.get_running_loop()
+        try:
+            response = await event_loop.run_in_executor(
+                None,
+                lambda: state_table.get_item(Key={"PK": self._get_pk(key), "SK": self.SK}),
+            )
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.warning("sentiment cache get exception", extra=dict(error=str(error)))
+            return None
+        item = response.get("Item")
+        if not item:
+            return None
+        # scores are stored as a JSON string to keep them as floats
+        return dict(Sentiment=item["Sentiment"], SentimentScore=json.loads(item["SentimentScore"]))
+
+    async def _save(self, key: CacheKeyType, sentiment: Dict[str, Any]) -> None:
+        if not self._state_table:
+            return
+        state_table = self._state_table
+        expires_after = int((datetime.utcnow() + timedelta(days=self._ttl_days)).timestamp())
+        event_loop = asyncio.get_running_loop()
+        try:
+            await event_loop.run_in_executor(
+                None,
+                lambda: state_table.put_item(
+                    Item={
+                        "PK": self._get_pk(key),
+                        "SK": self.SK,
+                        "Sentiment": sentiment["Sentiment"],
+                        "SentimentScore": json.dumps(sentiment["SentimentScore"]),
+                        "ExpiresAfter": expires_after,
+                    }
+                ),
+            )
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.warning("sentiment cache put exception", extra=dict(error=str(error)))
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Cache hits, misses, table hits and skipped texts"""
+        return dict(self._stats, size=len(self._cache))
+
+    def reset_stats(self) -> None:
+        """Clears the counters"""
+        self._stats = dict(hits=0, misses=0, table_hits=0, skipped=0)
@@ -1,6 +1,56 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
-"""Transcript Batch Processor"""
-from .transcript_batch_processor import TranscriptBatchProcessor
+"""Transcript Batch Processor
 
-__all__ = ["TranscriptBatchProcessor"]
+Submodules are imported on first attribute access so that importing the
+package does not load the batch processor dependencies.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .batch_item_failures import get_batch_item_failures, is_retryable_error
+    from .call_aggregation_batch import CallAggregationBatch, PendingCallAggregation
+    from .call_lane_scheduler import CallLaneScheduler, LaneStats
+    from .partial_transcript_coalescing import (
+        coalesce_partial_transcripts,
+        drop_partial_transcripts,
+    )
+    from .task_graph import TaskGraph
+    from .transcript_batch_processor import TranscriptBatchProcessor
+
+_ATTRIBUTE_MODULES = {
+    "CallAggregationBatch": ".call_aggregation_batch",
+    "CallLaneScheduler": ".call_lane_scheduler",
+    "LaneStats": ".call_lane_scheduler",
+    "PendingCallAggregation": ".call_aggregation_batch",
+    "TaskGraph": ".task_graph",
+    "TranscriptBatchProcessor": ".transcript_batch_processor",
+    "coalesce_partial_transcripts": ".partial_transcript_coalescing",
+    "drop_partial_transcripts": ".partial_transcript_coalescing",
+    "get_batch_item_failures": ".batch_item_failures",
+    "is_retryable_error": ".batch_item_failures",
+}
+
+__all__ = [
+    "CallAggregationBatch",
+    "CallLaneScheduler",
+    "LaneStats",
+    "PendingCallAggregation",
+    "TaskGraph",
+    "TranscriptBatchProcessor",
+    "coalesce_partial_transcripts",
+    "drop_partial_transcripts",
+    "get_batch_item_failures",
+    "is_retryable_error",
+]
+
+
+def __getattr__(name: str) -> Any:
+    """Imports the submodule of an attribute on first access"""
+    module_name = _ATTRIBUTE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,49 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+""" Kinesis Batch Item Failures
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+# module imports from Lambda layer
+# pylint: disable=import-error
+from appsync_utils import classify_error
+
+# pylint: enable=import-error
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Checks if replaying the record of an error may succeed
+
+    Validation errors (e.g. invalid input or a bug in the record mapping)
+    fail the same way when the record is replayed
+    """
+    return classify_error(error) != "validation"
+
+
+def get_shard_id(event_id: Optional[str]) -> str:
+    """Gets the shard of a Kinesis record from its event ID (shardId-...:sequenceNumber)"""
+    return (event_id or "").rpartition(":")[0]
+
+
+def get_batch_item_failures(records: Iterable[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Gets the batch item failures of the failed records of a batch
+
+    Lambda checkpoints a shard before the lowest sequence number reported so
+    only the first failed record of each shard is reported. The records
+    before it are not replayed.
+
+    :param records: processed records with their sequence_number, shard_id
+        and failed flag
+    """
+    first_failures: Dict[str, str] = {}
+    for record in records:
+        sequence_number = record.get("sequence_number")
+        if not record.get("failed") or not sequence_number:
+            continue
+        shard_id = record.get("shard_id") or ""
+        first_failure = first_failures.get(shard_id)
+        # sequence numbers are decimal strings of increasing values within a shard
+        if first_failure is None or int(sequence_number) < int(first_failure):
+            first_failures[shard_id] = sequence_number
+
+    return [dict(itemIdentifier=sequence_number) for sequence_number in first_failures.values()]
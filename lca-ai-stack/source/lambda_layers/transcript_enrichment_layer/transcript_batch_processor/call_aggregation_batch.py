@@ -0,0 +1,73 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+""" Batch Scoped Call Aggregation
+"""
+from typing import Any, Dict, List, Optional
+
+
+class PendingCallAggregation:
+    """Call aggregation requested by the records of a batch"""
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("call_id", "message", "sentiment_segments", "request_count")
+
+    def __init__(self, call_id: str) -> None:
+        self.call_id = call_id
+        # final transcript message with the latest end time
+        self.message: Optional[Dict[str, Any]] = None
+        self.sentiment_segments: List[Dict[str, Any]] = []
+        self.request_count = 0
+
+
+class CallAggregationBatch:
+    """Collects the call aggregation requests of a Kinesis batch
+
+    Records with final transcript segments register their call instead of
+    issuing an aggregation mutation. The batch processor then runs a single
+    aggregation per CallId after all the segment writes of the batch are done.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[str, PendingCallAggregation] = {}
+        self._request_count = 0
+        self._call_count = 0
+
+    def add(
+        self,
+        message: Dict[str, Any],
+        sentiment_segments: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        """Registers a call aggregation request
+
+        :param message: final transcript segment that triggered the aggregation
+        :param sentiment_segments: segments with sentiment to be added to the
+            call sentiment aggregate
+        """
+        call_id = str(message["CallId"])
+        pending = self._pending.get(call_id)
+        if pending is None:
+            pending = self._pending[call_id] = PendingCallAggregation(call_id=call_id)
+            self._call_count += 1
+        if pending.message is None or float(message.get("EndTime") or 0.0) >= float(
+            pending.message.get("EndTime") or 0.0
+        ):
+            pending.message = message
+        pending.sentiment_segments.extend(sentiment_segments or [])
+        pending.request_count += 1
+        self._request_count += 1
+
+    def pop_all(self) -> List[PendingCallAggregation]:
+        """Returns and clears the pending call aggregations"""
+        pending = list(self._pending.values())
+        self._pending = {}
+        return pending
+
+    @property
+    def request_count(self) -> int:
+        """Number of aggregation requests registered in the batch"""
+        return self._request_count
+
+    @property
+    def coalesced_count(self) -> int:
+        """Number of aggregation requests that were merged into another one"""
+        return self._request_count - self._call_count
@@ -0,0 +1,107 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+""" Per Call Lane Scheduler
+"""
+import asyncio
+from time import perf_counter
+from typing import Any, Coroutine, Dict, List, Optional, Sequence, Tuple, Union
+
+LaneItemType = Tuple[str, Coroutine[Any, Any, Any]]
+
+
+class LaneStats:
+    """Queue depth and wait time of a lane"""
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("key", "depth", "wait_total", "wait_max")
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        # number of items queued in the lane
+        self.depth = 0
+        # seconds between the start of the run and the start of each item
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Lane stats for logging"""
+        return dict(
+            lane=self.key,
+            depth=self.depth,
+            wait_max_ms=round(self.wait_max * 1000),
+            wait_avg_ms=round(self.wait_total / self.depth * 1000) if self.depth else 0,
+        )
+
+
+class CallLaneScheduler:
+    """Runs coroutines in order within a lane and concurrently across lanes
+
+    Lanes are keyed by call so that the records of a call are applied in
+    stream order while different calls progress in parallel. The number of
+    coroutines running at the same time across all lanes is bounded by
+    max_concurrency (unbounded when it is not positive).
+    """
+
+    DEFAULT_MAX_CONCURRENCY = 20
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+        self._max_concurrency = max_concurrency
+        self._lane_stats: Dict[str, LaneStats] = {}
+
+    async def run(self, items: Sequence[LaneItemType]) -> List[Union[Any, Exception]]:
+        """Runs the coroutines of the (lane key, coroutine) items
+
+        :returns: results or exceptions in the order of the items
+        """
+        results: List[Union[Any, Exception]] = [None] * len(items)
+        lanes: Dict[str, List[Tuple[int, Coroutine[Any, Any, Any]]]] = {}
+        for index, (key, coroutine) in enumerate(items):
+            lanes.setdefault(key, []).append((index, coroutine))
+        semaphore: Optional[asyncio.Semaphore] = (
+            asyncio.Semaphore(self._max_concurrency) if self._max_concurrency > 0 else None
+        )
+        start_time = perf_counter()
+
+        async def run_lane(key: str, lane: List[Tuple[int, Coroutine[Any, Any, Any]]]) -> None:
+            stats = self._lane_stats.get(key)
+            if stats is None:
+                stats = self._lane_stats[key] = LaneStats(key=key)
+            stats.depth += len(lane)
+            for index, coroutine in lane:
+                if semaphore:
+                    await semaphore.acquire()
+                wait = perf_counter() - start_time
+                stats.wait_total += wait
+                stats.wait_max = max(stats.wait_max, wait)
+                try:
+                    results[index] = await coroutine
+                except Exception as exception:  # pylint: disable=broad-except
+                    results[index] = exception
+                finally:
+                    if semaphore:
+                        semaphore.release()
+
+        await asyncio.gather(*(run_lane(key, lane) for key, lane in lanes.items()))
+
+        return results
+
+    @property
+    def lane_stats(self) -> List[LaneStats]:
+        """Stats of the lanes run by the scheduler"""
+        return list(self._lane_stats.values())
+
+    @property
+    def metrics(self) -> Dict[str, int]:
+        """Aggregated lane metrics"""
+        lane_stats = self._lane_stats.values()
+        item_count = sum(s.depth for s in lane_stats)
+        return dict(
+            lanes=len(lane_stats),
+            lane_depth_max=max((s.depth for s in lane_stats), default=0),
+            lane_wait_max_ms=round(max((s.wait_max for s in lane_stats), default=0.0) * 1000),
+            lane_wait_avg_ms=(
+                round(sum(s.wait_total for s in lane_stats) / item_count * 1000)
+                if item_count
+                else 0
+            ),
+        )
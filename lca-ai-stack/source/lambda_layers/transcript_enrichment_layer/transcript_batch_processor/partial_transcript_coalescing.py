@@ -0,0 +1,171 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+""" Partial Transcript Coalescing
+"""
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    # pylint: disable=import-error
+    from eventprocessor_utils import PartialUtteranceBuffer
+else:
+    PartialUtteranceBuffer = object
+
+SegmentKeyType = Tuple[str, str]
+
+TRANSCRIPT_EVENT_TYPES = ("ADD_TRANSCRIPT_SEGMENT", "SEGMENTS", "")
+
+
+def _get(value: Dict[str, Any], key: str) -> Any:
+    """Gets an UpperCamelCase key that may be sent in lowerCamelCase"""
+    if key in value:
+        return value[key]
+    return value.get(key[0].lower() + key[1:])
+
+
+def _iter_transcript_segments(
+    message: Dict[str, Any],
+) -> Iterator[Tuple[SegmentKeyType, bool, Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Yields the transcript segments of a KDS message
+
+    Yields tuples of the (CallId, SegmentId) key, the partial flag, the dict
+    holding the segment and, for Contact Lens, the Segments entry.
+    """
+    event_type = _get(message, "EventType") or ""
+    if event_type not in TRANSCRIPT_EVENT_TYPES:
+        return
+
+    contact_id = _get(message, "ContactId")
+    if contact_id:
+        for segment in _get(message, "Segments") or []:
+            if "Utterance" in segment:
+                utterance = segment["Utterance"]
+                yield (str(contact_id), str(utterance["TranscriptId"])), True, utterance, segment
+            elif "Transcript" in segment:
+                transcript = segment["Transcript"]
+                yield (str(contact_id), str(transcript["Id"])), False, transcript, segment
+        return
+
+    call_id = _get(message, "CallId")
+    if not call_id:
+        return
+    utterance_event = _get(message, "UtteranceEvent")
+    transcript_event = _get(message, "TranscriptEvent")
+    if utterance_event:
+        segment_id = _get(utterance_event, "UtteranceId")
+        is_partial = _get(utterance_event, "IsPartial")
+    elif transcript_event:
+        segment_id = _get(transcript_event, "ResultId")
+        is_partial = _get(transcript_event, "IsPartial")
+    elif event_type:
+        segment_id = _get(message, "SegmentId")
+        is_partial = _get(message, "IsPartial")
+    else:
+        return
+    if segment_id and is_partial is not None:
+        yield (str(call_id), str(segment_id)), bool(is_partial), message, None
+
+
+def coalesce_partial_transcripts(messages: List[Dict[str, Any]]) -> Tuple[int, Set[int]]:
+    """Supersedes stale partial transcript segments of a batch
+
+    Keeps only the latest partial segment per (CallId, SegmentId) and drops
+    partial segments whose final segment is in the batch. Superseded Contact
+    Lens entries are removed from the Segments of their record. Contact Lens
+    partials only hold the content added since the previous partial, so the
+    content of the superseded partials is prepended to the one that is kept.
+
+    :param messages: decoded KDS messages in stream order. Contact Lens
+        messages are modified in place
+    :returns: number of transcript segment writes saved and the indexes of
+        the messages made only of superseded segments
+    """
+    final_keys: Set[SegmentKeyType] = set()
+    for message in messages:
+        for key, is_partial, _, _ in _iter_transcript_segments(message):
+            if not is_partial:
+                final_keys.add(key)
+
+    latest_partials: Dict[SegmentKeyType, Dict[str, Any]] = {}
+    superseded_records: Set[int] = set()
+    saved_count = 0
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        superseded_segments: List[Dict[str, Any]] = []
+        for key, is_partial, segment, contact_lens_segment in reversed(
+            list(_iter_transcript_segments(message))
+        ):
+            if not is_partial:
+                continue
+            latest_partial = latest_partials.get(key)
+            if key not in final_keys and latest_partial is None:
+                latest_partials[key] = segment
+                continue
+            if latest_partial is not None and contact_lens_segment is not None:
+                previous_content = latest_partial["PartialContent"]
+                latest_partial["PartialContent"] = f"{segment['PartialContent']} {previous_content}"
+            saved_count += 1
+            if contact_lens_segment is None:
+                superseded_records.add(index)
+            else:
+                superseded_segments.append(contact_lens_segment)
+
+        if superseded_segments:
+            segments_key = "Segments" if "Segments" in message else "segments"
+            message[segments_key] = [
+                s
+                for s in message[segments_key]
+                if not any(s is superseded for superseded in superseded_segments)
+            ]
+            if not message[segments_key]:
+                superseded_records.add(index)
+
+    return saved_count, superseded_records
+
+
+def drop_partial_transcripts(
+    messages: List[Dict[str, Any]],
+    partial_utterance_buffer: Optional[PartialUtteranceBuffer] = None,
+) -> Tuple[int, Set[int]]:
+    """Drops all the partial transcript segments of a batch
+
+    Used when the consumer is behind the stream where partial segments are
+    stale by the time they are written and are superseded by the final
+    segments. Partial Contact Lens entries are removed from the Segments of
+    their record. Contact Lens partials only hold the content added since
+    the previous partial so their content is appended to the partial
+    utterance buffer - the partials written after the backlog is cleared
+    hold the whole utterance.
+
+    :param messages: decoded KDS messages in stream order. Contact Lens
+        messages are modified in place
+    :param partial_utterance_buffer: buffer of the Contact Lens partial
+        utterances
+    :returns: number of partial segments dropped and the indexes of the
+        messages made only of partial segments
+    """
+    dropped_records: Set[int] = set()
+    dropped_count = 0
+    for index, message in enumerate(messages):
+        partial_segments: List[Dict[str, Any]] = []
+        for key, is_partial, segment, contact_lens_segment in _iter_transcript_segments(message):
+            if not is_partial:
+                continue
+            dropped_count += 1
+            if contact_lens_segment is None:
+                dropped_records.add(index)
+                continue
+            partial_segments.append(contact_lens_segment)
+            if partial_utterance_buffer is not None:
+                partial_utterance_buffer.append(*key, segment["PartialContent"])
+
+        if partial_segments:
+            segments_key = "Segments" if "Segments" in message else "segments"
+            message[segments_key] = [
+                s
+                for s in message[segments_key]
+                if not any(s is partial for partial in partial_segments)
+            ]
+            if not message[segments_key]:
+                dropped_records.add(index)
+
+    return dropped_count, dropped_records
@@ -0,0 +1,81 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+""" Task Dependency Graph
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, List, Sequence, Union
+
+TaskType = Union[Awaitable[Any], Callable[[], Awaitable[Any]]]
+
+
+class _TaskNode:
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("task", "after")
+
+    def __init__(self, task: TaskType, after: Sequence[int]) -> None:
+        self.task = task
+        self.after = after
+
+
+class TaskGraph:
+    """Runs the tasks of a message once the tasks they depend on are done
+
+    Tasks without dependencies between them run concurrently. A task added
+    with after=[...] starts when those tasks complete, whether they succeeded
+    or failed, so that writes of the same item are applied in order. Tasks
+    can only depend on tasks added before them. A task is either an
+    awaitable or a function returning one - functions are called when the
+    task starts so that they can use the results of their dependencies.
+    Tasks that only need other tasks done part way through (e.g. before a
+    write) await wait() instead of declaring them in after.
+    """
+
+    def __init__(self) -> None:
+        self._nodes: List[_TaskNode] = []
+        self._futures: List["asyncio.Future[Any]"] = []
+
+    def add(self, task: TaskType, after: Sequence[int] = ()) -> int:
+        """Adds a task - returns its node to be used in after and result()"""
+        node = len(self._nodes)
+        for dependency in after:
+            if not 0 <= dependency < node:
+                raise ValueError(f"invalid task dependency: {dependency}")
+        self._nodes.append(_TaskNode(task=task, after=tuple(after)))
+        return node
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    @staticmethod
+    async def _run_node(node: _TaskNode, dependencies: List["asyncio.Future[Any]"]) -> Any:
+        if dependencies:
+            await asyncio.wait(dependencies)
+        task = node.task
+        return await (task() if callable(task) else task)  # type: ignore
+
+    async def run(self) -> List[Union[Any, Exception]]:
+        """Runs the tasks
+
+        :returns: results or exceptions in the order the tasks were added
+        """
+        futures = self._futures = []
+        for node in self._nodes:
+            futures.append(
+                asyncio.ensure_future(
+                    self._run_node(node, [futures[dependency] for dependency in node.after])
+                )
+            )
+        return list(await asyncio.gather(*futures, return_exceptions=True))
+
+    async def wait(self, nodes: Sequence[int]) -> None:
+        """Waits for tasks to complete - called by the running tasks"""
+        futures = [self._futures[node] for node in nodes]
+        if futures:
+            await asyncio.wait(futures)
+
+    def result(self, node: int) -> Union[Any, Exception]:
+        """Result or exception of a completed task (e.g. a dependency of the running task)"""
+        future = self._futures[node]
+        if not future.done():
+            raise RuntimeError(f"task {node} has not completed")
+        return future.exception() or future.result()
@@ -2,9 +2,21 @@
 # SPDX-License-Identifier: Apache-2.0
 """ Transcript Batch Processor
 """
-import asyncio
 import traceback
-from typing import Any, Coroutine, Dict, List, Literal, Optional, Protocol, Tuple, Union
+from time import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncContextManager,
+    Coroutine,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Protocol,
+    Tuple,
+    Union,
+)
 
 # third-party imports from Lambda layer
 from aws_lambda_powertools import Logger
@@ -16,14 +28,46 @@ from gql.client import AsyncClientSession
 
 # module imports from Lambda layer
 # pylint: disable=import-error
-from appsync_utils import AppsyncAioGqlClient
+from appsync_utils import (
+    BatchingClientSession,
+    reset_current_retry_coordinator,
+    set_current_retry_coordinator,
+)
+from logging_utils import is_debug_enabled
 
+if TYPE_CHECKING:
+    from appsync_utils import AppsyncAioGqlClient, AppsyncSessionManager, RetryCoordinator
+    from eventprocessor_utils import PartialUtteranceBuffer
+else:
+    AppsyncAioGqlClient = object
+    AppsyncSessionManager = object
+    RetryCoordinator = object
+    PartialUtteranceBuffer = object
 # pylint: enable=import-error
 
+from .batch_item_failures import get_batch_item_failures, get_shard_id, is_retryable_error
+from .call_aggregation_batch import CallAggregationBatch, PendingCallAggregation
+from .call_lane_scheduler import CallLaneScheduler
+from .partial_transcript_coalescing import coalesce_partial_transcripts, drop_partial_transcripts
+
 
 LOGGER = Logger(child=True, location="%(filename)s:%(lineno)d - %(funcName)s()")
 KDS_BATCH_PROCESSOR = BatchProcessor(event_type=EventType.KinesisDataStreams)
 
+# call lifecycle event types - their calls are processed first in priority mode
+LIFECYCLE_EVENT_TYPES = (
+    "START",
+    "STARTED",
+    "END",
+    "COMPLETED",
+    "ADD_SUMMARY",
+    "UPDATE_AGENT",
+)
+# call start event types processed before the other records in priority mode
+START_EVENT_TYPES = ("START", "STARTED")
+
+LaneItemType = Tuple[str, Coroutine[Any, Any, Any]]
+
 
 class TranscriptBatchProcessor:
     """Call Transcript Batch Processor"""
@@ -40,10 +84,31 @@ class TranscriptBatchProcessor:
             appsync_session: AsyncClientSession,
             sns_client: object,
             agent_assist_args: Dict[str, object],
-            sentiment_analysis_args: Dict[str, object]
+            sentiment_analysis_args: Dict[str, object],
+            call_aggregation_batch: Optional[CallAggregationBatch] = None,
+            deferred_tasks: Optional[List[LaneItemType]] = None,
         ) -> Coroutine[Any, Any, Any]:
             ...
 
+    class CallAggregationFnType(Protocol):
+        """Call Aggregation Function Signature"""
+
+        # pylint: disable=too-few-public-methods
+        def __call__(
+            self,
+            pending_call_aggregation: PendingCallAggregation,
+            appsync_session: AsyncClientSession,
+            sentiment_analysis_args: Dict[str, object],
+        ) -> Coroutine[Any, Any, Any]:
+            ...
+
+    class TranscriptHookFnType(Protocol):
+        """Transcript Hook Function Signature"""
+
+        # pylint: disable=too-few-public-methods
+        def __call__(self, messages: List[Any]) -> Coroutine[Any, Any, List[Any]]:
+            ...
+
     def __init__(
         self,
         appsync_client: AppsyncAioGqlClient,
@@ -51,20 +116,72 @@ class TranscriptBatchProcessor:
         sns_client,
         settings: Dict[str, Any],
         agent_assist_args: Optional[Dict[str, Any]] = None,
-        sentiment_analysis_args: Optional[Dict[str, object]] = None
+        sentiment_analysis_args: Optional[Dict[str, object]] = None,
+        call_aggregation_fn: Optional[CallAggregationFnType] = None,
+        coalesce_partial_transcripts_enabled: bool = True,
+        mutation_batch_size: int = 0,
+        mutation_batch_window: float = BatchingClientSession.DEFAULT_BATCH_WINDOW,
+        max_concurrency: int = CallLaneScheduler.DEFAULT_MAX_CONCURRENCY,
+        appsync_session_manager: Optional[AppsyncSessionManager] = None,
+        priority_mode_lag_threshold: float = 0.0,
+        partial_drop_lag_threshold: float = 0.0,
+        partial_utterance_buffer: Optional[PartialUtteranceBuffer] = None,
+        retry_coordinator: Optional[RetryCoordinator] = None,
+        transcript_hook_fn: Optional[TranscriptHookFnType] = None,
     ):
+        # pylint: disable=too-many-arguments,too-many-locals
         self._appsync_client = appsync_client
+        # keeps the session open across invocations instead of the client context
+        self._appsync_session_manager = appsync_session_manager
         self._sns_client = sns_client
         self._settings = settings
         self._api_mutation_fn = api_mutation_fn
+        self._call_aggregation_fn = call_aggregation_fn
+        # called once with the records of the batch before their mutations
+        self._transcript_hook_fn = transcript_hook_fn
+        # aggregation mutations are coalesced per CallId when a function is
+        # provided to run them after the record mutations of the batch
+        self._call_aggregation_batch: Optional[CallAggregationBatch] = (
+            CallAggregationBatch() if call_aggregation_fn else None
+        )
         self._agent_assist_args = agent_assist_args or {}
         self._sentiment_analysis_args = sentiment_analysis_args or {}
         self._kds_batch_processor = KDS_BATCH_PROCESSOR
 
+        self._coalesce_partial_transcripts_enabled = coalesce_partial_transcripts_enabled
+        self._superseded_partial_count = 0
+        # mutations are packed into aliased requests when the size is over 1
+        self._mutation_batch_size = mutation_batch_size
+        self._mutation_batch_window = mutation_batch_window
+        self._batching_session: Optional[BatchingClientSession] = None
+        # records are run in order per call and concurrently across calls
+        self._max_concurrency = max_concurrency
+        self._lane_scheduler = CallLaneScheduler(max_concurrency=max_concurrency)
+
+        # load shedding when the batch is behind the stream by more than the
+        # thresholds (in seconds - 0 disables). In priority mode the call start
+        # records run first, the calls with lifecycle records are scheduled
+        # before the other calls (records of a call keep their stream order)
+        # and the sentiment and aggregation work is deferred after the
+        # transcript writes. Partial segments are dropped past the partial
+        # drop threshold
+        self._priority_mode_lag_threshold = priority_mode_lag_threshold
+        self._partial_drop_lag_threshold = partial_drop_lag_threshold
+        # receives the content of the dropped Contact Lens partials
+        self._partial_utterance_buffer = partial_utterance_buffer
+        self._backlog_lag = 0.0
+        self._is_priority_mode = False
+        self._dropped_partial_count = 0
+        self._deferred_task_count = 0
+        # shared by the queries of the batch (retry budget and circuit breaker)
+        self._retry_coordinator = retry_coordinator
+
         self._kds_processed_messages: List[Dict[str, object]] = []
         self._successes: List = []
         self._errors: List = []
         self._has_error: bool = False
+        # records are replayed from the first failed record of each shard
+        self._is_batch_failed = False
 
     async def __aenter__(self):
         return self
@@ -78,60 +195,301 @@ class TranscriptBatchProcessor:
                 traceback.format_tb(exc_tb),
             )
             self._has_error = True
+            self._is_batch_failed = True
             self._errors.append(exc_val)
+        retry_coordinator_token = set_current_retry_coordinator(self._retry_coordinator)
         try:
-            async with self._appsync_client as appsync_session:
-                coroutines = [
-                    self._api_mutation_fn(
-                        message=message["result"],
-                        settings=self._settings,
-                        appsync_session=appsync_session,
-                        sns_client=self._sns_client,
-                        agent_assist_args=self._agent_assist_args,
-                        sentiment_analysis_args=self._sentiment_analysis_args,
+            self._set_load_shedding_mode()
+            if self._coalesce_partial_transcripts_enabled or self._is_priority_mode:
+                self._coalesce_partial_transcripts()
+            if self._is_partial_drop_mode:
+                self._drop_partial_transcripts()
+            if self._transcript_hook_fn:
+                await self._apply_transcript_hook(self._transcript_hook_fn)
+            async with self._get_appsync_session() as client_session:
+                appsync_session = client_session
+                if self._mutation_batch_size > 1:
+                    appsync_session = self._batching_session = BatchingClientSession(
+                        session=client_session,
+                        max_batch_size=self._mutation_batch_size,
+                        batch_window=self._mutation_batch_window,
+                    )
+                messages = [m for m in self._kds_processed_messages if m["status"] == "success"]
+                if self._is_priority_mode:
+                    phases = self._get_priority_phases(messages)
+                else:
+                    phases = [messages]
+                # deferred tasks of each record (priority mode) in stream order
+                message_deferred_tasks: Dict[int, List[LaneItemType]] = {}
+
+                for phase_messages in phases:
+                    lane_items: List[LaneItemType] = []
+                    for message in phase_messages:
+                        deferred_tasks: Optional[List[LaneItemType]] = None
+                        if self._is_priority_mode:
+                            deferred_tasks = message_deferred_tasks[id(message)] = []
+                        lane_items.append(
+                            (
+                                self._get_lane_key(message),
+                                self._api_mutation_fn(
+                                    message=message["result"],
+                                    settings=self._settings,
+                                    appsync_session=appsync_session,
+                                    sns_client=self._sns_client,
+                                    agent_assist_args=self._agent_assist_args,
+                                    sentiment_analysis_args=self._sentiment_analysis_args,
+                                    call_aggregation_batch=self._call_aggregation_batch,
+                                    deferred_tasks=deferred_tasks,
+                                ),
+                            )
+                        )
+                    results: List[Union[Dict, Exception]] = await self._lane_scheduler.run(
+                        lane_items
+                    )
+                    self._add_results(results, messages=phase_messages)
+                    LOGGER.debug(
+                        "call lanes",
+                        extra=dict(lanes=[s.to_dict() for s in self._lane_scheduler.lane_stats]),
                     )
-                    for message in self._kds_processed_messages
-                    if message["status"] == "success"
+
+                deferred_messages = [
+                    (message, item)
+                    for message in messages
+                    for item in message_deferred_tasks.get(id(message), [])
                 ]
+                if deferred_messages:
+                    # sentiment runs once the transcript writes of the batch are done
+                    self._deferred_task_count += len(deferred_messages)
+                    self._add_results(
+                        await CallLaneScheduler(max_concurrency=self._max_concurrency).run(
+                            [item for _, item in deferred_messages]
+                        ),
+                        messages=[message for message, _ in deferred_messages],
+                    )
 
-                results: List[Union[Dict, Exception]] = await asyncio.gather(
-                    *coroutines,
-                    return_exceptions=True,
+                # runs after all the segment writes of the batch are complete
+                await self._execute_call_aggregations(
+                    appsync_session=appsync_session, messages=messages
                 )
-                for result in results:
-                    if isinstance(result, Exception):
-                        LOGGER.error("transcript api mutation exception: %s", result)
-                        self._has_error = True
-                        self._errors.append(result)
-                    else:
-                        self._successes.append(result)
+                if self._appsync_session_manager:
+                    self._appsync_session_manager.report_errors(self._errors)
         except Exception as exception:  # pylint: disable=broad-except
             self._has_error = True
+            self._is_batch_failed = True
             self._errors.append(exception)
             LOGGER.exception("transcript batch processor exception: %s", exception)
+        finally:
+            reset_current_retry_coordinator(retry_coordinator_token)
 
         return True
 
+    def _get_appsync_session(self) -> AsyncContextManager[AsyncClientSession]:
+        if self._appsync_session_manager:
+            return self._appsync_session_manager.session()
+        return self._appsync_client
+
+    def _set_load_shedding_mode(self) -> None:
+        """Sets the priority mode from the lag of the oldest record of the batch"""
+        arrival_timestamps = [
+            m["arrival_timestamp"]
+            for m in self._kds_processed_messages
+            if m.get("arrival_timestamp")
+        ]
+        if not arrival_timestamps:
+            return
+        self._backlog_lag = max(time() - min(arrival_timestamps), 0.0)  # type: ignore
+        self._is_priority_mode = (
+            0 < self._priority_mode_lag_threshold <= self._backlog_lag
+            or self._is_partial_drop_mode
+        )
+        if self._is_priority_mode:
+            LOGGER.warning(
+                "backlog priority mode",
+                extra=dict(
+                    backlog_lag_ms=round(self._backlog_lag * 1000),
+                    drop_partial_transcripts=self._is_partial_drop_mode,
+                ),
+            )
+
+    @property
+    def _is_partial_drop_mode(self) -> bool:
+        return 0 < self._partial_drop_lag_threshold <= self._backlog_lag
+
+    def _drop_partial_transcripts(self) -> None:
+        """Drops the partial transcripts of the batch"""
+        messages = [m for m in self._kds_processed_messages if m["status"] == "success"]
+        dropped_count, dropped_indexes = drop_partial_transcripts(
+            [m["result"] for m in messages],  # type: ignore
+            partial_utterance_buffer=self._partial_utterance_buffer,
+        )
+        for index in dropped_indexes:
+            messages[index]["status"] = "dropped"
+        self._dropped_partial_count += dropped_count
+
+    @staticmethod
+    def _get_event_type(message: Dict[str, Any]) -> Optional[str]:
+        result = message["result"]
+        if not isinstance(result, dict):
+            return None
+        return result.get("EventType", result.get("eventType"))
+
+    def _get_priority_phases(self, messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Splits the records of the batch in the phases of the priority mode
+
+        The call start records run first. The other records run in stream
+        order within each call and the calls with lifecycle records (e.g. END)
+        are scheduled before the other calls.
+        """
+        start_messages = [m for m in messages if self._get_event_type(m) in START_EVENT_TYPES]
+        other_messages = [m for m in messages if self._get_event_type(m) not in START_EVENT_TYPES]
+        lifecycle_lane_keys = {
+            self._get_lane_key(m)
+            for m in other_messages
+            if self._get_event_type(m) in LIFECYCLE_EVENT_TYPES
+        }
+        # stable sort - lanes are started in the order of their first record
+        other_messages.sort(key=lambda m: self._get_lane_key(m) not in lifecycle_lane_keys)
+        return [start_messages, other_messages]
+
+    def _coalesce_partial_transcripts(self) -> None:
+        """Drops partial transcripts superseded by later segments of the batch"""
+        messages = [m for m in self._kds_processed_messages if m["status"] == "success"]
+        saved_count, superseded_indexes = coalesce_partial_transcripts(
+            [m["result"] for m in messages]  # type: ignore
+        )
+        for index in superseded_indexes:
+            messages[index]["status"] = "superseded"
+        self._superseded_partial_count += saved_count
+        if saved_count:
+            LOGGER.debug(
+                "superseded partial transcripts",
+                extra=dict(saved_writes=saved_count, superseded_records=len(superseded_indexes)),
+            )
+
+    async def _apply_transcript_hook(self, transcript_hook_fn: TranscriptHookFnType) -> None:
+        """Replaces the records of the batch with the result of the transcript hook"""
+        messages = [m for m in self._kds_processed_messages if m["status"] == "success"]
+        if not messages:
+            return
+        results = await transcript_hook_fn(messages=[m["result"] for m in messages])
+        for message, result in zip(messages, results):
+            message["result"] = result
+
+    def _add_results(
+        self,
+        results: List[Union[Dict, Exception]],
+        messages: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        """Adds the results and sets the failed flag of the records that produced them
+
+        :param results: results or exceptions of the mutation functions
+        :param messages: processed records in the order of the results
+        """
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                LOGGER.error("transcript api mutation exception: %s", result)
+                self._has_error = True
+                self._errors.append(result)
+                errors: List[Any] = [result]
+            else:
+                self._successes.append(result)
+                errors = (result.get("errors") or []) if isinstance(result, dict) else []
+            if messages is None or not errors:
+                continue
+            message = messages[index]
+            if message is not None and any(
+                is_retryable_error(error) for error in errors if isinstance(error, BaseException)
+            ):
+                message["failed"] = True
+
+    async def _execute_call_aggregations(
+        self,
+        appsync_session: Union[AsyncClientSession, BatchingClientSession],
+        messages: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        if not self._call_aggregation_fn or not self._call_aggregation_batch:
+            return
+        call_aggregation_fn = self._call_aggregation_fn
+        pending_call_aggregations = self._call_aggregation_batch.pop_all()
+        if not pending_call_aggregations:
+            return
+        LOGGER.debug(
+            "executing call aggregations",
+            extra=dict(
+                calls=len(pending_call_aggregations),
+                coalesced=self._call_aggregation_batch.coalesced_count,
+            ),
+        )
+        # a failed aggregation replays the last record of its call
+        last_messages = {self._get_lane_key(message): message for message in messages or []}
+        # bounded by the same concurrency limit as the records
+        results: List[Union[Dict, Exception]] = await CallLaneScheduler(
+            max_concurrency=self._max_concurrency
+        ).run(
+            [
+                (
+                    pending_call_aggregation.call_id,
+                    call_aggregation_fn(
+                        pending_call_aggregation=pending_call_aggregation,
+                        appsync_session=appsync_session,
+                        sentiment_analysis_args=self._sentiment_analysis_args,
+                    ),
+                )
+                for pending_call_aggregation in pending_call_aggregations
+            ]
+        )
+        messages = [last_messages.get(p.call_id) for p in pending_call_aggregations]
+        self._add_results(results, messages=messages)  # type: ignore
+
     @staticmethod
     def _map_kds_processed_message(
         message: Tuple,
     ) -> Dict[str, object]:
         status: Literal["success", "fail"] = message[0]
-        LOGGER.debug("status", extra=dict(status=status))
         result: Any = message[1]
-        LOGGER.debug("result", extra=dict(result=result))
         record: KinesisStreamRecord = message[2]
-        LOGGER.debug("record", extra=dict(record=record))
+        if is_debug_enabled(LOGGER):
+            LOGGER.debug(
+                "kds processed message", extra=dict(status=status, result=result, record=record)
+            )
+
+        # the batch processor returns the raw record on success
+        if isinstance(record, dict):
+            partition_key = record.get("kinesis", {}).get("partitionKey")
+            arrival_timestamp = record.get("kinesis", {}).get("approximateArrivalTimestamp")
+            sequence_number = record.get("kinesis", {}).get("sequenceNumber")
+            event_id = record.get("eventID")
+        else:
+            partition_key = record.kinesis.partition_key
+            arrival_timestamp = record.kinesis.approximate_arrival_timestamp
+            sequence_number = record.kinesis.sequence_number
+            event_id = record.event_id
 
         return dict(
             status=status,
             result=result,
+            partition_key=partition_key,
+            arrival_timestamp=arrival_timestamp,
+            sequence_number=sequence_number,
+            shard_id=get_shard_id(event_id),
+            failed=False,
         )
 
+    @staticmethod
+    def _get_lane_key(message: Dict[str, Any]) -> str:
+        """Gets the call of a record - falls back to the Kinesis partition key"""
+        result = message["result"]
+        if isinstance(result, dict):
+            for key in ("CallId", "callId", "ContactId", "contactId"):
+                if result.get(key):
+                    return str(result[key])
+        return str(message.get("partition_key") or "")
+
     @staticmethod
     def _process_record(record: KinesisStreamRecord) -> Dict:
         payload: Dict = record.kinesis.data_as_json()
-        LOGGER.debug("payload", extra=dict(payload=payload))
+        if is_debug_enabled(LOGGER):
+            LOGGER.debug("payload", extra=dict(payload=payload))
 
         return payload
 
@@ -157,10 +515,54 @@ class TranscriptBatchProcessor:
             )
             LOGGER.error("failed to decode or map KDS records", extra=dict(failures=failures))
 
+    @property
+    def batch_item_failures(self) -> List[Dict[str, str]]:
+        """Batch item failures of the Kinesis partial batch response
+
+        Decode failures and records that failed with validation errors are
+        not reported as they fail the same way when replayed
+        """
+        messages = self._kds_processed_messages
+        if self._is_batch_failed:
+            return get_batch_item_failures(
+                [dict(m, failed=True) for m in messages if m["status"] != "fail"]
+            )
+        return get_batch_item_failures(messages)
+
+    def response(self) -> Dict[str, List[Dict[str, str]]]:
+        """Kinesis partial batch response (ReportBatchItemFailures)"""
+        return dict(batchItemFailures=self.batch_item_failures)
+
     @property
     def results(self):
         """Processor Results"""
         return dict(
             successes=self._successes,
             errors=self._errors,
+            metrics=self.metrics,
+            batch_item_failures=self.batch_item_failures,
+        )
+
+    @property
+    def metrics(self) -> Dict[str, int]:
+        """Processor Metrics"""
+        metrics: Dict[str, int] = dict(
+            superseded_partial_transcripts=self._superseded_partial_count
+        )
+        if self._call_aggregation_batch:
+            metrics["call_aggregations_requested"] = self._call_aggregation_batch.request_count
+            metrics["call_aggregations_coalesced"] = self._call_aggregation_batch.coalesced_count
+        metrics.update(self._lane_scheduler.metrics)
+        metrics["backlog_lag_ms"] = round(self._backlog_lag * 1000)
+        metrics["priority_mode"] = int(self._is_priority_mode)
+        metrics["dropped_partial_transcripts"] = self._dropped_partial_count
+        metrics["deferred_tasks"] = self._deferred_task_count
+        metrics["failed_records"] = (
+            len([m for m in self._kds_processed_messages if m["status"] != "fail"])
+            if self._is_batch_failed
+            else len([m for m in self._kds_processed_messages if m.get("failed")])
         )
+        if self._batching_session:
+            metrics["appsync_requests"] = self._batching_session.request_count
+            metrics["batched_mutations"] = self._batching_session.batched_operation_count
+        return metrics
@@ -0,0 +1,41 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Transcript Hooks
+
+Submodules are imported on first attribute access so that importing the
+package does not load powertools.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .transcript_hook import (
+        LambdaBatchTranscriptHook,
+        PluginTranscriptHook,
+        TranscriptHook,
+        load_transcript_hook_plugin,
+    )
+
+_ATTRIBUTE_MODULES = {
+    "LambdaBatchTranscriptHook": ".transcript_hook",
+    "PluginTranscriptHook": ".transcript_hook",
+    "TranscriptHook": ".transcript_hook",
+    "load_transcript_hook_plugin": ".transcript_hook",
+}
+
+__all__ = [
+    "LambdaBatchTranscriptHook",
+    "PluginTranscriptHook",
+    "TranscriptHook",
+    "load_transcript_hook_plugin",
+]
+
+
+def __getattr__(name: str) -> Any:
+    """Imports the submodule of an attribute on first access"""
+    module_name = _ATTRIBUTE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
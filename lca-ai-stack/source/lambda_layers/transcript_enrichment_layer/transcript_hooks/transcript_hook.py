@@ -0,0 +1,162 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+""" Batched Transcript Hooks
+"""
+import inspect
+import json
+from importlib import import_module
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Sequence
+
+# third-party imports from Lambda layer
+from aws_lambda_powertools import Logger
+
+if TYPE_CHECKING:
+    from lambda_utils import AsyncLambdaInvoker
+else:
+    AsyncLambdaInvoker = object
+
+
+LOGGER = Logger(child=True, location="%(filename)s:%(lineno)d - %(funcName)s()")
+
+TranscriptHookFnType = Callable[[List[Dict[str, Any]]], Any]
+
+
+class TranscriptHook:
+    """Applies a transcript hook to a list of segments in a single call
+
+    The hook receives a copy of the segments and returns the list of
+    segments with optionally modified fields (e.g. a redacted "Transcript"
+    with the "OriginalTranscript") in the same order. The original segments
+    are kept when the hook returns an invalid result. Exceptions raised by
+    the hook are propagated.
+    """
+
+    hook_type = "transcript"
+
+    def __init__(self) -> None:
+        self._stats: Dict[str, float] = {}
+        self.reset_stats()
+
+    async def _apply(self, segments: List[Dict[str, Any]]) -> Any:
+        raise NotImplementedError
+
+    async def apply(self, segments: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        """Applies the hook to the segments"""
+        if not segments:
+            return []
+        payload = [dict(segment) for segment in segments]
+        start_time = perf_counter()
+        try:
+            result = await self._apply(payload)
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            duration = perf_counter() - start_time
+            self._stats["count"] += 1
+            self._stats["segments"] += len(payload)
+            self._stats["duration_total"] += duration
+            self._stats["duration_max"] = max(self._stats["duration_max"], duration)
+
+        if (
+            not isinstance(result, list)
+            or len(result) != len(payload)
+            or not all(isinstance(segment, dict) for segment in result)
+        ):
+            self._stats["invalid_results"] += 1
+            LOGGER.error(
+                "Transcript hook must return the list of (modified) input segments",
+                extra=dict(hook_type=self.hook_type, segments=len(payload)),
+            )
+            return payload
+        return result
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Call count and timing"""
+        count = self._stats["count"]
+        return dict(
+            count=int(count),
+            segments=int(self._stats["segments"]),
+            errors=int(self._stats["errors"]),
+            invalid_results=int(self._stats["invalid_results"]),
+            duration_max_ms=round(self._stats["duration_max"] * 1000),
+            duration_avg_ms=round(self._stats["duration_total"] / count * 1000) if count else 0,
+        )
+
+    def reset_stats(self) -> None:
+        """Clears the stats"""
+        self._stats = dict(
+            count=0,
+            segments=0,
+            errors=0,
+            invalid_results=0,
+            duration_total=0.0,
+            duration_max=0.0,
+        )
+
+
+class LambdaBatchTranscriptHook(TranscriptHook):
+    """Invokes a transcript hook Lambda function once for a list of segments
+
+    The function is invoked with {"Segments": [...]} and returns
+    {"Segments": [...]} (or the list) with the segments in the same order.
+    """
+
+    hook_type = "transcript_batch"
+
+    def __init__(self, invoker: AsyncLambdaInvoker, function_name: str) -> None:
+        super().__init__()
+        self._invoker = invoker
+        self._function_name = function_name
+
+    async def _apply(self, segments: List[Dict[str, Any]]) -> Any:
+        lambda_response = await self._invoker.invoke(
+            function_name=self._function_name,
+            payload=dict(Segments=segments),
+            invocation_type="RequestResponse",
+            hook_type=self.hook_type,
+        )
+        try:
+            result = json.loads(lambda_response["Payload"].read().decode("utf-8"))
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.error("Transcript batch hook result payload parsing exception: %s", error)
+            return None
+        return result.get("Segments") if isinstance(result, dict) else result
+
+
+class PluginTranscriptHook(TranscriptHook):
+    """Calls an in-process transcript hook function
+
+    The function takes the list of segments and returns the list of segments.
+    It runs in the event loop - coroutine functions are awaited.
+    """
+
+    hook_type = "transcript_plugin"
+
+    def __init__(self, hook_fn: TranscriptHookFnType) -> None:
+        super().__init__()
+        self._hook_fn = hook_fn
+
+    async def _apply(self, segments: List[Dict[str, Any]]) -> Any:
+        result = self._hook_fn(segments)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+
+def load_transcript_hook_plugin(entry_point: str) -> TranscriptHookFnType:
+    """Loads a transcript hook function from a module:function entry point
+
+    The module is imported from the Lambda layers or the function package
+    """
+    module_name, _, function_name = entry_point.strip().partition(":")
+    if not module_name or not function_name:
+        raise ValueError(f"invalid transcript hook plugin entry point: {entry_point}")
+    hook_fn = import_module(module_name)
+    for attribute in function_name.split("."):
+        hook_fn = getattr(hook_fn, attribute)
+    if not callable(hook_fn):
+        raise TypeError(f"transcript hook plugin is not callable: {entry_point}")
+    return hook_fn  # type: ignore
@@ -0,0 +1,175 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Test doubles of the AWS resources"""
+import copy
+import re
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+_CLAUSE_RE = re.compile(r"^(#?\w+)\s*(=|<>|<|>)\s*(:\w+)$")
+_ACTION_RE = re.compile(r"\b(SET|ADD|REMOVE)\s")
+
+
+def _check_types(value: Any) -> None:
+    # the DynamoDB resource rejects floats
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, dict):
+        for nested_value in value.values():
+            _check_types(nested_value)
+    elif isinstance(value, (list, set)):
+        for nested_value in value:
+            _check_types(nested_value)
+
+
+def _validation_error(message: str) -> ClientError:
+    return ClientError({"Error": {"Code": "ValidationException", "Message": message}}, "UpdateItem")
+
+
+class FakeStateTable:
+    """In memory DynamoDB table with the expressions used on the state table
+
+    Supports attribute_not_exists(attr), attribute_exists(attr) and
+    comparisons of an attribute with a value joined by AND / OR (AND binds
+    first). Conditional failures raise the botocore exception. Updates support
+    SET of (nested) paths, ADD of numbers to top level attributes and REMOVE.
+    """
+
+    def __init__(self) -> None:
+        client = boto3.client("dynamodb", region_name="us-east-1")
+        self.meta = SimpleNamespace(client=client)
+        self.items: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, operation: str) -> None:
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def _check(
+        self,
+        item: Optional[Dict[str, Any]],
+        expression: Optional[str],
+        values: Optional[Dict[str, Any]],
+        names: Optional[Dict[str, str]] = None,
+    ) -> None:
+        if expression is None:
+            return
+        values = values or {}
+        names = names or {}
+
+        def evaluate(clause: str) -> bool:
+            clause = clause.strip()
+            match = re.match(r"^attribute_(not_)?exists\((\w+)\)$", clause)
+            if match:
+                exists = item is not None and match.group(2) in item
+                return not exists if match.group(1) else exists
+            match = _CLAUSE_RE.match(clause)
+            if not match:
+                raise ValueError(f"unsupported condition: {clause}")
+            name = names.get(match.group(1), match.group(1))
+            if item is None or name not in item:
+                return False
+            left, right = item[name], values[match.group(3)]
+            return {
+                "=": left == right,
+                "<>": left != right,
+                "<": left < right,
+                ">": left > right,
+            }[match.group(2)]
+
+        if not any(
+            all(evaluate(clause) for clause in alternative.split(" AND "))
+            for alternative in expression.split(" OR ")
+        ):
+            raise self.meta.client.exceptions.ConditionalCheckFailedException(
+                {"Error": {"Code": "ConditionalCheckFailedException", "Message": expression}},
+                "PutItem",
+            )
+
+    def get_item(self, Key: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Gets an item (the projection is ignored)"""
+        # pylint: disable=invalid-name,unused-argument
+        with self._lock:
+            self._count("get_item")
+            item = self.items.get((Key["PK"], Key["SK"]))
+            return {"Item": dict(item)} if item is not None else {}
+
+    def put_item(
+        self,
+        Item: Dict[str, Any],
+        ConditionExpression: Optional[str] = None,
+        ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Puts an item if the condition holds"""
+        # pylint: disable=invalid-name
+        with self._lock:
+            self._count("put_item")
+            _check_types(Item)
+            key = (Item["PK"], Item["SK"])
+            self._check(self.items.get(key), ConditionExpression, ExpressionAttributeValues)
+            self.items[key] = dict(Item)
+            return {}
+
+    def delete_item(
+        self,
+        Key: Dict[str, Any],
+        ConditionExpression: Optional[str] = None,
+        ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Deletes an item if the condition holds"""
+        # pylint: disable=invalid-name
+        with self._lock:
+            self._count("delete_item")
+            key = (Key["PK"], Key["SK"])
+            self._check(self.items.get(key), ConditionExpression, ExpressionAttributeValues)
+            self.items.pop(key, None)
+            return {}
+
+    def update_item(
+        self,
+        Key: Dict[str, Any],
+        UpdateExpression: str,
+        ConditionExpression: Optional[str] = None,
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Updates an item if the condition holds"""
+        # pylint: disable=invalid-name
+        names = ExpressionAttributeNames or {}
+        values = ExpressionAttributeValues or {}
+        _check_types(values)
+        with self._lock:
+            self._count("update_item")
+            key = (Key["PK"], Key["SK"])
+            stored = self.items.get(key)
+            self._check(stored, ConditionExpression, values, names)
+            item = copy.deepcopy(stored) if stored is not None else dict(Key)
+
+            parts = _ACTION_RE.split(UpdateExpression)
+            paths: List[List[str]] = []
+            for action, clauses in zip(parts[1::2], parts[2::2]):
+                for clause in (c.strip() for c in clauses.split(",")):
+                    tokens = re.split(r"\s*=\s*|\s+", clause)
+                    path = [names.get(n, n) for n in tokens[0].split(".")]
+                    if any(p[: len(path)] == path or path[: len(p)] == p for p in paths):
+                        raise _validation_error("Two document paths overlap with each other")
+                    paths.append(path)
+                    parent = item
+                    for name in path[:-1]:
+                        parent = parent.get(name)
+                        if not isinstance(parent, dict):
+                            raise _validation_error("The document path provided is invalid")
+                    if action == "SET":
+                        parent[path[-1]] = copy.deepcopy(values[tokens[1]])
+                    elif action == "ADD":
+                        if len(path) > 1:
+                            raise _validation_error("ADD only supports top level attributes")
+                        parent[path[-1]] = parent.get(path[-1], 0) + values[tokens[1]]
+                    else:
+                        parent.pop(path[-1], None)
+            self.items[key] = item
+            return {}
@@ -0,0 +1,186 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Agent assist turn dispatcher tests"""
+# pylint: disable=import-error
+import asyncio
+
+import pytest
+from event_processor import call_event_processor
+from lambda_utils import AgentAssistTurnDispatcher
+from lambda_utils import agent_assist_dispatcher
+from sentiment import SentimentAggregationStore
+from test_call_event_processor import EchoSession
+
+
+class Clock:
+    """Monotonic clock advanced by the tests"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch) -> Clock:
+    """Replaces the clock of the dispatcher"""
+    clock = Clock()
+    monkeypatch.setattr(agent_assist_dispatcher, "monotonic", clock)
+    return clock
+
+
+def get_segment(segment_id: str, transcript: str = "hello", call_id: str = "call-1"):
+    """Final CALLER segment"""
+    return dict(
+        CallId=call_id,
+        Channel="CALLER",
+        SegmentId=segment_id,
+        StartTime=float(segment_id[-1]),
+        EndTime=float(segment_id[-1]) + 0.9,
+        Transcript=transcript,
+        IsPartial=False,
+    )
+
+
+def run_dispatcher(clock: Clock, steps, **kwargs):
+    """Runs the steps with a dispatcher and returns the dispatched requests
+
+    A step is a segment, a call ID ending its turn or a number of seconds
+    """
+    requests = []
+
+    async def dispatch(payload):
+        requests.append(payload)
+
+    async def run():
+        dispatcher = AgentAssistTurnDispatcher(dispatch_fn=dispatch, **kwargs)
+        for step in steps:
+            if isinstance(step, dict):
+                dispatcher.add(step)
+            elif isinstance(step, str):
+                dispatcher.end_turn(step)
+            else:
+                clock.now += step
+        await dispatcher.flush()
+        return dispatcher.stats
+
+    return requests, asyncio.run(run())
+
+
+def test_consecutive_segments_are_merged(clock):
+    requests, stats = run_dispatcher(
+        clock, [get_segment("segment-1", "I need"), 0.1, get_segment("segment-2", "help")]
+    )
+
+    assert len(requests) == 1
+    assert requests[0]["SegmentId"] == "segment-2"
+    assert requests[0]["StartTime"] == 1.0
+    assert requests[0]["Transcript"] == "I need help"
+    assert stats["segments"] == 2
+
+
+def test_turn_ends_when_the_agent_speaks(clock):
+    requests, stats = run_dispatcher(
+        clock,
+        [
+            get_segment("segment-1", "first"),
+            get_segment("segment-2", "question", call_id="call-2"),
+            "call-1",
+            get_segment("segment-3", "second"),
+        ],
+    )
+
+    assert [r["Transcript"] for r in requests] == ["first", "question", "second"]
+    assert stats["flush_channel"] == 1
+
+
+@pytest.mark.parametrize(
+    "steps, segment_ids, reason",
+    [
+        (
+            [get_segment("segment-1"), 0.6, get_segment("segment-2")],
+            ["segment-1", "segment-2"],
+            "quiet_window",
+        ),
+        (
+            [
+                get_segment("segment-1"),
+                0.4,
+                get_segment("segment-2"),
+                0.4,
+                get_segment("segment-3"),
+            ],
+            ["segment-2", "segment-3"],
+            "max_delay",
+        ),
+        (
+            [get_segment("segment-1", "x" * 6), get_segment("segment-2", "x" * 6), 0.1],
+            ["segment-2"],
+            "max_length",
+        ),
+    ],
+)
+def test_turns_are_split(clock, steps, segment_ids, reason):
+    requests, stats = run_dispatcher(clock, steps, quiet_window=0.5, max_delay=0.8, max_length=12)
+
+    assert [r["SegmentId"] for r in requests] == segment_ids
+    assert stats[f"flush_{reason}"] == 1
+
+
+def test_zero_quiet_window_dispatches_each_segment(clock):
+    requests, stats = run_dispatcher(
+        clock, [get_segment("segment-1"), get_segment("segment-2")], quiet_window=0
+    )
+
+    assert len(requests) == 2
+    assert stats["flush_segment"] == 2
+
+
+def test_flush_dispatches_every_pending_turn(clock):
+    # the turns of a caller still speaking are not held for the next invocation
+    requests, stats = run_dispatcher(
+        clock,
+        [get_segment("segment-1"), get_segment("segment-2", call_id="call-2")],
+        max_delay=60,
+    )
+
+    assert sorted(r["CallId"] for r in requests) == ["call-1", "call-2"]
+    assert stats["flush_flush"] == 2
+
+
+def test_dispatch_errors_are_counted(clock):
+    async def dispatch(payload):
+        raise RuntimeError(payload["SegmentId"])
+
+    async def run():
+        dispatcher = AgentAssistTurnDispatcher(dispatch_fn=dispatch)
+        dispatcher.add(get_segment("segment-1"))
+        await dispatcher.flush()
+        return dispatcher.stats
+
+    assert asyncio.run(run())["errors"] == 1
+
+
+def test_agent_assist_without_orchestrator_is_skipped(monkeypatch):
+    monkeypatch.delattr(call_event_processor, "AGENT_ASSIST_DISPATCHER", raising=False)
+    monkeypatch.setattr(call_event_processor, "ASYNC_AGENT_ASSIST_ORCHESTRATOR_ARN", "")
+    monkeypatch.setattr(call_event_processor, "IS_SENTIMENT_ANALYSIS_ENABLED", False)
+    session = EchoSession()
+    message = dict(get_segment("segment-1"), EventType="ADD_TRANSCRIPT_SEGMENT")
+
+    result = asyncio.run(
+        call_event_processor.execute_process_event_api_mutation(
+            message=message,
+            settings={},
+            appsync_session=session,
+            sns_client=None,
+            agent_assist_args=dict(
+                is_lex_agent_assist_enabled=False, is_lambda_agent_assist_enabled=True
+            ),
+            sentiment_analysis_args=dict(sentiment_aggregation_store=SentimentAggregationStore()),
+        )
+    )
+
+    assert result
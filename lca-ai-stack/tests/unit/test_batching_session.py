@@ -0,0 +1,95 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Batching client session tests"""
+# pylint: disable=import-error
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from appsync_utils import BatchingClientSession, get_compiled_operation, load_schema_snapshot
+from gql.dsl import DSLMutation
+from gql.transport.exceptions import TransportQueryError
+
+SCHEMA = load_schema_snapshot()
+
+
+def _create_call_operation(schema, variables):
+    return DSLMutation(
+        schema.Mutation.createCall.args(input=variables.input).select(
+            schema.CreateCallOutput.CallId
+        )
+    )
+
+
+OPERATION = get_compiled_operation("TestCreateCall", SCHEMA, _create_call_operation)
+
+
+class FakeSession:
+    """AppSync session rejecting the requests with an invalid CallId"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, errors_have_path: bool) -> None:
+        self.client = SimpleNamespace(schema=SCHEMA)
+        self.errors_have_path = errors_have_path
+        self.request_count = 0
+
+    async def execute(self, document, variable_values=None):
+        """Echoes the CallId of each aliased input"""
+        self.request_count += 1
+        data = {}
+        errors = []
+        for name, value in (variable_values or {}).items():
+            alias = name.split("_")[0] if "_" in name else "createCall"
+            if value["CallId"] == "invalid":
+                errors.append(
+                    dict(message="invalid CallId", path=[alias] if self.errors_have_path else None)
+                )
+                data[alias] = None
+            else:
+                data[alias] = dict(CallId=value["CallId"])
+        if errors and not self.errors_have_path:
+            # request errors have no data
+            raise TransportQueryError(str(errors[0]), errors=errors, data=None)
+        if errors:
+            raise TransportQueryError(str(errors[0]), errors=errors, data=data)
+        return data
+
+
+def create_calls(session: FakeSession, call_ids):
+    """Runs a createCall mutation per CallId in one batch"""
+
+    async def create_call(batching_session, call_id):
+        try:
+            return await batching_session.execute(
+                OPERATION.document, variable_values=dict(input=dict(CallId=call_id))
+            )
+        except TransportQueryError as error:
+            return error
+
+    async def run():
+        batching_session = BatchingClientSession(session, max_batch_size=len(call_ids))
+        return await asyncio.gather(*(create_call(batching_session, c) for c in call_ids))
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("errors_have_path", [True, False])
+def test_only_the_failed_operation_raises(errors_have_path):
+    session = FakeSession(errors_have_path=errors_have_path)
+
+    results = create_calls(session, ["call-1", "invalid", "call-3"])
+
+    assert results[0] == dict(createCall=dict(CallId="call-1"))
+    assert isinstance(results[1], TransportQueryError)
+    assert results[2] == dict(createCall=dict(CallId="call-3"))
+    # the operations are run one at a time after an error without a path
+    assert session.request_count == (1 if errors_have_path else 4)
+
+
+def test_batch_is_sent_as_one_request():
+    session = FakeSession(errors_have_path=True)
+
+    results = create_calls(session, ["call-1", "call-2"])
+
+    assert [r["createCall"]["CallId"] for r in results] == ["call-1", "call-2"]
+    assert session.request_count == 1
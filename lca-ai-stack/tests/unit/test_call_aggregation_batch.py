@@ -0,0 +1,80 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Call aggregation batch tests"""
+# pylint: disable=import-error
+import asyncio
+from time import time
+
+from test_transcript_batch_processor import FakeAppsyncClient, get_kds_event
+from transcript_batch_processor import CallAggregationBatch, TranscriptBatchProcessor
+
+
+def get_segment(call_id: str, segment_id: str, end_time: float):
+    """Final transcript segment"""
+    return dict(
+        EventType="ADD_TRANSCRIPT_SEGMENT",
+        CallId=call_id,
+        SegmentId=segment_id,
+        IsPartial=False,
+        EndTime=end_time,
+        Transcript=segment_id,
+    )
+
+
+def test_requests_are_coalesced_per_call():
+    batch = CallAggregationBatch()
+    batch.add(get_segment("call-1", "a2", 2.0), sentiment_segments=[dict(SegmentId="a2")])
+    batch.add(get_segment("call-2", "b1", 1.0))
+    # out of order records keep the segment with the latest end time
+    batch.add(get_segment("call-1", "a1", 1.0), sentiment_segments=[dict(SegmentId="a1")])
+
+    assert batch.request_count == 3
+    assert batch.coalesced_count == 1
+    pending = {p.call_id: p for p in batch.pop_all()}
+    assert pending["call-1"].message["SegmentId"] == "a2"
+    assert [s["SegmentId"] for s in pending["call-1"].sentiment_segments] == ["a2", "a1"]
+    assert pending["call-1"].request_count == 2
+    assert pending["call-2"].request_count == 1
+    assert not batch.pop_all()
+
+
+def test_aggregations_run_once_per_call_after_the_batch_writes():
+    events = []
+
+    async def api_mutation_fn(message, call_aggregation_batch=None, **_kwargs):
+        events.append(("mutation", message["SegmentId"]))
+        call_aggregation_batch.add(message)
+        return dict(errors=[])
+
+    async def call_aggregation_fn(pending_call_aggregation, **_kwargs):
+        events.append(("aggregation", pending_call_aggregation.message["SegmentId"]))
+        return dict(errors=[])
+
+    messages = [
+        get_segment("call-1", "a1", 1.0),
+        get_segment("call-2", "b1", 1.0),
+        get_segment("call-1", "a2", 2.0),
+        get_segment("call-1", "a3", 3.0),
+    ]
+
+    async def run():
+        async with TranscriptBatchProcessor(
+            appsync_client=FakeAppsyncClient(),  # type: ignore
+            api_mutation_fn=api_mutation_fn,  # type: ignore
+            sns_client=None,
+            settings={},
+            call_aggregation_fn=call_aggregation_fn,  # type: ignore
+            coalesce_partial_transcripts_enabled=False,
+        ) as processor:
+            await processor.handle_event(get_kds_event(messages, time()))
+        return processor
+
+    processor = asyncio.run(run())
+
+    assert [kind for kind, _ in events] == ["mutation"] * 4 + ["aggregation"] * 2
+    assert sorted(segment_id for kind, segment_id in events if kind == "aggregation") == [
+        "a3",
+        "b1",
+    ]
+    assert processor.metrics["call_aggregations_requested"] == 4
+    assert processor.metrics["call_aggregations_coalesced"] == 2
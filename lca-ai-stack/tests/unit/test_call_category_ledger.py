@@ -0,0 +1,132 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Call category ledger tests"""
+# pylint: disable=import-error
+import asyncio
+
+from eventprocessor_utils import (
+    CallCategoryLedger,
+    call_category_ledger,
+    get_category_alert_key,
+    get_category_segment_key,
+)
+from fakes import FakeStateTable
+
+CALL_ID = "call-1"
+KEYS = ["category#Billing", get_category_segment_key("Billing", 1, 2.5)]
+
+
+def claim(ledger: CallCategoryLedger, keys=None):
+    """Claims the keys of the call"""
+    return asyncio.run(ledger.claim(CALL_ID, KEYS if keys is None else keys))
+
+
+def record(ledger: CallCategoryLedger, keys=None):
+    """Records the keys of the call"""
+    asyncio.run(ledger.record(CALL_ID, KEYS if keys is None else keys, expires_after=0))
+
+
+def test_side_effect_keys_are_separate():
+    assert get_category_segment_key("Billing", 1, 2.5) != get_category_alert_key("Billing", 1, 2.5)
+    assert get_category_alert_key("Billing") == "alert#Billing"
+
+
+def test_claimed_keys_are_pending_until_recorded():
+    state_table = FakeStateTable()
+    ledger = CallCategoryLedger(state_table)
+
+    assert claim(ledger) == KEYS
+    # pending - the repeated matches of the batch are duplicates
+    assert claim(ledger) == []
+    assert all("ClaimExpiresAt" in item for item in state_table.items.values())
+
+    record(ledger)
+
+    assert claim(ledger) == []
+    assert sorted(sk for _, sk in state_table.items) == sorted(KEYS)
+    assert not any("ClaimExpiresAt" in item for item in state_table.items.values())
+    # claimed with a conditional put - the table is not read
+    assert state_table.calls == dict(put_item=2, update_item=2)
+
+
+def test_recorded_keys_are_skipped_by_other_containers():
+    state_table = FakeStateTable()
+    ledger = CallCategoryLedger(state_table)
+    claim(ledger, KEYS[:1])
+    record(ledger, KEYS[:1])
+
+    other_ledger = CallCategoryLedger(state_table)
+
+    assert claim(other_ledger) == KEYS[1:]
+    assert other_ledger.stats["table_duplicates"] == 1
+
+
+def test_keys_are_claimed_by_a_single_container():
+    state_table = FakeStateTable()
+    ledgers = [CallCategoryLedger(state_table) for _ in range(4)]
+
+    async def run():
+        return await asyncio.gather(*(ledger.claim(CALL_ID, KEYS) for ledger in ledgers))
+
+    claimed_keys = [key for keys in asyncio.run(run()) for key in keys]
+
+    assert sorted(claimed_keys) == sorted(KEYS)
+
+
+def test_claim_of_a_crashed_container_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(call_category_ledger, "monotonic", lambda: now[0])
+    monkeypatch.setattr(call_category_ledger, "time", lambda: now[0])
+    state_table = FakeStateTable()
+    claim(CallCategoryLedger(state_table, claim_timeout=30))
+    ledger = CallCategoryLedger(state_table, claim_timeout=30)
+
+    # the side effects may still be in flight in the other container
+    assert claim(ledger) == []
+    now[0] += 31
+
+    # the side effects were never sent - the retried record claims them
+    assert claim(ledger) == KEYS
+
+
+def test_released_keys_are_claimed_again():
+    state_table = FakeStateTable()
+    ledger = CallCategoryLedger(state_table)
+    claim(ledger)
+    record(ledger, KEYS[:1])
+
+    asyncio.run(ledger.release(CALL_ID, KEYS))
+
+    # recorded keys are not released
+    assert claim(ledger) == KEYS[1:]
+    assert ledger.stats["released"] == 1
+    # the claim item is deleted for the retry in another container
+    asyncio.run(ledger.release(CALL_ID, KEYS[1:]))
+    assert claim(CallCategoryLedger(state_table)) == KEYS[1:]
+
+
+def test_pending_keys_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(call_category_ledger, "monotonic", lambda: now[0])
+    monkeypatch.setattr(call_category_ledger, "time", lambda: now[0])
+    ledger = CallCategoryLedger(FakeStateTable(), claim_timeout=30)
+    claim(ledger)
+    now[0] += 31
+
+    # e.g. the task of the side effect was never awaited
+    assert claim(ledger) == KEYS
+    assert ledger.stats["expired"] == len(KEYS)
+
+
+def test_state_table_errors_send_the_keys():
+    class FailingStateTable(FakeStateTable):
+        """State table that can't be written"""
+
+        def put_item(self, Item, **kwargs):
+            # pylint: disable=invalid-name
+            raise RuntimeError("unavailable")
+
+    ledger = CallCategoryLedger(FailingStateTable())
+
+    assert claim(ledger) == KEYS
+    assert ledger.stats["errors"] == len(KEYS)
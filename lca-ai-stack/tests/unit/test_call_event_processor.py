@@ -0,0 +1,135 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Call event processor tests"""
+# pylint: disable=import-error
+import asyncio
+from types import SimpleNamespace
+
+import boto3
+from appsync_utils import load_schema_snapshot
+from botocore.stub import Stubber
+from event_processor import call_event_processor
+from eventprocessor_utils import CallCategoryLedger
+from fakes import FakeStateTable
+from gql.transport.exceptions import TransportQueryError
+
+TOPIC_ARN = "arn:aws:sns:us-east-1:123456789012:test"
+
+
+class EchoSession:
+    """AppSync session counting the category segments"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self) -> None:
+        self.client = SimpleNamespace(schema=load_schema_snapshot())
+        self.category_segment_count = 0
+
+    async def execute(self, document, variable_values=None):
+        """Echoes the input"""
+        call_input = (variable_values or {}).get("input") or {}
+        if call_input.get("Channel") == "CATEGORY_MATCH":
+            self.category_segment_count += 1
+        field_name = document.definitions[0].selection_set.selections[0].name.value
+        return {field_name: call_input}
+
+
+class ErrorSession:
+    """AppSync session failing every request with a resolver error"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, message: str) -> None:
+        self.client = SimpleNamespace(schema=load_schema_snapshot())
+        self.message = message
+        self.request_count = 0
+
+    async def execute(self, document, variable_values=None):
+        """Raises the resolver error"""
+        # pylint: disable=unused-argument
+        self.request_count += 1
+        raise TransportQueryError(
+            self.message,
+            errors=[
+                dict(errorType="DynamoDB:ConditionalCheckFailedException", message=self.message)
+            ],
+        )
+
+
+def test_existing_call_is_ignored():
+    session = ErrorSession("Item already exists")
+    message = dict(
+        EventType="START",
+        CallId="call-1",
+        CustomerPhoneNumber="+15550100",
+        SystemPhoneNumber="+15550101",
+        CreatedAt="2024-01-01T00:00:00.000Z",
+    )
+
+    result = asyncio.run(
+        call_event_processor.execute_create_call_mutation(message, appsync_session=session)
+    )
+
+    assert result == {"ok": True}
+    assert session.request_count == 1
+
+
+def test_transcript_segment_condition_failure_is_ignored():
+    session = ErrorSession("item put condition failure")
+    message = dict(
+        CallId="call-1",
+        Channel="CALLER",
+        SegmentId="segment-1",
+        StartTime=0.0,
+        EndTime=1.0,
+        Transcript="hello",
+        IsPartial=False,
+    )
+
+    async def add_transcript_segments():
+        return await asyncio.gather(
+            *call_event_processor.add_transcript_segments(message, appsync_session=session)
+        )
+
+    assert asyncio.run(add_transcript_segments()) == [{"ok": True}]
+    assert session.request_count == 1
+
+
+def test_failed_category_alert_is_sent_again_without_the_segment(monkeypatch):
+    monkeypatch.setattr(call_event_processor, "SNS_TOPIC_ARN", TOPIC_ARN)
+    # set from the settings parameter by execute_process_event_api_mutation
+    monkeypatch.setattr(call_event_processor, "SETTINGS", {}, raising=False)
+    session = EchoSession()
+    sns_client = boto3.client("sns", region_name="us-east-1")
+    ledger = CallCategoryLedger(FakeStateTable())
+    message = dict(
+        EventType="ADD_CALL_CATEGORY",
+        CallId="call-1",
+        CreatedAt="2024-01-01T00:00:00.000Z",
+        CategoryEvent=dict(
+            MatchedCategories=["Billing"],
+            MatchedDetails=dict(
+                Billing=dict(TimestampRanges=[dict(BeginOffsetMillis=0, EndOffsetMillis=2500)])
+            ),
+        ),
+    )
+
+    async def add_call_category():
+        tasks = await call_event_processor.add_call_category(
+            dict(message),
+            appsync_session=session,
+            sns_client=sns_client,
+            call_category_ledger=ledger,
+        )
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    with Stubber(sns_client) as stubber:
+        stubber.add_client_error("publish", service_error_code="InternalError")
+        stubber.add_response("publish", dict(MessageId="message-1"))
+
+        first_results = asyncio.run(add_call_category())
+        # the record is replayed
+        replay_results = asyncio.run(add_call_category())
+        stubber.assert_no_pending_responses()
+
+    assert sum(isinstance(r, Exception) for r in first_results) == 1
+    assert replay_results == [dict(MessageId="message-1")]
+    assert session.category_segment_count == 1
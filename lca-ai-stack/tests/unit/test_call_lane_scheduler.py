@@ -0,0 +1,76 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Call lane scheduler tests"""
+# pylint: disable=import-error
+import asyncio
+
+from transcript_batch_processor import CallLaneScheduler
+
+
+class Recorder:
+    """Records the start and end of the items and the running items"""
+
+    def __init__(self) -> None:
+        self.events = []
+        self.running = 0
+        self.max_running = 0
+
+    async def item(self, name: str, delay: float = 0.0, error: bool = False) -> str:
+        """Item coroutine"""
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.events.append(("start", name))
+        try:
+            await asyncio.sleep(delay)
+            if error:
+                raise ValueError(name)
+            return name
+        finally:
+            self.events.append(("end", name))
+            self.running -= 1
+
+
+def test_items_of_a_lane_run_in_order():
+    recorder = Recorder()
+    scheduler = CallLaneScheduler()
+    items = [
+        ("call-1", recorder.item("a1", delay=0.02)),
+        ("call-2", recorder.item("b1")),
+        ("call-1", recorder.item("a2")),
+        ("call-2", recorder.item("b2", delay=0.01)),
+        ("call-1", recorder.item("a3")),
+    ]
+
+    results = asyncio.run(scheduler.run(items))
+
+    assert results == ["a1", "b1", "a2", "b2", "a3"]
+    for lane in (["a1", "a2", "a3"], ["b1", "b2"]):
+        lane_events = [e for e in recorder.events if e[1] in lane]
+        assert lane_events == [(event, name) for name in lane for event in ("start", "end")]
+    # the lanes progress concurrently
+    assert recorder.events.index(("end", "b2")) < recorder.events.index(("end", "a1"))
+
+
+def test_failed_item_does_not_stop_its_lane():
+    recorder = Recorder()
+    items = [
+        ("call-1", recorder.item("a1", error=True)),
+        ("call-1", recorder.item("a2")),
+    ]
+
+    results = asyncio.run(CallLaneScheduler().run(items))
+
+    assert isinstance(results[0], ValueError)
+    assert results[1] == "a2"
+
+
+def test_concurrency_is_bounded_across_lanes():
+    recorder = Recorder()
+    scheduler = CallLaneScheduler(max_concurrency=2)
+    items = [(f"call-{i}", recorder.item(f"item-{i}", delay=0.01)) for i in range(6)]
+
+    asyncio.run(scheduler.run(items))
+
+    assert recorder.max_running == 2
+    assert scheduler.metrics["lanes"] == 6
+    assert scheduler.metrics["lane_depth_max"] == 1
@@ -0,0 +1,81 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Call metadata cache tests"""
+# pylint: disable=import-error
+import pytest
+from eventprocessor_utils import CallMetadataCache
+from eventprocessor_utils import call_metadata_cache
+
+
+@pytest.fixture(name="now")
+def fixture_now(monkeypatch):
+    """Monotonic clock of the cache advanced by the tests"""
+    now = [100.0]
+    monkeypatch.setattr(call_metadata_cache, "monotonic", lambda: now[0])
+    return now
+
+
+def test_metadata_of_the_call_events_is_merged():
+    cache = CallMetadataCache()
+
+    cache.update(
+        "call-1",
+        dict(
+            CallId="ignored",
+            CustomerPhoneNumber="+15550100",
+            SystemPhoneNumber="+15550199",
+            Status="STARTED",
+            EventType="START",
+        ),
+    )
+    metadata = cache.update("call-1", dict(AgentId="agent-1", Status="", CustomerPhoneNumber=None))
+
+    assert metadata == dict(
+        CallId="call-1",
+        CustomerPhoneNumber="+15550100",
+        SystemPhoneNumber="+15550199",
+        AgentId="agent-1",
+        Status="STARTED",
+    )
+    assert cache.get("call-1") == metadata
+    assert cache.get("call-2") is None
+    assert not cache.update("", dict(AgentId="agent-1"))
+    assert cache.stats == dict(
+        hits=1, misses=1, updates=2, evicted=0, expired=0, hit_rate=0.5, calls=1
+    )
+
+
+def test_returned_metadata_is_a_copy():
+    cache = CallMetadataCache()
+    cache.update("call-1", dict(AgentId="agent-1"))
+
+    cache.get("call-1")["AgentId"] = "changed"
+
+    assert cache.get("call-1")["AgentId"] == "agent-1"
+
+
+def test_metadata_expires_after_its_last_update(now):
+    cache = CallMetadataCache(ttl=60)
+    cache.update("call-1", dict(AgentId="agent-1"))
+    now[0] += 50
+    cache.update("call-1", dict(Status="ENDED"))
+    now[0] += 50
+
+    assert cache.get("call-1")["Status"] == "ENDED"
+    now[0] += 10
+    assert cache.get("call-1") is None
+    assert cache.stats["expired"] == 1
+    assert cache.stats["calls"] == 0
+
+
+def test_least_recently_updated_calls_are_evicted():
+    cache = CallMetadataCache(max_size=2)
+    cache.update("call-1", dict(AgentId="agent-1"))
+    cache.update("call-2", dict(AgentId="agent-2"))
+    cache.update("call-1", dict(Status="STARTED"))
+
+    cache.update("call-3", dict(AgentId="agent-3"))
+
+    assert cache.get("call-2") is None
+    assert cache.get("call-1") is not None
+    assert cache.stats["evicted"] == 1
@@ -0,0 +1,101 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""boto3 client registry and contact attributes cache tests"""
+# pylint: disable=import-error
+import boto3
+import pytest
+from boto3_utils import ClientRegistry, ContactAttributesCache, LazyClient
+from boto3_utils import contact_attributes_cache
+from botocore.stub import Stubber
+
+INSTANCE_ID = "instance-1"
+
+
+def test_clients_are_created_once_and_shared():
+    registry = ClientRegistry()
+
+    client = registry.get_client("sns")
+
+    assert registry.get_client("sns") is client
+    assert registry.get_client("lambda") is not client
+    assert client.meta.config.max_pool_connections == 50
+    assert client.meta.config.retries["mode"] == "adaptive"
+    assert registry.get_resource("dynamodb") is registry.get_resource("dynamodb")
+
+
+def test_lazy_client_is_created_on_first_use():
+    registry = ClientRegistry()
+    factory_calls = []
+
+    def factory():
+        factory_calls.append("sns")
+        return registry.get_client("sns")
+
+    lazy_sns_client = LazyClient(factory)
+    assert not factory_calls
+
+    assert lazy_sns_client.meta.service_model.service_name == "sns"
+    assert lazy_sns_client.meta is registry.get_client("sns").meta
+    assert factory_calls == ["sns"]
+
+
+@pytest.fixture(name="connect_stubber")
+def fixture_connect_stubber():
+    """Stubbed Amazon Connect client"""
+    connect_client = boto3.client("connect", region_name="us-east-1")
+    with Stubber(connect_client) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+def add_contact_attributes(stubber: Stubber, contact_id: str) -> None:
+    """Adds a GetContactAttributes response"""
+    stubber.add_response(
+        "get_contact_attributes",
+        dict(Attributes=dict(ContactId=contact_id)),
+        dict(InstanceId=INSTANCE_ID, InitialContactId=contact_id),
+    )
+
+
+def test_contact_attributes_are_cached(connect_stubber):
+    cache = ContactAttributesCache(connect_client=connect_stubber.client)
+    add_contact_attributes(connect_stubber, "contact-1")
+
+    assert cache.get_contact_attributes(INSTANCE_ID, "contact-1") == dict(ContactId="contact-1")
+    assert cache.get_contact_attributes(INSTANCE_ID, "contact-1") == dict(ContactId="contact-1")
+    assert (cache.hit_count, cache.miss_count) == (1, 1)
+
+
+def test_contact_attributes_expire(monkeypatch, connect_stubber):
+    now = [100.0]
+    monkeypatch.setattr(contact_attributes_cache, "monotonic", lambda: now[0])
+    cache = ContactAttributesCache(connect_client=connect_stubber.client, ttl=10)
+    add_contact_attributes(connect_stubber, "contact-1")
+    add_contact_attributes(connect_stubber, "contact-1")
+
+    cache.get_contact_attributes(INSTANCE_ID, "contact-1")
+    now[0] += 9
+    cache.get_contact_attributes(INSTANCE_ID, "contact-1")
+    now[0] += 2
+    cache.get_contact_attributes(INSTANCE_ID, "contact-1")
+
+    assert (cache.hit_count, cache.miss_count) == (1, 2)
+
+
+def test_least_recently_used_contacts_are_evicted(connect_stubber):
+    cache = ContactAttributesCache(connect_client=connect_stubber.client, max_size=2)
+    for contact_id in ["contact-1", "contact-2", "contact-3", "contact-2"]:
+        add_contact_attributes(connect_stubber, contact_id)
+
+    # contact-1 is kept by its second lookup, contact-2 is evicted by contact-3
+    for contact_id in [
+        "contact-1",
+        "contact-2",
+        "contact-1",
+        "contact-3",
+        "contact-1",
+        "contact-2",
+    ]:
+        cache.get_contact_attributes(INSTANCE_ID, contact_id)
+
+    assert (cache.hit_count, cache.miss_count) == (2, 4)
@@ -0,0 +1,97 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Compiled GraphQL operation tests"""
+# pylint: disable=import-error
+from types import MappingProxyType
+
+from appsync_utils.compiled_operation import (
+    get_compiled_operation,
+    get_compiled_operation_from_document,
+)
+from gql.dsl import DSLMutation
+from graphql import build_schema
+
+SCHEMA_DEFINITION = """
+input SentimentInput {
+    Score: Float
+}
+input SegmentInput {
+    CallId: ID!
+    Transcript: String
+    Sentiment: [SentimentInput]
+}
+type Segment {
+    CallId: ID!
+}
+type Query {
+    getSegment(CallId: ID!): Segment
+}
+type Mutation {
+    addSegment(input: SegmentInput!): Segment
+}
+"""
+
+
+class BuildFn:
+    """Builds the addSegment mutation and counts the builds"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, schema, variables):
+        self.count += 1
+        return DSLMutation(
+            schema.Mutation.addSegment.args(input=variables.input).select(schema.Segment.CallId)
+        )
+
+
+def test_operation_is_compiled_once_per_schema():
+    schema = build_schema(SCHEMA_DEFINITION)
+    build_fn = BuildFn()
+
+    operation = get_compiled_operation(name="AddSegmentOnce", schema=schema, build_fn=build_fn)
+
+    assert get_compiled_operation("AddSegmentOnce", schema, build_fn) is operation
+    assert build_fn.count == 1
+    assert "$input: SegmentInput!" in operation.query_string
+    assert get_compiled_operation_from_document(operation.document) is operation
+    # a new schema, e.g. after a reconnection, compiles the operation again
+    other_operation = get_compiled_operation(
+        "AddSegmentOnce", build_schema(SCHEMA_DEFINITION), build_fn
+    )
+    assert other_operation is not operation
+    assert build_fn.count == 2
+
+
+def test_variables_keep_the_fields_of_the_input_type():
+    operation = get_compiled_operation(
+        name="AddSegmentVariables", schema=build_schema(SCHEMA_DEFINITION), build_fn=BuildFn()
+    )
+
+    variables = operation.variables(
+        input=dict(
+            CallId="call-1",
+            Transcript="hello",
+            EventType="ADD_TRANSCRIPT_SEGMENT",
+            Sentiment=[dict(Score=0.5, Label="POSITIVE")],
+        ),
+        unknown="ignored",
+    )
+
+    assert variables == dict(
+        input=dict(CallId="call-1", Transcript="hello", Sentiment=[dict(Score=0.5)])
+    )
+
+
+def test_variables_of_mappings_and_single_list_items():
+    operation = get_compiled_operation(
+        name="AddSegmentMapping", schema=build_schema(SCHEMA_DEFINITION), build_fn=BuildFn()
+    )
+    segment = MappingProxyType(
+        dict(CallId="call-1", Transcript=None, Sentiment=dict(Score=0.1), IsPartial=False)
+    )
+
+    assert operation.variables(input=segment) == dict(
+        input=dict(CallId="call-1", Transcript=None, Sentiment=[dict(Score=0.1)])
+    )
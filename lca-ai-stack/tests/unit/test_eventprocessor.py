@@ -0,0 +1,40 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Transcript segment normalization tests"""
+# pylint: disable=import-error
+import pytest
+from eventprocessor_utils import normalize_transcript_segments
+
+
+def get_message(**offsets):
+    """Custom transcript segment message"""
+    return dict(
+        EventType="ADD_TRANSCRIPT_SEGMENT",
+        CallId="call-1",
+        Channel="CALLER",
+        SegmentId="segment-1",
+        Transcript="hello",
+        IsPartial=False,
+        **offsets,
+    )
+
+
+@pytest.mark.parametrize(
+    "offsets",
+    [
+        dict(StartTime=0.0, EndTime=1.5),
+        dict(BeginOffsetMillis=0, EndTime=1.5),
+    ],
+)
+def test_zero_start_offset_is_kept(offsets):
+    (segment,) = normalize_transcript_segments(get_message(**offsets))
+
+    assert segment["StartTime"] == 0
+    assert segment["EndTime"] == 1.5
+
+
+def test_zero_end_offset_is_kept():
+    (segment,) = normalize_transcript_segments(get_message(StartTime=0.0, EndTime=0.0))
+
+    assert segment["StartTime"] == 0
+    assert segment["EndTime"] == 0
@@ -0,0 +1,72 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Async Lambda invoker tests"""
+# pylint: disable=import-error
+import asyncio
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+from lambda_utils import AsyncLambdaInvoker
+
+FUNCTION_NAME = "agent-assist"
+
+
+def invoke(lambda_client, **kwargs):
+    """Invokes the function without sleeping between retries
+
+    Returns the response or the client error and the stats of the hook type
+    """
+    invoker = AsyncLambdaInvoker(lambda_client=lambda_client, min_sleep_time=0, **kwargs)
+
+    async def run():
+        try:
+            return await invoker.invoke(
+                function_name=FUNCTION_NAME, payload=dict(CallId="call-1"), hook_type="agent_assist"
+            )
+        except ClientError as error:
+            return error
+
+    return asyncio.run(run()), invoker.stats["agent_assist"]
+
+
+def test_throttled_invocations_are_retried():
+    lambda_client = boto3.client("lambda", region_name="us-east-1")
+    expected_params = dict(
+        FunctionName=FUNCTION_NAME, InvocationType="RequestResponse", Payload='{"CallId": "call-1"}'
+    )
+    with Stubber(lambda_client) as stubber:
+        stubber.add_client_error("invoke", service_error_code="TooManyRequestsException")
+        stubber.add_client_error("invoke", service_error_code="ResourceConflictException")
+        stubber.add_response("invoke", dict(StatusCode=200), expected_params)
+
+        response, stats = invoke(lambda_client)
+
+        stubber.assert_no_pending_responses()
+    assert response["StatusCode"] == 200
+    assert stats["count"] == 1
+    assert stats["retries"] == 2
+    assert stats["errors"] == 0
+
+
+@pytest.mark.parametrize(
+    "error_codes, max_retries",
+    [
+        (["InvalidRequestContentException"], 3),
+        (["TooManyRequestsException"] * 2, 1),
+    ],
+)
+def test_errors_are_raised(error_codes, max_retries):
+    lambda_client = boto3.client("lambda", region_name="us-east-1")
+    with Stubber(lambda_client) as stubber:
+        for error_code in error_codes:
+            stubber.add_client_error("invoke", service_error_code=error_code)
+
+        error, stats = invoke(lambda_client, max_retries=max_retries)
+
+        stubber.assert_no_pending_responses()
+    assert isinstance(error, ClientError)
+    assert error.response["Error"]["Code"] == error_codes[-1]
+    assert stats["retries"] == len(error_codes) - 1
+    assert stats["errors"] == 1
@@ -0,0 +1,55 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Lazy layer package import tests"""
+# pylint: disable=import-error
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from conftest import LAYER_DIR
+
+LAZY_PACKAGES = [
+    "appsync_utils",
+    "boto3_utils",
+    "lambda_utils",
+    "sentiment",
+    "transcript_batch_processor",
+    "transcript_hooks",
+]
+
+
+def get_imported_modules(package_name: str):
+    """Imports a package in a fresh interpreter and returns the loaded modules"""
+    code = f"import json, sys; import {package_name}; print(json.dumps(sorted(sys.modules)))"
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        env=dict(os.environ, PYTHONPATH=LAYER_DIR),
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+@pytest.mark.parametrize("package_name", LAZY_PACKAGES)
+def test_package_import_does_not_load_submodules(package_name):
+    modules = get_imported_modules(package_name)
+
+    assert not [m for m in modules if m.startswith(f"{package_name}.")]
+    assert "boto3" not in modules
+    assert "gql" not in modules
+
+
+@pytest.mark.parametrize("package_name", LAZY_PACKAGES)
+def test_package_exports_are_resolved_on_access(package_name):
+    package = importlib.import_module(package_name)
+
+    # pylint: disable=protected-access
+    assert sorted(package.__all__) == sorted(package._ATTRIBUTE_MODULES)
+    for name in package.__all__:
+        assert getattr(package, name) is not None
+    with pytest.raises(AttributeError):
+        getattr(package, "missing_attribute")
@@ -0,0 +1,72 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Lazy and sampled logging tests"""
+# pylint: disable=import-error
+import logging
+
+import pytest
+from logging_utils import DebugLogSampler, LazyJson, LazyStr, is_debug_enabled
+from logging_utils import lazy_logging
+
+
+class ListHandler(logging.Handler):
+    """Keeps the formatted messages"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture(name="logger")
+def fixture_logger():
+    """Logger with a handler keeping the messages"""
+    logger = logging.getLogger("test.lazy_logging")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = ListHandler()
+    logger.addHandler(handler)
+    yield logger
+    logger.removeHandler(handler)
+
+
+def test_arguments_are_formatted_when_the_record_is_emitted(logger):
+    calls = []
+
+    def format_payload(payload):
+        calls.append(payload)
+        return f"payload {payload}"
+
+    logger.debug("%s %s", LazyStr(format_payload, 1), LazyJson(dict(CallId="call-1")))
+    assert not calls
+
+    logger.info("%s %s", LazyStr(format_payload, 2), LazyJson(dict(CallId="call-1")))
+    # formatted by each handler - only the emitted record is formatted
+    assert set(calls) == {2}
+    assert logger.handlers[0].messages == ['payload 2 {"CallId": "call-1"}']
+
+
+@pytest.mark.parametrize("random_value, is_sampled", [(0.05, True), (0.5, False)])
+def test_debug_level_is_sampled_per_invocation(monkeypatch, logger, random_value, is_sampled):
+    child_logger = logging.getLogger("test.lazy_logging.child")
+    monkeypatch.setattr(lazy_logging, "random", lambda: random_value)
+    sampler = DebugLogSampler(logger, sample_rate=0.1)
+
+    assert sampler.sample() is is_sampled
+    assert is_debug_enabled(child_logger) is is_sampled
+
+    monkeypatch.setattr(lazy_logging, "random", lambda: 0.99)
+    assert sampler.sample() is False
+    # the level of the logger is restored for the next invocation
+    assert logger.level == logging.INFO
+    assert sampler.stats == dict(invocations=2, sampled=int(is_sampled))
+
+
+def test_zero_sample_rate_never_samples(monkeypatch, logger):
+    monkeypatch.setattr(lazy_logging, "random", lambda: 0.0)
+    sampler = DebugLogSampler(logger)
+
+    assert not any(sampler.sample() for _ in range(10))
+    assert not is_debug_enabled(logger)
@@ -0,0 +1,106 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Partial transcript coalescing tests"""
+# pylint: disable=import-error
+from eventprocessor_utils import PartialUtteranceBuffer
+from transcript_batch_processor.partial_transcript_coalescing import (
+    coalesce_partial_transcripts,
+    drop_partial_transcripts,
+)
+
+
+def get_segment(segment_id: str, transcript: str, is_partial: bool = True):
+    """ADD_TRANSCRIPT_SEGMENT message"""
+    return dict(
+        EventType="ADD_TRANSCRIPT_SEGMENT",
+        CallId="call-1",
+        SegmentId=segment_id,
+        IsPartial=is_partial,
+        Transcript=transcript,
+    )
+
+
+def get_contact_lens_message(*segments):
+    """Contact Lens SEGMENTS message"""
+    return dict(EventType="SEGMENTS", ContactId="contact-1", Segments=list(segments))
+
+
+def get_utterance(utterance_id: str, content: str):
+    """Contact Lens partial utterance"""
+    return dict(Utterance=dict(TranscriptId=utterance_id, PartialContent=content))
+
+
+def get_transcript(utterance_id: str, content: str):
+    """Contact Lens final transcript"""
+    return dict(Transcript=dict(Id=utterance_id, Content=content))
+
+
+def test_coalesce_keeps_the_latest_partial_of_each_segment():
+    messages = [
+        get_segment("s1", "hello"),
+        get_segment("s2", "other"),
+        get_segment("s1", "hello there"),
+    ]
+
+    saved_count, superseded = coalesce_partial_transcripts(messages)
+
+    assert saved_count == 1
+    assert superseded == {0}
+
+
+def test_coalesce_drops_the_partials_of_a_final_segment_in_the_batch():
+    messages = [
+        get_segment("s1", "hello"),
+        get_segment("s1", "hello there"),
+        get_segment("s1", "hello there.", is_partial=False),
+        get_segment("s2", "next"),
+    ]
+
+    saved_count, superseded = coalesce_partial_transcripts(messages)
+
+    assert saved_count == 2
+    assert superseded == {0, 1}
+
+
+def test_coalesce_prepends_the_superseded_contact_lens_contents():
+    messages = [
+        get_contact_lens_message(get_utterance("u1", "hello")),
+        get_contact_lens_message(get_utterance("u1", "there"), get_utterance("u2", "next")),
+    ]
+
+    saved_count, superseded = coalesce_partial_transcripts(messages)
+
+    assert saved_count == 1
+    assert superseded == {0}
+    assert messages[1]["Segments"][0]["Utterance"]["PartialContent"] == "hello there"
+
+
+def test_drop_removes_the_partials_and_keeps_the_finals():
+    messages = [
+        get_segment("s1", "hello"),
+        get_contact_lens_message(get_utterance("u1", "hi"), get_transcript("u0", "Bye.")),
+        get_segment("s1", "hello there.", is_partial=False),
+    ]
+
+    dropped_count, dropped = drop_partial_transcripts(messages)
+
+    assert dropped_count == 2
+    assert dropped == {0}
+    assert messages[1]["Segments"] == [get_transcript("u0", "Bye.")]
+
+
+def test_drop_buffers_the_contact_lens_contents():
+    partial_utterance_buffer = PartialUtteranceBuffer()
+    messages = [
+        get_contact_lens_message(get_utterance("u1", "hello")),
+        get_contact_lens_message(get_utterance("u1", "there")),
+    ]
+
+    dropped_count, dropped = drop_partial_transcripts(
+        messages, partial_utterance_buffer=partial_utterance_buffer
+    )
+
+    assert dropped_count == 2
+    assert dropped == {0, 1}
+    # the next partial written holds the dropped contents
+    assert partial_utterance_buffer.append("contact-1", "u1", "again") == " hello there again"
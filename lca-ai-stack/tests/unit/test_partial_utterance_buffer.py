@@ -0,0 +1,76 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Contact Lens partial utterance buffer tests"""
+# pylint: disable=import-error
+import pytest
+from eventprocessor_utils import PartialUtteranceBuffer
+from eventprocessor_utils import partial_utterance_buffer
+
+
+@pytest.fixture(name="now")
+def fixture_now(monkeypatch):
+    """Monotonic clock of the buffer advanced by the tests"""
+    now = [100.0]
+    monkeypatch.setattr(partial_utterance_buffer, "monotonic", lambda: now[0])
+    return now
+
+
+def test_partial_contents_are_concatenated_until_the_final_transcript():
+    buffer = PartialUtteranceBuffer()
+
+    assert buffer.append("call-1", "utterance-1", "I need") == " I need"
+    assert buffer.append("call-1", "utterance-1", "help") == " I need help"
+    assert buffer.append("call-2", "utterance-1", "hello") == " hello"
+
+    assert buffer.pop("call-1", "utterance-1")
+    assert not buffer.pop("call-1", "utterance-1")
+    assert buffer.append("call-1", "utterance-1", "again") == " again"
+    assert buffer.stats == dict(
+        completed=1, cleared=0, evicted=0, expired=0, calls=2, utterances=2, length=10
+    )
+
+
+def test_utterances_of_an_ended_call_are_cleared():
+    buffer = PartialUtteranceBuffer()
+    buffer.append("call-1", "utterance-1", "one")
+    buffer.append("call-1", "utterance-2", "two")
+    buffer.append("call-2", "utterance-1", "three")
+
+    assert buffer.clear_call("call-1") == 2
+    assert buffer.clear_call("call-1") == 0
+    assert buffer.stats["utterances"] == 1
+    assert buffer.stats["length"] == 5
+    assert buffer.stats["cleared"] == 2
+
+
+@pytest.mark.parametrize(
+    "max_utterances, max_length",
+    [(2, PartialUtteranceBuffer.DEFAULT_MAX_LENGTH), (10, 10)],
+)
+def test_least_recently_updated_utterances_are_evicted(max_utterances, max_length):
+    buffer = PartialUtteranceBuffer(max_utterances=max_utterances, max_length=max_length)
+    buffer.append("call-1", "utterance-1", "aaaa")
+    buffer.append("call-1", "utterance-2", "bbbb")
+    buffer.append("call-1", "utterance-1", "a")
+
+    buffer.append("call-2", "utterance-1", "cccc")
+
+    # utterance-2 was updated before utterance-1
+    assert not buffer.pop("call-1", "utterance-2")
+    assert buffer.append("call-1", "utterance-1", "a") == " aaaa a a"
+    assert buffer.stats["evicted"] == 1
+
+
+def test_stale_utterances_expire(now):
+    buffer = PartialUtteranceBuffer(max_age=60)
+    buffer.append("call-1", "utterance-1", "dropped final")
+    now[0] += 30
+    buffer.append("call-2", "utterance-1", "recent")
+    now[0] += 31
+
+    buffer.append("call-3", "utterance-1", "new")
+
+    assert buffer.stats["expired"] == 1
+    assert buffer.stats["utterances"] == 2
+    assert buffer.stats["calls"] == 2
+    assert not buffer.pop("call-1", "utterance-1")
@@ -0,0 +1,78 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""AppSync error classification and retry coordinator tests"""
+# pylint: disable=import-error
+import pytest
+from appsync_utils import RetryCoordinator, classify_error
+from gql.transport.exceptions import TransportQueryError, TransportServerError
+from graphql import GraphQLError
+from transcript_batch_processor import is_retryable_error
+
+
+def get_query_error(error_type: str, message: str) -> TransportQueryError:
+    """AppSync GraphQL error"""
+    return TransportQueryError(
+        message, errors=[dict(errorType=error_type, message=message, path=["createCall"])]
+    )
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        TransportServerError("Unauthorized", 401),
+        TransportServerError("Forbidden", 403),
+        get_query_error("UnauthorizedException", "Not Authorized to access createCall"),
+        get_query_error("UnrecognizedClientException", "The security token is invalid"),
+    ],
+)
+def test_auth_errors_are_retried_and_replayed(error):
+    retry_coordinator = RetryCoordinator()
+
+    assert classify_error(error) == "auth"
+    assert retry_coordinator.get_retry_delay("auth", retries=1, min_sleep_time=0.01) is not None
+    assert is_retryable_error(error)
+
+
+@pytest.mark.parametrize(
+    "error, error_class",
+    [
+        (TransportServerError("Too Many Requests", 429), "throttle"),
+        (TransportServerError("Bad Request", 400), "validation"),
+        (TransportServerError("Bad Gateway", 502), "server"),
+        (get_query_error("DynamoDB:ConditionalCheckFailedException", "failed"), "conflict"),
+        (get_query_error("MappingTemplate", "Validation error of type X"), "validation"),
+        (GraphQLError("Variable '$input' got invalid value"), "validation"),
+    ],
+)
+def test_classify_error(error, error_class):
+    assert classify_error(error) == error_class
+
+
+def test_validation_errors_are_not_retried_or_replayed():
+    error = get_query_error("BadRequestException", "invalid value")
+
+    assert RetryCoordinator().get_retry_delay("validation", 1, min_sleep_time=0.01) is None
+    assert not is_retryable_error(error)
+
+
+def test_auth_errors_do_not_open_the_circuit_breaker():
+    retry_coordinator = RetryCoordinator(failure_threshold=2)
+    for _ in range(3):
+        retry_coordinator.record_failure("auth")
+
+    assert retry_coordinator.state == "closed"
+    assert retry_coordinator.stats["auth"] == 3
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        TypeError("'NoneType' object is not subscriptable"),
+        KeyError("addTranscriptSegment"),
+        ValueError("invalid value in the response"),
+    ],
+)
+def test_unknown_errors_are_retried_and_replayed(error):
+    assert classify_error(error) == "unknown"
+    assert RetryCoordinator().get_retry_delay("unknown", 1, min_sleep_time=0.01) is not None
+    assert is_retryable_error(error)
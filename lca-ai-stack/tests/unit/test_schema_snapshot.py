@@ -0,0 +1,87 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""AppSync schema snapshot tests"""
+# pylint: disable=import-error
+import asyncio
+import json
+import os
+
+import pytest
+from appsync_utils import aio_gql_client
+from appsync_utils.aio_gql_client import AppsyncAioGqlClient
+from appsync_utils.schema_snapshot import (
+    APPSYNC_DEFINITIONS,
+    SCHEMA_SNAPSHOT_PATH,
+    get_schema_version,
+    load_schema_snapshot,
+)
+from gql.client import Client
+from graphql import build_schema, introspection_from_schema
+
+SCHEMA_DEFINITION_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    "source",
+    "appsync",
+    "schema.graphql",
+)
+URL = "https://test.appsync-api.us-east-1.amazonaws.com/graphql"
+
+
+def read_schema_definition() -> str:
+    """AppSync schema definition of the stack"""
+    with open(SCHEMA_DEFINITION_PATH, encoding="utf-8") as schema_file:
+        return schema_file.read()
+
+
+def read_snapshot():
+    """Snapshot bundled with the layer"""
+    with open(SCHEMA_SNAPSHOT_PATH, encoding="utf-8") as snapshot_file:
+        return json.load(snapshot_file)
+
+
+def test_snapshot_is_built_from_the_appsync_schema():
+    # rebuild it with: python -m appsync_utils.schema_snapshot <schema.graphql>
+    schema_definition = read_schema_definition()
+    snapshot = read_snapshot()
+
+    assert snapshot["version"] == get_schema_version(schema_definition)
+    schema = build_schema(APPSYNC_DEFINITIONS + schema_definition)
+    assert snapshot["introspection"] == json.loads(json.dumps(introspection_from_schema(schema)))
+
+
+def test_snapshot_of_another_version_is_not_loaded():
+    assert load_schema_snapshot(expected_version=read_snapshot()["version"]) is not None
+    assert load_schema_snapshot(expected_version="0000000000000000") is None
+
+
+def test_missing_snapshot_is_not_loaded(tmp_path):
+    assert load_schema_snapshot(snapshot_path=str(tmp_path / "missing.json")) is None
+
+
+@pytest.mark.parametrize(
+    "snapshot_path, schema_source",
+    [(SCHEMA_SNAPSHOT_PATH, "snapshot"), ("missing.json", "introspection")],
+)
+def test_client_falls_back_to_introspection(monkeypatch, snapshot_path, schema_source):
+    schemas = []
+
+    async def connect_async(client, reconnecting=False, **kwargs):
+        # pylint: disable=unused-argument
+        schemas.append(client.schema)
+        return "session"
+
+    monkeypatch.setattr(Client, "connect_async", connect_async)
+    logged = []
+    monkeypatch.setattr(aio_gql_client.LOGGER, "info", lambda message, extra: logged.append(extra))
+    client = AppsyncAioGqlClient(
+        url=URL,
+        fetch_schema_from_transport=True,
+        use_schema_snapshot=True,
+        schema_snapshot_path=snapshot_path,
+    )
+
+    assert asyncio.run(client.connect_async()) == "session"
+    # the gql client introspects the schema when it is not set
+    assert (schemas[0] is not None) == (schema_source == "snapshot")
+    assert logged[0]["schema_source"] == schema_source
+    assert set(client.startup_timings) == {"schema_snapshot_ms", "connect_ms", "total_ms"}
@@ -0,0 +1,191 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Sentiment aggregation store tests"""
+# pylint: disable=import-error
+import asyncio
+from decimal import Decimal
+
+import pytest
+from fakes import FakeStateTable
+from sentiment import CallSentimentAggregate, SentimentAggregationStore
+
+CALL_ID = "call-1"
+KEY = ("agg#call-1", "sentiment")
+
+
+def get_segment(index: int, score: float = 1.0, channel: str = "CALLER"):
+    """Transcript segment with a weighted sentiment"""
+    return dict(
+        CallId=CALL_ID,
+        Channel=channel,
+        SegmentId=f"segment-{index}",
+        StartTime=index,
+        EndTime=index + 0.5,
+        SentimentWeighted=score,
+    )
+
+
+async def no_seed(_aggregate: CallSentimentAggregate) -> None:
+    pass
+
+
+def add_segments(store: SentimentAggregationStore, *segments) -> CallSentimentAggregate:
+    """Adds segments to the call aggregate of a store and saves it"""
+
+    async def update() -> CallSentimentAggregate:
+        async with store.lock(CALL_ID):
+            aggregate = await store.get(CALL_ID, seed_fn=no_seed)
+            for segment in segments:
+                aggregate.add_segment(segment)
+            return await store.save(aggregate, expires_after=0)
+
+    return asyncio.run(update())
+
+
+def stored_segment_ids(state_table: FakeStateTable):
+    """Segment ids of the stored aggregate"""
+    return list(state_table.items[KEY]["SegmentIds"])
+
+
+def test_save_creates_the_first_revision():
+    state_table = FakeStateTable()
+    aggregate = add_segments(SentimentAggregationStore(state_table), get_segment(1))
+
+    assert aggregate.revision == 1
+    assert state_table.items[KEY]["Version"] == 1
+    assert stored_segment_ids(state_table) == ["segment-1"]
+
+
+def test_conflict_reapplies_the_pending_segments_on_the_stored_aggregate():
+    state_table = FakeStateTable()
+    store_a = SentimentAggregationStore(state_table)
+    store_b = SentimentAggregationStore(state_table)
+    add_segments(store_a, get_segment(1))
+    add_segments(store_b, get_segment(2))
+
+    # store_a has revision 1 cached and more pending segments than store_b added
+    aggregate = add_segments(store_a, get_segment(3), get_segment(4), get_segment(5))
+
+    assert aggregate.revision == 3
+    assert aggregate.channels["CALLER"].count == 5
+    assert sorted(stored_segment_ids(state_table)) == [f"segment-{i}" for i in range(1, 6)]
+
+
+def test_cached_aggregate_without_changes_is_not_read_or_written():
+    state_table = FakeStateTable()
+    store = SentimentAggregationStore(state_table)
+    add_segments(store, get_segment(1))
+    calls = dict(state_table.calls)
+
+    aggregate = add_segments(store)
+
+    assert aggregate.revision == 1
+    assert state_table.calls == calls
+
+
+def test_pending_segments_update_the_changed_attributes():
+    state_table = FakeStateTable()
+    store = SentimentAggregationStore(state_table)
+    add_segments(store, get_segment(1, score=2.0))
+
+    aggregate = add_segments(store, get_segment(2, score=4.0), get_segment(3, channel="AGENT"))
+
+    assert state_table.calls == dict(get_item=1, put_item=1, update_item=1)
+    item = state_table.items[KEY]
+    assert item["Version"] == aggregate.revision == 2
+    assert item["ScoreSum_CALLER"] == Decimal("6.0")
+    assert item["Count_CALLER"] == 2
+    assert item["Count_AGENT"] == 1
+    assert sorted(stored_segment_ids(state_table)) == ["segment-1", "segment-2", "segment-3"]
+
+
+def test_stored_aggregate_matches_the_cached_one():
+    state_table = FakeStateTable()
+    store = SentimentAggregationStore(state_table)
+    add_segments(store, get_segment(1))
+    # enough segments to widen the buckets of the channel
+    for index in range(2, 800, 3):
+        aggregate = add_segments(
+            store,
+            get_segment(index, score=index % 7 - 3 or 1),
+            get_segment(index + 1, score=2.5, channel="AGENT"),
+        )
+
+    stored = add_segments(SentimentAggregationStore(state_table))
+
+    assert state_table.calls["update_item"] > 100
+    assert aggregate.channels["CALLER"].bucket_width > 1000
+    sentiment, stored_sentiment = aggregate.get_sentiment(), stored.get_sentiment()
+    assert stored_sentiment["OverallSentiment"] == pytest.approx(sentiment["OverallSentiment"])
+    assert stored_sentiment["SentimentByPeriod"] == sentiment["SentimentByPeriod"]
+
+
+def test_segment_id_window_is_bounded(monkeypatch):
+    monkeypatch.setattr(CallSentimentAggregate, "MAX_SEGMENT_IDS", 3)
+    state_table = FakeStateTable()
+    store = SentimentAggregationStore(state_table)
+    for index in range(1, 6):
+        add_segments(store, get_segment(index))
+
+    assert sorted(stored_segment_ids(state_table)) == ["segment-3", "segment-4", "segment-5"]
+    # the window is kept when the aggregate is loaded
+    aggregate = add_segments(SentimentAggregationStore(state_table), get_segment(5))
+    assert aggregate.channels["CALLER"].count == 5
+
+
+def test_large_batches_put_the_aggregate():
+    state_table = FakeStateTable()
+    store = SentimentAggregationStore(state_table)
+    add_segments(store, get_segment(1))
+
+    segments = [
+        get_segment(index) for index in range(2, 2 + CallSentimentAggregate.MAX_UPDATE_SEGMENTS + 1)
+    ]
+    aggregate = add_segments(store, *segments)
+
+    assert state_table.calls.get("update_item") is None
+    assert state_table.calls["put_item"] == 2
+    assert state_table.items[KEY]["Count_CALLER"] == aggregate.channels["CALLER"].count
+
+
+def test_replayed_segments_are_not_counted_twice_after_a_conflict():
+    state_table = FakeStateTable()
+    store_a = SentimentAggregationStore(state_table)
+    store_b = SentimentAggregationStore(state_table)
+    add_segments(store_a, get_segment(1))
+    add_segments(store_b, get_segment(2))
+
+    aggregate = add_segments(store_a, get_segment(2))
+
+    assert aggregate.revision == 2
+    assert aggregate.channels["CALLER"].count == 2
+    assert state_table.calls["update_item"] == 2
+
+
+def test_save_raises_when_the_conflicts_persist():
+    class ConflictingStateTable(FakeStateTable):
+        """Another container writes before each put"""
+
+        def update_item(self, Key, UpdateExpression, **kwargs):
+            # pylint: disable=invalid-name
+            stored = self.items[KEY]
+            self.items[KEY] = dict(stored, Version=stored["Version"] + 1)
+            return super().update_item(Key, UpdateExpression, **kwargs)
+
+    state_table = ConflictingStateTable()
+    store = SentimentAggregationStore(state_table, max_save_attempts=2)
+    add_segments(store, get_segment(1))
+
+    with pytest.raises(RuntimeError):
+        add_segments(store, get_segment(2))
+    # the aggregate is reloaded on the next update
+    assert CALL_ID not in store._cache  # pylint: disable=protected-access
+
+
+def test_save_without_state_table_keeps_the_aggregate():
+    store = SentimentAggregationStore()
+    add_segments(store, get_segment(1))
+    aggregate = add_segments(store, get_segment(2))
+
+    assert aggregate.channels["CALLER"].count == 2
+    assert not aggregate.pending_segments
@@ -0,0 +1,81 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Sentiment batcher tests"""
+# pylint: disable=import-error
+import asyncio
+
+import boto3
+from botocore.stub import Stubber
+from sentiment import SentimentBatcher
+
+SCORE = dict(Positive=0.9, Negative=0.0, Neutral=0.1, Mixed=0.0)
+TEXTS = ["great service", "thanks a lot"]
+
+
+def detect_sentiments(batcher: SentimentBatcher, texts):
+    """Detects the sentiment of the texts concurrently"""
+
+    async def run():
+        return await asyncio.gather(
+            *(batcher.detect_sentiment(text=t, language_code="en") for t in texts)
+        )
+
+    return asyncio.run(run())
+
+
+def add_detect_sentiment_responses(stubber: Stubber, texts) -> None:
+    """Stubs a DetectSentiment response per text - sent concurrently in any order"""
+    for _ in texts:
+        stubber.add_response("detect_sentiment", dict(Sentiment="POSITIVE", SentimentScore=SCORE))
+
+
+def test_texts_are_sent_in_one_batch():
+    comprehend_client = boto3.client("comprehend", region_name="us-east-1")
+    with Stubber(comprehend_client) as stubber:
+        stubber.add_response(
+            "batch_detect_sentiment",
+            dict(
+                ResultList=[
+                    dict(Index=index, Sentiment="POSITIVE", SentimentScore=SCORE)
+                    for index in range(len(TEXTS))
+                ],
+                ErrorList=[],
+            ),
+            dict(TextList=TEXTS, LanguageCode="en"),
+        )
+        batcher = SentimentBatcher(comprehend_client)
+
+        results = detect_sentiments(batcher, TEXTS)
+
+    assert [r["Sentiment"] for r in results] == ["POSITIVE", "POSITIVE"]
+    assert batcher.stats == dict(texts=2, comprehend_requests=1)
+
+
+def test_failed_batch_request_falls_back_to_single_requests():
+    comprehend_client = boto3.client("comprehend", region_name="us-east-1")
+    with Stubber(comprehend_client) as stubber:
+        stubber.add_client_error("batch_detect_sentiment", service_error_code="ThrottlingException")
+        add_detect_sentiment_responses(stubber, TEXTS)
+        batcher = SentimentBatcher(comprehend_client)
+
+        results = detect_sentiments(batcher, TEXTS)
+        stubber.assert_no_pending_responses()
+
+    assert [r["Sentiment"] for r in results] == ["POSITIVE", "POSITIVE"]
+
+
+def test_batching_is_turned_off_when_access_is_denied():
+    comprehend_client = boto3.client("comprehend", region_name="us-east-1")
+    with Stubber(comprehend_client) as stubber:
+        stubber.add_client_error(
+            "batch_detect_sentiment", service_error_code="AccessDeniedException"
+        )
+        add_detect_sentiment_responses(stubber, TEXTS + TEXTS)
+        batcher = SentimentBatcher(comprehend_client)
+
+        detect_sentiments(batcher, TEXTS)
+        results = detect_sentiments(batcher, TEXTS)
+        stubber.assert_no_pending_responses()
+
+    assert [r["Sentiment"] for r in results] == ["POSITIVE", "POSITIVE"]
+    assert batcher.stats == dict(texts=4, comprehend_requests=5)
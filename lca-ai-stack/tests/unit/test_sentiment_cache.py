@@ -0,0 +1,100 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Sentiment cache tests"""
+# pylint: disable=import-error
+import asyncio
+from datetime import datetime, timedelta
+
+from fakes import FakeStateTable
+from sentiment import SentimentCache
+
+
+class DetectSentiment:
+    """Comprehend DetectSentiment stub counting the detections"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self) -> None:
+        self.texts = []
+
+    def __call__(self, text: str):
+        async def detect_sentiment_fn():
+            self.texts.append(text)
+            await asyncio.sleep(0)
+            return dict(
+                Sentiment="POSITIVE",
+                SentimentScore=dict(Positive=0.9, Negative=0.0, Neutral=0.1, Mixed=0.0),
+                ResponseMetadata={},
+            )
+
+        return detect_sentiment_fn
+
+
+def get_sentiments(sentiment_cache: SentimentCache, texts, concurrent: bool = False):
+    """Gets the sentiment of the texts and returns the detected texts"""
+    detect_sentiment = DetectSentiment()
+
+    async def get_sentiment(text):
+        return await sentiment_cache.get_sentiment(
+            text=text, language_code="en", detect_sentiment_fn=detect_sentiment(text)
+        )
+
+    async def run():
+        if concurrent:
+            return await asyncio.gather(*(get_sentiment(text) for text in texts))
+        return [await get_sentiment(text) for text in texts]
+
+    asyncio.run(run())
+    return detect_sentiment.texts
+
+
+def test_normalized_texts_are_cached():
+    sentiment_cache = SentimentCache()
+
+    detected = get_sentiments(sentiment_cache, ["Thank you!", "thank   you", "Thank you.", "no"])
+
+    assert detected == ["Thank you!", "no"]
+    assert sentiment_cache.stats == dict(hits=2, misses=2, table_hits=0, skipped=0, size=2)
+
+
+def test_texts_outside_the_length_bounds_are_not_cached():
+    sentiment_cache = SentimentCache(min_text_length=2, max_text_length=10)
+
+    detected = get_sentiments(sentiment_cache, ["k", "k", "a much longer utterance"] * 2)
+
+    assert len(detected) == 6
+    assert sentiment_cache.stats["skipped"] == 6
+    assert sentiment_cache.stats["size"] == 0
+
+
+def test_least_recently_used_texts_are_evicted():
+    sentiment_cache = SentimentCache(max_size=2)
+
+    detected = get_sentiments(sentiment_cache, ["yes", "no", "yes", "okay", "no", "yes"])
+
+    # okay evicts no, no then evicts yes
+    assert detected == ["yes", "no", "okay", "no", "yes"]
+    assert sentiment_cache.stats["size"] == 2
+
+
+def test_concurrent_lookups_share_a_detection():
+    sentiment_cache = SentimentCache()
+
+    detected = get_sentiments(sentiment_cache, ["hello"] * 3, concurrent=True)
+
+    assert detected == ["hello"]
+    assert sentiment_cache.stats["hits"] == 2
+
+
+def test_table_entries_are_shared_and_expire():
+    state_table = FakeStateTable()
+
+    detected = get_sentiments(SentimentCache(state_table=state_table, ttl_days=2), ["hello"])
+    other_sentiment_cache = SentimentCache(state_table=state_table)
+    other_detected = get_sentiments(other_sentiment_cache, ["Hello!"])
+
+    assert detected == ["hello"]
+    assert not other_detected
+    assert other_sentiment_cache.stats["table_hits"] == 1
+    (item,) = state_table.items.values()
+    expires_after = datetime.utcnow() + timedelta(days=2)
+    assert abs(item["ExpiresAfter"] - expires_after.timestamp()) < 60
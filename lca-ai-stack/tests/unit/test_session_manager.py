@@ -0,0 +1,123 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""AppSync session manager tests"""
+# pylint: disable=import-error,unused-argument
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import pytest
+from appsync_utils import session_manager
+from appsync_utils.session_manager import AppsyncSessionManager
+
+
+class FakeClient:
+    """AppSync client whose sessions are placeholders"""
+
+    def __init__(self) -> None:
+        self.transport = SimpleNamespace(session=None, client_session_args=None)
+        self.connect_count = 0
+
+    async def connect_async(self):
+        self.connect_count += 1
+        self.transport.session = SimpleNamespace(closed=False)
+        return SimpleNamespace(index=self.connect_count)
+
+    async def close_async(self):
+        self.transport.session = None
+
+
+@pytest.fixture(name="now")
+def fixture_now(monkeypatch):
+    """Wall clock of the session manager advanced by the tests"""
+    now = [1000.0]
+    monkeypatch.setattr(session_manager, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture(name="reasons")
+def fixture_reasons(monkeypatch):
+    """Logged reconnect reasons"""
+    reasons = []
+    monkeypatch.setattr(
+        session_manager.LOGGER, "info", lambda message, extra: reasons.append(extra["reason"])
+    )
+    return reasons
+
+
+def acquire(manager: AppsyncSessionManager, count: int = 1):
+    """Acquires the session count times on a new event loop"""
+
+    async def run():
+        return [(await manager.acquire()).index for _ in range(count)]
+
+    return asyncio.run(run())
+
+
+def test_session_is_reused(now, reasons):
+    manager = AppsyncSessionManager(client=FakeClient())  # type: ignore
+
+    assert acquire(manager, count=3) == [1, 1, 1]
+    assert manager.stats == dict(connects=1, reuses=2, reconnects=0)
+    assert not reasons
+
+
+@pytest.mark.parametrize(
+    "elapsed, reason",
+    [(61, "idle"), (0, "closed"), (0, "connection_error")],
+)
+def test_session_is_reconnected(now, reasons, elapsed, reason):
+    client = FakeClient()
+    manager = AppsyncSessionManager(client=client, max_idle_time=60)  # type: ignore
+
+    async def run():
+        await manager.acquire()
+        now[0] += elapsed
+        if reason == "closed":
+            client.transport.session.closed = True
+        elif reason == "connection_error":
+            manager.report_errors([ValueError(), aiohttp.ServerDisconnectedError()])
+        return (await manager.acquire()).index
+
+    assert asyncio.run(run()) == 2
+    assert reasons == [reason]
+    assert manager.stats == dict(connects=2, reuses=0, reconnects=1)
+
+
+def test_session_is_reconnected_after_its_max_age(now, reasons):
+    manager = AppsyncSessionManager(  # type: ignore
+        client=FakeClient(), max_idle_time=60, max_session_age=100
+    )
+
+    async def run():
+        indexes = []
+        for _ in range(3):
+            indexes.append((await manager.acquire()).index)
+            now[0] += 60
+        return indexes
+
+    assert asyncio.run(run()) == [1, 1, 2]
+    assert reasons == ["age"]
+
+
+def test_session_is_reconnected_on_a_new_event_loop(now, reasons):
+    manager = AppsyncSessionManager(client=FakeClient())  # type: ignore
+
+    assert acquire(manager) + acquire(manager) == [1, 2]
+    assert reasons == ["event_loop_changed"]
+
+
+def test_errors_other_than_connection_errors_keep_the_session(now, reasons):
+    manager = AppsyncSessionManager(client=FakeClient())  # type: ignore
+
+    async def run():
+        async with manager.session():
+            pass
+        with pytest.raises(ValueError):
+            async with manager.session():
+                raise ValueError("validation")
+        async with manager.session() as session:
+            return session.index
+
+    assert asyncio.run(run()) == 1
+    assert not reasons
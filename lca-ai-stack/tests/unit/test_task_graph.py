@@ -0,0 +1,91 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Task graph tests"""
+# pylint: disable=import-error
+import asyncio
+
+import pytest
+from transcript_batch_processor import TaskGraph
+
+
+async def record(events, name: str, delay: float = 0.0, error: bool = False) -> str:
+    """Task recording its start and end"""
+    events.append(("start", name))
+    await asyncio.sleep(delay)
+    events.append(("end", name))
+    if error:
+        raise RuntimeError(name)
+    return name
+
+
+def test_dependent_task_starts_after_its_dependencies():
+    events = []
+    task_graph = TaskGraph()
+    first = task_graph.add(record(events, "first", delay=0.02))
+    task_graph.add(record(events, "independent"))
+    task_graph.add(record(events, "dependent"), after=[first])
+
+    results = asyncio.run(task_graph.run())
+
+    assert results == ["first", "independent", "dependent"]
+    assert events.index(("start", "independent")) < events.index(("end", "first"))
+    assert events.index(("end", "first")) < events.index(("start", "dependent"))
+
+
+def test_failed_dependency_is_reported_and_dependents_still_run():
+    events = []
+    task_graph = TaskGraph()
+    write = task_graph.add(record(events, "write", error=True))
+
+    def get_next_write():
+        # called when the task starts - the dependency failed
+        assert isinstance(task_graph.result(write), RuntimeError)
+        return record(events, "next write")
+
+    task_graph.add(get_next_write, after=[write])
+
+    results = asyncio.run(task_graph.run())
+
+    assert isinstance(results[0], RuntimeError)
+    assert results[1] == "next write"
+    assert events[-1] == ("end", "next write")
+
+
+def test_failure_of_a_dependent_does_not_fail_the_other_tasks():
+    events = []
+    task_graph = TaskGraph()
+    first = task_graph.add(record(events, "first"))
+    task_graph.add(record(events, "failed", error=True), after=[first])
+    task_graph.add(record(events, "other"), after=[first])
+
+    results = asyncio.run(task_graph.run())
+
+    assert results[0] == "first"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == "other"
+
+
+def test_running_task_waits_for_other_tasks():
+    events = []
+    task_graph = TaskGraph()
+    write = task_graph.add(record(events, "write", delay=0.01))
+
+    async def sentiment_write():
+        events.append(("start", "sentiment"))
+        await task_graph.wait([write])
+        return await record(events, "sentiment write")
+
+    task_graph.add(sentiment_write)
+
+    asyncio.run(task_graph.run())
+
+    assert events.index(("start", "sentiment")) < events.index(("end", "write"))
+    assert events.index(("end", "write")) < events.index(("start", "sentiment write"))
+
+
+@pytest.mark.parametrize("after", [[0], [-1], [5]])
+def test_dependencies_must_be_added_before(after):
+    task_graph = TaskGraph()
+
+    with pytest.raises(ValueError):
+        task_graph.add(asyncio.sleep, after=after)
@@ -0,0 +1,113 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Transcript batch processor tests"""
+# pylint: disable=import-error
+import asyncio
+import base64
+import json
+from time import time
+from types import SimpleNamespace
+
+from transcript_batch_processor import TranscriptBatchProcessor
+
+
+class FakeAppsyncClient:
+    """AppSync client context manager returning a placeholder session"""
+
+    async def __aenter__(self):
+        return SimpleNamespace(client=SimpleNamespace(schema=None))
+
+    async def __aexit__(self, *args):
+        return False
+
+
+def get_kds_event(messages, arrival_timestamp: float):
+    """Kinesis event of the messages"""
+    return dict(
+        Records=[
+            dict(
+                eventID=f"shardId-000000000000:{index}",
+                eventSource="aws:kinesis",
+                kinesis=dict(
+                    data=base64.b64encode(json.dumps(message).encode()).decode(),
+                    partitionKey=message["CallId"],
+                    sequenceNumber=str(index),
+                    approximateArrivalTimestamp=arrival_timestamp,
+                ),
+            )
+            for index, message in enumerate(messages)
+        ]
+    )
+
+
+def process(messages, lag: float):
+    """Processes the messages in priority mode and returns the mutations in run order"""
+    mutations = []
+
+    async def api_mutation_fn(message, **_kwargs):
+        mutations.append((message["CallId"], message["EventType"], message.get("SegmentId")))
+        await asyncio.sleep(0)
+        return dict(errors=[])
+
+    async def run():
+        async with TranscriptBatchProcessor(
+            appsync_client=FakeAppsyncClient(),  # type: ignore
+            api_mutation_fn=api_mutation_fn,  # type: ignore
+            sns_client=None,
+            settings={},
+            coalesce_partial_transcripts_enabled=False,
+            priority_mode_lag_threshold=60.0,
+        ) as processor:
+            await processor.handle_event(get_kds_event(messages, time() - lag))
+        return processor
+
+    processor = asyncio.run(run())
+    return processor, mutations
+
+
+def get_segment(call_id: str, segment_id: str):
+    """Final transcript segment"""
+    return dict(
+        EventType="ADD_TRANSCRIPT_SEGMENT",
+        CallId=call_id,
+        SegmentId=segment_id,
+        IsPartial=False,
+        Transcript=segment_id,
+    )
+
+
+MESSAGES = [
+    get_segment("call-2", "b1"),
+    dict(EventType="START", CallId="call-1"),
+    get_segment("call-1", "a1"),
+    get_segment("call-1", "a2"),
+    dict(EventType="ADD_SUMMARY", CallId="call-1"),
+    dict(EventType="END", CallId="call-1"),
+    get_segment("call-2", "b2"),
+]
+
+
+def test_priority_mode_keeps_the_stream_order_of_each_call():
+    processor, mutations = process(MESSAGES, lag=120.0)
+
+    assert processor.metrics["priority_mode"] == 1
+    # the start records run first
+    assert mutations[0] == ("call-1", "START", None)
+    # the call with lifecycle records is scheduled first
+    assert mutations[1][0] == "call-1"
+    assert [m for m in mutations if m[0] == "call-1"] == [
+        ("call-1", "START", None),
+        ("call-1", "ADD_TRANSCRIPT_SEGMENT", "a1"),
+        ("call-1", "ADD_TRANSCRIPT_SEGMENT", "a2"),
+        ("call-1", "ADD_SUMMARY", None),
+        ("call-1", "END", None),
+    ]
+    assert [m[2] for m in mutations if m[0] == "call-2"] == ["b1", "b2"]
+
+
+def test_records_run_in_stream_order_without_backlog():
+    processor, mutations = process(MESSAGES, lag=0.0)
+
+    assert processor.metrics["priority_mode"] == 0
+    assert [m for m in mutations if m[0] == "call-1"][0] == ("call-1", "START", None)
+    assert mutations[0] == ("call-2", "ADD_TRANSCRIPT_SEGMENT", "b1")
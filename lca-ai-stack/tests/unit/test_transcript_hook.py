@@ -0,0 +1,138 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Batched and in-process transcript hook tests"""
+# pylint: disable=import-error,unused-argument
+import asyncio
+import io
+import json
+
+import pytest
+from event_processor import call_event_processor
+from transcript_hooks import (
+    LambdaBatchTranscriptHook,
+    PluginTranscriptHook,
+    load_transcript_hook_plugin,
+)
+
+
+def redact(segments):
+    """Transcript hook plugin redacting the transcripts"""
+    return [
+        dict(segment, OriginalTranscript=segment["Transcript"], Transcript="***")
+        for segment in segments
+    ]
+
+
+async def redact_async(segments):
+    """Coroutine transcript hook plugin"""
+    await asyncio.sleep(0)
+    return redact(segments)
+
+
+def get_segments(count: int = 2, is_partial: bool = False):
+    """Transcript segments of a call"""
+    return [
+        dict(
+            CallId="call-1", SegmentId=f"segment-{i}", Transcript=f"text {i}", IsPartial=is_partial
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("hook_fn", [redact, redact_async])
+def test_plugin_hook_is_called_once_for_the_segments(hook_fn):
+    hook = PluginTranscriptHook(hook_fn)
+    segments = get_segments()
+
+    result = asyncio.run(hook.apply(segments))
+
+    assert [s["Transcript"] for s in result] == ["***", "***"]
+    assert [s["OriginalTranscript"] for s in result] == ["text 0", "text 1"]
+    # the hook receives copies of the segments
+    assert segments == get_segments()
+    assert hook.stats["count"] == 1
+    assert hook.stats["segments"] == 2
+
+
+@pytest.mark.parametrize("hook_fn", [lambda segments: None, lambda segments: segments[:1]])
+def test_invalid_hook_results_keep_the_segments(hook_fn):
+    hook = PluginTranscriptHook(hook_fn)
+
+    assert asyncio.run(hook.apply(get_segments())) == get_segments()
+    assert hook.stats["invalid_results"] == 1
+
+
+def test_hook_exceptions_are_raised():
+    def fail(segments):
+        raise RuntimeError("hook failed")
+
+    hook = PluginTranscriptHook(fail)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(hook.apply(get_segments()))
+    assert hook.stats["errors"] == 1
+
+
+class FakeInvoker:
+    """Lambda invoker returning the payload of a transcript hook function"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, response_fn) -> None:
+        self.requests = []
+        self._response_fn = response_fn
+
+    async def invoke(self, **kwargs):
+        self.requests.append(kwargs)
+        payload = self._response_fn(kwargs["payload"]["Segments"])
+        return dict(Payload=io.BytesIO(payload.encode("utf-8")))
+
+
+@pytest.mark.parametrize(
+    "response_fn, transcripts",
+    [
+        (lambda segments: json.dumps(dict(Segments=redact(segments))), ["***", "***"]),
+        (lambda segments: json.dumps(redact(segments)), ["***", "***"]),
+        (lambda segments: "not json", ["text 0", "text 1"]),
+    ],
+)
+def test_lambda_hook_is_invoked_once_for_the_segments(response_fn, transcripts):
+    invoker = FakeInvoker(response_fn)
+    hook = LambdaBatchTranscriptHook(invoker=invoker, function_name="hook")  # type: ignore
+
+    result = asyncio.run(hook.apply(get_segments()))
+
+    assert [s["Transcript"] for s in result] == transcripts
+    assert len(invoker.requests) == 1
+    assert invoker.requests[0]["function_name"] == "hook"
+    assert invoker.requests[0]["hook_type"] == "transcript_batch"
+
+
+def test_plugin_is_loaded_from_its_entry_point():
+    assert load_transcript_hook_plugin("test_transcript_hook:redact") is redact
+    assert load_transcript_hook_plugin(" json:JSONEncoder.encode ") is json.JSONEncoder.encode
+    with pytest.raises(ValueError):
+        load_transcript_hook_plugin("test_transcript_hook")
+    with pytest.raises(TypeError):
+        load_transcript_hook_plugin("os:sep")
+
+
+@pytest.mark.parametrize("nonpartial_only, hooked_count", [(True, 2), (False, 3)])
+def test_segments_of_messages_are_hooked_in_a_single_call(
+    monkeypatch, nonpartial_only, hooked_count
+):
+    hook = PluginTranscriptHook(redact)
+    monkeypatch.setattr(call_event_processor, "TRANSCRIPT_HOOK", hook)
+    monkeypatch.setattr(
+        call_event_processor, "TRANSCRIPT_LAMBDA_HOOK_FUNCTION_NONPARTIAL_ONLY", nonpartial_only
+    )
+    segment_lists = [get_segments(1), get_segments(1, is_partial=True), get_segments(1)]
+
+    result = asyncio.run(call_event_processor.apply_transcript_hook(segment_lists))
+
+    assert [s["Transcript"] for segments in result for s in segments] == [
+        "***",
+        "text 0" if nonpartial_only else "***",
+        "***",
+    ]
+    assert hook.stats["count"] == 1
+    assert hook.stats["segments"] == hooked_count
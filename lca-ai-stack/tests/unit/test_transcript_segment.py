@@ -0,0 +1,88 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Transcript segment model tests"""
+# pylint: disable=import-error
+import json
+
+import pytest
+from eventprocessor_utils import TranscriptSegment
+
+
+def get_segment(**extra):
+    """Final segment with some unset fields"""
+    return TranscriptSegment(
+        CallId="call-1",
+        Channel="CALLER",
+        SegmentId="segment-1",
+        StartTime=0.0,
+        EndTime=1.5,
+        Transcript="hello",
+        IsPartial=False,
+        Sentiment=None,
+        **extra,
+    )
+
+
+def test_unset_fields_are_not_part_of_the_mapping():
+    segment = get_segment()
+
+    assert dict(segment) == segment.to_dict()
+    assert list(segment) == [
+        "CallId",
+        "Channel",
+        "SegmentId",
+        "StartTime",
+        "EndTime",
+        "Transcript",
+        "IsPartial",
+        "Sentiment",
+    ]
+    assert len(segment) == 8
+    # None is a value, unlike the unset fields
+    assert "Sentiment" in segment
+    assert "ContactId" not in segment
+    assert segment.get("ContactId", "default") == "default"
+    with pytest.raises(KeyError):
+        segment["ContactId"]  # pylint: disable=pointless-statement
+
+
+def test_fields_and_extra_keys_are_set_and_deleted():
+    segment = get_segment(EventType="ADD_TRANSCRIPT_SEGMENT")
+
+    segment["Sentiment"] = "POSITIVE"
+    segment["Speaker"] = "Caller"
+    del segment["Transcript"]
+    del segment["EventType"]
+
+    assert segment.Sentiment == "POSITIVE"
+    assert segment["Speaker"] == "Caller"
+    assert "Transcript" not in segment
+    assert "EventType" not in segment
+    with pytest.raises(KeyError):
+        del segment["Transcript"]
+    assert json.loads(json.dumps(segment.to_dict()))["Speaker"] == "Caller"
+
+
+def test_copy_is_independent():
+    segment = get_segment(Speaker="Caller")
+
+    copied_segment = segment.copy()
+    copied_segment["Transcript"] = "changed"
+    copied_segment["Speaker"] = "Agent"
+
+    assert copied_segment == dict(segment, Transcript="changed", Speaker="Agent")
+    assert segment["Transcript"] == "hello"
+    assert segment["Speaker"] == "Caller"
+
+
+def test_segment_updates_like_a_dict():
+    segment = get_segment()
+    expected = segment.to_dict()
+
+    segment.update(CreatedAt="2026-01-01T00:00:00Z", Status="TRANSCRIBING")
+    expected.update(CreatedAt="2026-01-01T00:00:00Z", Status="TRANSCRIBING")
+
+    assert segment == expected
+    assert segment.setdefault("Status", "ENDED") == "TRANSCRIBING"
+    assert segment.pop("Status") == "TRANSCRIBING"
+    assert "Status" not in segment